@@ -6,12 +6,14 @@ ETL пакет для обработки Excel файлов статистиче
 - batch_excel_processor: пакетная обработка всех регионов
 - excel_utils_single_folder: утилиты для работы с листами Excel
 - regional_excel_processor: обработка региональных файлов
+- workbook_splitter: потоковое разбиение региональной книги на CSV разделов
 """
 
 from .excel_processor import process_excel_file, process_directory
 from .batch_excel_processor import process_all_regions, print_summary_report
 from .excel_utils_single_folder import save_sheets_to_single_folder
 from .regional_excel_processor import process_regional_files
+from .workbook_splitter import split_workbook_to_csv
 
 __all__ = [
     'process_excel_file',
@@ -19,5 +21,6 @@ __all__ = [
     'process_all_regions',
     'print_summary_report',
     'save_sheets_to_single_folder',
-    'process_regional_files'
+    'process_regional_files',
+    'split_workbook_to_csv'
 ]
\ No newline at end of file
@@ -1,21 +1,106 @@
 import os
 import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 
 # Поддержка как относительных, так и абсолютных импортов
 try:
-    from .excel_processor import process_directory
+    from .excel_processor import process_directory, list_excel_files, convert_excel_file
 except ImportError:
-    from excel_processor import process_directory
+    from excel_processor import process_directory, list_excel_files, convert_excel_file
 
+# Количество процессов для преобразования Excel файлов (1 - последовательно по папкам)
+DEFAULT_EXCEL_WORKERS = int(os.environ.get("EXCEL_PROCESSOR_WORKERS", 1))
 
-def process_all_regions(base_directory: str = "2024/") -> Dict[str, Any]:
+
+def convert_workbook(file_path: str) -> Tuple[float, Optional[str]]:
+    """
+    Преобразует один Excel файл в CSV (выполняется в рабочем процессе).
+    
+    Args:
+        file_path: путь к Excel файлу
+        
+    Returns:
+        Кортеж (время обработки в секундах, текст ошибки или None)
+    """
+    start_time = time.time()
+    try:
+        convert_excel_file(file_path)
+        return time.time() - start_time, None
+    except Exception as e:
+        return time.time() - start_time, str(e)
+
+
+def process_folders_parallel(base_directory: str, folders: List[str], result: Dict[str, Any], max_workers: int) -> None:
+    """
+    Преобразует Excel файлы всех папок в пуле процессов и заполняет результаты по папкам.
+    
+    Единица работы - отдельный файл, поэтому большие папки не задерживают
+    остальные. Время папки - суммарное время обработки ее файлов,
+    папка считается неуспешной, если хотя бы один файл завершился ошибкой.
+    
+    Args:
+        base_directory: путь к директории с региональными папками
+        folders: имена папок
+        result: словарь результатов process_all_regions (изменяется на месте)
+        max_workers: количество рабочих процессов
+    """
+    folder_errors: Dict[str, str] = {}
+    tasks: List[Tuple[str, str]] = []
+    for folder_name in sorted(folders):
+        try:
+            tasks.extend((folder_name, file_path) for file_path in list_excel_files(os.path.join(base_directory, folder_name)))
+        except Exception as e:
+            folder_errors[folder_name] = str(e)
+
+    file_paths = [file_path for _, file_path in tasks]
+    print(f"Файлов для обработки: {len(file_paths)}, процессов: {max_workers}")
+
+    outcomes: List[Optional[Tuple[float, Optional[str]]]] = [None] * len(file_paths)
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(convert_workbook, file_path): index for index, file_path in enumerate(file_paths)}
+            for future in as_completed(futures):
+                try:
+                    outcomes[futures[future]] = future.result()
+                except Exception as e:
+                    # Пул сломан (например, рабочий процесс завершился аварийно):
+                    # файл будет обработан повторно последовательно
+                    print(f"Файл {os.path.basename(file_paths[futures[future]])} не обработан в пуле процессов: {str(e)}")
+    except Exception as e:
+        print(f"Параллельная обработка недоступна: {str(e)}")
+
+    # Последовательно обрабатываются только файлы без результата
+    pending = [index for index, outcome in enumerate(outcomes) if outcome is None]
+    if pending:
+        print(f"Последовательная обработка оставшихся файлов: {len(pending)}")
+        for index in pending:
+            outcomes[index] = convert_workbook(file_paths[index])
+
+    for (folder_name, file_path), (elapsed, error) in zip(tasks, outcomes):
+        result["folder_times"][folder_name] = result["folder_times"].get(folder_name, 0.0) + elapsed
+        if error is not None:
+            folder_errors.setdefault(folder_name, f"{os.path.basename(file_path)}: {error}")
+
+    for folder_name in sorted(folders):
+        result["folder_times"].setdefault(folder_name, 0.0)
+        if folder_name in folder_errors:
+            result["failed"] += 1
+            result["errors"].append({"folder": folder_name, "error": folder_errors[folder_name]})
+            print(f"✗ {folder_name}: {folder_errors[folder_name]}")
+        else:
+            result["successful"] += 1
+            print(f"✓ {folder_name}: {result['folder_times'][folder_name]:.2f} сек")
+
+
+def process_all_regions(base_directory: str = "2024/", max_workers: int = DEFAULT_EXCEL_WORKERS) -> Dict[str, Any]:
     """
     Обрабатывает все папки в указанной директории, используя excel_processor.
     
     Args:
         base_directory: путь к директории с региональными папками
+        max_workers: количество процессов (больше 1 - файлы всех папок обрабатываются в пуле процессов)
         
     Returns:
         Словарь с результатами обработки:
@@ -72,6 +157,11 @@ def process_all_regions(base_directory: str = "2024/") -> Dict[str, Any]:
         result["execution_time"] = time.time() - start_time
         return result
     
+    if max_workers > 1 and folders:
+        process_folders_parallel(base_directory, folders, result, max_workers)
+        result["execution_time"] = time.time() - start_time
+        return result
+    
     # Обрабатываем каждую папку
     for folder_name in sorted(folders):
         folder_path = os.path.join(base_directory, folder_name)
@@ -155,6 +245,7 @@ def print_summary_report(result: Dict[str, Any]) -> None:
 if __name__ == "__main__":
     print("Запуск массовой обработки Excel файлов...")
     print("Обрабатываются все папки в директории '2024/'")
+    print(f"Процессов: {DEFAULT_EXCEL_WORKERS} (переменная окружения EXCEL_PROCESSOR_WORKERS)")
     print()
     
     # Запускаем обработку
@@ -0,0 +1,333 @@
+"""
+Экспорт графа в CSV для офлайн-импорта (neo4j-admin database import).
+
+Узлы и связи пишутся построчно в пары файлов "заголовок + данные" по мере
+обработки, без накопления графа в памяти. Идентификаторы стабильные:
+показатели (Счетное, Расчетные) - по name в пространстве Indicator,
+регионы - по названию в пространстве Region. Поэтому экспорт узлов и
+расчетных узлов можно выполнять отдельными запусками в один каталог.
+"""
+
+import os
+import csv
+import math
+from typing import Dict, List, Optional, Any, Iterable, Set
+
+# Разделитель элементов массивов (--array-delimiter)
+ARRAY_DELIMITER = ";"
+
+# Пространства идентификаторов
+INDICATOR_ID_SPACE = "Indicator"
+REGION_ID_SPACE = "Region"
+
+# Группы файлов: имя -> базовые колонки заголовка (ключ свойства, поле заголовка)
+SCHETNOE_FIELDS = [
+    ("id", f"id:ID({INDICATOR_ID_SPACE})"),
+    ("name", "name"),
+    ("полное_название", "полное_название"),
+    ("years", "years:string[]"),
+    ("federal_values", "federal_values:double[]"),
+    ("periods_config_json", "periods_config_json"),
+    ("labels", ":LABEL"),
+]
+
+RASCHETNYE_FIELDS = [
+    ("id", f"id:ID({INDICATOR_ID_SPACE})"),
+    ("name", "name"),
+    ("полное_название", "полное_название"),
+    ("years", "years:string[]"),
+    ("federal_values", "federal_values:double[]"),
+    ("formula", "formula"),
+    ("child_nodes", "child_nodes:string[]"),
+    ("labels", ":LABEL"),
+]
+
+REGION_FIELDS = [
+    ("id", f"id:ID({REGION_ID_SPACE})"),
+    ("name", "name"),
+    ("labels", ":LABEL"),
+]
+
+LINK_FIELDS = [
+    ("start", f":START_ID({INDICATOR_ID_SPACE})"),
+    ("end", f":END_ID({INDICATOR_ID_SPACE})"),
+    ("type", ":TYPE"),
+]
+
+
+def format_csv_value(value: Any) -> str:
+    """
+    Преобразует значение свойства в поле CSV для neo4j-admin.
+
+    Args:
+        value (Any): Значение свойства (None - отсутствующее значение)
+
+    Returns:
+        str: Поле CSV (массивы через ARRAY_DELIMITER, None в массиве чисел - NaN)
+    """
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return ARRAY_DELIMITER.join("NaN" if item is None else str(item) for item in value)
+    return str(value)
+
+
+def parse_double(value: str) -> Optional[float]:
+    """
+    Разбирает число из экспортированного CSV.
+
+    Args:
+        value (str): Поле CSV
+
+    Returns:
+        Optional[float]: Значение или None для пустого поля и NaN
+    """
+    if value == "":
+        return None
+    number = float(value)
+    return None if math.isnan(number) else number
+
+
+class _CsvGroup:
+    """
+    Пара файлов "заголовок + данные" одной группы узлов или связей
+    """
+
+    def __init__(self, output_dir: str, name: str, fields: List[tuple], append: bool):
+        """
+        Args:
+            output_dir (str): Каталог экспорта
+            name (str): Имя группы (основа имен файлов)
+            fields (List[tuple]): Колонки (ключ, поле заголовка)
+            append (bool): Дописывать данные к существующему файлу
+        """
+        self.header_path = os.path.join(output_dir, f"{name}_header.csv")
+        self.data_path = os.path.join(output_dir, f"{name}.csv")
+        self.rows = 0
+
+        if append and os.path.exists(self.header_path):
+            # Дописываем в колонки существующего заголовка
+            keys_by_header = {header: key for key, header in fields}
+            with open(self.header_path, 'r', encoding='utf-8', newline='') as f:
+                headers = next(csv.reader(f), [])
+            self.fields = [(keys_by_header.get(header, header), header) for header in headers]
+        else:
+            self.fields = fields
+            with open(self.header_path, 'w', encoding='utf-8', newline='') as f:
+                csv.writer(f).writerow([header for _, header in fields])
+
+        self._file = open(self.data_path, 'a' if append else 'w', encoding='utf-8', newline='')
+        self._writer = csv.writer(self._file)
+
+    def write(self, row: Dict[str, Any]) -> None:
+        """
+        Записывает строку данных.
+
+        Args:
+            row (Dict[str, Any]): Значения по ключам колонок
+        """
+        self._writer.writerow([format_csv_value(row.get(key)) for key, _ in self.fields])
+        self.rows += 1
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class BulkImportExporter:
+    """
+    Потоковая запись узлов и связей графа в CSV формата neo4j-admin import
+    """
+
+    def __init__(self, output_dir: str, years: List[str], extra_properties: Iterable[str] = (), append: bool = False):
+        """
+        Args:
+            output_dir (str): Каталог экспорта
+            years (List[str]): Годы значений (свойства value_YYYY связей ПоРегион)
+            extra_properties (Iterable[str]): Дополнительные свойства узлов Счетное из конфигурации
+            append (bool): Дописывать к ранее экспортированным файлам (например, расчетные узлы после узлов Счетное)
+        """
+        self.output_dir = output_dir
+        self.years = list(years)
+        os.makedirs(output_dir, exist_ok=True)
+
+        regions_path = os.path.join(output_dir, "regions.csv")
+        self._regions: Set[str] = set()
+        if append and os.path.exists(regions_path):
+            with open(regions_path, 'r', encoding='utf-8', newline='') as f:
+                self._regions = {row[0] for row in csv.reader(f) if row}
+
+        schetnoe_fields = SCHETNOE_FIELDS[:-1] + [(key, key) for key in sorted(set(extra_properties))] + SCHETNOE_FIELDS[-1:]
+        poregion_fields = (
+            [("start", f":START_ID({INDICATOR_ID_SPACE})"), ("end", f":END_ID({REGION_ID_SPACE})")]
+            + [(f"value_{year}", f"value_{year}:double") for year in self.years]
+            + [("type", ":TYPE")]
+        )
+
+        self.groups = {
+            "schetnoe": _CsvGroup(output_dir, "schetnoe", schetnoe_fields, append),
+            "raschetnye": _CsvGroup(output_dir, "raschetnye", RASCHETNYE_FIELDS, append),
+            "regions": _CsvGroup(output_dir, "regions", REGION_FIELDS, append),
+            "poregion": _CsvGroup(output_dir, "poregion", poregion_fields, append),
+            "links": _CsvGroup(output_dir, "links", LINK_FIELDS, append),
+        }
+
+    def __enter__(self) -> "BulkImportExporter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def write_indicator(self, group: str, properties: Dict[str, Any], labels: List[str]) -> str:
+        """
+        Записывает узел показателя (Счетное или Расчетные).
+
+        Args:
+            group (str): "schetnoe" или "raschetnye"
+            properties (Dict[str, Any]): Свойства узла (name обязателен)
+            labels (List[str]): Метки узла
+
+        Returns:
+            str: Стабильный ID узла
+        """
+        node_id = properties["name"]
+        self.groups[group].write({**properties, "id": node_id, "labels": labels})
+        return node_id
+
+    def write_regional_values(self, node_id: str, regions: List[str], regional_values: List[List[Optional[float]]]) -> int:
+        """
+        Записывает связи ПоРегион узла (и узлы новых регионов).
+
+        Args:
+            node_id (str): Стабильный ID узла показателя
+            regions (List[str]): Список регионов
+            regional_values (List[List[Optional[float]]]): Данные по регионам и годам
+
+        Returns:
+            int: Количество записанных связей
+        """
+        written = 0
+
+        for region, region_data in zip(regions, regional_values):
+            if region not in self._regions:
+                self._regions.add(region)
+                self.groups["regions"].write({"id": region, "name": region, "labels": ["Регион"]})
+
+            row = {"start": node_id, "end": region, "type": "ПоРегион"}
+            for j, year in enumerate(self.years):
+                row[f"value_{year}"] = region_data[j] if j < len(region_data) else None
+
+            self.groups["poregion"].write(row)
+            written += 1
+
+        return written
+
+    def write_link(self, from_id: str, to_id: str, relationship_type: str) -> None:
+        """
+        Записывает связь между показателями (ОСНОВАН_НА, ИСПОЛЬЗУЕТСЯ_В).
+
+        Args:
+            from_id (str): ID исходного показателя
+            to_id (str): ID целевого показателя
+            relationship_type (str): Тип связи
+        """
+        self.groups["links"].write({"start": from_id, "end": to_id, "type": relationship_type})
+
+    def exported_indicator_names(self) -> Set[str]:
+        """
+        Возвращает имена всех уже экспортированных показателей.
+
+        Returns:
+            Set[str]: Имена узлов Счетное и Расчетные
+        """
+        names = set()
+        for group in ("schetnoe", "raschetnye"):
+            self.groups[group].flush()
+            with open(self.groups[group].data_path, 'r', encoding='utf-8', newline='') as f:
+                names.update(row[0] for row in csv.reader(f) if row)
+        return names
+
+    def load_indicator_data(self, names: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Читает обратно данные экспортированных показателей (для расчета узлов Расчетные).
+        Файлы просматриваются потоково, в память попадают только запрошенные узлы.
+
+        Args:
+            names (Iterable[str]): Имена показателей
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Данные в формате get_node_data_by_id по имени
+        """
+        wanted = set(names)
+        data: Dict[str, Dict[str, Any]] = {}
+
+        for group_name in ("schetnoe", "raschetnye"):
+            group = self.groups[group_name]
+            group.flush()
+            federal_index = [key for key, _ in group.fields].index("federal_values")
+
+            with open(group.data_path, 'r', encoding='utf-8', newline='') as f:
+                for row in csv.reader(f):
+                    if not row or row[0] not in wanted:
+                        continue
+                    federal_field = row[federal_index]
+                    federal_values = [parse_double(value) for value in federal_field.split(ARRAY_DELIMITER)] if federal_field else []
+                    data[row[0]] = {
+                        "node_id": row[0],
+                        "node_name": row[0],
+                        "federal_values": federal_values,
+                        "years": list(self.years),
+                        "regional": {}
+                    }
+
+        poregion = self.groups["poregion"]
+        poregion.flush()
+        with open(poregion.data_path, 'r', encoding='utf-8', newline='') as f:
+            for row in csv.reader(f):
+                if row and row[0] in data:
+                    data[row[0]]["regional"][row[1]] = [parse_double(value) for value in row[2:2 + len(self.years)]]
+
+        # Регионы упорядочены по названию, как в get_node_data_by_id
+        for node_data in data.values():
+            regional = node_data.pop("regional")
+            node_data["regions"] = sorted(regional)
+            node_data["regional_values"] = [regional[region] for region in node_data["regions"]]
+
+        return data
+
+    def import_command(self, database: str = "neo4j") -> str:
+        """
+        Формирует команду офлайн-импорта для экспортированных файлов.
+
+        Args:
+            database (str): Имя базы данных
+
+        Returns:
+            str: Команда neo4j-admin database import
+        """
+        def files(group: str) -> str:
+            return f"{self.groups[group].header_path},{self.groups[group].data_path}"
+
+        parts = ["neo4j-admin database import full"]
+        parts += [f'--nodes="{files(group)}"' for group in ("regions", "schetnoe", "raschetnye")]
+        parts += [f'--relationships="{files(group)}"' for group in ("poregion", "links")]
+        parts += [f'--array-delimiter="{ARRAY_DELIMITER}"', "--overwrite-destination=true", database]
+        return " ".join(parts)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Возвращает количество строк, записанных в каждую группу за этот запуск.
+
+        Returns:
+            Dict[str, int]: Количество строк по группам
+        """
+        return {name: group.rows for name, group in self.groups.items()}
+
+    def close(self) -> None:
+        """
+        Закрывает файлы экспорта
+        """
+        for group in self.groups.values():
+            group.close()
@@ -1,22 +1,62 @@
+import os
 import json
-import re
+import threading
+from collections import ChainMap
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Any, Tuple
-from ETL.neo4j_node_creator import Neo4jNodeCreator
+from ETL.neo4j_node_creator import Neo4jNodeCreator, DEFAULT_STORAGE_LAYOUT
+from ETL.etl_manifest import EtlManifest, config_hash, default_manifest_path
+from ETL.graph_schema import format_schema_report
+from ETL.bulk_export import BulkImportExporter
+from ETL.regional_layout import unpack_regional_values, values_equal
+from ETL.formula_engine import FormulaError, evaluate_federal, evaluate_regional
+from ETL.calculation_graph import build_dependency_levels, resolve_batch_dependency
+from ETL.virtual_indicators import VIRTUAL_PROPERTY, VirtualIndicatorResolver
+
+# Количество потоков для вычисления и записи независимых расчетных узлов
+DEFAULT_CALCULATION_WORKERS = int(os.environ.get("CALCULATED_NODES_WORKERS", 4))
+
+# Свойства, которые записываются для виртуального расчетного узла
+VIRTUAL_NODE_PROPERTIES = ("name", "полное_название", "years", "formula", "child_nodes")
 
 class CalculatedNodeCreator(Neo4jNodeCreator):
     """
     Класс для создания расчетных узлов в Neo4j на основе существующих узлов "Счетное"
     """
     
-    def __init__(self, config_path: str = "neo4j_config.json"):
+    def __init__(self, config_path: str = "neo4j_config.json", storage_layout: str = DEFAULT_STORAGE_LAYOUT,
+                 calculation_workers: int = DEFAULT_CALCULATION_WORKERS):
         """
         Инициализация класса
         
         Args:
             config_path (str): Путь к файлу конфигурации Neo4j
+            storage_layout (str): Хранение региональных данных (relationships, array, both)
+            calculation_workers (int): Количество потоков для узлов одного уровня зависимостей (1 - последовательно)
         """
-        super().__init__(config_path)
+        super().__init__(config_path, storage_layout=storage_layout)
+        self.calculation_workers = max(1, int(calculation_workers))
+        # Лог обработки ведется отдельно в каждом потоке
+        self._local = threading.local()
         self.processing_log = []
+        # Данные узлов, вычисленных в текущем пакете, по ID
+        self.computed_nodes: Dict[str, Dict[str, Any]] = {}
+        # Накопление связей ОСНОВАН_НА / ИСПОЛЬЗУЕТСЯ_В для массовой записи (None - запись сразу)
+        self.lineage_rows_buffer: Optional[List[Dict[str, str]]] = None
+        self._lineage_lock = threading.Lock()
+    
+    @property
+    def processing_log(self) -> List[str]:
+        """
+        Лог обработки текущего узла (свой для каждого потока)
+        """
+        if not hasattr(self._local, "processing_log"):
+            self._local.processing_log = []
+        return self._local.processing_log
+    
+    @processing_log.setter
+    def processing_log(self, value: List[str]) -> None:
+        self._local.processing_log = value
     
     def log_message(self, message: str) -> None:
         """
@@ -28,6 +68,52 @@ class CalculatedNodeCreator(Neo4jNodeCreator):
         print(message)
         self.processing_log.append(message)
     
+    def get_nodes_data_by_ids(self, node_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Получает данные узлов "Счетное" и "Расчетные" одним запросом UNWIND
+        
+        Федеральные и региональные значения выравниваются по годам self.years
+        (по свойству years узла), регионы упорядочены по названию. Значения
+        виртуальных расчетных узлов вычисляются по требованию (с кешем результатов).
+        
+        Args:
+            node_ids (List[str]): ID узлов (повторы допускаются)
+            
+        Returns:
+            Dict[str, Dict[str, Any]]: Данные найденных узлов по ID
+        """
+        unique_ids = list(dict.fromkeys(node_ids))
+        if not unique_ids:
+            return {}
+        
+        resolver = VirtualIndicatorResolver(self.driver, self.config["NEO4J_DATABASE"], self.years)
+        nodes_data = resolver.get_nodes_data(unique_ids)
+        
+        self.log_message(f"Данные {len(nodes_data)}/{len(unique_ids)} узлов получены одним запросом")
+        return nodes_data
+    
+    def find_calculated_node_ids(self, node_names: List[str]) -> Dict[str, str]:
+        """
+        Находит ID существующих расчетных узлов по именам одним запросом
+        
+        Args:
+            node_names (List[str]): Имена узлов
+            
+        Returns:
+            Dict[str, str]: ID найденных узлов по имени
+        """
+        if not node_names:
+            return {}
+        
+        query = """
+        UNWIND $names AS name
+        MATCH (n:Расчетные {name: name})
+        RETURN name, elementId(n) as node_id
+        """
+        
+        with self.driver.session(database=self.config["NEO4J_DATABASE"]) as session:
+            return {record["name"]: record["node_id"] for record in session.run(query, {"names": list(node_names)})}
+    
     def get_node_data_by_id(self, node_id: str) -> Optional[Dict[str, Any]]:
         """
         Получает данные узла "Счетное" по ID
@@ -39,278 +125,259 @@ class CalculatedNodeCreator(Neo4jNodeCreator):
             Optional[Dict[str, Any]]: Данные узла или None если не найден
         """
         try:
-            with self.driver.session(database=self.config["NEO4J_DATABASE"]) as session:
-                # Получаем федеральные данные
-                federal_query = """
-                MATCH (n)
-                WHERE elementId(n) = $node_id AND (n:Счетное OR n:Расчетные)
-                RETURN n.federal_values as federal_values, n.years as years, n.name as node_name, elementId(n) as node_id
-                """
-                
-                result = session.run(federal_query, {"node_id": node_id})
-                record = result.single()
-                
-                if not record:
-                    self.log_message(f"Узел с ID '{node_id}' не найден в базе данных")
-                    return None
-                
-                federal_values = record["federal_values"] or []
-                years = record["years"] or []
-                node_name = record["node_name"]
-                
-                # Получаем региональные данные
-                regional_query = """
-                MATCH (n)-[r:ПоРегион]->(reg:Регион)
-                WHERE elementId(n) = $node_id AND (n:Счетное OR n:Расчетные)
-                RETURN reg.name as region_name,
-                       r.value_2016, r.value_2017, r.value_2018, r.value_2019, r.value_2020,
-                       r.value_2021, r.value_2022, r.value_2023, r.value_2024
-                ORDER BY reg.name
-                """
-                
-                regional_result = session.run(regional_query, {"node_id": node_id})
-                
-                regions = []
-                regional_values = []
-                
-                for reg_record in regional_result:
-                    regions.append(reg_record["region_name"])
-                    region_values = []
-                    for year in years:
-                        value = reg_record.get(f"r.value_{year}")  # Исправлено: возвращен правильный префикс "r."
-                        region_values.append(value)
-                    regional_values.append(region_values)
-                
-                return {
-                    "node_id": node_id,
-                    "node_name": node_name,
-                    "federal_values": federal_values,
-                    "years": years,
-                    "regions": regions,
-                    "regional_values": regional_values
-                }
+            node_data = self.get_nodes_data_by_ids([node_id]).get(node_id)
+            
+            if not node_data:
+                self.log_message(f"Узел с ID '{node_id}' не найден в базе данных")
+            
+            return node_data
                 
         except Exception as e:
             self.log_message(f"Ошибка получения данных узла с ID '{node_id}': {str(e)}")
             return None
     
-    def parse_formula(self, formula: str) -> List[str]:
+    def calculated_node_data(self, node_id: str, properties: Dict[str, Any], regions: List[str], regional_values: List[List[Optional[float]]]) -> Dict[str, Any]:
         """
-        Парсит формулу и извлекает переменные node_id
+        Формирует данные только что вычисленного расчетного узла в формате get_nodes_data_by_ids
+        (чтобы использовать его как дочерний без повторного чтения из базы)
         
         Args:
-            formula (str): Математическая формула
+            node_id (str): ID узла
+            properties (Dict[str, Any]): Свойства узла
+            regions (List[str]): Список регионов
+            regional_values (List[List[Optional[float]]]): Данные по регионам и годам
             
         Returns:
-            List[str]: Список переменных node_id в формуле
+            Dict[str, Any]: Данные узла
         """
-        # Находим все переменные вида node_id1, node_id2, etc.
-        node_pattern = r'\bnode_id\d+\b'
-        nodes = re.findall(node_pattern, formula)
-        
-        return nodes
+        pairs = sorted(zip(regions, regional_values), key=lambda pair: pair[0])
+        return {
+            "node_id": node_id,
+            "node_name": properties["name"],
+            "federal_values": properties["federal_values"],
+            "years": list(self.years),
+            "regions": [region for region, _ in pairs],
+            "regional_values": [values for _, values in pairs]
+        }
     
-    def safe_divide(self, a: Optional[float], b: Optional[float]) -> Optional[float]:
+    def evaluate_formula_for_values(self, formula: str, node_values: List[Optional[float]]) -> Optional[float]:
         """
-        Безопасное деление с обработкой None и деления на ноль
+        Вычисляет формулу для конкретных значений узлов
         
         Args:
-            a: Делимое
-            b: Делитель
+            formula (str): Математическая формула
+            node_values (List[Optional[float]]): Значения узлов по порядку
             
         Returns:
-            Optional[float]: Результат деления или None
+            Optional[float]: Результат вычисления или None
         """
-        if a is None or b is None or b == 0:
-            return None
-        return a / b
+        child_nodes_data = [{"federal_values": [value]} for value in node_values]
+        return self.calculate_values_for_all_years(formula, child_nodes_data, years_count=1)[0]
     
-    def safe_multiply(self, a: Optional[float], b: Optional[float]) -> Optional[float]:
+    def calculate_values_for_all_years(self, formula: str, child_nodes_data: List[Dict[str, Any]], years_count: Optional[int] = None) -> List[Optional[float]]:
         """
-        Безопасное умножение с обработкой None
+        Вычисляет значения по формуле для всех лет одной векторной операцией
         
         Args:
-            a: Первый множитель
-            b: Второй множитель
+            formula (str): Математическая формула
+            child_nodes_data (List[Dict[str, Any]]): Данные дочерних узлов по порядку
+            years_count (Optional[int]): Количество лет (по умолчанию - len(self.years))
             
         Returns:
-            Optional[float]: Результат умножения или None
+            List[Optional[float]]: Список значений по годам
         """
-        if a is None or b is None:
-            return None
-        return a * b
+        if years_count is None:
+            years_count = len(self.years)
+        
+        try:
+            return evaluate_federal(formula, child_nodes_data, years_count)
+        except FormulaError as e:
+            self.log_message(f"ДИАГНОСТИКА: {str(e)}")
+            return [None] * years_count
     
-    def safe_add(self, a: Optional[float], b: Optional[float]) -> Optional[float]:
+    def calculate_regional_values_for_all_years(self, formula: str, child_nodes_data: List[Dict[str, Any]]) -> Tuple[List[str], List[List[Optional[float]]]]:
         """
-        Безопасное сложение с обработкой None
+        Вычисляет региональные значения по формуле для всех лет и регионов.
+        Регионы дочерних узлов сопоставляются по названию.
         
         Args:
-            a: Первое слагаемое
-            b: Второе слагаемое
+            formula (str): Математическая формула
+            child_nodes_data (List[Dict[str, Any]]): Данные дочерних узлов по порядку
             
         Returns:
-            Optional[float]: Результат сложения или None
+            Tuple[List[str], List[List[Optional[float]]]]: Кортеж (список регионов, значения по регионам и годам)
         """
-        if a is None and b is None:
-            return None
-        if a is None:
-            return b
-        if b is None:
-            return a
-        return a + b
+        try:
+            regions, regional_calculated_values = evaluate_regional(formula, child_nodes_data, len(self.years))
+        except FormulaError as e:
+            self.log_message(f"ДИАГНОСТИКА: {str(e)}")
+            return [], []
+        
+        if not regions:
+            self.log_message("Не найдены регионы в дочерних узлах")
+        
+        return regions, regional_calculated_values
     
-    def safe_subtract(self, a: Optional[float], b: Optional[float]) -> Optional[float]:
+    def collect_child_nodes_data(self, child_node_ids: List[str], prefetched: Optional[Dict[str, Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
         """
-        Безопасное вычитание с обработкой None
+        Получает данные дочерних узлов по порядку
         
         Args:
-            a: Уменьшаемое
-            b: Вычитаемое
+            child_node_ids (List[str]): ID дочерних узлов
+            prefetched (Optional[Dict[str, Dict[str, Any]]]): Данные, уже полученные get_nodes_data_by_ids
+                (по умолчанию все дочерние узлы читаются одним запросом)
             
         Returns:
-            Optional[float]: Результат вычитания или None
+            List[Dict[str, Any]]: Данные дочерних узлов (нулевые значения для отсутствующих)
         """
-        if a is None or b is None:
-            return None
-        return a - b
+        if prefetched is None:
+            try:
+                prefetched = self.get_nodes_data_by_ids(child_node_ids)
+            except Exception as e:
+                self.log_message(f"Ошибка получения данных дочерних узлов: {str(e)}")
+                prefetched = {}
+        
+        child_nodes_data = []
+        missing_nodes = []
+        
+        for child_node_id in child_node_ids:
+            node_data = prefetched.get(child_node_id)
+            if node_data:
+                child_nodes_data.append(node_data)
+                self.log_message(f"Данные узла '{node_data.get('node_name', child_node_id)}' получены")
+            else:
+                missing_nodes.append(child_node_id)
+                # Создаем пустые данные для отсутствующего узла
+                child_nodes_data.append({
+                    "node_id": child_node_id,
+                    "node_name": f"Missing_{child_node_id}",
+                    "federal_values": [0.0] * len(self.years),
+                    "regional_values": []
+                })
+                self.log_message(f"Узел с ID '{child_node_id}' не найден, используются нулевые значения")
+        
+        if missing_nodes:
+            self.log_message(f"Предупреждение: не найдены узлы с ID: {missing_nodes}")
+        
+        return child_nodes_data
     
-    def evaluate_formula_for_values(self, formula: str, node_values: List[Optional[float]]) -> Optional[float]:
+    def calculated_input_hash(self, calc_config: Dict[str, Any], child_nodes_data: List[Dict[str, Any]]) -> str:
         """
-        Вычисляет формулу для конкретных значений узлов
+        Вычисляет хеш входных данных расчетного узла: конфигурации (формулы) и данных дочерних узлов
         
         Args:
-            formula (str): Математическая формула
-            node_values (List[Optional[float]]): Значения узлов по порядку
+            calc_config (Dict[str, Any]): Конфигурация расчетного узла
+            child_nodes_data (List[Dict[str, Any]]): Данные дочерних узлов
             
         Returns:
-            Optional[float]: Результат вычисления или None
+            str: Хеш входных данных
         """
-        try:
-            # Проверяем, есть ли хотя бы одно не-None значение
-            if all(v is None for v in node_values):
-                return None
-            
-            # Проверяем синтаксис формулы
-            try:
-                compile(formula, '<string>', 'eval')
-            except SyntaxError as se:
-                self.log_message(f"ДИАГНОСТИКА: Синтаксическая ошибка в формуле: {str(se)}")
-                return None
-            
-            # Заменяем None на 0 в соответствии с требованиями
-            safe_values = {}
-            for i, value in enumerate(node_values, 1):
-                safe_values[f'node_id{i}'] = 0.0 if value is None else value
-            
-            # Проверяем деление на ноль для формул с делением
-            if '/' in formula:
-                # Находим знаменатель (предполагаем простые формулы вида (a / b))
-                if 'node_id2' in safe_values and safe_values['node_id2'] == 0.0:
-                    return None
-            
-            # Создаем безопасное окружение для eval
-            safe_dict = {
-                '__builtins__': {},
-                **safe_values
+        children = [
+            {
+                "node_id": child.get("node_id"),
+                "federal_values": child.get("federal_values"),
+                "regions": child.get("regions", []),
+                "regional_values": child.get("regional_values", [])
             }
-            
-            # Вычисляем формулу
-            result = eval(formula, safe_dict)
-            
-            return float(result) if result is not None else None
-            
-        except ZeroDivisionError:
-            return None
-        except Exception as e:
-            self.log_message(f"Ошибка вычисления формулы '{formula}' с значениями {node_values}: {str(e)}")
-            return None
+            for child in child_nodes_data
+        ]
+        return config_hash({"config": calc_config, "years": self.years, "children": children})
     
-    def calculate_values_for_all_years(self, formula: str, child_nodes_data: List[Dict[str, Any]]) -> List[Optional[float]]:
+    def compute_calculated_node(self, calc_config: Dict[str, Any], child_nodes_data: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], List[str], List[List[Optional[float]]]]:
         """
-        Вычисляет значения по формуле для всех лет
+        Вычисляет значения и свойства расчетного узла
         
         Args:
-            formula (str): Математическая формула
-            child_nodes_data (List[Dict[str, Any]]): Данные дочерних узлов по порядку
+            calc_config (Dict[str, Any]): Конфигурация расчетного узла
+            child_nodes_data (List[Dict[str, Any]]): Данные дочерних узлов
             
         Returns:
-            List[Optional[float]]: Список значений по годам
+            Tuple: (свойства узла, регионы, региональные значения)
         """
-        calculated_values = []
+        node_name = calc_config["node_name"]
+        formula = calc_config["formula"]
+        # Ссылки на расчетные узлы пакета по имени сохраняются как ID узлов
+        child_node_ids = [
+            child.get("node_id") or child_ref
+            for child_ref, child in zip(calc_config["child_nodes"], child_nodes_data)
+        ]
         
-        # Получаем список лет (предполагаем, что у всех узлов одинаковые годы)
-        years = self.years
+        # Вычисляем федеральные значения
+        federal_values = self.calculate_values_for_all_years(formula, child_nodes_data)
+        self.log_message(f"Федеральные значения вычислены: {federal_values}")
         
-        for year_index in range(len(years)):
-            # Собираем значения для текущего года по порядку узлов
-            year_values = []
-            
-            for node_data in child_nodes_data:
-                federal_values = node_data.get("federal_values", [])
-                if year_index < len(federal_values):
-                    year_values.append(federal_values[year_index])
+        # Вычисляем региональные значения
+        regions, regional_values = self.calculate_regional_values_for_all_years(formula, child_nodes_data)
+        self.log_message(f"Региональные значения вычислены для {len(regions)} регионов")
+        
+        # Подготавливаем свойства узла
+        node_properties = {
+            "name": node_name,
+            "полное_название": calc_config.get("full_name", node_name),
+            "years": self.years,
+            "federal_values": federal_values,
+            "formula": formula,
+            "child_nodes": child_node_ids
+        }
+        
+        # Очищаем null значения из списков
+        cleaned_properties = {}
+        for key, value in node_properties.items():
+            if isinstance(value, list):
+                # Заменяем None на 0.0 для числовых списков
+                if key == "federal_values":
+                    cleaned_value = [0.0 if v is None else v for v in value]
                 else:
-                    year_values.append(None)
-            
-            # Вычисляем значение для текущего года
-            calculated_value = self.evaluate_formula_for_values(formula, year_values)
-            calculated_values.append(calculated_value)
+                    cleaned_value = [v for v in value if v is not None]
+                cleaned_properties[key] = cleaned_value
+            else:
+                cleaned_properties[key] = value
+        
+        cleaned_properties.update(self.layout_properties(regions, regional_values))
         
-        return calculated_values
+        return cleaned_properties, regions, regional_values
     
-    def calculate_regional_values_for_all_years(self, formula: str, child_nodes_data: List[Dict[str, Any]]) -> Tuple[List[str], List[List[Optional[float]]]]:
+    def stored_properties(self, calc_config: Dict[str, Any], properties: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Вычисляет региональные значения по формуле для всех лет и регионов
+        Возвращает свойства, записываемые в граф. Виртуальный узел ("virtual": true
+        в конфигурации) хранит только формулу и дочерние узлы: значения вычисляются
+        при чтении (см. ETL/virtual_indicators.py).
         
         Args:
-            formula (str): Математическая формула
-            child_nodes_data (List[Dict[str, Any]]): Данные дочерних узлов по порядку
+            calc_config (Dict[str, Any]): Конфигурация расчетного узла
+            properties (Dict[str, Any]): Вычисленные свойства узла
             
         Returns:
-            Tuple[List[str], List[List[Optional[float]]]]: Кортеж (список регионов, значения по регионам и годам)
+            Dict[str, Any]: Свойства для записи
         """
-        # Получаем список регионов из первого узла (предполагаем, что у всех одинаковые регионы)
-        regions = []
-        for node_data in child_nodes_data:
-            if node_data.get("regions"):
-                regions = node_data["regions"]
-                break
-        
-        if not regions:
-            self.log_message("Не найдены регионы в дочерних узлах")
-            return [], []
-        
-        regional_calculated_values = []
+        if not calc_config.get(VIRTUAL_PROPERTY):
+            return properties
+        return {**{key: properties[key] for key in VIRTUAL_NODE_PROPERTIES}, VIRTUAL_PROPERTY: True}
+    
+    def clear_calculated_values(self, node_id: str) -> None:
+        """
+        Удаляет значения и признак виртуальности узла перед перезаписью
+        (узел может переходить между виртуальным и материализованным режимами)
         
-        for region_index in range(len(regions)):
-            region_values_by_years = []
-            
-            for year_index in range(len(self.years)):
-                # Собираем значения для текущего региона и года по порядку узлов
-                year_region_values = []
-                
-                for node_data in child_nodes_data:
-                    regional_values = node_data.get("regional_values", [])
-                    if (region_index < len(regional_values) and
-                        year_index < len(regional_values[region_index])):
-                        year_region_values.append(regional_values[region_index][year_index])
-                    else:
-                        year_region_values.append(None)
-                
-                # Вычисляем значение для текущего региона и года
-                calculated_value = self.evaluate_formula_for_values(formula, year_region_values)
-                region_values_by_years.append(calculated_value)
-            
-            regional_calculated_values.append(region_values_by_years)
+        Args:
+            node_id (str): ID расчетного узла
+        """
+        query = """
+        MATCH (n)
+        WHERE elementId(n) = $node_id
+        REMOVE n.virtual, n.federal_values, n.region_keys, n.regional_values
+        """
         
-        return regions, regional_calculated_values
+        with self.driver.session(database=self.config["NEO4J_DATABASE"]) as session:
+            session.run(query, {"node_id": node_id}).consume()
     
-    def create_calculated_node(self, calc_config: Dict[str, Any]) -> Optional[str]:
+    def create_calculated_node(self, calc_config: Dict[str, Any], child_nodes_data: Optional[List[Dict[str, Any]]] = None) -> Optional[str]:
         """
         Создает расчетный узел на основе конфигурации
         
         Args:
             calc_config (Dict[str, Any]): Конфигурация расчетного узла
+            child_nodes_data (Optional[List[Dict[str, Any]]]): Уже полученные данные дочерних узлов
             
         Returns:
             Optional[str]: ID созданного узла или None при ошибке
@@ -319,43 +386,16 @@ class CalculatedNodeCreator(Neo4jNodeCreator):
             # Извлекаем параметры из конфигурации
             node_name = calc_config["node_name"]
             node_label = calc_config["node_label"]
-            formula = calc_config["formula"]
-            child_node_ids = calc_config["child_nodes"]
             
             self.log_message(f"Создание расчетного узла '{node_name}'")
-            self.log_message(f"Формула: {formula}")
-            self.log_message(f"Дочерние узлы (ID): {child_node_ids}")
+            self.log_message(f"Формула: {calc_config['formula']}")
+            self.log_message(f"Дочерние узлы (ID): {calc_config['child_nodes']}")
             
             # Получаем данные всех дочерних узлов по порядку
-            child_nodes_data = []
-            missing_nodes = []
-            
-            for child_node_id in child_node_ids:
-                node_data = self.get_node_data_by_id(child_node_id)
-                if node_data:
-                    child_nodes_data.append(node_data)
-                    self.log_message(f"Данные узла '{node_data.get('node_name', child_node_id)}' получены")
-                else:
-                    missing_nodes.append(child_node_id)
-                    # Создаем пустые данные для отсутствующего узла
-                    child_nodes_data.append({
-                        "node_id": child_node_id,
-                        "node_name": f"Missing_{child_node_id}",
-                        "federal_values": [0.0] * len(self.years),
-                        "regional_values": []
-                    })
-                    self.log_message(f"Узел с ID '{child_node_id}' не найден, используются нулевые значения")
-            
-            if missing_nodes:
-                self.log_message(f"Предупреждение: не найдены узлы с ID: {missing_nodes}")
-            
-            # Вычисляем федеральные значения
-            federal_values = self.calculate_values_for_all_years(formula, child_nodes_data)
-            self.log_message(f"Федеральные значения вычислены: {federal_values}")
-            
-            # Вычисляем региональные значения
-            regions, regional_values = self.calculate_regional_values_for_all_years(formula, child_nodes_data)
-            self.log_message(f"Региональные значения вычислены для {len(regions)} регионов")
+            if child_nodes_data is None:
+                child_nodes_data = self.collect_child_nodes_data(calc_config["child_nodes"])
+            
+            cleaned_properties, regions, regional_values = self.compute_calculated_node(calc_config, child_nodes_data)
             
             # Создаем узел в Neo4j
             with self.driver.session(database=self.config["NEO4J_DATABASE"]) as session:
@@ -365,31 +405,9 @@ class CalculatedNodeCreator(Neo4jNodeCreator):
                 else:
                     labels_str = node_label
                 
-                # Подготавливаем свойства узла
-                node_properties = {
-                    "name": node_name,
-                    "полное_название": calc_config.get("full_name", node_name),
-                    "years": self.years,
-                    "federal_values": federal_values,
-                    "formula": formula,
-                    "child_nodes": child_node_ids
-                }
-                
-                # Очищаем null значения из списков
-                cleaned_properties = {}
-                for key, value in node_properties.items():
-                    if isinstance(value, list):
-                        # Заменяем None на 0.0 для числовых списков
-                        if key == "federal_values":
-                            cleaned_value = [0.0 if v is None else v for v in value]
-                        else:
-                            cleaned_value = [v for v in value if v is not None]
-                        cleaned_properties[key] = cleaned_value
-                    else:
-                        cleaned_properties[key] = value
-                
                 # Формируем строку свойств для Cypher запроса
-                properties_str = ", ".join([f"{key}: ${key}" for key in cleaned_properties.keys()])
+                stored_properties = self.stored_properties(calc_config, cleaned_properties)
+                properties_str = ", ".join([f"{key}: ${key}" for key in stored_properties.keys()])
                 
                 query = f"""
                 CREATE (n:{labels_str} {{
@@ -398,16 +416,18 @@ class CalculatedNodeCreator(Neo4jNodeCreator):
                 RETURN elementId(n) as node_id
                 """
                 
-                result = session.run(query, cleaned_properties)
+                result = session.run(query, stored_properties)
                 record = result.single()
                 
                 if record:
                     node_id = record["node_id"]
                     self.log_message(f"Расчетный узел '{node_name}' создан с ID: {node_id}")
+                    self.computed_nodes[node_id] = self.calculated_node_data(node_id, cleaned_properties, regions, regional_values)
                     
-                    # Создаем связи с регионами
-                    regional_links_created = self.create_regional_relationships(node_id, regions, regional_values)
-                    self.log_message(f"Создано {regional_links_created} связей с регионами")
+                    # Создаем связи с регионами (виртуальный узел значений не хранит)
+                    if self.uses_regional_relationships() and not calc_config.get(VIRTUAL_PROPERTY):
+                        regional_links_created = self.create_regional_relationships(node_id, regions, regional_values)
+                        self.log_message(f"Создано {regional_links_created} связей с регионами")
                     
                     # Создаем связи с дочерними узлами
                     child_links_created = self.create_child_relationships(node_id, child_nodes_data)
@@ -423,35 +443,147 @@ class CalculatedNodeCreator(Neo4jNodeCreator):
             self.log_message(f"Ошибка при создании расчетного узла '{node_name}': {str(e)}")
             return None
     
-    def create_child_relationships(self, calculated_node_id: str, child_nodes_data: List[Dict[str, Any]]) -> int:
+    def rewrite_calculated_node(self, node_id: str, calc_config: Dict[str, Any], child_nodes_data: List[Dict[str, Any]]) -> Optional[str]:
         """
-        Создает связи между расчетным узлом и дочерними узлами
+        Пересчитывает существующий расчетный узел на месте: обновляет свойства,
+        связи ПоРегион и связи с дочерними узлами. Связи узла с родительскими
+        расчетными узлами сохраняются.
+        
+        Args:
+            node_id (str): ID существующего расчетного узла
+            calc_config (Dict[str, Any]): Конфигурация расчетного узла
+            child_nodes_data (List[Dict[str, Any]]): Данные дочерних узлов
+            
+        Returns:
+            Optional[str]: ID узла или None, если узел не найден или произошла ошибка
+        """
+        node_name = calc_config.get("node_name", "Unknown")
+        
+        try:
+            self.log_message(f"Пересчет расчетного узла '{node_name}' (ID: {node_id})")
+            
+            cleaned_properties, regions, regional_values = self.compute_calculated_node(calc_config, child_nodes_data)
+            
+            self.clear_calculated_values(node_id)
+            if not self.update_node_properties(node_id, self.stored_properties(calc_config, cleaned_properties)):
+                self.log_message(f"Расчетный узел '{node_name}' с ID {node_id} не найден для обновления")
+                return None
+            self.computed_nodes[node_id] = self.calculated_node_data(node_id, cleaned_properties, regions, regional_values)
+            
+            # Заменяем региональные связи и связи с дочерними узлами
+            self.delete_node_relationships(node_id, "ПоРегион")
+            self.delete_node_relationships(node_id, "ОСНОВАН_НА")
+            self.delete_node_relationships(node_id, "ИСПОЛЬЗУЕТСЯ_В", incoming=True)
+            
+            regional_links_created = 0
+            if self.uses_regional_relationships() and not calc_config.get(VIRTUAL_PROPERTY):
+                regional_links_created = self.create_regional_relationships(node_id, regions, regional_values)
+            child_links_created = self.create_child_relationships(node_id, child_nodes_data)
+            self.log_message(f"Расчетный узел '{node_name}' обновлен: {regional_links_created} связей с регионами, "
+                             f"{child_links_created} связей с дочерними узлами")
+            
+            return node_id
+            
+        except Exception as e:
+            self.log_message(f"Ошибка при пересчете расчетного узла '{node_name}': {str(e)}")
+            return None
+    
+    def build_lineage_rows(self, calculated_node_id: str, child_nodes_data: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+        """
+        Формирует строки связей расчетного узла с дочерними узлами для массовой записи
         
         Args:
             calculated_node_id (str): ID расчетного узла
             child_nodes_data (List[Dict[str, Any]]): Данные дочерних узлов
             
+        Returns:
+            List[Dict[str, str]]: Строки {calc_id, child_id}
+        """
+        return [
+            {"calc_id": calculated_node_id, "child_id": child_data["node_id"]}
+            for child_data in child_nodes_data if child_data.get("node_id")
+        ]
+    
+    def write_lineage_rows(self, rows: List[Dict[str, str]]) -> int:
+        """
+        Создает связи ОСНОВАН_НА (расчетный -> дочерний) и ИСПОЛЬЗУЕТСЯ_В (дочерний -> расчетный)
+        для всех строк запросами UNWIND по write_batch_size строк в транзакции
+        
+        Args:
+            rows (List[Dict[str, str]]): Строки {calc_id, child_id}
+            
+        Returns:
+            int: Количество созданных связей (обоих направлений)
+        """
+        query = """
+        UNWIND $rows AS row
+        MATCH (calc)
+        WHERE elementId(calc) = row.calc_id
+        MATCH (child)
+        WHERE elementId(child) = row.child_id
+        CREATE (calc)-[:ОСНОВАН_НА]->(child)
+        CREATE (child)-[:ИСПОЛЬЗУЕТСЯ_В]->(calc)
+        RETURN count(*) * 2 as written
+        """
+        
+        written_total = 0
+        batches = [rows[i:i + self.write_batch_size] for i in range(0, len(rows), self.write_batch_size)]
+        
+        for batch_number, batch in enumerate(batches, 1):
+            try:
+                with self.driver.session(database=self.config["NEO4J_DATABASE"]) as session:
+                    record = session.run(query, {"rows": batch}).single()
+                    written_total += record["written"] if record else 0
+            except Exception as e:
+                self.log_message(f"Ошибка массовой записи связей с дочерними узлами (пакет {batch_number}/{len(batches)}): {str(e)}")
+        
+        if len(rows) * 2 != written_total:
+            self.log_message(f"Создано {written_total} из {len(rows) * 2} связей с дочерними узлами (часть узлов не найдена)")
+        
+        return written_total
+    
+    def begin_lineage_buffer(self) -> None:
+        """
+        Включает накопление связей с дочерними узлами нескольких расчетных узлов для общей записи
+        """
+        with self._lineage_lock:
+            self.lineage_rows_buffer = []
+    
+    def flush_lineage_buffer(self) -> int:
+        """
+        Записывает накопленные связи с дочерними узлами и выключает буфер
+        
         Returns:
             int: Количество созданных связей
         """
-        created_links = 0
+        with self._lineage_lock:
+            rows = self.lineage_rows_buffer or []
+            self.lineage_rows_buffer = None
         
-        for child_data in child_nodes_data:
-            child_node_id = child_data.get("node_id")
-            child_node_name = child_data.get("node_name", "Unknown")
+        return self.write_lineage_rows(rows) if rows else 0
+    
+    def create_child_relationships(self, calculated_node_id: str, child_nodes_data: List[Dict[str, Any]]) -> int:
+        """
+        Создает связи между расчетным узлом и дочерними узлами
+        
+        Если включен буфер (begin_lineage_buffer), строки накапливаются
+        и записываются вместе со связями других узлов при flush_lineage_buffer.
+        
+        Args:
+            calculated_node_id (str): ID расчетного узла
+            child_nodes_data (List[Dict[str, Any]]): Данные дочерних узлов
             
-            if child_node_id:
-                # Создаем связь "ОСНОВАН_НА" от расчетного к дочернему
-                if self.create_relationship(calculated_node_id, child_node_id, "ОСНОВАН_НА"):
-                    created_links += 1
-                    self.log_message(f"Создана связь ОСНОВАН_НА: {calculated_node_id} -> {child_node_id} ({child_node_name})")
-                
-                # Создаем связь "ИСПОЛЬЗУЕТСЯ_В" от дочернего к расчетному
-                if self.create_relationship(child_node_id, calculated_node_id, "ИСПОЛЬЗУЕТСЯ_В"):
-                    created_links += 1
-                    self.log_message(f"Создана связь ИСПОЛЬЗУЕТСЯ_В: {child_node_id} -> {calculated_node_id} ({child_node_name})")
+        Returns:
+            int: Количество созданных (или поставленных в очередь) связей
+        """
+        rows = self.build_lineage_rows(calculated_node_id, child_nodes_data)
+        
+        with self._lineage_lock:
+            if self.lineage_rows_buffer is not None:
+                self.lineage_rows_buffer.extend(rows)
+                return len(rows) * 2
         
-        return created_links
+        return self.write_lineage_rows(rows)
     
     def process_calculated_node(self, calc_config: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -491,12 +623,52 @@ class CalculatedNodeCreator(Neo4jNodeCreator):
         finally:
             self.disconnect()
     
-    def process_calculated_nodes_batch(self, config_path: str) -> Dict[str, Any]:
+    def process_scheduled_node(self, calc_config: Dict[str, Any], child_nodes_data: List[Dict[str, Any]], previous_node_id: Optional[str]) -> Dict[str, Any]:
+        """
+        Вычисляет и записывает один узел пакета (выполняется в пуле потоков)
+        
+        Args:
+            calc_config (Dict[str, Any]): Конфигурация расчетного узла
+            child_nodes_data (List[Dict[str, Any]]): Данные дочерних узлов
+            previous_node_id (Optional[str]): ID узла из манифеста (узел пересчитывается на месте)
+            
+        Returns:
+            Dict[str, Any]: status (created, updated, failed), node_id, processing_log
+        """
+        self.processing_log = []
+        node_id = None
+        status = "failed"
+        
+        try:
+            if previous_node_id:
+                node_id = self.rewrite_calculated_node(previous_node_id, calc_config, child_nodes_data)
+                status = "updated" if node_id else status
+            
+            if not node_id:
+                node_id = self.create_calculated_node(calc_config, child_nodes_data)
+                status = "created" if node_id else status
+        except Exception as e:
+            self.log_message(f"Ошибка обработки расчетного узла '{calc_config.get('node_name', 'Unknown')}': {str(e)}")
+        
+        return {"status": status, "node_id": node_id, "processing_log": self.processing_log.copy()}
+    
+    def process_calculated_nodes_batch(self, config_path: str, incremental: bool = False, manifest_path: Optional[str] = None) -> Dict[str, Any]:
         """
         Обрабатывает пакет расчетных узлов из JSON-конфигурации
         
+        Дочерний узел задается ID узла в Neo4j или именем (node_name) расчетного
+        узла того же пакета. Узлы вычисляются по уровням графа зависимостей:
+        узлы одного уровня - параллельно, результаты берутся из памяти без
+        повторного чтения из базы. Циклы обнаруживаются до начала записи.
+        
+        После обработки сохраняется манифест с хешами входных данных узлов
+        (формула и данные дочерних узлов). В инкрементальном режиме пересчитываются
+        только узлы с изменившимися входными данными.
+        
         Args:
             config_path (str): Путь к файлу конфигурации пакета
+            incremental (bool): Пересчитывать только изменившиеся узлы
+            manifest_path (Optional[str]): Путь к манифесту (по умолчанию рядом с конфигурацией)
             
         Returns:
             Dict[str, Any]: Результат обработки пакета
@@ -507,51 +679,160 @@ class CalculatedNodeCreator(Neo4jNodeCreator):
                 batch_config = json.load(f)
             
             calculated_nodes_config = batch_config.get("calculated_nodes", [])
+            node_names = [calc_config.get("node_name", f"CalculatedNode_{i}") for i, calc_config in enumerate(calculated_nodes_config, 1)]
+            batch_names = set(node_names)
+            
+            manifest = EtlManifest.load(manifest_path or default_manifest_path(config_path))
+            self.computed_nodes = {}
+            self.failed_regional_node_ids = set()
+            self.regional_write_stats = {"rows": 0, "batches": 0, "seconds": 0.0}
+            
+            # ID узлов пакета, записанных ранее: ссылки на них тоже считаются зависимостями
+            ids_to_names = {manifest.get_node_id(name): name for name in node_names if manifest.get_node_id(name)}
+            levels = build_dependency_levels(calculated_nodes_config, ids_to_names)
             
             # Инициализируем результат
             result = {
                 "success": True,
                 "total_nodes": len(calculated_nodes_config),
+                "levels": len(levels),
                 "created_nodes": 0,
+                "updated_nodes": 0,
+                "skipped_nodes": 0,
                 "failed_nodes": 0,
                 "processing_log": [],
                 "created_node_ids": []
             }
             
-            result["processing_log"].append(f"Начинаем обработку {len(calculated_nodes_config)} расчетных узлов")
+            result["processing_log"].append(
+                f"Начинаем обработку {len(calculated_nodes_config)} расчетных узлов ({len(levels)} уровней зависимостей)"
+            )
             
-            # Подключаемся к Neo4j
+            # Подключаемся к Neo4j и проверяем ограничения и индексы (IF NOT EXISTS - повторный запуск безопасен)
             self.connect()
+            result["processing_log"].extend(format_schema_report(self.ensure_schema()))
+            
+            # Узлы с теми же именами, уже записанные в базу, перезаписываются на месте:
+            # повторный CREATE нарушил бы ограничение уникальности name
+            existing_ids = self.find_calculated_node_ids(node_names)
+            
+            # Данные всех внешних дочерних узлов (и ранее записанных узлов пакета)
+            # читаются одним запросом, каждый узел - один раз
+            external_ids = [
+                child_id for calc_config in calculated_nodes_config for child_id in calc_config.get("child_nodes", [])
+                if resolve_batch_dependency(child_id, batch_names, ids_to_names) is None
+            ]
+            self.processing_log = []
+            prefetched = self.get_nodes_data_by_ids(external_ids + list(ids_to_names))
+            result["processing_log"].extend(self.processing_log)
+            
+            # Связи с дочерними узлами всего пакета записываются вместе после вычислений
+            self.begin_lineage_buffer()
+            
+            # Данные узлов пакета по имени (вычисленные или не изменившиеся)
+            value_store: Dict[str, Dict[str, Any]] = {}
+            failed_names = set()
             
-            # Обрабатываем каждый расчетный узел
-            for i, calc_config in enumerate(calculated_nodes_config, 1):
-                try:
-                    node_name = calc_config.get("node_name", f"CalculatedNode_{i}")
-                    result["processing_log"].append(f"Обработка расчетного узла {i}/{len(calculated_nodes_config)}: '{node_name}'")
+            for level_number, level in enumerate(levels, 1):
+                result["processing_log"].append(f"Уровень {level_number}/{len(levels)}: {len(level)} узлов")
+                scheduled = []
+                
+                for index in level:
+                    self.processing_log = []
+                    calc_config = calculated_nodes_config[index]
+                    node_name = node_names[index]
+                    child_refs = calc_config.get("child_nodes", [])
+                    
+                    dependencies = {ref: resolve_batch_dependency(ref, batch_names, ids_to_names) for ref in child_refs}
+                    failed_dependencies = sorted({name for name in dependencies.values() if name in failed_names})
+                    if failed_dependencies:
+                        failed_names.add(node_name)
+                        result["failed_nodes"] += 1
+                        manifest.forget_node(node_name)
+                        result["processing_log"].append(
+                            f"Расчетный узел '{node_name}' пропущен: не вычислены дочерние узлы {failed_dependencies}"
+                        )
+                        continue
+                    
+                    sources = ChainMap({ref: value_store[name] for ref, name in dependencies.items() if name}, prefetched)
+                    child_nodes_data = self.collect_child_nodes_data(child_refs, sources)
+                    input_hash = self.calculated_input_hash(calc_config, child_nodes_data)
+                    previous_node_id = manifest.get_node_id(node_name) if incremental else None
+                    result["processing_log"].extend(self.processing_log)
                     
-                    # Создаем расчетный узел
-                    node_id = self.create_calculated_node(calc_config)
+                    # Узел из манифеста существует, если он прочитан вместе с дочерними узлами
+                    if previous_node_id in prefetched and not manifest.node_changed(node_name, input_hash):
+                        value_store[node_name] = prefetched[previous_node_id]
+                        result["skipped_nodes"] += 1
+                        result["processing_log"].append(f"Расчетный узел '{node_name}' не изменился")
+                        continue
                     
-                    if node_id:
+                    scheduled.append((index, child_nodes_data, input_hash, previous_node_id or existing_ids.get(node_name)))
+                
+                # Независимые узлы уровня вычисляются и записываются параллельно
+                def run(task):
+                    index, child_nodes_data, _, previous_node_id = task
+                    return self.process_scheduled_node(calculated_nodes_config[index], child_nodes_data, previous_node_id)
+                
+                if self.calculation_workers > 1 and len(scheduled) > 1:
+                    with ThreadPoolExecutor(max_workers=min(self.calculation_workers, len(scheduled))) as executor:
+                        outcomes = list(executor.map(run, scheduled))
+                else:
+                    outcomes = [run(task) for task in scheduled]
+                
+                for (index, _, input_hash, _), outcome in zip(scheduled, outcomes):
+                    node_name = node_names[index]
+                    node_id = outcome["node_id"]
+                    
+                    if outcome["status"] == "updated":
+                        result["updated_nodes"] += 1
+                        result["processing_log"].append(f"Расчетный узел '{node_name}' обновлен")
+                    elif outcome["status"] == "created":
                         result["created_nodes"] += 1
                         result["created_node_ids"].append(node_id)
                         result["processing_log"].append(f"Расчетный узел '{node_name}' создан успешно с ID: {node_id}")
+                    
+                    if node_id and node_id in self.failed_regional_node_ids:
+                        # Значения вычислены, но связи ПоРегион записаны не полностью:
+                        # зависимые узлы считаются, а узел пересчитается при следующем запуске
+                        value_store[node_name] = self.computed_nodes[node_id]
+                        result["failed_nodes"] += 1
+                        manifest.forget_node(node_name)
+                        result["processing_log"].append(
+                            f"Связи ПоРегион расчетного узла '{node_name}' записаны не полностью"
+                        )
+                    elif node_id:
+                        manifest.record_node(node_name, node_id, input_hash)
+                        value_store[node_name] = self.computed_nodes[node_id]
                     else:
+                        failed_names.add(node_name)
                         result["failed_nodes"] += 1
+                        manifest.forget_node(node_name)
                         result["processing_log"].append(f"Ошибка создания расчетного узла '{node_name}'")
-                        
-                    # Добавляем лог обработки текущего узла
-                    result["processing_log"].extend(self.processing_log)
-                        
-                except Exception as e:
-                    result["failed_nodes"] += 1
-                    result["processing_log"].append(f"Ошибка обработки расчетного узла {i}: {str(e)}")
+                    
+                    # Добавляем лог обработки узла
+                    result["processing_log"].extend(outcome["processing_log"])
+            
+            self.processing_log = []
+            result["lineage_relationships"] = self.flush_lineage_buffer()
+            result["processing_log"].extend(self.processing_log)
+            result["processing_log"].append(f"Создано {result['lineage_relationships']} связей с дочерними узлами")
+            
+            result["failed_regional_node_ids"] = sorted(self.failed_regional_node_ids)
+            result["regional_write_stats"] = dict(self.regional_write_stats)
             
             # Обновляем общий статус
             if result["failed_nodes"] > 0:
                 result["success"] = False
             
-            result["processing_log"].append(f"Обработка завершена: {result['created_nodes']}/{result['total_nodes']} расчетных узлов создано")
+            # Узлы с ошибками не попадают в манифест и будут обработаны при следующем запуске
+            manifest.save()
+            result["manifest_path"] = manifest.path
+            
+            result["processing_log"].append(
+                f"Обработка завершена: {result['created_nodes']}/{result['total_nodes']} расчетных узлов создано, "
+                f"{result['updated_nodes']} обновлено, {result['skipped_nodes']} без изменений"
+            )
             
             return result
             
@@ -562,7 +843,274 @@ class CalculatedNodeCreator(Neo4jNodeCreator):
                 "processing_log": [f"Критическая ошибка: {str(e)}"]
             }
         finally:
+            self.lineage_rows_buffer = None
+            self.disconnect()
+
+
+    def find_dependent_nodes(self, changed_node_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Находит все расчетные узлы, транзитивно зависящие от изменившихся узлов
+        (по связям ИСПОЛЬЗУЕТСЯ_В), вместе с их формулами и дочерними узлами
+        
+        Args:
+            changed_node_ids (List[str]): ID изменившихся узлов
+            
+        Returns:
+            List[Dict[str, Any]]: node_id, node_name, full_name, labels, formula, child_nodes
+        """
+        query = """
+        UNWIND $node_ids AS changed_id
+        MATCH (changed)
+        WHERE elementId(changed) = changed_id
+        MATCH (changed)-[:ИСПОЛЬЗУЕТСЯ_В*1..]->(calc:Расчетные)
+        WITH DISTINCT calc
+        RETURN elementId(calc) as node_id, calc.name as node_name, calc.полное_название as full_name,
+               labels(calc) as labels, calc.formula as formula, calc.child_nodes as child_nodes,
+               calc.virtual as virtual
+        ORDER BY node_name
+        """
+        
+        with self.driver.session(database=self.config["NEO4J_DATABASE"]) as session:
+            return [dict(record) for record in session.run(query, {"node_ids": list(dict.fromkeys(changed_node_ids))})]
+    
+    def recompute_dependents(self, changed_node_ids: List[str]) -> Dict[str, Any]:
+        """
+        Пересчитывает расчетные узлы, зависящие от изменившихся узлов
+        
+        Формула и дочерние узлы берутся из свойств formula и child_nodes
+        расчетных узлов. Узлы пересчитываются по уровням зависимостей,
+        результаты пересчета сразу используются для следующих уровней. Узел,
+        значения которого не изменились, не перезаписывается.
+        
+        Args:
+            changed_node_ids (List[str]): ID изменившихся узлов (Счетное или Расчетные)
+            
+        Returns:
+            Dict[str, Any]: Результат пересчета (dependent_nodes, touched_nodes, skipped_nodes, failed_nodes)
+        """
+        result = {
+            "success": True,
+            "changed_nodes": len(set(changed_node_ids)),
+            "dependent_nodes": 0,
+            "touched_nodes": 0,
+            "skipped_nodes": 0,
+            "virtual_nodes": 0,
+            "failed_nodes": 0,
+            "touched_node_ids": [],
+            "processing_log": []
+        }
+        
+        try:
+            self.connect()
+            self.computed_nodes = {}
+            
+            dependents = self.find_dependent_nodes(changed_node_ids)
+            result["dependent_nodes"] = len(dependents)
+            result["processing_log"].append(f"Найдено {len(dependents)} зависимых расчетных узлов")
+            
+            if not dependents:
+                return result
+            
+            calculated_nodes_config = [
+                {
+                    "node_name": node["node_name"],
+                    "node_label": node["labels"],
+                    "full_name": node["full_name"] or node["node_name"],
+                    "formula": node["formula"],
+                    "child_nodes": list(node["child_nodes"] or []),
+                    VIRTUAL_PROPERTY: bool(node.get("virtual"))
+                }
+                for node in dependents
+            ]
+            ids_to_names = {node["node_id"]: node["node_name"] for node in dependents}
+            node_ids = {node["node_name"]: node["node_id"] for node in dependents}
+            levels = build_dependency_levels(calculated_nodes_config, ids_to_names)
+            
+            # Текущие данные зависимых узлов и их внешних дочерних узлов - одним запросом
+            child_ids = [child_id for calc_config in calculated_nodes_config for child_id in calc_config["child_nodes"]]
+            self.processing_log = []
+            current = self.get_nodes_data_by_ids(child_ids + list(ids_to_names))
+            result["processing_log"].extend(self.processing_log)
+            self.begin_lineage_buffer()
+            
+            # Пересчитанные узлы подменяют свои текущие данные для следующих уровней
+            recomputed: Dict[str, Dict[str, Any]] = {}
+            sources = ChainMap(recomputed, current)
+            
+            for level in levels:
+                for index in level:
+                    self.processing_log = []
+                    calc_config = calculated_nodes_config[index]
+                    node_name = calc_config["node_name"]
+                    node_id = node_ids[node_name]
+                    
+                    try:
+                        child_nodes_data = self.collect_child_nodes_data(calc_config["child_nodes"], sources)
+                        properties, regions, regional_values = self.compute_calculated_node(calc_config, child_nodes_data)
+                        new_data = self.calculated_node_data(node_id, properties, regions, regional_values)
+                        old_data = current.get(node_id, {})
+                        
+                        unchanged = all(
+                            values_equal(old_data.get(key), new_data[key])
+                            for key in ("federal_values", "regions", "regional_values")
+                        )
+                        
+                        if calc_config[VIRTUAL_PROPERTY]:
+                            # Виртуальный узел не перезаписывается, его значения нужны только следующим уровням
+                            recomputed[node_id] = new_data
+                            result["virtual_nodes"] += 1
+                            result["processing_log"].append(f"Виртуальный узел '{node_name}' вычисляется при чтении")
+                        elif unchanged:
+                            result["skipped_nodes"] += 1
+                            result["processing_log"].append(f"Расчетный узел '{node_name}' не изменился")
+                        elif self.rewrite_calculated_node(node_id, calc_config, child_nodes_data):
+                            recomputed[node_id] = new_data
+                            result["touched_nodes"] += 1
+                            result["touched_node_ids"].append(node_id)
+                            result["processing_log"].append(f"Расчетный узел '{node_name}' пересчитан")
+                        else:
+                            result["failed_nodes"] += 1
+                            result["processing_log"].append(f"Ошибка пересчета расчетного узла '{node_name}'")
+                    except Exception as e:
+                        result["failed_nodes"] += 1
+                        result["processing_log"].append(f"Ошибка пересчета расчетного узла '{node_name}': {str(e)}")
+                    
+                    result["processing_log"].extend(self.processing_log)
+            
+            self.processing_log = []
+            result["lineage_relationships"] = self.flush_lineage_buffer()
+            result["processing_log"].extend(self.processing_log)
+            
+            if result["failed_nodes"] > 0:
+                result["success"] = False
+            
+            result["processing_log"].append(
+                f"Пересчет завершен: {result['touched_nodes']} узлов обновлено, "
+                f"{result['skipped_nodes']} без изменений, {result['failed_nodes']} ошибок"
+            )
+            
+            return result
+            
+        except Exception as e:
+            result["success"] = False
+            result["error"] = f"Ошибка пересчета зависимых узлов: {str(e)}"
+            result["processing_log"].append(f"Критическая ошибка: {str(e)}")
+            return result
+        finally:
+            self.lineage_rows_buffer = None
             self.disconnect()
+    
+    def export_calculated_nodes_batch(self, config_path: str, output_dir: str, id_map: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Экспортирует пакет расчетных узлов в CSV для офлайн-импорта, дописывая
+        их к ранее экспортированным узлам Счетное в том же каталоге.
+        
+        Дочерние узлы задаются именами экспортированных узлов или ID Neo4j,
+        которые переводятся в имена через id_map (например, из манифеста
+        пакета узлов: EtlManifest.node_names_by_id). Данные дочерних узлов
+        читаются из экспортированных файлов.
+        
+        Args:
+            config_path (str): Путь к файлу конфигурации пакета
+            output_dir (str): Каталог экспорта
+            id_map (Optional[Dict[str, str]]): Имя узла по ID Neo4j
+            
+        Returns:
+            Dict[str, Any]: Результат экспорта
+        """
+        try:
+            with open(config_path, 'r', encoding='utf-8') as f:
+                batch_config = json.load(f)
+            
+            calculated_nodes_config = batch_config.get("calculated_nodes", [])
+            id_map = id_map or {}
+            
+            result = {
+                "success": True,
+                "total_nodes": len(calculated_nodes_config),
+                "exported_nodes": 0,
+                "failed_nodes": 0,
+                "processing_log": []
+            }
+            
+            with BulkImportExporter(output_dir, self.years, append=True) as exporter:
+                exported_names = exporter.exported_indicator_names()
+                
+                def resolve(child_id: str) -> str:
+                    return child_id if child_id in exported_names else id_map.get(child_id, child_id)
+                
+                # Данные дочерних узлов, экспортированных ранее, читаются одним проходом
+                child_names = {resolve(child_id) for calc_config in calculated_nodes_config
+                               for child_id in calc_config.get("child_nodes", [])}
+                known_data = exporter.load_indicator_data(child_names)
+                
+                # Расчетные узлы пакета экспортируются после узлов, от которых они зависят
+                order = [index for level in build_dependency_levels(calculated_nodes_config) for index in level]
+                
+                for index in order:
+                    self.processing_log = []
+                    calc_config = calculated_nodes_config[index]
+                    node_name = calc_config.get("node_name", f"CalculatedNode_{index + 1}")
+                    
+                    try:
+                        child_names_ordered = [resolve(child_id) for child_id in calc_config["child_nodes"]]
+                        child_nodes_data = []
+                        for child_name in child_names_ordered:
+                            if child_name in known_data:
+                                child_nodes_data.append(known_data[child_name])
+                            else:
+                                # Как и при записи через драйвер, отсутствующий узел дает нулевые значения
+                                self.log_message(f"Узел '{child_name}' не найден среди экспортированных, используются нулевые значения")
+                                child_nodes_data.append({
+                                    "node_id": child_name,
+                                    "node_name": f"Missing_{child_name}",
+                                    "federal_values": [0.0] * len(self.years),
+                                    "regional_values": []
+                                })
+                        
+                        properties, regions, regional_values = self.compute_calculated_node(calc_config, child_nodes_data)
+                        properties["child_nodes"] = child_names_ordered
+                        
+                        labels = calc_config["node_label"]
+                        node_id = exporter.write_indicator("raschetnye", properties, labels if isinstance(labels, list) else [labels])
+                        exporter.write_regional_values(node_id, regions, regional_values)
+                        
+                        for child_name in child_names_ordered:
+                            if child_name in known_data:
+                                exporter.write_link(node_id, child_name, "ОСНОВАН_НА")
+                                exporter.write_link(child_name, node_id, "ИСПОЛЬЗУЕТСЯ_В")
+                        
+                        # Расчетный узел может быть дочерним для следующих узлов пакета
+                        known_data[node_id] = self.calculated_node_data(node_id, properties, regions, regional_values)
+                        exported_names.add(node_id)
+                        
+                        result["exported_nodes"] += 1
+                        
+                    except Exception as e:
+                        result["failed_nodes"] += 1
+                        result["processing_log"].append(f"Ошибка экспорта расчетного узла '{node_name}': {str(e)}")
+                    
+                    result["processing_log"].extend(self.processing_log)
+                
+                result["export_stats"] = exporter.stats()
+                result["import_command"] = exporter.import_command(self.config.get("NEO4J_DATABASE", "neo4j"))
+            
+            if result["failed_nodes"] > 0:
+                result["success"] = False
+            
+            result["processing_log"].append(
+                f"Экспорт завершен: {result['exported_nodes']}/{result['total_nodes']} расчетных узлов"
+            )
+            result["processing_log"].append(f"Команда импорта: {result['import_command']}")
+            
+            return result
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Ошибка экспорта пакета расчетных узлов: {str(e)}",
+                "processing_log": [f"Критическая ошибка: {str(e)}"]
+            }
 
 
 # Пример использования
@@ -571,8 +1119,25 @@ if __name__ == "__main__":
     creator = CalculatedNodeCreator()
     
     try:
-        # Обрабатываем пакет расчетных узлов из JSON-файла
-        result = creator.process_calculated_nodes_batch("calculated_nodes_config.json")
+        import sys
+        
+        if "--recompute" in sys.argv:
+            # Пересчет узлов, зависящих от изменившихся: --recompute ID [ID ...]
+            result = creator.recompute_dependents(sys.argv[sys.argv.index("--recompute") + 1:])
+            
+            print("\n=== РЕЗУЛЬТАТ ПЕРЕСЧЕТА ЗАВИСИМЫХ УЗЛОВ ===")
+            print(f"Успех: {result['success']}")
+            print(f"Зависимых узлов: {result['dependent_nodes']}")
+            print(f"Пересчитано: {result['touched_nodes']}")
+            print(f"Без изменений: {result['skipped_nodes']}")
+            print(f"Ошибок: {result['failed_nodes']}")
+            
+            if result.get('error'):
+                print(f"Ошибка: {result['error']}")
+            sys.exit(0 if result['success'] else 1)
+        
+        # Обрабатываем пакет расчетных узлов из JSON-файла (--incremental - только изменившиеся узлы)
+        result = creator.process_calculated_nodes_batch("calculated_nodes_config.json", incremental="--incremental" in sys.argv)
         
         print("\n=== РЕЗУЛЬТАТ ОБРАБОТКИ ПАКЕТА РАСЧЕТНЫХ УЗЛОВ ===")
         print(f"Успех: {result['success']}")
@@ -0,0 +1,95 @@
+"""
+Граф зависимостей пакета расчетных узлов.
+
+Дочерний узел в child_nodes может быть ID существующего узла в Neo4j или
+именем (node_name) другого расчетного узла того же пакета. Ссылки на узлы
+пакета образуют граф зависимостей, который раскладывается на
+топологические уровни: узлы одного уровня не зависят друг от друга и могут
+вычисляться параллельно, каждый следующий уровень использует результаты
+предыдущих. Циклы обнаруживаются до начала вычислений.
+"""
+
+from typing import Dict, List, Any, Optional, Set
+
+
+class DependencyCycleError(ValueError):
+    """
+    Циклическая зависимость между расчетными узлами пакета
+    """
+
+    def __init__(self, node_names: List[str]):
+        """
+        Args:
+            node_names (List[str]): Узлы, входящие в цикл или зависящие от него
+        """
+        self.node_names = node_names
+        super().__init__(f"Циклическая зависимость между расчетными узлами: {', '.join(node_names)}")
+
+
+def resolve_batch_dependency(child_ref: str, batch_names: Set[str], ids_to_names: Optional[Dict[str, str]] = None) -> Optional[str]:
+    """
+    Определяет, ссылается ли дочерний узел на расчетный узел пакета.
+
+    Args:
+        child_ref (str): Значение из child_nodes (ID узла или node_name)
+        batch_names (Set[str]): Имена расчетных узлов пакета
+        ids_to_names (Optional[Dict[str, str]]): Имена узлов пакета по их ID, записанным ранее (из манифеста)
+
+    Returns:
+        Optional[str]: Имя расчетного узла пакета или None для внешнего узла
+    """
+    if child_ref in batch_names:
+        return child_ref
+    if ids_to_names and ids_to_names.get(child_ref) in batch_names:
+        return ids_to_names[child_ref]
+    return None
+
+
+def build_dependency_levels(calculated_nodes_config: List[Dict[str, Any]],
+                            ids_to_names: Optional[Dict[str, str]] = None) -> List[List[int]]:
+    """
+    Раскладывает пакет расчетных узлов на топологические уровни.
+
+    Args:
+        calculated_nodes_config (List[Dict[str, Any]]): Конфигурации расчетных узлов
+        ids_to_names (Optional[Dict[str, str]]): Имена узлов пакета по их ID, записанным ранее
+
+    Returns:
+        List[List[int]]: Индексы конфигураций по уровням (внутри уровня - в порядке файла)
+
+    Raises:
+        DependencyCycleError: В пакете есть циклическая зависимость
+        ValueError: Имена расчетных узлов в пакете повторяются
+    """
+    names = [calc_config.get("node_name", f"CalculatedNode_{i}") for i, calc_config in enumerate(calculated_nodes_config, 1)]
+    index_by_name = {name: index for index, name in enumerate(names)}
+
+    if len(index_by_name) != len(names):
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        raise ValueError(f"Повторяющиеся имена расчетных узлов в пакете: {', '.join(duplicates)}")
+
+    batch_names = set(names)
+    dependencies: List[Set[int]] = []
+    for index, calc_config in enumerate(calculated_nodes_config):
+        node_dependencies = set()
+        for child_ref in calc_config.get("child_nodes", []):
+            dependency = resolve_batch_dependency(child_ref, batch_names, ids_to_names)
+            if dependency is not None:
+                node_dependencies.add(index_by_name[dependency])
+        if index in node_dependencies:
+            raise DependencyCycleError([names[index]])
+        dependencies.append(node_dependencies)
+
+    levels = []
+    done: Set[int] = set()
+    pending = list(range(len(calculated_nodes_config)))
+
+    while pending:
+        level = [index for index in pending if dependencies[index] <= done]
+        if not level:
+            raise DependencyCycleError([names[index] for index in pending])
+        levels.append(level)
+        done.update(level)
+        pending = [index for index in pending if index not in done]
+
+    return levels
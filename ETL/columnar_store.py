@@ -0,0 +1,555 @@
+"""
+Скомпилированное колоночное хранилище дерева БД.
+
+Шаг компиляции упаковывает федеральные (БД/<год>/Раздел X.csv) и
+региональные (БД/<год>/<год>/<регион>/Раздел X.csv) таблицы в длинный
+формат (год, регион, таблица, строка, колонка, значение). Данные
+разбиты по годам на файлы Arrow IPC без сжатия, поэтому читаются через
+memory map без копирования. Внутри года строки отсортированы по
+составному ключу (таблица, строка, колонка), и значения одной ячейки по
+всем регионам образуют непрерывный срез.
+
+Рядом хранится словарь подписей строк и колонок каждой таблицы
+(labels.arrow) и метаданные (meta.json) со словарями таблиц и регионов и
+mtime исходных CSV файлов каждого года. Год, файлы которого изменились,
+добавились или пропали после компиляции, считается устаревшим: has_year
+возвращает для него False, и данные читаются из CSV до перекомпиляции.
+"""
+
+import os
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Tuple
+
+import numpy as np
+import pyarrow as pa
+
+# Поддержка как относительных, так и абсолютных импортов
+try:
+    from .table_cache import read_section_frame, find_header_row, parse_numeric_frame
+except ImportError:
+    from table_cache import read_section_frame, find_header_row, parse_numeric_frame
+
+STORE_FORMAT_VERSION = 2
+
+# Дерево БД в корне проекта: из него компилируется хранилище, которое читают ETL и бот
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()  # Поднимаемся на уровень выше из ETL/
+PROJECT_BASE_DIR = os.path.join(PROJECT_ROOT, "БД")
+
+# Как часто (в секундах) перепроверять актуальность года по mtime исходных файлов
+FRESHNESS_CHECK_INTERVAL = int(os.environ.get("COLUMNAR_STORE_FRESHNESS_INTERVAL", 60))
+
+# Псевдо-регион для федеральных таблиц
+FEDERAL_REGION = ""
+
+# Разряды составного ключа ячейки: таблица | строка | колонка
+_ROW_SHIFT = 20
+_TABLE_SHIFT = 40
+
+CELLS_SCHEMA = pa.schema([
+    ("key", pa.int64()),
+    ("table", pa.int32()),
+    ("row", pa.int32()),
+    ("col", pa.int32()),
+    ("region", pa.int32()),
+    ("value", pa.float64())
+])
+
+LABELS_SCHEMA = pa.schema([
+    ("year", pa.string()),
+    ("table", pa.string()),
+    ("kind", pa.string()),
+    ("number", pa.string()),
+    ("label", pa.string())
+])
+
+
+def default_store_dir(base_dir: str) -> str:
+    """
+    Возвращает путь к хранилищу по умолчанию рядом с деревом БД.
+
+    Args:
+        base_dir (str): Путь к директории БД
+
+    Returns:
+        str: Путь к директории хранилища (например, "БД_store")
+    """
+    return os.environ.get("COLUMNAR_STORE_DIR") or os.path.normpath(base_dir) + "_store"
+
+
+def project_store_dir() -> str:
+    """
+    Возвращает путь к хранилищу проекта (<корень проекта>/БД_store или COLUMNAR_STORE_DIR).
+
+    Returns:
+        str: Путь к директории хранилища
+    """
+    return default_store_dir(PROJECT_BASE_DIR)
+
+
+def make_cell_key(table_code: int, row_number: int, column_number: int) -> int:
+    """
+    Формирует составной ключ ячейки.
+
+    Args:
+        table_code (int): Код таблицы в словаре хранилища
+        row_number (int): Номер строки (начиная с 1)
+        column_number (int): Номер колонки (начиная с 1)
+
+    Returns:
+        int: Составной ключ
+    """
+    return (table_code << _TABLE_SHIFT) | (row_number << _ROW_SHIFT) | column_number
+
+
+def table_number_from_file(file_name: str) -> Optional[str]:
+    """
+    Извлекает номер таблицы из имени файла "Раздел X.csv".
+
+    Args:
+        file_name (str): Имя файла
+
+    Returns:
+        Optional[str]: Номер таблицы или None для посторонних файлов
+    """
+    if not file_name.startswith("Раздел ") or not file_name.endswith(".csv"):
+        return None
+    return file_name[len("Раздел "):-len(".csv")]
+
+
+def _clean_label(value: Any) -> str:
+    """
+    Приводит подпись строки или колонки к строке.
+    """
+    if not isinstance(value, str):
+        return ""
+    return value.replace('\ufeff', '').strip()
+
+
+def extract_labels(df, header_row_index: int) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    Извлекает подписи колонок и строк таблицы раздела.
+
+    Args:
+        df: Содержимое файла раздела (см. read_section_frame)
+        header_row_index (int): Индекс строки "№ строки"
+
+    Returns:
+        Tuple[Dict[str, str], Dict[str, str]]: (номер колонки -> название, номер строки -> название)
+    """
+    column_names = [_clean_label(value) for value in df.iloc[header_row_index]]
+    if header_row_index > 0:
+        column_numbers = [_clean_label(value) for value in df.iloc[header_row_index - 1]]
+    else:
+        column_numbers = [str(i + 1) for i in range(len(column_names))]
+
+    columns = {
+        number: name
+        for number, name in zip(column_numbers, column_names)
+        if number and name
+    }
+
+    rows = {}
+    if df.shape[1] >= 2:
+        for number, name in zip(df.iloc[header_row_index + 1:, 0], df.iloc[header_row_index + 1:, 1]):
+            number, name = _clean_label(number), _clean_label(name)
+            if number and name:
+                rows[number] = name
+
+    return columns, rows
+
+
+def _iter_year_files(base_dir: str, year: str):
+    """
+    Перечисляет файлы разделов года: (регион, номер таблицы, путь).
+    """
+    year_dir = os.path.join(base_dir, year)
+
+    for file_name in sorted(os.listdir(year_dir)):
+        table_number = table_number_from_file(file_name)
+        if table_number is not None:
+            yield FEDERAL_REGION, table_number, os.path.join(year_dir, file_name)
+
+    regions_dir = os.path.join(year_dir, year)
+    if not os.path.isdir(regions_dir):
+        return
+
+    for region in sorted(os.listdir(regions_dir)):
+        region_dir = os.path.join(regions_dir, region)
+        if region.startswith('.') or not os.path.isdir(region_dir):
+            continue
+        for file_name in sorted(os.listdir(region_dir)):
+            table_number = table_number_from_file(file_name)
+            if table_number is not None:
+                yield region, table_number, os.path.join(region_dir, file_name)
+
+
+def source_signature(base_dir: str, year: str) -> Dict[str, int]:
+    """
+    Возвращает mtime исходных файлов разделов года.
+
+    Args:
+        base_dir (str): Путь к директории БД
+        year (str): Год
+
+    Returns:
+        Dict[str, int]: {путь относительно base_dir: mtime в наносекундах}
+    """
+    signature = {}
+    if not os.path.isdir(os.path.join(base_dir, year)):
+        return signature
+    for _, _, file_path in _iter_year_files(base_dir, year):
+        signature[os.path.relpath(file_path, base_dir)] = os.stat(file_path).st_mtime_ns
+    return signature
+
+
+def compile_store(base_dir: str, output_dir: Optional[str] = None, years: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Компилирует дерево CSV файлов БД в колоночное хранилище.
+
+    Args:
+        base_dir (str): Путь к директории БД
+        output_dir (Optional[str]): Директория хранилища (по умолчанию default_store_dir)
+        years (Optional[List[str]]): Годы для компиляции (по умолчанию все годы в БД)
+
+    Returns:
+        Dict[str, Any]: Статистика компиляции
+    """
+    start_time = time.time()
+    output_dir = output_dir or default_store_dir(base_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    if years is None:
+        years = sorted(name for name in os.listdir(base_dir)
+                       if name.isdigit() and os.path.isdir(os.path.join(base_dir, name)))
+
+    tables: Dict[str, int] = {}
+    regions: Dict[str, int] = {FEDERAL_REGION: 0}
+    regions_by_year: Dict[str, List[str]] = {}
+    sources: Dict[str, Dict[str, int]] = {}
+    label_columns = {name: [] for name in LABELS_SCHEMA.names}
+    stats = {"years": len(years), "files": 0, "cells": 0, "skipped_files": 0}
+
+    # Годы компилируются по одному, чтобы в памяти был только текущий год
+    for year in years:
+        chunks = []
+        labelled_tables = set()
+        year_regions = set()
+        year_files = 0
+        # mtime фиксируется до чтения: файл, измененный во время компиляции, окажется устаревшим
+        sources[year] = source_signature(base_dir, year)
+
+        # Федеральные файлы перечисляются первыми, поэтому подписи берутся из
+        # федеральной таблицы, а при её отсутствии - из первой региональной
+        for region, table_number, file_path in _iter_year_files(base_dir, year):
+            try:
+                df = read_section_frame(file_path)
+            except Exception as e:
+                print(f"Ошибка при чтении файла {file_path}: {str(e)}")
+                stats["skipped_files"] += 1
+                continue
+
+            header_row_index = find_header_row(df)
+            if header_row_index is None:
+                stats["skipped_files"] += 1
+                continue
+
+            table_code = tables.setdefault(table_number, len(tables))
+            region_code = regions.setdefault(region, len(regions))
+            if region != FEDERAL_REGION:
+                year_regions.add(region)
+            stats["files"] += 1
+            year_files += 1
+
+            if table_number not in labelled_tables:
+                labelled_tables.add(table_number)
+                columns, rows = extract_labels(df, header_row_index)
+                for kind, labels in (("col", columns), ("row", rows)):
+                    for number, label in labels.items():
+                        label_columns["year"].append(year)
+                        label_columns["table"].append(table_number)
+                        label_columns["kind"].append(kind)
+                        label_columns["number"].append(number)
+                        label_columns["label"].append(label)
+
+            # Длинный формат: только непустые ячейки
+            values = parse_numeric_frame(df).values
+            row_index, column_index = np.nonzero(~np.isnan(values))
+            if len(row_index) == 0:
+                continue
+            rows = (row_index + 1).astype(np.int64)
+            cols = (column_index + 1).astype(np.int64)
+            chunks.append((
+                (np.int64(table_code) << _TABLE_SHIFT) | (rows << _ROW_SHIFT) | cols,
+                np.full(len(rows), table_code, dtype=np.int32),
+                rows.astype(np.int32),
+                cols.astype(np.int32),
+                np.full(len(rows), region_code, dtype=np.int32),
+                values[row_index, column_index].astype(np.float64)
+            ))
+
+        if chunks:
+            columns = [np.concatenate([chunk[i] for chunk in chunks]) for i in range(6)]
+        else:
+            columns = [np.empty(0, dtype=field.type.to_pandas_dtype()) for field in CELLS_SCHEMA]
+
+        # Сортировка по ключу ячейки, внутри ключа - по коду региона
+        order = np.lexsort((columns[4], columns[0]))
+        table = pa.Table.from_arrays([pa.array(column[order]) for column in columns], schema=CELLS_SCHEMA)
+
+        partition_dir = os.path.join(output_dir, f"year={year}")
+        os.makedirs(partition_dir, exist_ok=True)
+        _write_arrow(table, os.path.join(partition_dir, "cells.arrow"))
+
+        regions_by_year[year] = sorted(year_regions)
+        stats["cells"] += table.num_rows
+        print(f"Год {year}: {year_files} файлов, {table.num_rows} значений")
+
+    labels_table = pa.Table.from_pydict(label_columns, schema=LABELS_SCHEMA)
+    _write_arrow(labels_table, os.path.join(output_dir, "labels.arrow"))
+
+    meta = {
+        "format_version": STORE_FORMAT_VERSION,
+        "created_at": datetime.now().isoformat(),
+        "base_dir": os.path.abspath(base_dir),
+        "years": list(years),
+        "tables": sorted(tables, key=tables.get),
+        "regions": sorted(regions, key=regions.get),
+        "regions_by_year": regions_by_year,
+        "sources": sources
+    }
+    with open(os.path.join(output_dir, "meta.json"), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    stats["tables"] = len(tables)
+    stats["regions"] = len(regions) - 1
+    stats["execution_time"] = time.time() - start_time
+    print(f"Хранилище скомпилировано в {output_dir}: {stats['files']} файлов, "
+          f"{stats['cells']} значений за {stats['execution_time']:.2f} сек")
+    return stats
+
+
+def _write_arrow(table: pa.Table, path: str) -> None:
+    """
+    Атомарно записывает таблицу в файл Arrow IPC без сжатия.
+    """
+    temp_path = f"{path}.tmp"
+    with pa.OSFile(temp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(temp_path, path)
+
+
+class ColumnarStore:
+    """
+    Читатель скомпилированного хранилища с индексированным доступом к ячейкам
+    """
+
+    def __init__(self, store_dir: str):
+        """
+        Args:
+            store_dir (str): Директория хранилища
+
+        Raises:
+            FileNotFoundError: Если хранилище не скомпилировано
+        """
+        meta_path = os.path.join(store_dir, "meta.json")
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(f"Хранилище не найдено: {store_dir}")
+
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+
+        self.store_dir = store_dir
+        self.base_dir = self.meta.get("base_dir", "")
+        self.years = list(self.meta["years"])
+        self.table_codes = {table: code for code, table in enumerate(self.meta["tables"])}
+        self.regions = list(self.meta["regions"])
+        self.region_codes = {region: code for code, region in enumerate(self.regions)}
+        self._partitions: Dict[str, Dict[str, np.ndarray]] = {}
+        self._labels: Optional[Dict[Tuple[str, str], Dict[str, Dict[str, str]]]] = None
+        # Год -> (актуален ли, время проверки)
+        self._freshness: Dict[str, Tuple[bool, float]] = {}
+
+    def is_fresh(self, year: str) -> bool:
+        """
+        Проверяет, что исходные CSV файлы года не менялись после компиляции.
+
+        Результат кешируется на FRESHNESS_CHECK_INTERVAL секунд. Если дерева
+        БД нет на диске, хранилище - единственный источник и считается актуальным.
+
+        Args:
+            year (str): Год
+
+        Returns:
+            bool: True, если данные года в хранилище актуальны
+        """
+        checked = self._freshness.get(year)
+        if checked is not None and time.time() - checked[1] < FRESHNESS_CHECK_INTERVAL:
+            return checked[0]
+
+        if self.meta.get("format_version") != STORE_FORMAT_VERSION:
+            fresh = False
+        elif not os.path.isdir(os.path.join(self.base_dir, year)):
+            fresh = True
+        else:
+            fresh = source_signature(self.base_dir, year) == self.meta.get("sources", {}).get(year)
+
+        if not fresh and (checked is None or checked[0]):
+            print(f"Хранилище {self.store_dir} устарело для {year} года, данные читаются из CSV")
+        self._freshness[year] = (fresh, time.time())
+        return fresh
+
+    def has_year(self, year: str) -> bool:
+        """
+        Проверяет, скомпилирован ли год и актуальны ли его данные (см. is_fresh).
+        """
+        return year in self.years and self.is_fresh(year)
+
+    def get_regions(self, year: str) -> List[str]:
+        """
+        Возвращает список регионов года.
+
+        Args:
+            year (str): Год
+
+        Returns:
+            List[str]: Регионы, для которых в году есть таблицы
+        """
+        return list(self.meta.get("regions_by_year", {}).get(year, []))
+
+    def _partition(self, year: str) -> Dict[str, np.ndarray]:
+        """
+        Открывает раздел года через memory map (без копирования столбцов).
+        """
+        partition = self._partitions.get(year)
+        if partition is None:
+            path = os.path.join(self.store_dir, f"year={year}", "cells.arrow")
+            source = pa.memory_map(path, 'r')
+            table = pa.ipc.open_file(source).read_all()
+            partition = {
+                name: table.column(name).combine_chunks().to_numpy(zero_copy_only=True)
+                for name in ("key", "region", "value")
+            }
+            self._partitions[year] = partition
+        return partition
+
+    def get_cell_slice(self, year: str, table_number: str, row_number: int, column_number: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Возвращает срез значений ячейки по всем регионам года.
+
+        Args:
+            year (str): Год
+            table_number (str): Номер таблицы
+            row_number (int): Номер строки (начиная с 1)
+            column_number (int): Номер колонки (начиная с 1)
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (коды регионов, значения) - представления без копирования
+        """
+        table_code = self.table_codes.get(str(table_number))
+        if table_code is None or year not in self.years or row_number < 1 or column_number < 1:
+            empty = np.empty(0)
+            return empty.astype(np.int32), empty
+
+        partition = self._partition(year)
+        key = make_cell_key(table_code, int(row_number), int(column_number))
+        lo = np.searchsorted(partition["key"], key, side='left')
+        hi = np.searchsorted(partition["key"], key, side='right')
+        return partition["region"][lo:hi], partition["value"][lo:hi]
+
+    def get_value(self, year: str, table_number: str, row_number: int, column_number: int,
+                  region: str = FEDERAL_REGION) -> Optional[float]:
+        """
+        Возвращает значение одной ячейки.
+
+        Args:
+            year (str): Год
+            table_number (str): Номер таблицы
+            row_number (int): Номер строки (начиная с 1)
+            column_number (int): Номер колонки (начиная с 1)
+            region (str): Регион (по умолчанию федеральная таблица)
+
+        Returns:
+            Optional[float]: Значение или None
+        """
+        region_code = self.region_codes.get(region)
+        if region_code is None:
+            return None
+        region_codes, values = self.get_cell_slice(year, table_number, row_number, column_number)
+        position = np.searchsorted(region_codes, region_code)
+        if position < len(region_codes) and region_codes[position] == region_code:
+            return float(values[position])
+        return None
+
+    def get_regional_values(self, year: str, table_number: str, row_number: int, column_number: int) -> Dict[str, float]:
+        """
+        Возвращает значения ячейки по регионам года.
+
+        Returns:
+            Dict[str, float]: {регион: значение} (федеральное значение под ключом FEDERAL_REGION)
+        """
+        region_codes, values = self.get_cell_slice(year, table_number, row_number, column_number)
+        return {self.regions[code]: float(value) for code, value in zip(region_codes, values)}
+
+    def get_table_schema(self, table_number: str, year: str) -> Optional[Dict[str, Dict[str, str]]]:
+        """
+        Возвращает подписи колонок и строк таблицы.
+
+        Args:
+            table_number (str): Номер таблицы
+            year (str): Год
+
+        Returns:
+            Optional[Dict[str, Dict[str, str]]]: {"columns": {...}, "rows": {...}} или None
+        """
+        if self._labels is None:
+            labels_path = os.path.join(self.store_dir, "labels.arrow")
+            table = pa.ipc.open_file(pa.memory_map(labels_path, 'r')).read_all().to_pydict()
+            labels: Dict[Tuple[str, str], Dict[str, Dict[str, str]]] = {}
+            for year_value, table_value, kind, number, label in zip(
+                    table["year"], table["table"], table["kind"], table["number"], table["label"]):
+                entry = labels.setdefault((year_value, table_value), {"columns": {}, "rows": {}})
+                entry["columns" if kind == "col" else "rows"][number] = label
+            self._labels = labels
+
+        return self._labels.get((year, str(table_number)))
+
+
+_opened_stores: Dict[str, Optional[ColumnarStore]] = {}
+
+
+def open_store_if_available(store_dir: str) -> Optional[ColumnarStore]:
+    """
+    Открывает хранилище, если оно скомпилировано (результат кешируется в процессе).
+
+    Args:
+        store_dir (str): Директория хранилища
+
+    Returns:
+        Optional[ColumnarStore]: Хранилище или None
+    """
+    store_dir = os.path.abspath(store_dir)
+    if store_dir not in _opened_stores:
+        try:
+            _opened_stores[store_dir] = ColumnarStore(store_dir)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Ошибка открытия хранилища {store_dir}: {str(e)}")
+            return None
+    return _opened_stores[store_dir]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Компиляция дерева БД в колоночное хранилище")
+    parser.add_argument("--base-dir", default=PROJECT_BASE_DIR, help="Директория БД")
+    parser.add_argument("--output-dir", default=None, help="Директория хранилища")
+    parser.add_argument("--years", nargs="+", default=None, help="Годы для компиляции")
+    args = parser.parse_args()
+
+    compile_store(args.base_dir, args.output_dir, args.years)
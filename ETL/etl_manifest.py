@@ -0,0 +1,303 @@
+"""
+Манифест инкрементальной загрузки ETL.
+
+После каждого запуска сохраняется состояние исходных файлов (размер, mtime,
+SHA-256 содержимого) и входных данных каждого записанного узла. При
+инкрементальном запуске узел пересчитывается, только если изменилась его
+конфигурация, входные данные или любой из файлов, на которые он ссылается.
+Хеш файла пересчитывается только при изменении размера или mtime.
+
+Хеши файлов узла хранятся в его записи: файл сравнивается с тем
+содержимым, из которого узел был записан в последний раз, поэтому узел,
+запись которого не удалась, пересчитывается, даже если другой узел уже
+записан из нового содержимого того же файла.
+"""
+
+import os
+import json
+import hashlib
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Iterable
+
+# Версия формата манифеста
+MANIFEST_VERSION = 2
+
+# Размер блока чтения при хешировании файлов
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file_path: str) -> str:
+    """
+    Вычисляет SHA-256 содержимого файла.
+
+    Args:
+        file_path (str): Путь к файлу
+
+    Returns:
+        str: Хеш в шестнадцатеричном виде
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def config_hash(data: Any) -> str:
+    """
+    Вычисляет стабильный хеш JSON-совместимых данных (конфигурации узла, входных значений).
+
+    Args:
+        data (Any): Данные для хеширования
+
+    Returns:
+        str: Хеш в шестнадцатеричном виде
+    """
+    payload = json.dumps(data, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def default_manifest_path(config_path: str) -> str:
+    """
+    Возвращает путь к манифесту для файла конфигурации пакета.
+
+    Args:
+        config_path (str): Путь к конфигурации пакета
+
+    Returns:
+        str: Путь к файлу манифеста рядом с конфигурацией
+    """
+    return f"{os.path.splitext(config_path)[0]}.manifest.json"
+
+
+class EtlManifest:
+    """
+    Состояние исходных файлов и записанных узлов на момент последнего запуска
+    """
+
+    def __init__(self, path: str, base_dir: Optional[str] = None):
+        """
+        Args:
+            path (str): Путь к файлу манифеста
+            base_dir (Optional[str]): Корень дерева БД (пути файлов хранятся относительно него)
+        """
+        self.path = path
+        self.base_dir = os.path.abspath(base_dir) if base_dir else None
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.nodes: Dict[str, Dict[str, Any]] = {}
+        self.hashed_files = 0
+        self._current: Dict[str, Optional[Dict[str, Any]]] = {}
+
+    @classmethod
+    def load(cls, path: str, base_dir: Optional[str] = None) -> "EtlManifest":
+        """
+        Загружает манифест с диска (пустой манифест, если файла нет или он поврежден).
+
+        Args:
+            path (str): Путь к файлу манифеста
+            base_dir (Optional[str]): Корень дерева БД
+
+        Returns:
+            EtlManifest: Манифест
+        """
+        manifest = cls(path, base_dir)
+
+        if not os.path.exists(path):
+            return manifest
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+
+            if data.get("version") == MANIFEST_VERSION:
+                manifest.files = data.get("files", {})
+                manifest.nodes = data.get("nodes", {})
+            else:
+                print(f"Манифест {path} имеет другую версию формата и будет пересоздан")
+        except Exception as e:
+            print(f"Ошибка чтения манифеста {path}: {str(e)}")
+
+        return manifest
+
+    def _file_key(self, file_path: str) -> str:
+        """
+        Возвращает ключ файла в манифесте (путь относительно base_dir).
+
+        Args:
+            file_path (str): Путь к файлу
+
+        Returns:
+            str: Ключ файла
+        """
+        abs_path = os.path.abspath(file_path)
+        if self.base_dir and abs_path.startswith(self.base_dir + os.sep):
+            return os.path.relpath(abs_path, self.base_dir)
+        return abs_path
+
+    def current_fingerprint(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """
+        Возвращает текущий отпечаток файла. Хеш из манифеста переиспользуется,
+        если размер и mtime файла не изменились.
+
+        Args:
+            file_path (str): Путь к файлу
+
+        Returns:
+            Optional[Dict[str, Any]]: size, mtime_ns, sha256 или None, если файла нет
+        """
+        key = self._file_key(file_path)
+        if key in self._current:
+            return self._current[key]
+
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            self._current[key] = None
+            return None
+
+        previous = self.files.get(key)
+        if previous and previous.get("size") == stat.st_size and previous.get("mtime_ns") == stat.st_mtime_ns:
+            sha256 = previous["sha256"]
+        else:
+            sha256 = hash_file(file_path)
+            self.hashed_files += 1
+
+        fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256}
+        self._current[key] = fingerprint
+        return fingerprint
+
+    def file_changed(self, file_path: str) -> bool:
+        """
+        Проверяет, изменилось ли содержимое файла с последнего запуска.
+
+        Args:
+            file_path (str): Путь к файлу
+
+        Returns:
+            bool: True, если файл появился, исчез или изменилось его содержимое
+        """
+        previous = self.files.get(self._file_key(file_path))
+        current = self.current_fingerprint(file_path)
+
+        if previous is None or current is None:
+            return previous is not current
+        return previous.get("sha256") != current["sha256"]
+
+    def node_changed(self, node_name: str, node_hash: str, file_paths: Iterable[str] = ()) -> bool:
+        """
+        Проверяет, нужно ли пересчитать узел.
+
+        Args:
+            node_name (str): Имя узла
+            node_hash (str): Хеш конфигурации или входных данных узла
+            file_paths (Iterable[str]): Файлы, на которые ссылается узел
+
+        Returns:
+            bool: True, если узел новый, его хеш изменился или изменился любой из файлов
+        """
+        entry = self.nodes.get(node_name)
+        if not entry or entry.get("hash") != node_hash:
+            return True
+
+        node_files = entry.get("files", {})
+        for file_path in file_paths:
+            key = self._file_key(file_path)
+            if key not in node_files:
+                return True
+            current = self.current_fingerprint(file_path)
+            if node_files[key] != (current["sha256"] if current else None):
+                return True
+        return False
+
+    def get_node_id(self, node_name: str) -> Optional[str]:
+        """
+        Возвращает ID узла, записанного при предыдущем запуске.
+
+        Args:
+            node_name (str): Имя узла
+
+        Returns:
+            Optional[str]: ID узла или None
+        """
+        entry = self.nodes.get(node_name)
+        return entry.get("node_id") if entry else None
+
+    def node_names_by_id(self) -> Dict[str, str]:
+        """
+        Возвращает соответствие ID узлов в Neo4j их именам.
+
+        Returns:
+            Dict[str, str]: Имя узла по его ID
+        """
+        return {entry["node_id"]: name for name, entry in self.nodes.items() if entry.get("node_id")}
+
+    def record_node(self, node_name: str, node_id: str, node_hash: str, file_paths: Iterable[str] = ()) -> None:
+        """
+        Запоминает успешно записанный узел и текущее состояние его файлов.
+
+        Args:
+            node_name (str): Имя узла
+            node_id (str): ID узла в Neo4j
+            node_hash (str): Хеш конфигурации или входных данных узла
+            file_paths (Iterable[str]): Файлы, на которые ссылается узел
+        """
+        node_files = {}
+        for file_path in file_paths:
+            key = self._file_key(file_path)
+            fingerprint = self.current_fingerprint(file_path)
+            if fingerprint is None:
+                self.files.pop(key, None)
+                node_files[key] = None
+            else:
+                self.files[key] = fingerprint
+                node_files[key] = fingerprint["sha256"]
+
+        self.nodes[node_name] = {
+            "node_id": node_id,
+            "hash": node_hash,
+            "files": node_files,
+            "updated_at": datetime.now().isoformat(timespec='seconds')
+        }
+
+    def forget_node(self, node_name: str) -> None:
+        """
+        Удаляет узел из манифеста, чтобы он был пересчитан при следующем запуске.
+
+        Args:
+            node_name (str): Имя узла
+        """
+        self.nodes.pop(node_name, None)
+
+    def save(self) -> None:
+        """
+        Атомарно сохраняет манифест на диск
+        """
+        data = {
+            "version": MANIFEST_VERSION,
+            "base_dir": self.base_dir,
+            "updated_at": datetime.now().isoformat(timespec='seconds'),
+            "files": self.files,
+            "nodes": self.nodes
+        }
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
+
+        print(f"Манифест сохранен: {self.path} ({len(self.nodes)} узлов, {len(self.files)} файлов)")
+
+    def changed_file_keys(self, file_paths: Iterable[str]) -> List[str]:
+        """
+        Возвращает ключи изменившихся файлов (для отчета об инкрементальном запуске).
+
+        Args:
+            file_paths (Iterable[str]): Проверяемые файлы
+
+        Returns:
+            List[str]: Отсортированные ключи изменившихся файлов
+        """
+        return sorted({self._file_key(path) for path in file_paths if self.file_changed(path)})
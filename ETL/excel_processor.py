@@ -1,7 +1,15 @@
 import pandas as pd
+import numpy as np
 import os
 from typing import Union, List
 
+# Начало первой колонки в строке-якоре таблицы раздела
+ANCHOR_PREFIXES = ('Наименование', 'Профили')
+# Заголовок колонки и строк с номерами строк формы
+NUMBER_HEADER = '№ строки'
+# Количество пустых строк в начале CSV раздела
+HEADER_PADDING_ROWS = 5
+
 def process_excel_file(file_path: str) -> Union[pd.DataFrame, None]:
     """
     Обрабатывает Excel файл согласно требованиям:
@@ -22,88 +30,102 @@ def process_excel_file(file_path: str) -> Union[pd.DataFrame, None]:
     """
     try:
         # Читаем Excel файл
-        df = pd.read_excel(file_path)
+        return normalize_table(pd.read_excel(file_path))
+    except Exception as e:
+        return None
+
+def normalize_table(df: pd.DataFrame) -> Union[pd.DataFrame, None]:
+    """
+    Приводит таблицу листа (в виде, который возвращает pd.read_excel) к формату
+    CSV раздела: шаги 1-8 из описания process_excel_file
+    
+    Таблица обрабатывается как массив NumPy: строка-якорь и колонка
+    "№ строки" находятся векторным сравнением, строки и колонки
+    переставляются одной выборкой, пустые строки и объединенный заголовок
+    записываются в заранее выделенный массив без pd.concat.
+    
+    Args:
+        df: таблица листа
+    
+    Returns:
+        DataFrame: обработанный датафрейм или None, если не найдены строка
+        "Наименование"/"Профили" или колонка "№ строки"
+    """
+    try:
+        values = df.to_numpy(dtype=object)
         
-        # Находим индекс строки с "Наименование" или "Профили"
-        target_row = -1
-        for idx, value in enumerate(df.iloc[:, 0]):
-            if isinstance(value, str) and (value.startswith('Наименование') or value.startswith('Профили')):
-                target_row = idx
-                break
-                
-        if target_row == -1:
+        # Находим строку с "Наименование" или "Профили" в первой колонке
+        anchor_mask = pd.Series(values[:, 0], dtype=object).str.startswith(ANCHOR_PREFIXES, na=False).to_numpy(dtype=bool)
+        if not anchor_mask.any():
             return None
-            
-        # Удаляем все строки выше
-        df = df.iloc[target_row:].reset_index(drop=True)
+        target_row = int(anchor_mask.argmax())
         
-        # Находим колонку с "№ строки"
-        number_col = -1
-        for idx, col in enumerate(df.iloc[0]):
-            if isinstance(col, str) and col == '№ строки':
-                number_col = idx
-                break
-                
-        if number_col == -1:
+        # Находим колонку с "№ строки" в строке-якоре
+        number_mask = values[target_row] == NUMBER_HEADER
+        if not number_mask.any():
             return None
-            
-        # Оставляем только первую колонку и колонки начиная с "№ строки"
-        first_col = df.iloc[:, 0].copy()
-        remaining_cols = df.iloc[:, number_col:].copy()
+        number_col = int(number_mask.argmax())
         
-        # Перемещаем колонку с "№ строки" на первое место
-        header_row = remaining_cols.iloc[0]
-        num_col_idx = None
-        for idx, value in enumerate(header_row):
-            if isinstance(value, str) and value == '№ строки':
-                num_col_idx = idx
-                break
+        # Находим строку со значением "2" в колонке "№ строки" (ниже строки-якоря)
+        below = pd.Series(values[target_row + 1:, number_col], dtype=object).astype(str).str.strip()
+        second_rows = np.flatnonzero(below.to_numpy() == "2")
         
-        # Находим строку со значением "2" и сохраняем её индекс
-        target_row_idx = None
-        for idx, value in enumerate(remaining_cols.iloc[1:, num_col_idx]):
-            if str(value).strip() == "2":
-                target_row_idx = idx + 1  # +1 так как пропустили первую строку
-                break
+        # Порядок строк: строка "2" первой, затем остальные начиная со строки-якоря;
+        # порядок колонок: "№ строки", первая колонка, колонки после "№ строки"
+        row_order = np.arange(target_row, len(values))
+        if len(second_rows):
+            moved = target_row + 1 + int(second_rows[0])
+            row_order = np.concatenate(([moved], row_order[row_order != moved]))
+        column_order = np.r_[number_col, 0, number_col + 1:values.shape[1]]
+        table = values[np.ix_(row_order, column_order)]
         
-        # Создаем новый DataFrame с нужными колонками и числовыми названиями
-        df = pd.DataFrame(columns=range(len(remaining_cols.columns) + 1), dtype=object)
-        df[0] = first_col
-        for i in range(remaining_cols.shape[1]):
-            df[i + 1] = remaining_cols.iloc[:, i]
+        # Объединяем строки заголовков между строками "№ строки"
+        header_rows = np.flatnonzero(table[:, 0] == NUMBER_HEADER)
+        if len(header_rows) >= 2:
+            first, last = int(header_rows[0]), int(header_rows[-1])
+            kept_rows = len(table) - (last - first)
+        else:
+            first = last = None
+            kept_rows = len(table)
         
-        # Перемещаем колонку "№ строки" на первое место
-        if num_col_idx is not None:
-            cols = list(df.columns)
-            col_to_move = num_col_idx + 1  # +1 because we added first column
-            cols.remove(col_to_move)
-            cols = [col_to_move] + cols
-            df = df[cols]
-                
-        if target_row_idx is not None:
-            # Перемещаем найденную строку на самое первое место
-            row_to_move = df.iloc[target_row_idx:target_row_idx+1]
-            df_without_row = df.drop(target_row_idx)
-            df = pd.concat([row_to_move, df_without_row], ignore_index=True)
+        # Пустые строки в начале таблицы
+        result = np.full((HEADER_PADDING_ROWS + kept_rows, table.shape[1]), None, dtype=object)
+        if first is None:
+            result[HEADER_PADDING_ROWS:] = table
+        else:
+            offset = HEADER_PADDING_ROWS + first
+            result[HEADER_PADDING_ROWS:offset] = table[:first]
+            result[offset] = merge_header_values(table[first:last + 1])
+            result[offset + 1:] = table[last + 1:]
         
-        # Добавляем 5 пустых строк в начало таблицы
-        empty_rows = pd.DataFrame([[None] * len(df.columns)] * 5, columns=df.columns, dtype=object)
-        df = pd.concat([empty_rows, df], ignore_index=True)
+        # Меняем местами значения "1" и "2" в строке после пустых строк
+        swap_row = result[HEADER_PADDING_ROWS]
+        if str(swap_row[0]).strip() == "2" and str(swap_row[1]).strip() == "1":
+            swap_row[0], swap_row[1] = swap_row[1], swap_row[0]
         
-        # Объединяем строки заголовков
-        df = merge_header_rows(df)
-        
-        # Меняем местами значения "1" и "2" в строке после пустых строк (индекс 5)
-        if str(df.iloc[5, 0]).strip() == "2" and str(df.iloc[5, 1]).strip() == "1":
-            temp = df.iloc[5, 0]
-            df.iloc[5, 0] = df.iloc[5, 1]
-            df.iloc[5, 1] = temp
-        
-        return df
+        return pd.DataFrame(result, dtype=object)
         
     except Exception as e:
         return None
 
+def merge_header_values(header_rows: np.ndarray) -> np.ndarray:
+    """
+    Объединяет значения строк заголовка по колонкам: уникальные непустые
+    значения в порядке появления через пробел
+    
+    Args:
+        header_rows: строки заголовка (строки, колонки)
+    
+    Returns:
+        Объединенная строка заголовка
+    """
+    text = np.char.strip(header_rows.astype(str))
+    filled = ~pd.isna(header_rows) & (text != '')
+    
+    merged = np.empty(header_rows.shape[1], dtype=object)
+    merged[:] = [' '.join(dict.fromkeys(column[mask])) for column, mask in zip(text.T, filled.T)]
+    return merged
+
 def merge_header_rows(df: pd.DataFrame) -> pd.DataFrame:
     """
     Объединяет строки заголовков между строками с номерами.
@@ -114,45 +136,20 @@ def merge_header_rows(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         DataFrame с объединенными строками заголовков
     """
-    # Находим индексы строк с '№ строки'
-    num_row_indices = []
-    for idx, value in enumerate(df.iloc[:, 0]):
-        if isinstance(value, str) and value == '№ строки':
-            num_row_indices.append(idx)
+    values = df.to_numpy(dtype=object)
     
+    # Находим индексы строк с '№ строки'
+    num_row_indices = np.flatnonzero(values[:, 0] == NUMBER_HEADER)
     if len(num_row_indices) < 2:
         return df
     
-    # Получаем строки заголовков между строками с номерами
-    header_rows = df.iloc[num_row_indices[0]:num_row_indices[-1]+1]
-    
-    # Создаем новую строку с объединенными значениями
-    merged_row = pd.Series(index=df.columns, dtype=object)
-    
-    # Для каждой колонки объединяем уникальные значения
-    for col in df.columns:
-        # Получаем все непустые значения из колонки
-        values = [str(val).strip() for val in header_rows[col] 
-                 if pd.notna(val) and str(val).strip()]
-        # Оставляем только уникальные значения, сохраняя порядок
-        unique_values = []
-        for val in values:
-            if val not in unique_values:
-                unique_values.append(val)
-        # Объединяем значения через пробел
-        merged_row[col] = ' '.join(unique_values) if unique_values else ''
-    
-    # Создаем новый DataFrame с одной строкой
-    merged_df = pd.DataFrame([merged_row], dtype=object)
-    
-    # Собираем финальный DataFrame
-    result = pd.concat([
-        df.iloc[:num_row_indices[0]],
-        merged_df,
-        df.iloc[num_row_indices[-1]+1:]
-    ], ignore_index=True)
-    
-    return result
+    first, last = int(num_row_indices[0]), int(num_row_indices[-1])
+    result = np.empty((len(values) - (last - first), values.shape[1]), dtype=object)
+    result[:first] = values[:first]
+    result[first] = merge_header_values(values[first:last + 1])
+    result[first + 1:] = values[last + 1:]
+    
+    return pd.DataFrame(result, columns=df.columns, dtype=object)
 
 def process_directory(directory_path: str) -> None:
     """
@@ -161,32 +158,69 @@ def process_directory(directory_path: str) -> None:
     Args:
         directory_path: путь к директории с Excel файлами
     """
-    # Получаем список всех Excel файлов
-    excel_files = [f for f in os.listdir(directory_path) 
-                  if f.endswith(('.xlsx', '.xls'))]
+    for file_path in list_excel_files(directory_path):
+        convert_excel_file(file_path)
+
+def list_excel_files(directory_path: str) -> List[str]:
+    """
+    Возвращает пути к Excel файлам директории
     
-    for file in excel_files:
-        file_path = os.path.join(directory_path, file)
-        
-        # Создаем имя для CSV файла
-        csv_file = os.path.splitext(file)[0] + '.csv'
-        temp_path = os.path.join(directory_path, f"temp_{csv_file}")
-        csv_path = os.path.join(directory_path, csv_file)
-        
-        df = process_excel_file(file_path)
-        if df is not None:
-            # Сохраняем во временный CSV файл
-            df.to_csv(temp_path, index=False, header=False, encoding='utf-8-sig', sep=';')
-            
-            # Если CSV файл уже существует, удаляем его
-            if os.path.exists(csv_path):
-                os.remove(csv_path)
-            
-            # Переименовываем временный файл
-            os.rename(temp_path, csv_path)
-            
-            # Удаляем исходный Excel файл
-            os.remove(file_path)
+    Args:
+        directory_path: путь к директории с Excel файлами
+    
+    Returns:
+        Список путей к файлам .xlsx и .xls
+    """
+    return [os.path.join(directory_path, f) for f in sorted(os.listdir(directory_path))
+            if f.endswith(('.xlsx', '.xls'))]
+
+def convert_excel_file(file_path: str) -> Union[str, None]:
+    """
+    Преобразует один Excel файл в CSV рядом с ним: запись во временный файл,
+    переименование и удаление исходного Excel файла
+    
+    Args:
+        file_path: путь к Excel файлу
+    
+    Returns:
+        Путь к CSV файлу или None, если файл не удалось обработать
+    """
+    directory_path, file = os.path.split(file_path)
+    
+    # Создаем имя для CSV файла
+    csv_path = os.path.join(directory_path, os.path.splitext(file)[0] + '.csv')
+    
+    df = process_excel_file(file_path)
+    if df is None:
+        return None
+    
+    write_csv(df, csv_path)
+    
+    # Удаляем исходный Excel файл
+    os.remove(file_path)
+    
+    return csv_path
+
+def write_csv(df: pd.DataFrame, csv_path: str) -> None:
+    """
+    Сохраняет таблицу раздела в CSV через временный файл и переименование
+    
+    Args:
+        df: обработанная таблица
+        csv_path: путь к CSV файлу
+    """
+    directory_path, csv_file = os.path.split(csv_path)
+    temp_path = os.path.join(directory_path, f"temp_{csv_file}")
+    
+    # Сохраняем во временный CSV файл
+    df.to_csv(temp_path, index=False, header=False, encoding='utf-8-sig', sep=';')
+    
+    # Если CSV файл уже существует, удаляем его
+    if os.path.exists(csv_path):
+        os.remove(csv_path)
+    
+    # Переименовываем временный файл
+    os.rename(temp_path, csv_path)
 
 if __name__ == "__main__":
     # Пример использования с указанной директорией
@@ -98,13 +98,30 @@ def clean_value(value) -> any:
         return value.replace('\n', ' ').replace('\r', ' ').strip()
     return value
 
-def save_sheets_to_single_folder(excel_path: str):
+def save_sheets_to_single_folder(excel_path: str, streaming: bool = True):
     """
     Основная функция для обработки Excel файла и сохранения всех листов в одну папку.
     
     Args:
         excel_path (str): Путь к Excel файлу
+        streaming (bool): Сразу сохранять CSV разделов за один проход по книге (см. workbook_splitter);
+            False - прежний путь через промежуточные .xlsx
     """
+    if streaming:
+        # Импорт внутри функции: workbook_splitter сам использует утилиты этого модуля
+        try:
+            from .workbook_splitter import split_workbook_to_csv, StreamingNotSupportedError
+        except ImportError:
+            from workbook_splitter import split_workbook_to_csv, StreamingNotSupportedError
+        
+        output_dir = Path(excel_path).parent / Path(excel_path).stem
+        try:
+            created_files = split_workbook_to_csv(excel_path, str(output_dir))
+            print(f"Сохранено CSV файлов разделов: {len(created_files)} в {output_dir}")
+            return
+        except StreamingNotSupportedError as e:
+            print(f"{str(e)}, используется прежний путь через промежуточные .xlsx")
+    
     try:
         # Получаем все листы
         print("Получаем список листов...")
@@ -0,0 +1,180 @@
+"""
+Планировщик извлечения ячеек для пакетной обработки узлов.
+
+Сначала по всем узлам пакета собирается множество нужных ячеек
+(файл, строка, колонка) с учетом разбиения на периоды, затем каждый файл
+открывается ровно один раз, а извлеченные значения раздаются всем узлам,
+которые их запросили.
+"""
+
+import os
+from collections import defaultdict
+from typing import Dict, List, Optional, Any, Tuple
+
+# Поддержка как относительных, так и абсолютных импортов
+try:
+    from .parallel_extraction import extract_cells
+except ImportError:
+    from parallel_extraction import extract_cells
+
+# Ключ ячейки: (путь к файлу, номер строки, номер колонки)
+CellKey = Tuple[str, int, int]
+
+
+class BatchExtractionPlan:
+    """
+    План извлечения данных для пакета узлов
+    """
+
+    def __init__(self, creator, regions: Optional[List[str]] = None):
+        """
+        Args:
+            creator: Экземпляр Neo4jNodeCreator (пути к файлам, годы, кеш таблиц)
+            regions (Optional[List[str]]): Список регионов (по умолчанию из файловой системы)
+        """
+        self.creator = creator
+        self.years = list(creator.years)
+        self.regions = regions if regions is not None else creator.get_regions_list()
+        self.cells_by_file: Dict[str, set] = defaultdict(set)
+        self.node_cells: Dict[int, Dict[str, Any]] = {}
+        self.values: Dict[CellKey, Optional[float]] = {}
+        self.executed = False
+        self.stats = {
+            "nodes": 0,
+            "cell_requests": 0,
+            "distinct_cells": 0,
+            "distinct_files": 0,
+            "missing_files": 0
+        }
+
+    def _cell_key(self, file_path: str, period_config: Dict[str, Any]) -> CellKey:
+        """
+        Регистрирует ячейку в плане и возвращает её ключ.
+
+        Args:
+            file_path (str): Путь к файлу
+            period_config (Dict[str, Any]): Параметры периода (table_number, column, row)
+
+        Returns:
+            CellKey: Ключ ячейки
+        """
+        row_number = int(period_config["row"])
+        column_number = int(period_config["column"])
+        self.cells_by_file[file_path].add((row_number, column_number))
+        self.stats["cell_requests"] += 1
+        return (file_path, row_number, column_number)
+
+    def add_node(self, node_index: int, node_config: Dict[str, Any]) -> bool:
+        """
+        Добавляет в план все ячейки, нужные узлу.
+
+        Args:
+            node_index (int): Порядковый номер узла в пакете
+            node_config (Dict[str, Any]): Конфигурация узла
+
+        Returns:
+            bool: False, если у узла нет конфигурации периодов
+        """
+        periods_config = self.creator.extract_period_config(node_config)
+        if not periods_config:
+            return False
+
+        federal_keys: List[Optional[CellKey]] = []
+        regional_keys: List[List[Optional[CellKey]]] = [[] for _ in self.regions]
+
+        for year in self.years:
+            period_config = periods_config.get(self.creator.get_period_key(year))
+
+            if period_config is None:
+                federal_keys.append(None)
+                for region_keys in regional_keys:
+                    region_keys.append(None)
+                continue
+
+            table_number = str(period_config["table_number"])
+            federal_path = self.creator.get_federal_file_path(year, table_number)
+            federal_keys.append(self._cell_key(federal_path, period_config))
+
+            for region_index, region in enumerate(self.regions):
+                regional_path = self.creator.get_regional_file_path(year, region, table_number)
+                regional_keys[region_index].append(self._cell_key(regional_path, period_config))
+
+        self.node_cells[node_index] = {
+            "federal": federal_keys,
+            "regional": regional_keys
+        }
+        self.stats["nodes"] += 1
+        return True
+
+    def execute(self) -> Dict[str, int]:
+        """
+        Открывает каждый файл плана один раз и извлекает все запрошенные ячейки
+        (в пуле процессов, если у создателя узлов включен параллельный режим).
+
+        Returns:
+            Dict[str, int]: Статистика выполнения плана
+        """
+        tasks = [(file_path, sorted(cells)) for file_path, cells in self.cells_by_file.items()]
+        self.stats["missing_files"] = sum(1 for file_path, _ in tasks if not os.path.exists(file_path))
+
+        # В параллельном режиме файлы распределяются по пулу процессов
+        results = extract_cells(tasks, getattr(self.creator, "max_workers", 1), self.creator.table_cache,
+                                getattr(self.creator, "extraction_pool", None))
+
+        for (file_path, cells), values in zip(tasks, results):
+            for (row_number, column_number), value in zip(cells, values):
+                self.values[(file_path, row_number, column_number)] = value
+
+        self.stats["distinct_files"] = len(self.cells_by_file)
+        self.stats["distinct_cells"] = len(self.values)
+        self.executed = True
+
+        print(f"План извлечения: {self.stats['nodes']} узлов, {self.stats['cell_requests']} запросов ячеек, "
+              f"{self.stats['distinct_files']} файлов ({self.stats['missing_files']} отсутствуют)")
+        return self.stats
+
+    def get_node_data(self, node_index: int) -> Optional[Tuple[List[Optional[float]], List[str], List[List[Optional[float]]]]]:
+        """
+        Возвращает извлеченные данные узла.
+
+        Args:
+            node_index (int): Порядковый номер узла в пакете
+
+        Returns:
+            Optional[Tuple]: (федеральные значения, список регионов, значения по регионам и годам)
+                или None, если узел не был добавлен в план
+        """
+        if not self.executed:
+            self.execute()
+
+        cells = self.node_cells.get(node_index)
+        if cells is None:
+            return None
+
+        federal_values = [self.values.get(key) if key else None for key in cells["federal"]]
+        regional_values = [
+            [self.values.get(key) if key else None for key in region_keys]
+            for region_keys in cells["regional"]
+        ]
+
+        return federal_values, list(self.regions), regional_values
+
+    def get_referenced_files(self, node_index: int) -> List[str]:
+        """
+        Возвращает список файлов, на которые ссылается узел.
+
+        Args:
+            node_index (int): Порядковый номер узла в пакете
+
+        Returns:
+            List[str]: Отсортированный список путей к файлам
+        """
+        cells = self.node_cells.get(node_index)
+        if cells is None:
+            return []
+
+        files = {key[0] for key in cells["federal"] if key}
+        for region_keys in cells["regional"]:
+            files.update(key[0] for key in region_keys if key)
+
+        return sorted(files)
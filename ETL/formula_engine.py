@@ -0,0 +1,482 @@
+"""
+Векторный движок формул расчетных узлов.
+
+Формула вида "(node_id1 / node_id2) * 100" разбирается в AST один раз
+(с кешированием по тексту) и вычисляется над массивами NumPy сразу для
+всех лет и регионов. Пропуски описываются явной маской:
+
+- значение дочернего узла None подставляется как 0 (как и прежде);
+- ячейка, где пропущены значения всех дочерних узлов, остается пустой;
+- деление (в том числе // и %) на ноль делает пустой только эту ячейку;
+- нечисловые результаты (inf, nan) также считаются пустыми.
+
+Региональные данные дочерних узлов сопоставляются по названию региона,
+а не по позиции в списке.
+
+Функции формул (аргумент - любое выражение):
+
+- sum_regions(x), mean_regions(x) - сумма и среднее x по регионам с
+  заполненными значениями (одинаковы для всех регионов года);
+- federal(x) - значение x по федеральным данным (для региональной формулы
+  "node_id1 / federal(node_id1)" - доля региона в федеральном значении);
+- lag(x, n=1) - значение x на n лет раньше (первые n лет пустые);
+- yoy(x) - относительное изменение к предыдущему году: x / lag(x) - 1.
+
+Функции вычисляются над всей матрицей значений сразу: агрегаты - по оси
+регионов, lag и yoy - сдвигом по оси лет.
+"""
+
+import ast
+import re
+import operator
+from functools import lru_cache
+from typing import Dict, List, Optional, Any, Tuple
+
+import numpy as np
+
+# Имя переменной дочернего узла: node_id1, node_id2, ...
+VARIABLE_PATTERN = re.compile(r"^node_id(\d+)$")
+
+_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+
+# Операторы, для которых нулевой делитель делает ячейку пустой
+_DIVISION_OPERATORS = (ast.Div, ast.FloorDiv, ast.Mod)
+
+_UNARY_OPERATORS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+# Функции формул: имя -> (минимальное, максимальное количество аргументов)
+FUNCTIONS = {
+    "sum_regions": (1, 1),
+    "mean_regions": (1, 1),
+    "federal": (1, 1),
+    "lag": (1, 2),
+    "yoy": (1, 1),
+}
+
+# Функции, которым нужны региональные значения дочерних узлов
+REGIONAL_FUNCTIONS = frozenset({"sum_regions", "mean_regions"})
+
+
+class FormulaError(ValueError):
+    """
+    Ошибка разбора или вычисления формулы
+    """
+
+
+class _Scope:
+    """
+    Значения дочерних узлов, над которыми вычисляется выражение:
+    федеральные (дочерние узлы, годы) или региональные (дочерние узлы, регионы, годы)
+    """
+
+    def __init__(self, values: np.ndarray, present: np.ndarray):
+        """
+        Args:
+            values (np.ndarray): Значения дочерних узлов
+            present (np.ndarray): Маска наличия значений той же формы
+        """
+        # Пропуски подставляются как 0, поэтому для переменных все ячейки допустимы
+        self.filled = np.where(present, values, 0.0).astype(float)
+        self.cell_shape = values.shape[1:]
+        # Ячейка пуста, если пропущены значения всех дочерних узлов
+        if values.shape[0] > 0:
+            self.present_any = present.any(axis=0)
+        else:
+            self.present_any = np.ones(self.cell_shape, dtype=bool)
+
+
+class CompiledFormula:
+    """
+    Разобранная формула, вычисляемая над массивами значений дочерних узлов
+    """
+
+    def __init__(self, formula: str):
+        """
+        Args:
+            formula (str): Текст формулы
+
+        Raises:
+            FormulaError: Синтаксическая ошибка или неподдерживаемая конструкция
+        """
+        self.formula = formula
+        try:
+            self.tree = ast.parse(formula.strip(), mode='eval')
+        except SyntaxError as e:
+            raise FormulaError(f"Синтаксическая ошибка в формуле '{formula}': {e.msg}")
+
+        self.functions: set = set()
+        self.variables: List[int] = sorted(self._collect_variables(self.tree.body))
+
+    @property
+    def uses_regions(self) -> bool:
+        """Формула агрегирует значения по регионам"""
+        return bool(self.functions & REGIONAL_FUNCTIONS)
+
+    @property
+    def uses_federal(self) -> bool:
+        """Формула обращается к федеральным значениям"""
+        return "federal" in self.functions
+
+    def _collect_variables(self, node: ast.AST) -> set:
+        """
+        Проверяет конструкции формулы, собирает номера переменных node_idN
+        и используемые функции.
+
+        Args:
+            node (ast.AST): Узел AST
+
+        Returns:
+            set: Номера дочерних узлов (начиная с 1)
+        """
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+            return self._collect_variables(node.left) | self._collect_variables(node.right)
+        if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPERATORS:
+            return self._collect_variables(node.operand)
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+            return set()
+        if isinstance(node, ast.Name):
+            match = VARIABLE_PATTERN.match(node.id)
+            if match and int(match.group(1)) >= 1:
+                return {int(match.group(1))}
+            raise FormulaError(f"Неизвестная переменная '{node.id}' в формуле '{self.formula}'")
+        if isinstance(node, ast.Call):
+            return self._collect_call_variables(node)
+
+        raise FormulaError(f"Неподдерживаемая конструкция '{ast.dump(node)}' в формуле '{self.formula}'")
+
+    def _collect_call_variables(self, node: ast.Call) -> set:
+        """
+        Проверяет вызов функции формулы.
+
+        Args:
+            node (ast.Call): Вызов функции
+
+        Returns:
+            set: Номера дочерних узлов в аргументах
+        """
+        name = node.func.id if isinstance(node.func, ast.Name) else None
+        if name not in FUNCTIONS:
+            raise FormulaError(f"Неизвестная функция '{ast.unparse(node.func)}' в формуле '{self.formula}'")
+
+        min_args, max_args = FUNCTIONS[name]
+        if node.keywords or not min_args <= len(node.args) <= max_args:
+            raise FormulaError(f"Неверные аргументы функции {name}() в формуле '{self.formula}'")
+
+        if name == "lag" and len(node.args) == 2:
+            periods = node.args[1]
+            if not (isinstance(periods, ast.Constant) and type(periods.value) is int and periods.value >= 1):
+                raise FormulaError(f"Сдвиг lag() должен быть целым числом не меньше 1 в формуле '{self.formula}'")
+
+        self.functions.add(name)
+        return self._collect_variables(node.args[0])
+
+    def evaluate(self, values: np.ndarray, present: np.ndarray,
+                 federal: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+                 regional: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Вычисляет формулу для всех ячеек сразу.
+
+        Последняя ось ячеек - годы; если ячейки двумерные, первая ось - регионы.
+
+        Args:
+            values (np.ndarray): Значения дочерних узлов, форма (дочерние узлы, ...)
+            present (np.ndarray): Маска наличия значений той же формы
+            federal (Optional[Tuple[np.ndarray, np.ndarray]]): Федеральные значения и маска (дочерние узлы, годы)
+                для federal() в региональной формуле
+            regional (Optional[Tuple[np.ndarray, np.ndarray]]): Региональные значения и маска
+                (дочерние узлы, регионы, годы) для агрегатов по регионам в федеральной формуле
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (результаты, маска заполненных ячеек) формы values.shape[1:]
+
+        Raises:
+            FormulaError: Формула ссылается на отсутствующий дочерний узел или недоступные данные
+        """
+        if self.variables and self.variables[-1] > values.shape[0]:
+            raise FormulaError(
+                f"Формула '{self.formula}' ссылается на node_id{self.variables[-1]}, "
+                f"а дочерних узлов {values.shape[0]}"
+            )
+
+        scope = _Scope(values, present)
+        scopes = {
+            "federal": scope if len(scope.cell_shape) < 2 else (_Scope(*federal) if federal is not None else None),
+            "regional": scope if len(scope.cell_shape) == 2 else (_Scope(*regional) if regional is not None else None),
+        }
+
+        with np.errstate(all='ignore'):
+            result, valid = self._evaluate_full(self.tree.body, scope, scopes)
+
+        return result, valid
+
+    def _evaluate_full(self, node: ast.AST, scope: _Scope, scopes: Dict[str, Optional[_Scope]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Вычисляет выражение над набором значений с итоговой маской заполненных ячеек.
+
+        Args:
+            node (ast.AST): Узел AST
+            scope (_Scope): Значения, над которыми вычисляется выражение
+            scopes (Dict[str, Optional[_Scope]]): Федеральные и региональные значения для функций
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (значения, маска) формы scope.cell_shape
+        """
+        result, valid = self._evaluate_node(node, scope, scopes)
+        result = np.broadcast_to(np.asarray(result, dtype=float), scope.cell_shape)
+        valid = np.broadcast_to(valid, scope.cell_shape) & np.isfinite(result) & scope.present_any
+        return result, valid
+
+    def _evaluate_node(self, node: ast.AST, scope: _Scope, scopes: Dict[str, Optional[_Scope]]) -> Tuple[Any, Any]:
+        """
+        Рекурсивно вычисляет узел AST.
+
+        Args:
+            node (ast.AST): Узел AST
+            scope (_Scope): Значения, над которыми вычисляется выражение
+            scopes (Dict[str, Optional[_Scope]]): Федеральные и региональные значения для функций
+
+        Returns:
+            Tuple[Any, Any]: (значения, маска допустимых ячеек)
+        """
+        if isinstance(node, ast.Constant):
+            return float(node.value), True
+
+        if isinstance(node, ast.Name):
+            return scope.filled[int(VARIABLE_PATTERN.match(node.id).group(1)) - 1], True
+
+        if isinstance(node, ast.Call):
+            return self._evaluate_call(node, scope, scopes)
+
+        if isinstance(node, ast.UnaryOp):
+            operand, valid = self._evaluate_node(node.operand, scope, scopes)
+            return _UNARY_OPERATORS[type(node.op)](operand), valid
+
+        left, left_valid = self._evaluate_node(node.left, scope, scopes)
+        right, right_valid = self._evaluate_node(node.right, scope, scopes)
+        valid = np.logical_and(left_valid, right_valid)
+
+        if isinstance(node.op, _DIVISION_OPERATORS):
+            nonzero = np.asarray(right) != 0
+            valid = np.logical_and(valid, nonzero)
+            safe_right = np.where(nonzero, right, 1.0)
+            return _BINARY_OPERATORS[type(node.op)](left, safe_right), valid
+
+        return _BINARY_OPERATORS[type(node.op)](left, right), valid
+
+    def _evaluate_call(self, node: ast.Call, scope: _Scope, scopes: Dict[str, Optional[_Scope]]) -> Tuple[Any, Any]:
+        """
+        Вычисляет функцию формулы над всей матрицей значений.
+
+        Args:
+            node (ast.Call): Вызов функции
+            scope (_Scope): Значения, над которыми вычисляется выражение
+            scopes (Dict[str, Optional[_Scope]]): Федеральные и региональные значения для функций
+
+        Returns:
+            Tuple[Any, Any]: (значения, маска допустимых ячеек)
+
+        Raises:
+            FormulaError: Для функции нет нужных данных
+        """
+        name = node.func.id
+
+        if name in REGIONAL_FUNCTIONS:
+            regional = scopes["regional"]
+            if regional is None:
+                raise FormulaError(f"Для {name}() в формуле '{self.formula}' нет региональных значений")
+            values, valid = self._evaluate_full(node.args[0], regional, scopes)
+            # Сумма по оси регионов; результат (годы) транслируется на все регионы
+            total = np.where(valid, values, 0.0).sum(axis=0)
+            count = valid.sum(axis=0)
+            if name == "mean_regions":
+                total = total / np.maximum(count, 1)
+            return total, count > 0
+
+        if name == "federal":
+            federal = scopes["federal"]
+            if federal is None:
+                raise FormulaError(f"Для federal() в формуле '{self.formula}' нет федеральных значений")
+            return self._evaluate_full(node.args[0], federal, scopes)
+
+        if not scope.cell_shape:
+            raise FormulaError(f"Для {name}() в формуле '{self.formula}' нужны значения по годам")
+
+        values, valid = self._evaluate_full(node.args[0], scope, scopes)
+        periods = node.args[1].value if len(node.args) == 2 else 1
+        previous, previous_valid = _shift_years(values, valid, periods)
+
+        if name == "lag":
+            return previous, previous_valid
+
+        # yoy: изменение к предыдущему году, нулевое значение прошлого года дает пустую ячейку
+        nonzero = previous != 0
+        change = values / np.where(nonzero, previous, 1.0) - 1.0
+        return change, valid & previous_valid & nonzero
+
+
+def _shift_years(values: np.ndarray, valid: np.ndarray, periods: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Сдвигает значения вперед по оси лет (последней оси).
+
+    Args:
+        values (np.ndarray): Значения
+        valid (np.ndarray): Маска заполненных ячеек
+        periods (int): Количество лет сдвига
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (значения на periods лет раньше, маска; первые periods лет пустые)
+    """
+    shifted = np.zeros_like(values)
+    shifted_valid = np.zeros_like(valid)
+    if periods < values.shape[-1]:
+        shifted[..., periods:] = values[..., :-periods]
+        shifted_valid[..., periods:] = valid[..., :-periods]
+    return shifted, shifted_valid
+
+
+@lru_cache(maxsize=1024)
+def compile_formula(formula: str) -> CompiledFormula:
+    """
+    Разбирает формулу (результат кешируется по тексту формулы).
+
+    Args:
+        formula (str): Текст формулы
+
+    Returns:
+        CompiledFormula: Разобранная формула
+
+    Raises:
+        FormulaError: Синтаксическая ошибка или неподдерживаемая конструкция
+    """
+    return CompiledFormula(formula)
+
+
+def to_optional_list(values: np.ndarray, valid: np.ndarray) -> List[Optional[float]]:
+    """
+    Преобразует массив с маской в список значений (None для пустых ячеек).
+
+    Args:
+        values (np.ndarray): Значения
+        valid (np.ndarray): Маска заполненных ячеек
+
+    Returns:
+        List[Optional[float]]: Значения
+    """
+    return [float(value) if is_valid else None for value, is_valid in zip(values.tolist(), valid.tolist())]
+
+
+def federal_matrix(child_nodes_data: List[Dict[str, Any]], years_count: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Собирает федеральные значения дочерних узлов в матрицу (дочерние узлы, годы).
+
+    Args:
+        child_nodes_data (List[Dict[str, Any]]): Данные дочерних узлов по порядку
+        years_count (int): Количество лет
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (значения, маска наличия)
+    """
+    values = np.zeros((len(child_nodes_data), years_count))
+    present = np.zeros((len(child_nodes_data), years_count), dtype=bool)
+
+    for child_index, node_data in enumerate(child_nodes_data):
+        for year_index, value in enumerate((node_data.get("federal_values") or [])[:years_count]):
+            if value is not None:
+                values[child_index, year_index] = value
+                present[child_index, year_index] = True
+
+    return values, present
+
+
+def regional_tensor(child_nodes_data: List[Dict[str, Any]], years_count: int) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """
+    Собирает региональные значения дочерних узлов в тензор (дочерние узлы, регионы, годы),
+    сопоставляя регионы по названию.
+
+    Args:
+        child_nodes_data (List[Dict[str, Any]]): Данные дочерних узлов по порядку
+        years_count (int): Количество лет
+
+    Returns:
+        Tuple[List[str], np.ndarray, np.ndarray]: (регионы в порядке первого появления, значения, маска наличия)
+    """
+    region_index: Dict[str, int] = {}
+    for node_data in child_nodes_data:
+        for region in node_data.get("regions") or []:
+            region_index.setdefault(region, len(region_index))
+
+    regions = list(region_index)
+    shape = (len(child_nodes_data), len(regions), years_count)
+    values = np.zeros(shape)
+    present = np.zeros(shape, dtype=bool)
+
+    for child_index, node_data in enumerate(child_nodes_data):
+        child_regions = node_data.get("regions") or []
+        child_values = node_data.get("regional_values") or []
+
+        for region, region_values in zip(child_regions, child_values):
+            row = region_index[region]
+            for year_index, value in enumerate((region_values or [])[:years_count]):
+                if value is not None:
+                    values[child_index, row, year_index] = value
+                    present[child_index, row, year_index] = True
+
+    return regions, values, present
+
+
+def evaluate_federal(formula: str, child_nodes_data: List[Dict[str, Any]], years_count: int) -> List[Optional[float]]:
+    """
+    Вычисляет формулу по федеральным значениям для всех лет.
+
+    Args:
+        formula (str): Текст формулы
+        child_nodes_data (List[Dict[str, Any]]): Данные дочерних узлов по порядку
+        years_count (int): Количество лет
+
+    Returns:
+        List[Optional[float]]: Значения по годам
+
+    Raises:
+        FormulaError: Ошибка разбора или вычисления формулы
+    """
+    compiled = compile_formula(formula)
+    values, present = federal_matrix(child_nodes_data, years_count)
+    regional = regional_tensor(child_nodes_data, years_count)[1:] if compiled.uses_regions else None
+    result, valid = compiled.evaluate(values, present, regional=regional)
+    return to_optional_list(result, valid)
+
+
+def evaluate_regional(formula: str, child_nodes_data: List[Dict[str, Any]], years_count: int) -> Tuple[List[str], List[List[Optional[float]]]]:
+    """
+    Вычисляет формулу по региональным значениям для всех регионов и лет.
+
+    Args:
+        formula (str): Текст формулы
+        child_nodes_data (List[Dict[str, Any]]): Данные дочерних узлов по порядку
+        years_count (int): Количество лет
+
+    Returns:
+        Tuple[List[str], List[List[Optional[float]]]]: (регионы, значения по регионам и годам)
+
+    Raises:
+        FormulaError: Ошибка разбора или вычисления формулы
+    """
+    regions, values, present = regional_tensor(child_nodes_data, years_count)
+    if not regions:
+        return [], []
+
+    compiled = compile_formula(formula)
+    federal = federal_matrix(child_nodes_data, years_count) if compiled.uses_federal else None
+    result, valid = compiled.evaluate(values, present, federal=federal)
+    return regions, [to_optional_list(result[row], valid[row]) for row in range(len(regions))]
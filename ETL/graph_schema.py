@@ -0,0 +1,216 @@
+"""
+Схема графа статистических показателей: ограничения и индексы Neo4j.
+
+Все операторы идемпотентны (IF NOT EXISTS). Схема создается в начале
+пакетов ETL (Neo4jNodeCreator.ensure_schema), при проверке системы
+(main.py) или командой
+
+    python ETL/graph_schema.py --config neo4j_config.json
+
+Ограничения уникальности по name для
+Регион/Счетное/Расчетные одновременно служат индексами для поиска узлов по
+имени. Поэтому пакеты по умолчанию пишутся в режиме upsert (повторный
+запуск обновляет узел с тем же name); режим create подходит только для
+первой загрузки в пустую базу.
+
+Ограничение не создается, если в базе уже есть узлы с одинаковым name
+(например, после повторных запусков в режиме create). Отчет показывает
+количество таких имен; дубликаты нужно удалить до повторного запуска.
+"""
+
+import json
+from typing import Dict, List, Any, Tuple
+
+# (имя, оператор) - ограничения уникальности
+SCHEMA_CONSTRAINTS: List[Tuple[str, str]] = [
+    ("region_name_unique",
+     "CREATE CONSTRAINT region_name_unique IF NOT EXISTS FOR (r:Регион) REQUIRE r.name IS UNIQUE"),
+    ("schetnoe_name_unique",
+     "CREATE CONSTRAINT schetnoe_name_unique IF NOT EXISTS FOR (n:Счетное) REQUIRE n.name IS UNIQUE"),
+    ("raschetnye_name_unique",
+     "CREATE CONSTRAINT raschetnye_name_unique IF NOT EXISTS FOR (n:Расчетные) REQUIRE n.name IS UNIQUE"),
+]
+
+# Метка узлов каждого ограничения (для поиска дубликатов)
+CONSTRAINT_LABELS: Dict[str, str] = {
+    "region_name_unique": "Регион",
+    "schetnoe_name_unique": "Счетное",
+    "raschetnye_name_unique": "Расчетные",
+}
+
+# (имя, оператор) - индексы: RANGE для равенства, диапазонов и сортировки,
+# TEXT для поиска подстрок (CONTAINS) в названиях
+SCHEMA_INDEXES: List[Tuple[str, str]] = [
+    ("schetnoe_full_name_range",
+     "CREATE RANGE INDEX schetnoe_full_name_range IF NOT EXISTS FOR (n:Счетное) ON (n.полное_название)"),
+    ("raschetnye_full_name_range",
+     "CREATE RANGE INDEX raschetnye_full_name_range IF NOT EXISTS FOR (n:Расчетные) ON (n.полное_название)"),
+    ("raschetnye_virtual_range",
+     "CREATE RANGE INDEX raschetnye_virtual_range IF NOT EXISTS FOR (n:Расчетные) ON (n.virtual)"),
+    ("schetnoe_name_text",
+     "CREATE TEXT INDEX schetnoe_name_text IF NOT EXISTS FOR (n:Счетное) ON (n.name)"),
+    ("schetnoe_full_name_text",
+     "CREATE TEXT INDEX schetnoe_full_name_text IF NOT EXISTS FOR (n:Счетное) ON (n.полное_название)"),
+    ("raschetnye_full_name_text",
+     "CREATE TEXT INDEX raschetnye_full_name_text IF NOT EXISTS FOR (n:Расчетные) ON (n.полное_название)"),
+]
+
+INDEX_STATUS_QUERY = """
+SHOW INDEXES
+YIELD name, type, state, populationPercent, labelsOrTypes, properties, owningConstraint
+RETURN name, type, state, populationPercent, labelsOrTypes, properties, owningConstraint
+ORDER BY name
+"""
+
+DUPLICATE_NAMES_QUERY = """
+MATCH (n:`{label}`)
+WITH n.name AS name, count(*) AS nodes
+WHERE name IS NOT NULL AND nodes > 1
+RETURN count(name) AS duplicate_names, collect(name)[..5] AS examples
+"""
+
+
+def schema_object_names() -> List[str]:
+    """
+    Возвращает имена всех ограничений и индексов схемы.
+
+    Returns:
+        List[str]: Имена объектов схемы
+    """
+    return [name for name, _ in SCHEMA_CONSTRAINTS + SCHEMA_INDEXES]
+
+
+def get_index_status(driver, database: str) -> List[Dict[str, Any]]:
+    """
+    Возвращает состояние индексов схемы (включая индексы ограничений).
+
+    Args:
+        driver: Драйвер Neo4j
+        database (str): Имя базы данных
+
+    Returns:
+        List[Dict[str, Any]]: name, type, state, populationPercent, labelsOrTypes, properties
+    """
+    names = set(schema_object_names())
+
+    with driver.session(database=database) as session:
+        records = [dict(record) for record in session.run(INDEX_STATUS_QUERY)]
+
+    # Индекс ограничения называется так же, как ограничение
+    return [
+        record for record in records
+        if record.get("name") in names or record.get("owningConstraint") in names
+    ]
+
+
+def count_duplicate_names(driver, database: str, label: str) -> Dict[str, Any]:
+    """
+    Считает имена, которые носят несколько узлов метки.
+
+    Args:
+        driver: Драйвер Neo4j
+        database (str): Имя базы данных
+        label (str): Метка узлов
+
+    Returns:
+        Dict[str, Any]: duplicate_names, examples (до 5 имен)
+    """
+    with driver.session(database=database) as session:
+        record = session.run(DUPLICATE_NAMES_QUERY.format(label=label)).single()
+
+    if not record:
+        return {"duplicate_names": 0, "examples": []}
+    return {"duplicate_names": record["duplicate_names"], "examples": list(record["examples"])}
+
+
+def bootstrap_schema(driver, database: str) -> Dict[str, Any]:
+    """
+    Создает недостающие ограничения и индексы и собирает состояние индексов.
+
+    Args:
+        driver: Драйвер Neo4j
+        database (str): Имя базы данных
+
+    Returns:
+        Dict[str, Any]: applied, failed ({name, error}), indexes, all_online
+    """
+    report = {"applied": [], "failed": [], "indexes": [], "all_online": False}
+
+    for name, statement in SCHEMA_CONSTRAINTS + SCHEMA_INDEXES:
+        try:
+            with driver.session(database=database) as session:
+                session.run(statement).consume()
+            report["applied"].append(name)
+        except Exception as e:
+            # Например, ограничение уникальности не создается при наличии дубликатов
+            failure = {"name": name, "error": str(e)}
+            if name in CONSTRAINT_LABELS:
+                try:
+                    failure["duplicates"] = count_duplicate_names(driver, database, CONSTRAINT_LABELS[name])
+                except Exception as count_error:
+                    print(f"Не удалось посчитать дубликаты для {name}: {str(count_error)}")
+            report["failed"].append(failure)
+
+    try:
+        report["indexes"] = get_index_status(driver, database)
+    except Exception as e:
+        report["failed"].append({"name": "SHOW INDEXES", "error": str(e)})
+
+    report["all_online"] = bool(report["indexes"]) and all(
+        index.get("state") == "ONLINE" for index in report["indexes"]
+    )
+
+    return report
+
+
+def format_schema_report(report: Dict[str, Any]) -> List[str]:
+    """
+    Формирует строки отчета о состоянии схемы.
+
+    Args:
+        report (Dict[str, Any]): Результат bootstrap_schema
+
+    Returns:
+        List[str]: Строки отчета
+    """
+    lines = [f"Схема графа: применено {len(report['applied'])}, ошибок {len(report['failed'])}"]
+
+    for index in report["indexes"]:
+        labels = ",".join(index.get("labelsOrTypes") or [])
+        properties = ",".join(index.get("properties") or [])
+        lines.append(
+            f"  {index.get('name')} ({index.get('type')} {labels}.{properties}): "
+            f"{index.get('state')}, заполнен на {index.get('populationPercent', 0):.0f}%"
+        )
+
+    for failure in report["failed"]:
+        lines.append(f"  Ошибка {failure['name']}: {failure['error']}")
+        duplicates = failure.get("duplicates")
+        if duplicates and duplicates["duplicate_names"]:
+            lines.append(
+                f"    Повторяющихся имен: {duplicates['duplicate_names']} "
+                f"(например: {', '.join(map(str, duplicates['examples']))})"
+            )
+
+    return lines
+
+
+if __name__ == "__main__":
+    import argparse
+    from neo4j import GraphDatabase
+
+    parser = argparse.ArgumentParser(description="Создание ограничений и индексов графа")
+    parser.add_argument("--config", default="neo4j_config.json", help="Путь к конфигурации Neo4j")
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    driver = GraphDatabase.driver(config["NEO4J_URI"], auth=(config["NEO4J_USERNAME"], config["NEO4J_PASSWORD"]))
+    try:
+        schema_report = bootstrap_schema(driver, config["NEO4J_DATABASE"])
+    finally:
+        driver.close()
+
+    for line in format_schema_report(schema_report):
+        print(line)
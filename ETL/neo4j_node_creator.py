@@ -2,11 +2,39 @@ import pandas as pd
 import numpy as np
 import os
 import json
+import time
+import threading
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Set, Tuple
 from neo4j import GraphDatabase
 import warnings
 
+# Поддержка как относительных, так и абсолютных импортов
+try:
+    from .table_cache import get_table_cache, format_cell_value
+    from .extraction_plan import BatchExtractionPlan
+    from .columnar_store import FEDERAL_REGION, open_store_if_available, project_store_dir
+    from .parallel_extraction import ExtractionPool, extract_cells, resolve_worker_count
+    from .etl_manifest import EtlManifest, config_hash, default_manifest_path
+    from .graph_schema import bootstrap_schema, format_schema_report
+    from .bulk_export import BulkImportExporter
+    from .regional_layout import (
+        LAYOUT_ARRAY, LAYOUT_RELATIONSHIPS, REGION_KEYS_PROPERTY, REGIONAL_VALUES_PROPERTY, STORAGE_LAYOUTS,
+        pack_regional_values, values_equal
+    )
+except ImportError:
+    from table_cache import get_table_cache, format_cell_value
+    from extraction_plan import BatchExtractionPlan
+    from columnar_store import FEDERAL_REGION, open_store_if_available, project_store_dir
+    from parallel_extraction import ExtractionPool, extract_cells, resolve_worker_count
+    from etl_manifest import EtlManifest, config_hash, default_manifest_path
+    from graph_schema import bootstrap_schema, format_schema_report
+    from bulk_export import BulkImportExporter
+    from regional_layout import (
+        LAYOUT_ARRAY, LAYOUT_RELATIONSHIPS, REGION_KEYS_PROPERTY, REGIONAL_VALUES_PROPERTY, STORAGE_LAYOUTS,
+        pack_regional_values, values_equal
+    )
+
 # Подавляем предупреждения pandas
 warnings.filterwarnings('ignore')
 
@@ -17,21 +45,58 @@ __author__ = "Neo4j Node Creator"
 PROJECT_ROOT = Path(__file__).parent.absolute()
 BASE_DIR = os.path.join(PROJECT_ROOT, "БД")
 
+# Количество строк (связей ПоРегион) в одной транзакции массовой записи
+DEFAULT_WRITE_BATCH_SIZE = int(os.environ.get("NEO4J_WRITE_BATCH_SIZE", 5000))
+
+# Способ хранения региональных данных: relationships, array или both
+DEFAULT_STORAGE_LAYOUT = os.environ.get("REGIONAL_STORAGE_LAYOUT", "relationships")
+
+# Количество узлов в одном плане извлечения при экспорте для офлайн-импорта
+EXPORT_CHUNK_SIZE = 200
+
 class Neo4jNodeCreator:
     """
     Класс для создания узлов Neo4j из статистических данных
     """
     
-    def __init__(self, config_path: str = "neo4j_config.json"):
+    def __init__(self, config_path: str = "neo4j_config.json", parallel: bool = False, max_workers: Optional[int] = None,
+                 write_batch_size: int = DEFAULT_WRITE_BATCH_SIZE, storage_layout: str = DEFAULT_STORAGE_LAYOUT):
         """
         Инициализация подключения к Neo4j
         
         Args:
             config_path (str): Путь к файлу конфигурации Neo4j
+            parallel (bool): Извлекать региональные данные в пуле процессов
+            max_workers (Optional[int]): Количество процессов (по умолчанию - число ядер)
+            write_batch_size (int): Количество связей ПоРегион в одной транзакции записи
+            storage_layout (str): Хранение региональных данных: "relationships" - связи ПоРегион,
+                "array" - массивы region_keys/regional_values в свойствах узла, "both" - оба варианта
         """
         self.config = self._load_neo4j_config(config_path)
         self.driver = None
         self.years = ["2016", "2017", "2018", "2019", "2020", "2021", "2022", "2023", "2024"]
+        # Общий для процесса кеш разобранных таблиц
+        self.table_cache = get_table_cache()
+        # Скомпилированное колоночное хранилище (если оно собрано)
+        self.columnar_store = open_store_if_available(project_store_dir())
+        self.store_regions: Optional[List[str]] = None
+        # Количество процессов для извлечения (1 - последовательный режим)
+        self.max_workers = resolve_worker_count(max_workers) if parallel else 1
+        # Пул процессов переиспользуется всеми узлами до disconnect
+        self.extraction_pool = ExtractionPool()
+        # Массовая запись связей ПоРегион
+        self.write_batch_size = max(1, int(write_batch_size))
+        self.regional_rows_buffer: Optional[List[Dict[str, Any]]] = None
+        self.regional_write_stats = {"rows": 0, "batches": 0, "seconds": 0.0}
+        # Узлы, связи ПоРегион которых не записались (пакет транзакции завершился ошибкой)
+        self.failed_regional_node_ids: Set[str] = set()
+        # Запись связей может идти из нескольких потоков (расчетные узлы одного уровня)
+        self.regional_write_lock = threading.Lock()
+        if storage_layout not in STORAGE_LAYOUTS:
+            raise ValueError(f"Неизвестный способ хранения региональных данных: {storage_layout}")
+        self.storage_layout = storage_layout
+        # Отчет о создании ограничений и индексов (заполняется при первом подключении)
+        self.schema_report: Optional[Dict[str, Any]] = None
         
     def _load_neo4j_config(self, config_path: str) -> Dict[str, str]:
         """
@@ -67,12 +132,27 @@ class Neo4jNodeCreator:
     
     def disconnect(self) -> None:
         """
-        Закрывает соединение с Neo4j
+        Закрывает соединение с Neo4j и останавливает пул процессов извлечения
         """
+        self.extraction_pool.close()
         if self.driver:
             self.driver.close()
             print("Соединение с Neo4j закрыто")
     
+    def ensure_schema(self) -> Dict[str, Any]:
+        """
+        Создает ограничения и индексы графа (один раз за время жизни экземпляра).
+        
+        Returns:
+            Dict[str, Any]: Отчет bootstrap_schema
+        """
+        if self.schema_report is None:
+            self.schema_report = bootstrap_schema(self.driver, self.config["NEO4J_DATABASE"])
+            for line in format_schema_report(self.schema_report):
+                print(line)
+        
+        return self.schema_report
+    
     def get_federal_file_path(self, year: str, table_number: str) -> str:
         """
         Формирует путь к федеральному файлу для конкретного года и номера таблицы.
@@ -112,39 +192,27 @@ class Neo4jNodeCreator:
         Returns:
             Optional[str]: Значение ячейки или None при ошибке
         """
+        numeric_value = self.get_numeric_cell_value(file_path, column_number, row_number)
+        
+        if numeric_value is None:
+            return None
+        
+        return format_cell_value(numeric_value)
+    
+    def get_numeric_cell_value(self, file_path: str, column_number: int, row_number: int) -> Optional[float]:
+        """
+        Получает числовое значение ячейки через кеш разобранных таблиц.
+        
+        Args:
+            file_path (str): Путь к CSV файлу
+            column_number (int): Номер колонки (начиная с 1)
+            row_number (int): Номер строки (начиная с 1)
+        
+        Returns:
+            Optional[float]: Числовое значение ячейки или None при ошибке
+        """
         try:
-            # Читаем CSV файл
-            df = pd.read_csv(file_path, header=None, encoding='utf-8', sep=';')
-            
-            # Находим строку с заголовком (содержит "№ строки")
-            header_row_index = None
-            for idx, row in df.iterrows():
-                if isinstance(row[0], str) and "№ строки" in str(row[0]):
-                    header_row_index = idx
-                    break
-            
-            if header_row_index is None:
-                return None
-            
-            # Данные начинаются со следующей строки после заголовка
-            data_start_index = header_row_index + 1
-            
-            # Получаем реальный индекс строки с учетом смещения
-            actual_row_index = data_start_index + row_number - 1
-            
-            # Проверяем, что индексы в пределах DataFrame
-            if actual_row_index >= len(df) or column_number - 1 >= len(df.columns):
-                return None
-            
-            # Получаем значение ячейки (column_number - 1, так как в pandas индексация с 0)
-            cell_value = df.iloc[actual_row_index, column_number - 1]
-            
-            # Проверяем на NaN и конвертируем в строку
-            if pd.isna(cell_value):
-                return None
-            
-            return str(cell_value).strip()
-            
+            return self.table_cache.get_value(file_path, column_number, row_number)
         except Exception as e:
             print(f"Ошибка при чтении файла {file_path}: {str(e)}")
             return None
@@ -203,6 +271,113 @@ class Neo4jNodeCreator:
         
         return periods_config
     
+    def get_period_key(self, year: str) -> str:
+        """
+        Определяет период конфигурации, к которому относится год.
+        
+        Args:
+            year (str): Год
+        
+        Returns:
+            str: Ключ периода ("2016_2020" или "2021_2024")
+        """
+        if year in ["2016", "2017", "2018", "2019", "2020"]:
+            return "2016_2020"
+        return "2021_2024"
+    
+    def build_extraction_plan(self, nodes_config: List[Dict[str, Any]]) -> BatchExtractionPlan:
+        """
+        Строит план извлечения ячеек сразу для всех узлов пакета.
+        
+        Args:
+            nodes_config (List[Dict[str, Any]]): Конфигурации узлов пакета
+        
+        Returns:
+            BatchExtractionPlan: План, в котором каждый файл открывается один раз
+        """
+        plan = BatchExtractionPlan(self)
+        
+        for node_index, node_config in enumerate(nodes_config):
+            plan.add_node(node_index, node_config)
+        
+        return plan
+    
+    def collect_data_from_store(self, periods_config: Dict[str, Dict[str, Any]]) -> Tuple[List[Optional[float]], List[str], List[List[Optional[float]]]]:
+        """
+        Собирает федеральные и региональные данные из колоночного хранилища.
+        Значения ячейки по всем регионам года берутся одним срезом; годы,
+        отсутствующие в хранилище или устаревшие (CSV изменены после
+        компиляции), читаются из CSV файлов. Список регионов - объединение
+        регионов всех лет.
+        
+        Args:
+            periods_config (Dict[str, Dict[str, Any]]): Конфигурация параметров для периодов
+        
+        Returns:
+            Tuple: (федеральные значения, список регионов, значения по регионам и годам)
+        """
+        store = self.columnar_store
+        regions = self.get_store_regions()
+        federal_values = []
+        regional_values = [[] for _ in regions]
+        
+        for year in self.years:
+            period_config = periods_config.get(self.get_period_key(year))
+            
+            if period_config is None:
+                federal_values.append(None)
+                for region_values in regional_values:
+                    region_values.append(None)
+                continue
+            
+            table_number = str(period_config["table_number"])
+            column_number = period_config["column"]
+            row_number = period_config["row"]
+            
+            if store.has_year(year):
+                cell_values = store.get_regional_values(year, table_number, row_number, column_number)
+                federal_values.append(cell_values.get(FEDERAL_REGION))
+                for region, region_values in zip(regions, regional_values):
+                    region_values.append(cell_values.get(region))
+                continue
+            
+            # Год не скомпилирован - читаем CSV файлы
+            file_path = self.get_federal_file_path(year, table_number)
+            federal_values.append(
+                self.get_numeric_cell_value(file_path, column_number, row_number) if os.path.exists(file_path) else None
+            )
+            for region, region_values in zip(regions, regional_values):
+                file_path = self.get_regional_file_path(year, region, table_number)
+                region_values.append(
+                    self.get_numeric_cell_value(file_path, column_number, row_number) if os.path.exists(file_path) else None
+                )
+        
+        return federal_values, regions, regional_values
+    
+    def get_store_regions(self) -> List[str]:
+        """
+        Получает объединенный по годам список регионов: из хранилища для
+        актуальных лет и из файловой системы для остальных.
+        
+        Returns:
+            List[str]: Список названий регионов в порядке первого появления
+        """
+        if self.store_regions is not None:
+            return self.store_regions
+        
+        store = self.columnar_store
+        regions = {}
+        for year in self.years:
+            if store.has_year(year):
+                year_regions = store.get_regions(year)
+            elif os.path.exists(os.path.join(BASE_DIR, year, year)):
+                year_regions = self.get_regions_list(year)
+            else:
+                year_regions = []
+            regions.update(dict.fromkeys(year_regions))
+        self.store_regions = list(regions)
+        return self.store_regions
+    
     def collect_federal_data_by_periods(self, periods_config: Dict[str, Dict[str, Any]]) -> List[Optional[float]]:
         """
         Собирает федеральные данные за все годы с учетом разных параметров для разных периодов.
@@ -217,10 +392,7 @@ class Neo4jNodeCreator:
         
         for year in self.years:
             # Определяем к какому периоду относится год
-            if year in ["2016", "2017", "2018", "2019", "2020"]:
-                period_key = "2016_2020"
-            else:
-                period_key = "2021_2024"
+            period_key = self.get_period_key(year)
             
             # Проверяем есть ли конфигурация для этого периода
             if period_key not in periods_config:
@@ -236,13 +408,7 @@ class Neo4jNodeCreator:
             file_path = self.get_federal_file_path(year, table_number)
             
             if os.path.exists(file_path):
-                cell_value = self.get_cell_value(file_path, column_number, row_number)
-                
-                if cell_value is not None:
-                    numeric_value = self.validate_numeric_value(cell_value)
-                    federal_values.append(numeric_value)
-                else:
-                    federal_values.append(None)
+                federal_values.append(self.get_numeric_cell_value(file_path, column_number, row_number))
             else:
                 print(f"Федеральный файл не найден: {file_path}")
                 federal_values.append(None)
@@ -260,45 +426,52 @@ class Neo4jNodeCreator:
             Tuple[List[str], List[List[Optional[float]]]]: Кортеж (список регионов, список значений по годам для каждого региона)
         """
         regions = self.get_regions_list()
-        regional_values = []
         
+        # Формируем единицы работы (регион, год) в порядке регионов и лет
+        units = []
         for region in regions:
-            region_values = []
-            
             for year in self.years:
                 # Определяем к какому периоду относится год
-                if year in ["2016", "2017", "2018", "2019", "2020"]:
-                    period_key = "2016_2020"
-                else:
-                    period_key = "2021_2024"
+                period_key = self.get_period_key(year)
                 
                 # Проверяем есть ли конфигурация для этого периода
                 if period_key not in periods_config:
-                    region_values.append(None)
+                    units.append(None)
                     continue
                 
                 period_config = periods_config[period_key]
                 table_number = str(period_config["table_number"])
-                column_number = period_config["column"]
-                row_number = period_config["row"]
-                
                 file_path = self.get_regional_file_path(year, region, table_number)
-                
-                if os.path.exists(file_path):
-                    cell_value = self.get_cell_value(file_path, column_number, row_number)
-                    
-                    if cell_value is not None:
-                        numeric_value = self.validate_numeric_value(cell_value)
-                        region_values.append(numeric_value)
-                    else:
-                        region_values.append(None)
-                else:
-                    region_values.append(None)
-            
+                units.append((file_path, [(period_config["row"], period_config["column"])]))
+        
+        regional_values = self._extract_regional_units(regions, units)
+        
+        return regions, regional_values
+    
+    def _extract_regional_units(self, regions: List[str], units: List[Optional[Tuple[str, List[Tuple[int, int]]]]]) -> List[List[Optional[float]]]:
+        """
+        Извлекает значения единиц работы (регион, год) и собирает их по регионам.
+        В параллельном режиме единицы распределяются по общему пулу процессов.
+        
+        Args:
+            regions (List[str]): Список регионов
+            units (List[Optional[Tuple]]): Задачи извлечения в порядке регион-год (None - нет конфигурации)
+        
+        Returns:
+            List[List[Optional[float]]]: Значения по годам для каждого региона
+        """
+        tasks = [unit for unit in units if unit is not None]
+        extracted = iter(extract_cells(tasks, self.max_workers, self.table_cache, self.extraction_pool))
+        flat_values = [next(extracted)[0] if unit is not None else None for unit in units]
+        
+        years_count = len(self.years)
+        regional_values = []
+        for region_index, region in enumerate(regions):
+            region_values = flat_values[region_index * years_count:(region_index + 1) * years_count]
             regional_values.append(region_values)
             print(f"Регион {region}: {region_values}")
         
-        return regions, regional_values
+        return regional_values
     
     def collect_federal_data(self, table_number: str, column_number: int, row_number: int) -> List[Optional[float]]:
         """
@@ -318,13 +491,7 @@ class Neo4jNodeCreator:
             file_path = self.get_federal_file_path(year, table_number)
             
             if os.path.exists(file_path):
-                cell_value = self.get_cell_value(file_path, column_number, row_number)
-                
-                if cell_value is not None:
-                    numeric_value = self.validate_numeric_value(cell_value)
-                    federal_values.append(numeric_value)
-                else:
-                    federal_values.append(None)
+                federal_values.append(self.get_numeric_cell_value(file_path, column_number, row_number))
             else:
                 print(f"Федеральный файл не найден: {file_path}")
                 federal_values.append(None)
@@ -366,36 +533,101 @@ class Neo4jNodeCreator:
             Tuple[List[str], List[List[Optional[float]]]]: Кортеж (список регионов, список значений по годам для каждого региона)
         """
         regions = self.get_regions_list()
-        regional_values = []
         
-        for region in regions:
-            region_values = []
-            
-            for year in self.years:
-                file_path = self.get_regional_file_path(year, region, table_number)
-                
-                if os.path.exists(file_path):
-                    cell_value = self.get_cell_value(file_path, column_number, row_number)
-                    
-                    if cell_value is not None:
-                        numeric_value = self.validate_numeric_value(cell_value)
-                        region_values.append(numeric_value)
-                    else:
-                        region_values.append(None)
-                else:
-                    region_values.append(None)
-            
-            regional_values.append(region_values)
-            print(f"Регион {region}: {region_values}")
+        # Формируем единицы работы (регион, год) в порядке регионов и лет
+        units = [
+            (self.get_regional_file_path(year, region, table_number), [(row_number, column_number)])
+            for region in regions
+            for year in self.years
+        ]
+        
+        regional_values = self._extract_regional_units(regions, units)
         
         return regions, regional_values
     
-    def create_node(self, node_config: Dict[str, Any]) -> Optional[str]:
+    def collect_node_data(self, periods_config: Dict[str, Dict[str, Any]], collected_data: Optional[Tuple[List[Optional[float]], List[str], List[List[Optional[float]]]]] = None) -> Tuple[List[Optional[float]], List[str], List[List[Optional[float]]]]:
+        """
+        Собирает федеральные и региональные данные узла.
+        
+        Args:
+            periods_config (Dict[str, Dict[str, Any]]): Конфигурация периодов узла
+            collected_data (Optional[Tuple]): Уже извлеченные данные узла, например из плана пакета
+        
+        Returns:
+            Tuple: (федеральные значения, регионы, региональные значения)
+        """
+        if collected_data is not None:
+            # Данные уже извлечены планом пакета
+            return collected_data
+        
+        if self.columnar_store is not None:
+            # Данные берутся срезами из колоночного хранилища
+            return self.collect_data_from_store(periods_config)
+        
+        # Собираем федеральные и региональные данные с учетом периодов
+        federal_values = self.collect_federal_data_by_periods(periods_config)
+        regions, regional_values = self.collect_regional_data_by_periods(periods_config)
+        
+        return federal_values, regions, regional_values
+    
+    def build_node_properties(self, node_config: Dict[str, Any], periods_config: Dict[str, Dict[str, Any]], federal_values: List[Optional[float]]) -> Dict[str, Any]:
+        """
+        Формирует свойства узла "Счетное".
+        
+        Args:
+            node_config (Dict[str, Any]): Конфигурация узла
+            periods_config (Dict[str, Dict[str, Any]]): Конфигурация периодов узла
+            federal_values (List[Optional[float]]): Федеральные значения по годам
+        
+        Returns:
+            Dict[str, Any]: Свойства узла (базовые и дополнительные из конфигурации)
+        """
+        node_name = node_config["node_name"]
+        
+        base_properties = {
+            "name": node_name,
+            "полное_название": node_config.get("full_name", node_name),
+            "years": self.years,
+            "federal_values": federal_values,
+            "periods_config_json": json.dumps(periods_config, ensure_ascii=False)
+        }
+        
+        return {**base_properties, **node_config.get("properties", {})}
+    
+    def layout_properties(self, regions: List[str], regional_values: List[List[Optional[float]]]) -> Dict[str, Any]:
+        """
+        Возвращает свойства узла для компактного хранения региональных данных.
+        
+        Args:
+            regions (List[str]): Список регионов
+            regional_values (List[List[Optional[float]]]): Данные по регионам и годам
+        
+        Returns:
+            Dict[str, Any]: region_keys и regional_values; если данные хранятся только
+                в связях ПоРегион - оба свойства со значением None, чтобы SET n += ...
+                удалил массивы, оставшиеся от прежнего способа хранения
+        """
+        if self.storage_layout == LAYOUT_RELATIONSHIPS:
+            return {REGION_KEYS_PROPERTY: None, REGIONAL_VALUES_PROPERTY: None}
+        return pack_regional_values(regions, regional_values, self.years)
+    
+    def uses_regional_relationships(self) -> bool:
+        """
+        Проверяет, записываются ли региональные данные в связи ПоРегион.
+        
+        Returns:
+            bool: False для хранения только в массивах узла
+        """
+        return self.storage_layout != LAYOUT_ARRAY
+    
+    def create_node(self, node_config: Dict[str, Any], collected_data: Optional[Tuple[List[Optional[float]], List[str], List[List[Optional[float]]]]] = None) -> Optional[str]:
         """
         Создает узел в Neo4j с собранными данными.
         
         Args:
             node_config (Dict[str, Any]): Конфигурация узла
+            collected_data (Optional[Tuple]): Уже извлеченные данные узла
+                (федеральные значения, регионы, региональные значения), например из плана пакета
         
         Returns:
             Optional[str]: ID созданного узла или None при ошибке
@@ -405,9 +637,8 @@ class Neo4jNodeCreator:
             node_name = node_config["node_name"]
             node_label = node_config["node_label"]
             
-            # Извлекаем дополнительные параметры
-            full_name = node_config.get("full_name", node_name)  # Полное название узла
-            additional_properties = node_config.get("properties", {})  # Дополнительные свойства
+            # Полное название узла
+            full_name = node_config.get("full_name", node_name)
             
             # Извлекаем конфигурацию периодов
             periods_config = self.extract_period_config(node_config)
@@ -418,12 +649,9 @@ class Neo4jNodeCreator:
             
             print(f"Создание узла '{node_name}' (полное название: '{full_name}') с конфигурацией периодов: {list(periods_config.keys())}")
             
-            # Собираем федеральные данные с учетом периодов
-            federal_values = self.collect_federal_data_by_periods(periods_config)
-            print(f"Федеральные данные: {federal_values}")
+            federal_values, regions, regional_values = self.collect_node_data(periods_config, collected_data)
             
-            # Собираем региональные данные с учетом периодов
-            regions, regional_values = self.collect_regional_data_by_periods(periods_config)
+            print(f"Федеральные данные: {federal_values}")
             print(f"Региональные данные собраны для {len(regions)} регионов")
             
             # Создаем основной узел в Neo4j (без региональных данных)
@@ -434,17 +662,8 @@ class Neo4jNodeCreator:
                 else:
                     labels_str = node_label
                 
-                # Подготавливаем базовые свойства узла
-                base_properties = {
-                    "name": node_name,
-                    "полное_название": full_name,
-                    "years": self.years,
-                    "federal_values": federal_values,
-                    "periods_config_json": json.dumps(periods_config, ensure_ascii=False)
-                }
-                
-                # Добавляем дополнительные свойства
-                all_properties = {**base_properties, **additional_properties}
+                all_properties = self.build_node_properties(node_config, periods_config, federal_values)
+                all_properties.update(self.layout_properties(regions, regional_values))
                 
                 # Формируем строку свойств для Cypher запроса
                 properties_str = ", ".join([f"{key}: ${key}" for key in all_properties.keys()])
@@ -464,8 +683,9 @@ class Neo4jNodeCreator:
                     print(f"Узел '{node_name}' создан с ID: {node_id}")
                     
                     # Создаем связи с регионами
-                    regional_links_created = self.create_regional_relationships(node_id, regions, regional_values)
-                    print(f"Создано {regional_links_created} связей с регионами")
+                    if self.uses_regional_relationships():
+                        regional_links_created = self.create_regional_relationships(node_id, regions, regional_values)
+                        print(f"Создано {regional_links_created} связей с регионами")
                     
                     return node_id
                 else:
@@ -477,6 +697,157 @@ class Neo4jNodeCreator:
             print(f"Ошибка при создании узла '{node_name}': {str(e)}")
             return None
     
+    def node_exists(self, node_id: str) -> bool:
+        """
+        Проверяет, существует ли узел с указанным ID.
+        
+        Args:
+            node_id (str): ID узла
+        
+        Returns:
+            bool: True если узел найден
+        """
+        try:
+            with self.driver.session(database=self.config["NEO4J_DATABASE"]) as session:
+                query = """
+                MATCH (n)
+                WHERE elementId(n) = $node_id
+                RETURN count(n) as count
+                """
+                
+                record = session.run(query, {"node_id": node_id}).single()
+                return bool(record and record["count"])
+                
+        except Exception as e:
+            print(f"Ошибка при проверке узла '{node_id}': {str(e)}")
+            return False
+    
+    def delete_node_relationships(self, node_id: str, relationship_type: str, incoming: bool = False) -> int:
+        """
+        Удаляет связи узла указанного типа.
+        
+        Args:
+            node_id (str): ID узла
+            relationship_type (str): Тип связи
+            incoming (bool): Удалять входящие связи вместо исходящих
+        
+        Returns:
+            int: Количество удаленных связей
+        """
+        pattern = f"(n)<-[r:{relationship_type}]-()" if incoming else f"(n)-[r:{relationship_type}]->()"
+        
+        try:
+            with self.driver.session(database=self.config["NEO4J_DATABASE"]) as session:
+                query = f"""
+                MATCH {pattern}
+                WHERE elementId(n) = $node_id
+                DELETE r
+                RETURN count(r) as deleted
+                """
+                
+                record = session.run(query, {"node_id": node_id}).single()
+                return record["deleted"] if record else 0
+                
+        except Exception as e:
+            print(f"Ошибка при удалении связей '{relationship_type}' узла '{node_id}': {str(e)}")
+            return 0
+    
+    def delete_regional_edges(self, node_id: str, regions: List[str]) -> Optional[int]:
+        """
+        Удаляет связи ПоРегион узла с указанными регионами.
+        
+        Args:
+            node_id (str): ID узла
+            regions (List[str]): Названия регионов
+        
+        Returns:
+            Optional[int]: Количество удаленных связей или None при ошибке
+        """
+        try:
+            with self.driver.session(database=self.config["NEO4J_DATABASE"]) as session:
+                query = """
+                MATCH (n)-[r:ПоРегион]->(reg:Регион)
+                WHERE elementId(n) = $node_id AND reg.name IN $regions
+                DELETE r
+                RETURN count(r) as deleted
+                """
+                
+                record = session.run(query, {"node_id": node_id, "regions": regions}).single()
+                return record["deleted"] if record else 0
+                
+        except Exception as e:
+            print(f"Ошибка при удалении связей ПоРегион узла '{node_id}': {str(e)}")
+            return None
+    
+    def update_node_properties(self, node_id: str, properties: Dict[str, Any]) -> bool:
+        """
+        Обновляет свойства существующего узла.
+        
+        Args:
+            node_id (str): ID узла
+            properties (Dict[str, Any]): Новые значения свойств
+        
+        Returns:
+            bool: True если узел найден и обновлен
+        """
+        try:
+            with self.driver.session(database=self.config["NEO4J_DATABASE"]) as session:
+                query = """
+                MATCH (n)
+                WHERE elementId(n) = $node_id
+                SET n += $properties
+                RETURN elementId(n) as node_id
+                """
+                
+                record = session.run(query, {"node_id": node_id, "properties": properties}).single()
+                return record is not None
+                
+        except Exception as e:
+            print(f"Ошибка при обновлении узла '{node_id}': {str(e)}")
+            return False
+    
+    def rewrite_node(self, node_id: str, node_config: Dict[str, Any], collected_data: Optional[Tuple[List[Optional[float]], List[str], List[List[Optional[float]]]]] = None) -> Optional[str]:
+        """
+        Перезаписывает данные существующего узла и его связи ПоРегион.
+        ID узла и остальные его связи (например, с расчетными узлами) сохраняются.
+        
+        Args:
+            node_id (str): ID существующего узла
+            node_config (Dict[str, Any]): Конфигурация узла
+            collected_data (Optional[Tuple]): Уже извлеченные данные узла
+        
+        Returns:
+            Optional[str]: ID узла или None, если узел не найден или произошла ошибка
+        """
+        node_name = node_config.get("node_name", "Unknown")
+        
+        try:
+            periods_config = self.extract_period_config(node_config)
+            
+            if not periods_config:
+                print(f"Не найдена конфигурация периодов для узла '{node_name}'")
+                return None
+            
+            federal_values, regions, regional_values = self.collect_node_data(periods_config, collected_data)
+            properties = self.build_node_properties(node_config, periods_config, federal_values)
+            properties.update(self.layout_properties(regions, regional_values))
+            
+            if not self.update_node_properties(node_id, properties):
+                print(f"Узел '{node_name}' с ID {node_id} не найден для обновления")
+                return None
+            
+            deleted_links = self.delete_node_relationships(node_id, "ПоРегион")
+            regional_links_created = 0
+            if self.uses_regional_relationships():
+                regional_links_created = self.create_regional_relationships(node_id, regions, regional_values)
+            print(f"Узел '{node_name}' обновлен: связей с регионами удалено {deleted_links}, создано {regional_links_created}")
+            
+            return node_id
+            
+        except Exception as e:
+            print(f"Ошибка при обновлении узла '{node_name}': {str(e)}")
+            return None
+    
     def find_or_create_region_node(self, region_name: str) -> Optional[str]:
         """
         Находит существующий узел региона или создает новый.
@@ -522,9 +893,132 @@ class Neo4jNodeCreator:
             print(f"Ошибка при работе с узлом региона '{region_name}': {str(e)}")
             return None
     
-    def create_regional_relationships(self, main_node_id: str, regions: List[str], regional_values: List[List[Optional[float]]]) -> int:
+    def fetch_node_state(self, node_name: str, node_label: Any) -> Optional[Dict[str, Any]]:
         """
-        Создает связи от основного узла к узлам регионов с данными по годам в свойствах связей.
+        Одним запросом читает текущие свойства узла и значения его связей ПоРегион.
+        
+        Args:
+            node_name (str): Имя узла
+            node_label (Any): Метка или список меток узла
+        
+        Returns:
+            Optional[Dict[str, Any]]: node_id, properties, edges ({регион: свойства связи}) или None
+        """
+        labels_str = ":".join(node_label) if isinstance(node_label, list) else node_label
+        
+        with self.driver.session(database=self.config["NEO4J_DATABASE"]) as session:
+            query = f"""
+            MATCH (n:{labels_str} {{name: $name}})
+            WITH n LIMIT 1
+            OPTIONAL MATCH (n)-[r:ПоРегион]->(reg:Регион)
+            RETURN elementId(n) as node_id, properties(n) as properties,
+                   collect(CASE WHEN reg IS NULL THEN NULL ELSE {{region: reg.name, values: properties(r)}} END) as edges
+            """
+            
+            record = session.run(query, {"name": node_name}).single()
+            
+            if not record:
+                return None
+            
+            return {
+                "node_id": record["node_id"],
+                "properties": dict(record["properties"] or {}),
+                "edges": {edge["region"]: dict(edge["values"] or {}) for edge in record["edges"]}
+            }
+    
+    def upsert_node(self, node_config: Dict[str, Any], collected_data: Optional[Tuple[List[Optional[float]], List[str], List[List[Optional[float]]]]] = None) -> Dict[str, Any]:
+        """
+        Создает узел или обновляет существующий (ключ - name и метки), записывая
+        только изменившиеся свойства узла и связи ПоРегион.
+        
+        Args:
+            node_config (Dict[str, Any]): Конфигурация узла
+            collected_data (Optional[Tuple]): Уже извлеченные данные узла
+        
+        Returns:
+            Dict[str, Any]: node_id, status (inserted/updated/unchanged/failed) и
+                edges (счетчики inserted/updated/unchanged/removed по связям ПоРегион;
+                removed - связи с регионами, которых больше нет в извлеченных данных)
+        """
+        outcome = {"node_id": None, "status": "failed",
+                   "edges": {"inserted": 0, "updated": 0, "unchanged": 0, "removed": 0}}
+        node_name = node_config.get("node_name", "Unknown")
+        
+        try:
+            periods_config = self.extract_period_config(node_config)
+            
+            if not periods_config:
+                print(f"Не найдена конфигурация периодов для узла '{node_name}'")
+                return outcome
+            
+            federal_values, regions, regional_values = self.collect_node_data(periods_config, collected_data)
+            state = self.fetch_node_state(node_name, node_config["node_label"])
+            
+            if state is None:
+                node_id = self.create_node(node_config, (federal_values, regions, regional_values))
+                if node_id:
+                    outcome.update({"node_id": node_id, "status": "inserted"})
+                    outcome["edges"]["inserted"] = min(len(regions), len(regional_values))
+                return outcome
+            
+            node_id = state["node_id"]
+            outcome["node_id"] = node_id
+            
+            # Сравниваем свойства узла
+            properties = self.build_node_properties(node_config, periods_config, federal_values)
+            properties.update(self.layout_properties(regions, regional_values))
+            changed_properties = {
+                key: value for key, value in properties.items()
+                if not values_equal(state["properties"].get(key), value)
+            }
+            
+            if changed_properties and not self.update_node_properties(node_id, changed_properties):
+                outcome["status"] = "failed"
+                return outcome
+            
+            # Сравниваем значения связей ПоРегион (отсутствующее свойство равно NULL)
+            changed_rows = []
+            regional_rows = self.build_regional_rows(node_id, regions, regional_values) if self.uses_regional_relationships() else []
+            for row in regional_rows:
+                existing = state["edges"].get(row["region"])
+                
+                if existing is None:
+                    outcome["edges"]["inserted"] += 1
+                    changed_rows.append(row)
+                elif any(existing.get(key) != value for key, value in row["values"].items()):
+                    outcome["edges"]["updated"] += 1
+                    changed_rows.append(row)
+                else:
+                    outcome["edges"]["unchanged"] += 1
+            
+            if changed_rows:
+                self.write_regional_rows(changed_rows, merge=True)
+            
+            # Связи с регионами, которых больше нет в данных, удаляются
+            extracted_regions = set(regions[:len(regional_values)])
+            stale_regions = sorted(region for region in state["edges"] if region not in extracted_regions)
+            if stale_regions:
+                removed = self.delete_regional_edges(node_id, stale_regions)
+                if removed is None:
+                    outcome["status"] = "failed"
+                    return outcome
+                outcome["edges"]["removed"] = removed
+            
+            changed = changed_properties or changed_rows or stale_regions
+            outcome["status"] = "updated" if changed else "unchanged"
+            print(f"Узел '{node_name}': {outcome['status']}, изменено свойств {len(changed_properties)}, "
+                  f"связей ПоРегион: новых {outcome['edges']['inserted']}, обновлено {outcome['edges']['updated']}, "
+                  f"удалено {outcome['edges']['removed']}, без изменений {outcome['edges']['unchanged']}")
+            
+            return outcome
+            
+        except Exception as e:
+            print(f"Ошибка при обновлении узла '{node_name}': {str(e)}")
+            return outcome
+    
+    def build_regional_rows(self, main_node_id: str, regions: List[str], regional_values: List[List[Optional[float]]]) -> List[Dict[str, Any]]:
+        """
+        Формирует строки для массовой записи связей ПоРегион.
         
         Args:
             main_node_id (str): ID основного узла
@@ -532,38 +1026,132 @@ class Neo4jNodeCreator:
             regional_values (List[List[Optional[float]]]): Данные по регионам и годам
         
         Returns:
-            int: Количество созданных связей
+            List[Dict[str, Any]]: Строки {node_id, region, values: {value_YYYY: ...}}
         """
-        created_links = 0
+        rows = []
         
         for i, region in enumerate(regions):
+            if i >= len(regional_values):
+                break
+            
+            region_data = regional_values[i]
+            
+            # Записываем все значения, включая None (будут сохранены как NULL в Neo4j)
+            year_values = {
+                f"value_{year}": region_data[j] if j < len(region_data) else None
+                for j, year in enumerate(self.years)
+            }
+            
+            rows.append({"node_id": main_node_id, "region": region, "values": year_values})
+        
+        return rows
+    
+    def write_regional_rows(self, rows: List[Dict[str, Any]], merge: bool = False) -> int:
+        """
+        Записывает связи ПоРегион пакетами через UNWIND: узлы регионов создаются
+        через MERGE, связи - через CREATE (или MERGE), значения по годам - в свойствах связи.
+        ID узлов из пакетов, завершившихся ошибкой, добавляются в failed_regional_node_ids.
+        
+        Args:
+            rows (List[Dict[str, Any]]): Строки из build_regional_rows (могут относиться к разным узлам)
+            merge (bool): Использовать MERGE для связей вместо CREATE
+        
+        Returns:
+            int: Количество записанных связей
+        """
+        if not rows:
+            return 0
+        
+        relationship_clause = "MERGE" if merge else "CREATE"
+        query = f"""
+        UNWIND $rows AS row
+        MATCH (n)
+        WHERE elementId(n) = row.node_id
+        MERGE (reg:Регион {{name: row.region}})
+        {relationship_clause} (n)-[r:ПоРегион]->(reg)
+        SET r += row.values
+        RETURN count(r) as written
+        """
+        
+        written_total = 0
+        batches = [rows[i:i + self.write_batch_size] for i in range(0, len(rows), self.write_batch_size)]
+        
+        for batch_number, batch in enumerate(batches, 1):
+            started = time.perf_counter()
             try:
-                # Находим или создаем узел региона
-                region_id = self.find_or_create_region_node(region)
-                
-                if region_id and i < len(regional_values):
-                    # Подготавливаем данные по годам для свойств связи
-                    region_data = regional_values[i]
-                    
-                    # Создаем словарь со значениями по годам
-                    year_values = {}
-                    for j, year in enumerate(self.years):
-                        if j < len(region_data):
-                            # Записываем все значения, включая None (будут сохранены как NULL в Neo4j)
-                            year_values[f"value_{year}"] = region_data[j]
-                        else:
-                            # Если данных нет, записываем None
-                            year_values[f"value_{year}"] = None
-                    
-                    # Создаем связь с данными по годам в свойствах
-                    if self.create_relationship_with_properties(main_node_id, region_id, "ПоРегион", year_values):
-                        created_links += 1
-                        print(f"Создана связь ПоРегион: {main_node_id} -> {region_id} ({region})")
-                    
+                with self.driver.session(database=self.config["NEO4J_DATABASE"]) as session:
+                    record = session.run(query, {"rows": batch}).single()
+                    written = record["written"] if record else 0
             except Exception as e:
-                print(f"Ошибка при создании связи с регионом '{region}': {str(e)}")
+                failed_node_ids = {row["node_id"] for row in batch}
+                with self.regional_write_lock:
+                    self.failed_regional_node_ids.update(failed_node_ids)
+                print(f"Ошибка массовой записи связей ПоРегион (пакет {batch_number}/{len(batches)}, "
+                      f"узлов {len(failed_node_ids)}): {str(e)}")
+                continue
+            
+            elapsed = time.perf_counter() - started
+            written_total += written
+            with self.regional_write_lock:
+                self.regional_write_stats["rows"] += written
+                self.regional_write_stats["batches"] += 1
+                self.regional_write_stats["seconds"] += elapsed
+            
+            rate = written / elapsed if elapsed > 0 else float(written)
+            print(f"Пакет ПоРегион {batch_number}/{len(batches)}: {written} связей за {elapsed:.2f} с ({rate:.0f} связей/с)")
+        
+        return written_total
+    
+    def begin_regional_buffer(self) -> None:
+        """
+        Включает накопление связей ПоРегион нескольких узлов для общей записи
+        """
+        self.regional_rows_buffer = []
+    
+    def flush_regional_buffer(self, merge: bool = False) -> int:
+        """
+        Записывает накопленные связи ПоРегион. Буфер остается включенным.
         
-        return created_links
+        Args:
+            merge (bool): Использовать MERGE для связей вместо CREATE
+        
+        Returns:
+            int: Количество записанных связей
+        """
+        if not self.regional_rows_buffer:
+            return 0
+        
+        rows = self.regional_rows_buffer
+        self.regional_rows_buffer = []
+        return self.write_regional_rows(rows, merge=merge)
+    
+    def create_regional_relationships(self, main_node_id: str, regions: List[str], regional_values: List[List[Optional[float]]]) -> int:
+        """
+        Создает связи от основного узла к узлам регионов с данными по годам в свойствах связей.
+        
+        Если включен буфер (begin_regional_buffer), строки накапливаются и записываются
+        пакетами по write_batch_size вместе со связями других узлов. Ошибки записи
+        отражаются в failed_regional_node_ids.
+        
+        Args:
+            main_node_id (str): ID основного узла
+            regions (List[str]): Список регионов
+            regional_values (List[List[Optional[float]]]): Данные по регионам и годам
+        
+        Returns:
+            int: Количество связей, записанных за этот вызов (при включенном буфере -
+                записанных при сбросе буфера, 0 если строки только поставлены в очередь)
+        """
+        rows = self.build_regional_rows(main_node_id, regions, regional_values)
+        
+        if self.regional_rows_buffer is None:
+            return self.write_regional_rows(rows)
+        
+        self.regional_rows_buffer.extend(rows)
+        if len(self.regional_rows_buffer) >= self.write_batch_size:
+            return self.flush_regional_buffer()
+        
+        return 0
     
     def create_relationship_with_properties(self, from_node_id: str, to_node_id: str, relationship_type: str, properties: Dict[str, Any]) -> bool:
         """
@@ -640,12 +1228,23 @@ class Neo4jNodeCreator:
             print(f"Ошибка при создании связи '{relationship_type}': {str(e)}")
             return False
     
-    def process_batch(self, batch_config_path: str) -> Dict[str, Any]:
+    def process_batch(self, batch_config_path: str, incremental: bool = False, manifest_path: Optional[str] = None,
+                      write_mode: str = "upsert") -> Dict[str, Any]:
         """
         Обрабатывает пакет узлов из JSON-конфигурации.
         
+        После обработки сохраняется манифест (состояние файлов БД и записанных узлов).
+        В инкрементальном режиме обрабатываются только узлы, у которых изменилась
+        конфигурация или файлы-источники; существующие узлы перезаписываются на месте.
+        
         Args:
             batch_config_path (str): Путь к файлу конфигурации пакета
+            incremental (bool): Обрабатывать только изменившиеся узлы
+            manifest_path (Optional[str]): Путь к манифесту (по умолчанию рядом с конфигурацией)
+            write_mode (str): "upsert" - сравнивать с узлами в базе (по name и меткам) и
+                записывать только изменения; "create" - создавать узлы (CREATE), только для
+                первой загрузки в пустую базу: при повторном запуске узлы с тем же name
+                нарушают ограничения уникальности схемы (см. graph_schema)
         
         Returns:
             Dict[str, Any]: Результат обработки пакета
@@ -662,25 +1261,121 @@ class Neo4jNodeCreator:
                 "success": True,
                 "total_nodes": len(nodes_config),
                 "created_nodes": 0,
+                "updated_nodes": 0,
+                "unchanged_nodes": 0,
+                "skipped_nodes": 0,
                 "failed_nodes": 0,
                 "total_relationships": 0,
                 "processing_log": [],
-                "created_node_ids": []
+                "created_node_ids": [],
+                "updated_node_ids": []
             }
             
-            # Подключаемся к Neo4j
+            if write_mode not in ("create", "upsert"):
+                raise ValueError(f"Неизвестный режим записи: {write_mode}")
+            
+            manifest = EtlManifest.load(manifest_path or default_manifest_path(batch_config_path), BASE_DIR)
+            upsert_edges = {"inserted": 0, "updated": 0, "unchanged": 0, "removed": 0}
+            
+            # Регистрируем ячейки всех узлов (без чтения файлов), чтобы знать файлы-источники узлов
+            reference_plan = self.build_extraction_plan(nodes_config)
+            node_hashes = [config_hash({"node": node_config, "years": self.years}) for node_config in nodes_config]
+            
+            # Подключаемся к Neo4j и проверяем ограничения и индексы (IF NOT EXISTS - повторный запуск безопасен)
             self.connect()
+            result["processing_log"].extend(format_schema_report(self.ensure_schema()))
+            
+            # Отбираем узлы для обработки
+            selected_indexes = []
+            for index, node_config in enumerate(nodes_config):
+                node_name = node_config.get("node_name", f"Node_{index + 1}")
+                
+                if incremental:
+                    node_id = manifest.get_node_id(node_name)
+                    changed = manifest.node_changed(node_name, node_hashes[index], reference_plan.get_referenced_files(index))
+                    if not changed and node_id and self.node_exists(node_id):
+                        result["skipped_nodes"] += 1
+                        continue
+                
+                selected_indexes.append(index)
+            
+            if incremental:
+                result["processing_log"].append(
+                    f"Инкрементальный режим: к обработке {len(selected_indexes)} узлов, без изменений {result['skipped_nodes']} "
+                    f"(хешировано файлов: {manifest.hashed_files})"
+                )
+            
+            # Планируем извлечение: каждый файл пакета читается один раз.
+            # При наличии колоночного хранилища данные берутся из него напрямую
+            plan = None
+            if self.columnar_store is not None:
+                result["processing_log"].append(f"Используется колоночное хранилище: {self.columnar_store.store_dir}")
+            else:
+                if len(selected_indexes) == len(nodes_config):
+                    plan = reference_plan
+                else:
+                    plan = BatchExtractionPlan(self, regions=reference_plan.regions)
+                    for index in selected_indexes:
+                        plan.add_node(index, nodes_config[index])
+                
+                plan_stats = plan.execute()
+                result["extraction_plan_stats"] = plan_stats
+                result["processing_log"].append(
+                    f"План извлечения: {plan_stats['cell_requests']} запросов ячеек из {plan_stats['distinct_files']} файлов"
+                )
+            
+            # Связи ПоРегион всех узлов пакета записываются общими пакетами UNWIND
+            self.regional_write_stats = {"rows": 0, "batches": 0, "seconds": 0.0}
+            self.failed_regional_node_ids = set()
+            self.begin_regional_buffer()
+            # Узлы попадают в манифест только после записи их связей ПоРегион
+            manifest_records = []
             
             # Обрабатываем каждый узел
-            for i, node_config in enumerate(nodes_config, 1):
+            for index in selected_indexes:
+                i = index + 1
+                node_config = nodes_config[index]
+                node_name = node_config.get("node_name", f"Node_{i}")
                 try:
-                    node_name = node_config.get("node_name", f"Node_{i}")
                     result["processing_log"].append(f"Обработка узла {i}/{len(nodes_config)}: '{node_name}'")
                     
-                    # Создаем узел
-                    node_id = self.create_node(node_config)
+                    collected_data = plan.get_node_data(index) if plan else None
                     
-                    if node_id:
+                    node_id = None
+                    created = False
+                    
+                    if write_mode == "upsert":
+                        # Записываются только изменившиеся свойства и связи
+                        outcome = self.upsert_node(node_config, collected_data)
+                        node_id = outcome["node_id"]
+                        for key, count in outcome["edges"].items():
+                            upsert_edges[key] += count
+                        
+                        if outcome["status"] == "inserted":
+                            created = True
+                        elif outcome["status"] == "updated":
+                            result["updated_nodes"] += 1
+                            result["updated_node_ids"].append(node_id)
+                            result["processing_log"].append(f"Узел '{node_name}' обновлен")
+                        elif outcome["status"] == "unchanged":
+                            result["unchanged_nodes"] += 1
+                            result["processing_log"].append(f"Узел '{node_name}' не изменился")
+                    else:
+                        # В инкрементальном режиме существующий узел перезаписывается на месте
+                        previous_node_id = manifest.get_node_id(node_name) if incremental else None
+                        if previous_node_id:
+                            node_id = self.rewrite_node(previous_node_id, node_config, collected_data)
+                        
+                        if node_id:
+                            result["updated_nodes"] += 1
+                            result["updated_node_ids"].append(node_id)
+                            result["processing_log"].append(f"Узел '{node_name}' обновлен")
+                        else:
+                            # Создаем узел по данным из плана
+                            node_id = self.create_node(node_config, collected_data)
+                            created = node_id is not None
+                    
+                    if created:
                         result["created_nodes"] += 1
                         result["created_node_ids"].append(node_id)
                         result["processing_log"].append(f"Узел '{node_name}' создан успешно")
@@ -697,19 +1392,76 @@ class Neo4jNodeCreator:
                                     result["processing_log"].append(f"Связь '{rel_type}' создана для узла '{node_name}'")
                                 else:
                                     result["processing_log"].append(f"Ошибка создания связи '{rel_type}' для узла '{node_name}'")
+                    
+                    if node_id:
+                        manifest_records.append((node_name, node_id, index))
                     else:
                         result["failed_nodes"] += 1
+                        manifest.forget_node(node_name)
                         result["processing_log"].append(f"Ошибка создания узла '{node_name}'")
                         
                 except Exception as e:
                     result["failed_nodes"] += 1
+                    manifest.forget_node(node_name)
                     result["processing_log"].append(f"Ошибка обработки узла {i}: {str(e)}")
             
+            self.flush_regional_buffer()
+            self.regional_rows_buffer = None
+            
+            for node_name, node_id, index in manifest_records:
+                if node_id in self.failed_regional_node_ids:
+                    result["failed_nodes"] += 1
+                    manifest.forget_node(node_name)
+                    result["processing_log"].append(
+                        f"Связи ПоРегион узла '{node_name}' записаны не полностью, узел будет обработан повторно"
+                    )
+                    continue
+                manifest.record_node(node_name, node_id, node_hashes[index], reference_plan.get_referenced_files(index))
+            result["failed_regional_node_ids"] = sorted(self.failed_regional_node_ids)
+            
+            if write_mode == "upsert":
+                result["upsert_stats"] = {
+                    "nodes": {
+                        "inserted": result["created_nodes"],
+                        "updated": result["updated_nodes"],
+                        "unchanged": result["unchanged_nodes"]
+                    },
+                    "edges": upsert_edges
+                }
+                result["processing_log"].append(
+                    f"Upsert: узлов новых {result['created_nodes']}, обновлено {result['updated_nodes']}, "
+                    f"без изменений {result['unchanged_nodes']}; связей ПоРегион новых {upsert_edges['inserted']}, "
+                    f"обновлено {upsert_edges['updated']}, удалено {upsert_edges['removed']}, "
+                    f"без изменений {upsert_edges['unchanged']}"
+                )
+            
+            write_stats = self.regional_write_stats
+            result["regional_write_stats"] = dict(write_stats)
+            result["processing_log"].append(
+                f"Связи ПоРегион: записано {write_stats['rows']} в {write_stats['batches']} транзакциях "
+                f"за {write_stats['seconds']:.2f} с"
+            )
+            
             # Обновляем общий статус
             if result["failed_nodes"] > 0:
                 result["success"] = False
             
-            result["processing_log"].append(f"Обработка завершена: {result['created_nodes']}/{result['total_nodes']} узлов создано")
+            # Узлы с ошибками не попадают в манифест и будут обработаны при следующем запуске
+            manifest.save()
+            result["manifest_path"] = manifest.path
+            
+            result["processing_log"].append(
+                f"Обработка завершена: {result['created_nodes']}/{result['total_nodes']} узлов создано, "
+                f"{result['updated_nodes']} обновлено, {result['skipped_nodes']} без изменений"
+            )
+            
+            # Счетчики кеша таблиц для подбора его размера
+            cache_stats = self.table_cache.stats()
+            result["table_cache_stats"] = cache_stats
+            result["processing_log"].append(
+                f"Кеш таблиц: попаданий {cache_stats['hits']}, промахов {cache_stats['misses']}, "
+                f"вытеснений {cache_stats['evictions']}, записей {cache_stats['entries']}/{cache_stats['max_entries']}"
+            )
             
             return result
             
@@ -720,20 +1472,127 @@ class Neo4jNodeCreator:
                 "processing_log": [f"Критическая ошибка: {str(e)}"]
             }
         finally:
+            self.regional_rows_buffer = None
             self.disconnect()
 
+    def export_batch(self, batch_config_path: str, output_dir: str, chunk_size: int = EXPORT_CHUNK_SIZE) -> Dict[str, Any]:
+        """
+        Экспортирует пакет узлов в CSV для офлайн-импорта (neo4j-admin database import)
+        вместо записи через драйвер. Узлы обрабатываются порциями по chunk_size,
+        строки пишутся на диск сразу после извлечения.
+        
+        Связи из раздела "relationships" конфигурации ссылаются на ID узлов
+        существующей базы и при экспорте пропускаются.
+        
+        Args:
+            batch_config_path (str): Путь к файлу конфигурации пакета
+            output_dir (str): Каталог для CSV файлов
+            chunk_size (int): Количество узлов в одном плане извлечения
+        
+        Returns:
+            Dict[str, Any]: Результат экспорта (счетчики, команда импорта)
+        """
+        try:
+            with open(batch_config_path, 'r', encoding='utf-8') as f:
+                batch_config = json.load(f)
+            
+            nodes_config = batch_config.get("nodes", [])
+            
+            result = {
+                "success": True,
+                "total_nodes": len(nodes_config),
+                "exported_nodes": 0,
+                "failed_nodes": 0,
+                "skipped_relationships": 0,
+                "processing_log": []
+            }
+            
+            extra_properties = {key for node_config in nodes_config for key in node_config.get("properties", {})}
+            regions = None
+            
+            with BulkImportExporter(output_dir, self.years, extra_properties) as exporter:
+                for start in range(0, len(nodes_config), max(1, chunk_size)):
+                    chunk = nodes_config[start:start + max(1, chunk_size)]
+                    
+                    plan = None
+                    if self.columnar_store is None:
+                        plan = BatchExtractionPlan(self, regions=regions)
+                        regions = plan.regions
+                        for offset, node_config in enumerate(chunk):
+                            plan.add_node(offset, node_config)
+                        plan.execute()
+                    
+                    for offset, node_config in enumerate(chunk):
+                        node_name = node_config.get("node_name", f"Node_{start + offset + 1}")
+                        try:
+                            periods_config = self.extract_period_config(node_config)
+                            if not periods_config:
+                                result["failed_nodes"] += 1
+                                result["processing_log"].append(f"Не найдена конфигурация периодов для узла '{node_name}'")
+                                continue
+                            
+                            federal_values, node_regions, regional_values = self.collect_node_data(
+                                periods_config, plan.get_node_data(offset) if plan else None
+                            )
+                            properties = self.build_node_properties(node_config, periods_config, federal_values)
+                            
+                            labels = node_config["node_label"]
+                            node_id = exporter.write_indicator("schetnoe", properties, labels if isinstance(labels, list) else [labels])
+                            exporter.write_regional_values(node_id, node_regions, regional_values)
+                            
+                            result["exported_nodes"] += 1
+                            result["skipped_relationships"] += len(node_config.get("relationships", []))
+                            
+                        except Exception as e:
+                            result["failed_nodes"] += 1
+                            result["processing_log"].append(f"Ошибка экспорта узла '{node_name}': {str(e)}")
+                    
+                    print(f"Экспортировано узлов: {result['exported_nodes']}/{len(nodes_config)}")
+                
+                result["export_stats"] = exporter.stats()
+                result["import_command"] = exporter.import_command(self.config.get("NEO4J_DATABASE", "neo4j"))
+            
+            if result["failed_nodes"] > 0:
+                result["success"] = False
+            
+            result["processing_log"].append(
+                f"Экспорт завершен: {result['exported_nodes']}/{result['total_nodes']} узлов, "
+                f"связей ПоРегион {result['export_stats']['poregion']}, регионов {result['export_stats']['regions']}"
+            )
+            if result["skipped_relationships"]:
+                result["processing_log"].append(
+                    f"Пропущено связей с узлами существующей базы: {result['skipped_relationships']}"
+                )
+            result["processing_log"].append(f"Команда импорта: {result['import_command']}")
+            
+            return result
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Ошибка экспорта пакета: {str(e)}",
+                "processing_log": [f"Критическая ошибка: {str(e)}"]
+            }
+        finally:
+            self.extraction_pool.close()
+
 # Пример использования
 if __name__ == "__main__":
     # Создаем экземпляр класса
     creator = Neo4jNodeCreator()
     
     try:
-        # Пример обработки пакета узлов
-        result = creator.process_batch("batch_nodes_config.json")
+        # Пример обработки пакета узлов (--incremental - только изменившиеся узлы,
+        # --create - создание узлов без сравнения с базой, только для пустой базы)
+        import sys
+        result = creator.process_batch("batch_nodes_config.json", incremental="--incremental" in sys.argv,
+                                       write_mode="create" if "--create" in sys.argv else "upsert")
         
         print("\n=== РЕЗУЛЬТАТ ОБРАБОТКИ ===")
         print(f"Успех: {result['success']}")
         print(f"Создано узлов: {result.get('created_nodes', 0)}")
+        print(f"Обновлено узлов: {result.get('updated_nodes', 0)}")
+        print(f"Без изменений: {result.get('skipped_nodes', 0)}")
         print(f"Ошибок: {result.get('failed_nodes', 0)}")
         print(f"Создано связей: {result.get('total_relationships', 0)}")
         
@@ -0,0 +1,138 @@
+"""
+Параллельное извлечение ячеек из CSV файлов разделов.
+
+Единица работы - файл и список ячеек (строка, колонка) в нём. Единицы
+распределяются по пулу процессов, у каждого процесса свой кеш таблиц,
+а результаты собираются в исходном порядке. При одном рабочем процессе
+или сбое пула извлечение детерминированно выполняется последовательно.
+
+ExtractionPool держит один пул процессов на весь пакет: вызовы
+extract_cells для разных узлов переиспользуют уже запущенные процессы
+(и их кеши таблиц) вместо запуска нового пула на каждый узел.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+# Поддержка как относительных, так и абсолютных импортов
+try:
+    from .table_cache import ParsedTableCache, get_table_cache
+except ImportError:
+    from table_cache import ParsedTableCache, get_table_cache
+
+# Единица работы: (путь к файлу, [(номер строки, номер колонки), ...])
+ExtractionTask = Tuple[str, List[Tuple[int, int]]]
+
+
+def resolve_worker_count(max_workers: Optional[int] = None) -> int:
+    """
+    Определяет количество рабочих процессов.
+
+    Args:
+        max_workers (Optional[int]): Заданное количество (по умолчанию - число ядер)
+
+    Returns:
+        int: Количество рабочих процессов (не меньше 1)
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    return max(1, int(max_workers))
+
+
+class ExtractionPool:
+    """
+    Пул процессов извлечения, переиспользуемый между вызовами extract_cells
+    """
+
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._max_workers = 0
+
+    def get_executor(self, max_workers: int) -> ProcessPoolExecutor:
+        """
+        Возвращает запущенный пул, создавая его при первом обращении
+        или при изменении количества процессов.
+
+        Args:
+            max_workers (int): Количество рабочих процессов
+
+        Returns:
+            ProcessPoolExecutor: Пул процессов
+        """
+        if self._executor is None or self._max_workers != max_workers:
+            self.close()
+            self._executor = ProcessPoolExecutor(max_workers=max_workers)
+            self._max_workers = max_workers
+        return self._executor
+
+    def close(self) -> None:
+        """
+        Останавливает пул (следующий вызов get_executor создаст новый)
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+            self._max_workers = 0
+
+    def __enter__(self) -> "ExtractionPool":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def extract_file_cells(task: ExtractionTask, cache: Optional[ParsedTableCache] = None) -> List[Optional[float]]:
+    """
+    Извлекает значения ячеек одного файла.
+
+    Args:
+        task (ExtractionTask): Файл и список ячеек
+        cache (Optional[ParsedTableCache]): Кеш таблиц (по умолчанию общий кеш процесса)
+
+    Returns:
+        List[Optional[float]]: Значения в порядке ячеек задачи
+    """
+    file_path, cells = task
+
+    if not os.path.exists(file_path):
+        return [None] * len(cells)
+
+    try:
+        table = (cache or get_table_cache()).get_table(file_path)
+    except Exception as e:
+        print(f"Ошибка при чтении файла {file_path}: {str(e)}")
+        return [None] * len(cells)
+
+    return [table.get_value(column_number, row_number) for row_number, column_number in cells]
+
+
+def extract_cells(tasks: List[ExtractionTask], max_workers: int = 1,
+                  cache: Optional[ParsedTableCache] = None,
+                  pool: Optional[ExtractionPool] = None) -> List[List[Optional[float]]]:
+    """
+    Извлекает ячейки по списку задач, при необходимости в пуле процессов.
+
+    Args:
+        tasks (List[ExtractionTask]): Задачи извлечения
+        max_workers (int): Количество рабочих процессов (1 - последовательно)
+        cache (Optional[ParsedTableCache]): Кеш таблиц для последовательного режима
+        pool (Optional[ExtractionPool]): Общий пул пакета (по умолчанию пул создается на вызов)
+
+    Returns:
+        List[List[Optional[float]]]: Значения по задачам в исходном порядке
+    """
+    if max_workers > 1 and len(tasks) > 1:
+        try:
+            chunksize = max(1, len(tasks) // (max_workers * 4))
+            if pool is not None:
+                return list(pool.get_executor(max_workers).map(extract_file_cells, tasks, chunksize=chunksize))
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                return list(executor.map(extract_file_cells, tasks, chunksize=chunksize))
+        except Exception as e:
+            if pool is not None:
+                # Сломанный пул не переиспользуется: следующий вызов запустит новый
+                pool.close()
+            print(f"Параллельное извлечение недоступно, выполняем последовательно: {str(e)}")
+
+    return [extract_file_cells(task, cache) for task in tasks]
@@ -7,8 +7,10 @@ import traceback
 # Поддержка как относительных, так и абсолютных импортов
 try:
     from .excel_utils_single_folder import save_sheets_to_single_folder
+    from .workbook_splitter import split_workbook_to_csv, StreamingNotSupportedError
 except ImportError:
     from excel_utils_single_folder import save_sheets_to_single_folder
+    from workbook_splitter import split_workbook_to_csv, StreamingNotSupportedError
 
 def extract_region_name(filename: str) -> str:
     """
@@ -56,7 +58,7 @@ def get_excel_files_from_folder(folder_path: str) -> List[str]:
     
     return sorted(excel_files)
 
-def save_sheets_to_region_folder(excel_path: str, region_name: str, base_folder: str) -> None:
+def save_sheets_to_region_folder(excel_path: str, region_name: str, base_folder: str, streaming: bool = True) -> List[str]:
     """
     Модифицированная версия функции save_sheets_to_single_folder для сохранения в папку региона.
     
@@ -64,7 +66,18 @@ def save_sheets_to_region_folder(excel_path: str, region_name: str, base_folder:
         excel_path (str): Путь к Excel файлу
         region_name (str): Название региона
         base_folder (str): Базовая папка (2024/)
+        streaming (bool): Сразу сохранять CSV разделов за один проход по книге (см. workbook_splitter);
+            False - прежний путь через промежуточные .xlsx, которые затем обрабатывает excel_processor
+        
+    Returns:
+        List[str]: Пути к созданным файлам
     """
+    if streaming:
+        try:
+            return split_workbook_to_csv(excel_path, str(Path(base_folder) / region_name))
+        except StreamingNotSupportedError as e:
+            print(f"{str(e)}, используется прежний путь через промежуточные .xlsx")
+    
     # Поддержка как относительных, так и абсолютных импортов
     try:
         from .excel_utils_single_folder import (
@@ -94,6 +107,8 @@ def save_sheets_to_region_folder(excel_path: str, region_name: str, base_folder:
     # Загружаем исходный Excel файл
     source_wb = openpyxl.load_workbook(excel_path, data_only=True)
     
+    created_files = []
+    
     # Обрабатываем каждый лист
     for sheet in section_sheets:
         # Получаем исходный лист
@@ -135,8 +150,11 @@ def save_sheets_to_region_folder(excel_path: str, region_name: str, base_folder:
         output_path = region_dir / f"{sheet}.xlsx"
         new_wb.save(str(output_path))
         new_wb.close()
+        created_files.append(str(output_path))
     
     source_wb.close()
+    
+    return created_files
 
 def process_regional_files(folder_path: str = "2024") -> Dict[str, List[str]]:
     """
@@ -187,10 +205,9 @@ def process_regional_files(folder_path: str = "2024") -> Dict[str, List[str]]:
                 continue
             
             # Обрабатываем файл
-            save_sheets_to_region_folder(excel_file, region_name, folder_path)
+            created_files = save_sheets_to_region_folder(excel_file, region_name, folder_path)
             
             # Проверяем результат
-            created_files = list(region_folder.glob("*.xlsx")) if region_folder.exists() else []
             print(f"  ✅ Успешно обработан! Создано файлов: {len(created_files)}")
             successful_regions.append(region_name)
             
@@ -0,0 +1,198 @@
+"""
+Компактное хранение региональных значений в свойствах узла.
+
+Вместо ~85 связей ПоРегион со свойствами value_YYYY узел хранит список
+регионов region_keys и плоский массив regional_values в порядке
+"регион, затем год" (шаг - длина свойства years узла). Отсутствующие
+значения хранятся как NaN, так как списки Neo4j не могут содержать NULL.
+Добавление года не требует новых имен свойств.
+
+Запуск миграции существующих узлов:
+    python -m ETL.regional_layout --config neo4j_config.json [--drop-relationships]
+"""
+
+import math
+import json
+import argparse
+from typing import Dict, List, Optional, Any, Tuple
+
+# Имена свойств узла
+REGION_KEYS_PROPERTY = "region_keys"
+REGIONAL_VALUES_PROPERTY = "regional_values"
+
+# Варианты хранения региональных данных
+LAYOUT_RELATIONSHIPS = "relationships"
+LAYOUT_ARRAY = "array"
+LAYOUT_BOTH = "both"
+STORAGE_LAYOUTS = (LAYOUT_RELATIONSHIPS, LAYOUT_ARRAY, LAYOUT_BOTH)
+
+# Количество узлов в одной транзакции миграции
+MIGRATION_BATCH_SIZE = 100
+
+
+def pack_regional_values(regions: List[str], regional_values: List[List[Optional[float]]], years: List[str]) -> Dict[str, Any]:
+    """
+    Упаковывает региональные значения в свойства узла.
+
+    Args:
+        regions (List[str]): Список регионов
+        regional_values (List[List[Optional[float]]]): Данные по регионам и годам
+        years (List[str]): Годы (шаг плоского массива)
+
+    Returns:
+        Dict[str, Any]: {region_keys: [...], regional_values: [...]}
+    """
+    region_keys = []
+    flat_values = []
+
+    for region, region_data in zip(regions, regional_values):
+        region_keys.append(region)
+        for j in range(len(years)):
+            value = region_data[j] if j < len(region_data) else None
+            flat_values.append(float("nan") if value is None else float(value))
+
+    return {REGION_KEYS_PROPERTY: region_keys, REGIONAL_VALUES_PROPERTY: flat_values}
+
+
+def unpack_regional_values(properties: Dict[str, Any], years: List[str]) -> Optional[Tuple[List[str], List[List[Optional[float]]]]]:
+    """
+    Распаковывает региональные значения из свойств узла.
+
+    Args:
+        properties (Dict[str, Any]): Свойства узла (region_keys, regional_values, years)
+        years (List[str]): Запрошенные годы (могут отличаться от years узла)
+
+    Returns:
+        Optional[Tuple]: (регионы, значения по регионам и запрошенным годам) или None,
+            если узел хранит данные только в связях ПоРегион
+    """
+    region_keys = properties.get(REGION_KEYS_PROPERTY)
+    flat_values = properties.get(REGIONAL_VALUES_PROPERTY)
+
+    if region_keys is None or flat_values is None:
+        return None
+
+    node_years = [str(year) for year in (properties.get("years") or years)]
+    stride = len(node_years)
+    positions = {year: index for index, year in enumerate(node_years)}
+
+    regional_values = []
+    for region_index in range(len(region_keys)):
+        row = []
+        for year in years:
+            position = positions.get(str(year))
+            offset = region_index * stride + position if position is not None else None
+            value = flat_values[offset] if offset is not None and offset < len(flat_values) else None
+            row.append(None if value is None or math.isnan(value) else value)
+        regional_values.append(row)
+
+    return list(region_keys), regional_values
+
+
+def values_equal(first: Any, second: Any) -> bool:
+    """
+    Сравнивает значения свойств, считая NaN равными друг другу (в том числе внутри списков).
+
+    Args:
+        first (Any): Первое значение
+        second (Any): Второе значение
+
+    Returns:
+        bool: True, если значения совпадают
+    """
+    if isinstance(first, (list, tuple)) and isinstance(second, (list, tuple)):
+        return len(first) == len(second) and all(values_equal(a, b) for a, b in zip(first, second))
+    if isinstance(first, float) and isinstance(second, float) and math.isnan(first) and math.isnan(second):
+        return True
+    return first == second
+
+
+def migrate_to_array_layout(driver, database: str, batch_size: int = MIGRATION_BATCH_SIZE,
+                            drop_relationships: bool = False) -> Dict[str, int]:
+    """
+    Переносит данные связей ПоРегион в свойства узлов Счетное и Расчетные.
+
+    Args:
+        driver: Драйвер Neo4j
+        database (str): Имя базы данных
+        batch_size (int): Количество узлов в одной транзакции
+        drop_relationships (bool): Удалять связи ПоРегион после переноса
+
+    Returns:
+        Dict[str, int]: nodes, relationships, deleted_relationships
+    """
+    read_query = """
+    MATCH (n)
+    WHERE (n:Счетное OR n:Расчетные) AND n.region_keys IS NULL
+    WITH n LIMIT $batch_size
+    OPTIONAL MATCH (n)-[r:ПоРегион]->(reg:Регион)
+    WITH n, reg, r ORDER BY reg.name
+    RETURN elementId(n) as node_id, n.years as years,
+           collect(CASE WHEN reg IS NULL THEN NULL ELSE {region: reg.name, values: properties(r)} END) as edges
+    """
+
+    write_query = """
+    UNWIND $rows AS row
+    MATCH (n)
+    WHERE elementId(n) = row.node_id
+    SET n.region_keys = row.region_keys, n.regional_values = row.regional_values
+    RETURN count(n) as updated
+    """
+
+    delete_query = """
+    UNWIND $node_ids AS node_id
+    MATCH (n)-[r:ПоРегион]->()
+    WHERE elementId(n) = node_id
+    DELETE r
+    RETURN count(r) as deleted
+    """
+
+    stats = {"nodes": 0, "relationships": 0, "deleted_relationships": 0}
+
+    while True:
+        with driver.session(database=database) as session:
+            records = list(session.run(read_query, {"batch_size": batch_size}))
+
+            if not records:
+                break
+
+            rows = []
+            for record in records:
+                years = [str(year) for year in (record["years"] or [])]
+                edges = record["edges"]
+                regions = [edge["region"] for edge in edges]
+                values = [[edge["values"].get(f"value_{year}") for year in years] for edge in edges]
+
+                rows.append({"node_id": record["node_id"], **pack_regional_values(regions, values, years)})
+                stats["relationships"] += len(edges)
+
+            session.run(write_query, {"rows": rows}).consume()
+            stats["nodes"] += len(rows)
+
+            if drop_relationships:
+                record = session.run(delete_query, {"node_ids": [row["node_id"] for row in rows]}).single()
+                stats["deleted_relationships"] += record["deleted"] if record else 0
+
+        print(f"Перенесено узлов: {stats['nodes']}, связей ПоРегион: {stats['relationships']}")
+
+    return stats
+
+
+if __name__ == "__main__":
+    from neo4j import GraphDatabase
+
+    parser = argparse.ArgumentParser(description="Перенос региональных данных из связей ПоРегион в свойства узлов")
+    parser.add_argument("--config", default="neo4j_config.json", help="Путь к конфигурации Neo4j")
+    parser.add_argument("--batch-size", type=int, default=MIGRATION_BATCH_SIZE, help="Узлов в одной транзакции")
+    parser.add_argument("--drop-relationships", action="store_true", help="Удалить связи ПоРегион после переноса")
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    driver = GraphDatabase.driver(config["NEO4J_URI"], auth=(config["NEO4J_USERNAME"], config["NEO4J_PASSWORD"]))
+    try:
+        result = migrate_to_array_layout(driver, config["NEO4J_DATABASE"], args.batch_size, args.drop_relationships)
+        print(f"Миграция завершена: {result}")
+    finally:
+        driver.close()
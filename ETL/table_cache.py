@@ -0,0 +1,305 @@
+"""
+Кеш разобранных таблиц "Раздел X.csv".
+
+Каждый файл разбирается один раз: находится строка заголовка "№ строки",
+а строки данных под ней сохраняются числовой матрицей (NaN для пустых и
+нечисловых ячеек) и матрицей исходного текста ячеек. Ключ кеша - абсолютный путь и mtime файла, поэтому
+изменённый на диске файл автоматически перечитывается.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple, Any
+
+import numpy as np
+import pandas as pd
+
+# Маркер строки заголовка в первой колонке таблицы
+HEADER_MARKER = "№ строки"
+
+# Максимальное количество таблиц в кеше процесса
+DEFAULT_MAX_ENTRIES = int(os.environ.get("TABLE_CACHE_MAX_ENTRIES", 4096))
+
+
+class ParsedTable:
+    """
+    Разобранная таблица: числовая и текстовая матрицы строк данных и индекс строки заголовка
+    """
+
+    __slots__ = ("values", "text", "header_row_index")
+
+    def __init__(self, values: np.ndarray, header_row_index: Optional[int], text: Optional[np.ndarray] = None):
+        """
+        Args:
+            values (np.ndarray): Матрица строк данных (после строки "№ строки")
+            header_row_index (Optional[int]): Индекс строки заголовка в файле или None
+            text (Optional[np.ndarray]): Исходный текст ячеек тех же строк (строки или NaN)
+        """
+        self.values = values
+        self.text = text if text is not None else np.empty(values.shape, dtype=object)
+        self.header_row_index = header_row_index
+
+    def get_value(self, column_number: int, row_number: int) -> Optional[float]:
+        """
+        Возвращает числовое значение ячейки.
+
+        Args:
+            column_number (int): Номер колонки (начиная с 1)
+            row_number (int): Номер строки данных (начиная с 1)
+
+        Returns:
+            Optional[float]: Значение или None, если ячейка пустая или вне таблицы
+        """
+        if self.header_row_index is None:
+            return None
+
+        row_index = row_number - 1
+        column_index = column_number - 1
+        rows, columns = self.values.shape
+
+        if row_index < 0 or column_index < 0 or row_index >= rows or column_index >= columns:
+            return None
+
+        value = self.values[row_index, column_index]
+        if np.isnan(value):
+            return None
+
+        return float(value)
+
+    def get_text(self, column_number: int, row_number: int) -> str:
+        """
+        Возвращает исходный текст ячейки (без преобразования в число).
+
+        Args:
+            column_number (int): Номер колонки (начиная с 1)
+            row_number (int): Номер строки данных (начиная с 1)
+
+        Returns:
+            str: Текст ячейки или "", если ячейка пустая или вне таблицы
+        """
+        if self.header_row_index is None:
+            return ""
+
+        row_index = row_number - 1
+        column_index = column_number - 1
+        rows, columns = self.text.shape
+
+        if row_index < 0 or column_index < 0 or row_index >= rows or column_index >= columns:
+            return ""
+
+        value = self.text[row_index, column_index]
+        return value if isinstance(value, str) else ""
+
+
+def read_section_frame(file_path: str) -> pd.DataFrame:
+    """
+    Читает CSV файл раздела как таблицу строк без преобразования типов.
+
+    Args:
+        file_path (str): Путь к CSV файлу
+
+    Returns:
+        pd.DataFrame: Содержимое файла (все значения - строки или NaN)
+    """
+    return pd.read_csv(file_path, header=None, encoding='utf-8', sep=';', dtype=str)
+
+
+def find_header_row(df: pd.DataFrame) -> Optional[int]:
+    """
+    Находит строку заголовка (содержит "№ строки") одним векторным проходом.
+
+    Args:
+        df (pd.DataFrame): Содержимое файла раздела
+
+    Returns:
+        Optional[int]: Индекс строки заголовка или None
+    """
+    if df.shape[1] == 0:
+        return None
+
+    is_header = df.iloc[:, 0].str.contains(HEADER_MARKER, regex=False, na=False).to_numpy()
+    header_rows = np.flatnonzero(is_header)
+
+    if len(header_rows) == 0:
+        return None
+
+    return int(header_rows[0])
+
+
+def parse_numeric_frame(df: pd.DataFrame) -> ParsedTable:
+    """
+    Преобразует строки данных под заголовком в числовую и текстовую матрицы.
+
+    Args:
+        df (pd.DataFrame): Содержимое файла раздела (см. read_section_frame)
+
+    Returns:
+        ParsedTable: Разобранная таблица (header_row_index=None, если заголовок не найден)
+    """
+    header_row_index = find_header_row(df)
+
+    if header_row_index is None:
+        return ParsedTable(np.empty((0, 0)), None)
+
+    data = df.iloc[header_row_index + 1:]
+
+    # Та же нормализация, что и в validate_numeric_value: пробелы и десятичная запятая
+    cleaned = data.apply(lambda col: col.str.strip().str.replace(',', '.', regex=False))
+    values = cleaned.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+
+    return ParsedTable(values, header_row_index, data.to_numpy(dtype=object))
+
+
+def parse_numeric_table(file_path: str) -> ParsedTable:
+    """
+    Читает CSV файл раздела и преобразует строки данных в числовую матрицу.
+
+    Args:
+        file_path (str): Путь к CSV файлу
+
+    Returns:
+        ParsedTable: Разобранная таблица (header_row_index=None, если заголовок не найден)
+    """
+    return parse_numeric_frame(read_section_frame(file_path))
+
+
+class ParsedTableCache:
+    """
+    Ограниченный по размеру LRU-кеш разобранных таблиц в рамках процесса
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Args:
+            max_entries (int): Максимальное количество таблиц в кеше
+        """
+        self.max_entries = max(1, int(max_entries))
+        self._entries: "OrderedDict[Tuple[str, int], ParsedTable]" = OrderedDict()
+        self._keys_by_path: Dict[str, Tuple[str, int]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_table(self, file_path: str) -> ParsedTable:
+        """
+        Возвращает разобранную таблицу, читая файл только при промахе кеша.
+
+        Args:
+            file_path (str): Путь к CSV файлу
+
+        Returns:
+            ParsedTable: Разобранная таблица
+
+        Raises:
+            OSError: Если файл недоступен
+        """
+        abs_path = os.path.abspath(file_path)
+        key = (abs_path, os.stat(abs_path).st_mtime_ns)
+
+        with self._lock:
+            table = self._entries.get(key)
+            if table is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return table
+
+        table = parse_numeric_table(abs_path)
+
+        with self._lock:
+            self.misses += 1
+
+            # Удаляем устаревшую версию того же файла
+            stale_key = self._keys_by_path.get(abs_path)
+            if stale_key is not None and stale_key != key:
+                self._entries.pop(stale_key, None)
+
+            self._entries[key] = table
+            self._keys_by_path[abs_path] = key
+
+            while len(self._entries) > self.max_entries:
+                evicted_key, _ = self._entries.popitem(last=False)
+                if self._keys_by_path.get(evicted_key[0]) == evicted_key:
+                    del self._keys_by_path[evicted_key[0]]
+                self.evictions += 1
+
+        return table
+
+    def get_value(self, file_path: str, column_number: int, row_number: int) -> Optional[float]:
+        """
+        Возвращает числовое значение ячейки из кешированной таблицы.
+
+        Args:
+            file_path (str): Путь к CSV файлу
+            column_number (int): Номер колонки (начиная с 1)
+            row_number (int): Номер строки (начиная с 1)
+
+        Returns:
+            Optional[float]: Значение ячейки или None
+        """
+        return self.get_table(file_path).get_value(column_number, row_number)
+
+    def clear(self) -> None:
+        """
+        Очищает кеш и сбрасывает счетчики
+        """
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_path.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает счетчики кеша для подбора его размера.
+
+        Returns:
+            Dict[str, Any]: hits, misses, evictions, entries, max_entries, hit_rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+_shared_cache: Optional[ParsedTableCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_table_cache() -> ParsedTableCache:
+    """
+    Возвращает общий для процесса экземпляр кеша таблиц.
+
+    Returns:
+        ParsedTableCache: Кеш таблиц
+    """
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = ParsedTableCache()
+        return _shared_cache
+
+
+def format_cell_value(value: Optional[float]) -> str:
+    """
+    Форматирует числовое значение ячейки для текстового вывода.
+
+    Args:
+        value (Optional[float]): Значение ячейки
+
+    Returns:
+        str: Строковое представление ("" для отсутствующего значения)
+    """
+    if value is None:
+        return ""
+    if float(value).is_integer():
+        return str(int(value))
+    return str(value)
@@ -0,0 +1,344 @@
+"""
+Чтение данных показателей, включая виртуальные расчетные узлы.
+
+Виртуальный расчетный узел (свойство virtual = true) хранит только
+formula и child_nodes: его федеральные и региональные значения не
+записываются в граф, а вычисляются при первом чтении. Результат
+хранится в ограниченном LRU-кеше по ключу (хеш формулы, версии данных
+дочерних узлов), поэтому часто просматриваемые показатели вычисляются
+один раз, а невостребованные не вычисляются вовсе.
+
+Версия данных узла - хеш его годов, федеральных и региональных значений
+(для виртуального узла - ключ его результата), поэтому изменение любого
+дочернего узла, в том числе транзитивно, дает новый ключ.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any, Tuple
+
+try:
+    from .formula_engine import FormulaError, evaluate_federal, evaluate_regional
+    from .regional_layout import unpack_regional_values
+    from .etl_manifest import config_hash
+except ImportError:
+    from formula_engine import FormulaError, evaluate_federal, evaluate_regional
+    from regional_layout import unpack_regional_values
+    from etl_manifest import config_hash
+
+# Свойство узла, отмечающее виртуальный расчетный узел
+VIRTUAL_PROPERTY = "virtual"
+
+# Количество результатов виртуальных узлов в кеше процесса
+DEFAULT_CACHE_SIZE = int(os.environ.get("VIRTUAL_RESULT_CACHE_SIZE", 256))
+
+NODES_DATA_QUERY = """
+UNWIND $node_ids AS node_id
+MATCH (n)
+WHERE elementId(n) = node_id AND (n:Счетное OR n:Расчетные)
+OPTIONAL MATCH (n)-[r:ПоРегион]->(reg:Регион)
+WHERE n.region_keys IS NULL
+WITH n, node_id, reg, r ORDER BY reg.name
+RETURN node_id, n.name as node_name, n.полное_название as full_name,
+       n.federal_values as federal_values, n.years as years,
+       n.region_keys as region_keys, n.regional_values as regional_values,
+       n.virtual as virtual, n.formula as formula, n.child_nodes as child_nodes,
+       collect(CASE WHEN reg IS NULL THEN NULL ELSE {region: reg.name, values: properties(r)} END) as edges
+"""
+
+
+def data_version(node_data: Dict[str, Any]) -> str:
+    """
+    Вычисляет версию данных узла по его значениям.
+
+    Args:
+        node_data (Dict[str, Any]): Данные узла (years, federal_values, regions, regional_values)
+
+    Returns:
+        str: Хеш значений узла
+    """
+    return config_hash({key: node_data.get(key) for key in ("years", "federal_values", "regions", "regional_values")})
+
+
+def fetch_nodes_data(driver, database: str, node_ids: List[str], years: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Читает данные узлов "Счетное" и "Расчетные" одним запросом UNWIND.
+
+    Федеральные и региональные значения выравниваются по годам years (по
+    свойству years узла), регионы упорядочены по названию. Региональные
+    значения читаются из свойств узла (компактное хранение) или из связей
+    ПоРегион. Значения виртуальных узлов не вычисляются (см. VirtualIndicatorResolver).
+
+    Args:
+        driver: Драйвер Neo4j
+        database (str): Имя базы данных
+        node_ids (List[str]): ID узлов (повторы допускаются)
+        years (List[str]): Годы значений
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Данные найденных узлов по ID
+    """
+    unique_ids = list(dict.fromkeys(node_ids))
+    if not unique_ids:
+        return {}
+
+    nodes_data = {}
+
+    with driver.session(database=database) as session:
+        for record in session.run(NODES_DATA_QUERY, {"node_ids": unique_ids}):
+            record = dict(record)
+            node_years = [str(year) for year in (record["years"] or years)]
+            positions = {year: index for index, year in enumerate(node_years)}
+            federal = record["federal_values"] or []
+
+            federal_values = []
+            for year in years:
+                position = positions.get(str(year))
+                federal_values.append(federal[position] if position is not None and position < len(federal) else None)
+
+            # Компактное хранение: регионы и значения в свойствах узла
+            unpacked = unpack_regional_values(record, years)
+            if unpacked is not None:
+                pairs = sorted(zip(*unpacked), key=lambda pair: pair[0])
+            else:
+                pairs = [
+                    (edge["region"], [edge["values"].get(f"value_{year}") for year in years])
+                    for edge in record.get("edges") or []
+                ]
+
+            node_data = {
+                "node_id": record["node_id"],
+                "node_name": record["node_name"],
+                "full_name": record.get("full_name") or record["node_name"],
+                "federal_values": federal_values,
+                "years": list(years),
+                "regions": [region for region, _ in pairs],
+                "regional_values": [values for _, values in pairs],
+                "virtual": bool(record.get("virtual")),
+                "formula": record.get("formula"),
+                "child_nodes": list(record.get("child_nodes") or [])
+            }
+            node_data["data_version"] = data_version(node_data)
+            nodes_data[record["node_id"]] = node_data
+
+    return nodes_data
+
+
+class VirtualResultCache:
+    """
+    Ограниченный по размеру LRU-кеш результатов виртуальных расчетных узлов
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_SIZE):
+        """
+        Args:
+            max_entries (int): Максимальное количество результатов в кеше
+        """
+        self.max_entries = max(1, int(max_entries))
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Возвращает результат по ключу.
+
+        Args:
+            key (str): Ключ результата (хеш формулы и версий данных дочерних узлов)
+
+        Returns:
+            Optional[Dict[str, Any]]: federal_values, regions, regional_values или None при промахе
+        """
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        """
+        Сохраняет результат, вытесняя самые давно использованные.
+
+        Args:
+            key (str): Ключ результата
+            result (Dict[str, Any]): federal_values, regions, regional_values
+        """
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> int:
+        """
+        Очищает кеш и сбрасывает счетчики.
+
+        Returns:
+            int: Количество удаленных результатов
+        """
+        with self._lock:
+            removed = len(self._entries)
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает счетчики кеша.
+
+        Returns:
+            Dict[str, Any]: hits, misses, evictions, entries, max_entries, hit_rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+_shared_cache: Optional[VirtualResultCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_virtual_cache() -> VirtualResultCache:
+    """
+    Возвращает общий для процесса кеш результатов виртуальных узлов.
+
+    Returns:
+        VirtualResultCache: Кеш результатов
+    """
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = VirtualResultCache()
+        return _shared_cache
+
+
+class VirtualIndicatorResolver:
+    """
+    Чтение данных узлов с вычислением виртуальных расчетных узлов по требованию
+    """
+
+    def __init__(self, driver, database: str, years: List[str], cache: Optional[VirtualResultCache] = None):
+        """
+        Args:
+            driver: Драйвер Neo4j
+            database (str): Имя базы данных
+            years (List[str]): Годы значений
+            cache (Optional[VirtualResultCache]): Кеш результатов (по умолчанию общий кеш процесса)
+        """
+        self.driver = driver
+        self.database = database
+        self.years = list(years)
+        self.cache = cache if cache is not None else get_virtual_cache()
+
+    def get_nodes_data(self, node_ids: List[str], _path: Tuple[str, ...] = ()) -> Dict[str, Dict[str, Any]]:
+        """
+        Возвращает данные узлов; значения виртуальных узлов вычисляются (или берутся из кеша).
+
+        Args:
+            node_ids (List[str]): ID узлов
+            _path (Tuple[str, ...]): Виртуальные узлы, вычисляемые выше по цепочке (защита от циклов)
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Данные найденных узлов по ID
+        """
+        nodes_data = fetch_nodes_data(self.driver, self.database, node_ids, self.years)
+
+        for node_id, node_data in nodes_data.items():
+            if node_data["virtual"]:
+                nodes_data[node_id] = self.evaluate(node_data, _path)
+
+        return nodes_data
+
+    def get_node_data(self, node_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Возвращает данные одного узла.
+
+        Args:
+            node_id (str): ID узла
+
+        Returns:
+            Optional[Dict[str, Any]]: Данные узла или None, если узел не найден
+        """
+        return self.get_nodes_data([node_id]).get(node_id)
+
+    def evaluate(self, node_data: Dict[str, Any], _path: Tuple[str, ...] = ()) -> Dict[str, Any]:
+        """
+        Вычисляет значения виртуального узла по данным дочерних узлов.
+
+        Args:
+            node_data (Dict[str, Any]): Данные виртуального узла (formula, child_nodes)
+            _path (Tuple[str, ...]): Виртуальные узлы, вычисляемые выше по цепочке
+
+        Returns:
+            Dict[str, Any]: Данные узла с вычисленными значениями
+
+        Raises:
+            ValueError: Циклическая зависимость между виртуальными узлами
+        """
+        node_id = node_data["node_id"]
+        if node_id in _path:
+            raise ValueError(f"Циклическая зависимость виртуальных узлов: {' -> '.join(_path + (node_id,))}")
+
+        child_ids = node_data["child_nodes"]
+        found = self.get_nodes_data(child_ids, _path + (node_id,))
+
+        # Как и при материализации, отсутствующий узел дает нулевые значения
+        children = [
+            found.get(child_id) or {"node_id": child_id, "federal_values": [0.0] * len(self.years),
+                                    "regions": [], "regional_values": [], "data_version": None}
+            for child_id in child_ids
+        ]
+
+        key = config_hash({
+            "formula": node_data["formula"],
+            "years": self.years,
+            "children": [child["data_version"] for child in children]
+        })
+
+        result = self.cache.get(key)
+        if result is None:
+            result = self.compute(node_data["formula"], children)
+            self.cache.put(key, result)
+
+        return {**node_data, **result, "data_version": key}
+
+    def compute(self, formula: str, children: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Вычисляет формулу по данным дочерних узлов.
+
+        Args:
+            formula (str): Формула расчетного узла
+            children (List[Dict[str, Any]]): Данные дочерних узлов по порядку
+
+        Returns:
+            Dict[str, Any]: federal_values (None как 0.0, как у материализованных узлов), regions, regional_values
+        """
+        try:
+            federal_values = evaluate_federal(formula, children, len(self.years))
+            regions, regional_values = evaluate_regional(formula, children, len(self.years))
+        except FormulaError as e:
+            print(f"Ошибка вычисления виртуального узла: {str(e)}")
+            federal_values, regions, regional_values = [None] * len(self.years), [], []
+
+        pairs = sorted(zip(regions, regional_values), key=lambda pair: pair[0])
+        return {
+            "federal_values": [0.0 if value is None else value for value in federal_values],
+            "regions": [region for region, _ in pairs],
+            "regional_values": [values for _, values in pairs]
+        }
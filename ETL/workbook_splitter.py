@@ -0,0 +1,239 @@
+"""
+Потоковое разбиение регионального Excel файла на CSV файлы разделов.
+
+Прежний путь открывал книгу дважды (список листов и полная загрузка),
+копировал каждый лист в новую книгу, сохранял промежуточный .xlsx и
+затем перечитывал его через pd.read_excel для получения CSV. Здесь книга
+открывается один раз в режиме read_only, строки каждого листа "Раздел ..."
+читаются потоком, объединенные ячейки заполняются по интервалам диапазонов
+<mergeCells>, и нормализация process_excel_file применяется к таблице,
+собранной так же, как ее собрал бы pd.read_excel. Промежуточные .xlsx не
+создаются, результат побайтно совпадает с прежним путем.
+
+XML листа читается через закрытые атрибуты openpyxl (workbook._archive,
+worksheet._worksheet_path; проверено с версией из requirements.txt). Если
+в установленной версии их нет, split_workbook_to_csv бросает
+StreamingNotSupportedError, и вызывающий код переходит на прежний путь.
+"""
+
+import os
+from pathlib import Path
+from typing import Any, Iterator, List, Tuple
+
+import numpy as np
+import openpyxl
+import pandas as pd
+from openpyxl.cell.cell import ERROR_CODES
+from openpyxl.utils.cell import range_boundaries
+from openpyxl.xml.functions import iterparse
+from pandas.errors import EmptyDataError
+from pandas.io.parsers import TextParser
+
+# Поддержка как относительных, так и абсолютных импортов
+try:
+    from .excel_processor import normalize_table, write_csv
+    from .excel_utils_single_folder import filter_section_sheets, clean_value
+except ImportError:
+    from excel_processor import normalize_table, write_csv
+    from excel_utils_single_folder import filter_section_sheets, clean_value
+
+# Границы объединенного диапазона: (min_col, min_row, max_col, max_row)
+MergedRange = Tuple[int, int, int, int]
+
+
+class StreamingNotSupportedError(RuntimeError):
+    """Установленная версия openpyxl не дает доступа к XML листов книги"""
+
+
+def streaming_supported(workbook, sheets: List[str]) -> bool:
+    """
+    Проверяет, что у книги и ее листов есть закрытые атрибуты, через которые читается XML листа.
+
+    Args:
+        workbook: Книга openpyxl, открытая с read_only=True
+        sheets (List[str]): Имена листов
+
+    Returns:
+        bool: True, если read_merged_ranges может прочитать объединенные диапазоны листов
+    """
+    if not hasattr(getattr(workbook, '_archive', None), 'open'):
+        return False
+    return all(isinstance(getattr(workbook[sheet], '_worksheet_path', None), str) for sheet in sheets)
+
+
+def read_merged_ranges(workbook, worksheet) -> List[MergedRange]:
+    """
+    Читает объединенные диапазоны листа из раздела <mergeCells> его XML.
+
+    Лист в режиме read_only не хранит объединенные ячейки, поэтому XML
+    листа просматривается потоково без построения дерева.
+
+    Args:
+        workbook: Книга openpyxl, открытая с read_only=True
+        worksheet: Лист этой книги
+
+    Returns:
+        List[MergedRange]: Диапазоны в порядке первой строки
+    """
+    merged_ranges = []
+
+    with workbook._archive.open(worksheet._worksheet_path) as source:
+        for _, element in iterparse(source):
+            tag = element.tag.rsplit('}', 1)[-1]
+            if tag == 'mergeCell':
+                merged_ranges.append(range_boundaries(element.get('ref')))
+            if tag in ('row', 'mergeCell'):
+                element.clear()
+
+    return sorted(merged_ranges, key=lambda merged_range: merged_range[1])
+
+
+def iter_sheet_rows(worksheet, merged_ranges: List[MergedRange]) -> Iterator[List[Any]]:
+    """
+    Потоково возвращает значения строк листа с заполненными объединенными ячейками.
+
+    Значение левой верхней ячейки диапазона запоминается, когда поток
+    доходит до первой строки диапазона, и копируется в ячейки
+    активных диапазонов последующих строк. Значения очищаются clean_value.
+
+    Args:
+        worksheet: Лист openpyxl в режиме read_only
+        merged_ranges (List[MergedRange]): Диапазоны в порядке первой строки
+
+    Returns:
+        Iterator[List[Any]]: Значения строк начиная с первой
+    """
+    # Размеры в XML листа бывают неверными, поэтому читаем все строки
+    worksheet.reset_dimensions()
+
+    active: List[Tuple[int, int, int, Any]] = []
+    next_range = 0
+    row_number = 0
+
+    def fill(row: List[Any]) -> List[Any]:
+        nonlocal active, next_range
+        active = [interval for interval in active if interval[2] >= row_number]
+        while next_range < len(merged_ranges) and merged_ranges[next_range][1] <= row_number:
+            min_col, _, max_col, max_row = merged_ranges[next_range]
+            active.append((min_col, max_col, max_row, row[min_col - 1] if min_col <= len(row) else None))
+            next_range += 1
+
+        for min_col, max_col, _, value in active:
+            if len(row) < max_col:
+                row.extend([None] * (max_col - len(row)))
+            row[min_col - 1:max_col] = [value] * (max_col - min_col + 1)
+
+        return [clean_value(value) for value in row]
+
+    for values in worksheet.iter_rows(values_only=True):
+        row_number += 1
+        yield fill(list(values))
+
+    # Объединенные диапазоны могут заканчиваться ниже последней строки с данными
+    last_row = max([interval[2] for interval in active] + [max_row for *_, max_row in merged_ranges[next_range:]], default=0)
+    while row_number < last_row:
+        row_number += 1
+        yield fill([])
+
+
+def _convert_value(value: Any) -> Any:
+    """
+    Приводит значение ячейки так же, как pd.read_excel (движок openpyxl).
+
+    Args:
+        value (Any): Значение ячейки
+
+    Returns:
+        Any: "" для пустых ячеек, NaN для ошибок, int для целых чисел
+    """
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return np.nan if value in ERROR_CODES else value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return int(value) if int(value) == value else float(value)
+    return value
+
+
+def sheet_frame(rows: Iterator[List[Any]]) -> pd.DataFrame:
+    """
+    Собирает таблицу из строк листа так же, как pd.read_excel с параметрами по умолчанию.
+
+    Args:
+        rows (Iterator[List[Any]]): Значения строк листа
+
+    Returns:
+        pd.DataFrame: Таблица; первая строка листа - заголовки колонок
+    """
+    data = []
+    last_row_with_data = -1
+
+    for row_number, row in enumerate(rows):
+        converted_row = [_convert_value(value) for value in row]
+        while converted_row and converted_row[-1] == "":
+            converted_row.pop()
+        if converted_row:
+            last_row_with_data = row_number
+        data.append(converted_row)
+
+    data = data[:last_row_with_data + 1]
+    if not data:
+        return pd.DataFrame()
+
+    width = max(len(row) for row in data)
+    data = [row + [""] * (width - len(row)) for row in data]
+
+    try:
+        return TextParser(data, header=0, skip_blank_lines=False).read()
+    except EmptyDataError:
+        return pd.DataFrame()
+
+
+def split_workbook_to_csv(excel_path: str, output_dir: str) -> List[str]:
+    """
+    Сохраняет листы "Раздел ..." Excel файла в CSV файлы разделов за один проход по книге.
+
+    Args:
+        excel_path (str): Путь к Excel файлу
+        output_dir (str): Папка для CSV файлов ("Раздел X.csv")
+
+    Returns:
+        List[str]: Пути к созданным CSV файлам
+
+    Raises:
+        FileNotFoundError: Если файл не найден
+        ValueError: Если в файле нет листов, начинающихся с 'Раздел'
+        StreamingNotSupportedError: Если openpyxl не дает доступа к XML листов (файлы не создаются)
+    """
+    if not os.path.exists(excel_path):
+        raise FileNotFoundError(f"Файл не найден: {excel_path}")
+
+    workbook = openpyxl.load_workbook(excel_path, read_only=True, data_only=True, keep_links=False)
+    try:
+        section_sheets = filter_section_sheets(workbook.sheetnames)
+        if not section_sheets:
+            raise ValueError("Не найдено листов, начинающихся с 'Раздел'")
+        if not streaming_supported(workbook, section_sheets):
+            raise StreamingNotSupportedError(
+                f"openpyxl {openpyxl.__version__} не поддерживает потоковое чтение листов"
+            )
+
+        Path(output_dir).mkdir(exist_ok=True, parents=True)
+        created_files = []
+
+        for sheet in section_sheets:
+            worksheet = workbook[sheet]
+            rows = iter_sheet_rows(worksheet, read_merged_ranges(workbook, worksheet))
+            df = normalize_table(sheet_frame(rows))
+
+            if df is None:
+                print(f"Лист '{sheet}' пропущен: не найдены строка 'Наименование' или колонка '№ строки'")
+                continue
+
+            csv_path = os.path.join(output_dir, f"{sheet}.csv")
+            write_csv(df, csv_path)
+            created_files.append(csv_path)
+    finally:
+        workbook.close()
+
+    return created_files
@@ -9,6 +9,9 @@ import json
 import sys
 from pathlib import Path
 from region_visualizer_neo4j import RegionVisualizerNeo4j
+from geometry_lod import DEFAULT_LOD, LOD_TOLERANCES
+from map_figure import DEFAULT_MAP_RENDERER, MAP_RENDERERS
+from ETL.virtual_indicators import get_virtual_cache
 
 # Добавляем путь для импорта модулей tg_bot
 sys.path.append(str(Path(__file__).parent / 'tg_bot'))
@@ -294,16 +297,28 @@ def api_map_data(node_id: str, year: str):
     Args:
         node_id (str): ID узла в Neo4j
         year (str): Год для карты
+    
+    Query параметры:
+        lod: уровень детализации контуров регионов (full, medium, low)
+        renderer: способ рендера карты (traces, choropleth)
     """
     try:
         # Проверяем валидность года
         if year not in AVAILABLE_YEARS:
             return jsonify({'error': f'Недопустимый год: {year}'}), 400
         
+        lod = request.args.get('lod', DEFAULT_LOD)
+        if lod not in LOD_TOLERANCES:
+            return jsonify({'error': f'Недопустимый уровень детализации: {lod}'}), 400
+        
+        renderer = request.args.get('renderer', DEFAULT_MAP_RENDERER)
+        if renderer not in MAP_RENDERERS:
+            return jsonify({'error': f'Недопустимый способ рендера: {renderer}'}), 400
+        
         if not visualizer:
             return jsonify({'error': 'Визуализатор не инициализирован'}), 500
         
-        map_html = visualizer.get_regional_map_html(node_id, year)
+        map_html = visualizer.get_regional_map_html(node_id, year, lod=lod, renderer=renderer)
         
         if not map_html:
             return jsonify({'error': 'Не удалось сгенерировать карту'}), 500
@@ -311,6 +326,8 @@ def api_map_data(node_id: str, year: str):
         return jsonify({
             'node_id': node_id,
             'year': year,
+            'lod': lod,
+            'renderer': renderer,
             'map_html': map_html,
             'generated_at': datetime.now().isoformat()
         })
@@ -319,6 +336,38 @@ def api_map_data(node_id: str, year: str):
         logger.error(f"Ошибка API получения карты для узла {node_id}, год {year}: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/map/<node_id>/<year>/styles')
+def api_map_styles(node_id: str, year: str):
+    """
+    API эндпоинт для смены года на уже загруженной карте: значения, цвета и
+    подсказки регионов по индексам трасс (применяются через Plotly.restyle)
+    
+    Args:
+        node_id (str): ID узла в Neo4j
+        year (str): Год для карты
+    """
+    try:
+        if year not in AVAILABLE_YEARS:
+            return jsonify({'error': f'Недопустимый год: {year}'}), 400
+        
+        if not visualizer:
+            return jsonify({'error': 'Визуализатор не инициализирован'}), 500
+        
+        styles = visualizer.get_regional_map_styles(node_id, year)
+        
+        if not styles:
+            return jsonify({'error': f'Нет данных для карты за {year} год'}), 404
+        
+        return jsonify({
+            'node_id': node_id,
+            'year': year,
+            **styles
+        })
+        
+    except Exception as e:
+        logger.error(f"Ошибка API получения цветов карты для узла {node_id}, год {year}: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/chart/<node_id>')
 def api_chart_data(node_id: str):
     """
@@ -353,9 +402,12 @@ def api_clear_cache():
         global dashboard_cache
         cache_size = len(dashboard_cache)
         dashboard_cache.clear()
-        logger.info(f"Кеш очищен, удалено {cache_size} записей")
+        # Результаты виртуальных расчетных узлов
+        virtual_size = get_virtual_cache().clear()
+        logger.info(f"Кеш очищен, удалено {cache_size} записей, {virtual_size} результатов виртуальных узлов")
         return jsonify({
             'message': f'Кеш очищен, удалено {cache_size} записей',
+            'virtual_results_cleared': virtual_size,
             'cleared_at': datetime.now().isoformat()
         })
     except Exception as e:
@@ -371,6 +423,7 @@ def health_check():
             'timestamp': datetime.now().isoformat(),
             'visualizer_connected': visualizer is not None,
             'cache_size': len(dashboard_cache),
+            'virtual_cache': get_virtual_cache().stats(),
             'available_years': AVAILABLE_YEARS
         }
         
@@ -476,16 +529,26 @@ def get_map_html(node_id):
     """API эндпоинт для получения только HTML карты"""
     try:
         year = request.args.get('year', '2024')
+        lod = request.args.get('lod', DEFAULT_LOD)
+        if lod not in LOD_TOLERANCES:
+            return jsonify({'error': f'Недопустимый уровень детализации: {lod}'}), 400
+        
+        renderer = request.args.get('renderer', DEFAULT_MAP_RENDERER)
+        if renderer not in MAP_RENDERERS:
+            return jsonify({'error': f'Недопустимый способ рендера: {renderer}'}), 400
         
         if not visualizer:
             return jsonify({'error': 'Визуализатор не инициализирован'}), 500
         
         # Получаем HTML карты без встроенной Plotly для API
-        map_html = visualizer.get_regional_map_html(node_id, year, include_plotlyjs=False)
+        map_html = visualizer.get_regional_map_html(node_id, year, include_plotlyjs=False,
+                                                   lod=lod, renderer=renderer)
         
         return jsonify({
             'map_html': map_html,
             'year': year,
+            'lod': lod,
+            'renderer': renderer,
             'node_id': node_id
         })
         
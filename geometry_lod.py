@@ -0,0 +1,158 @@
+'''Сборка упрощенных контуров регионов для карт разного уровня детализации
+
+Запускается офлайн после обновления russia_regions.parquet:
+
+    python geometry_lod.py
+
+Для каждого уровня детализации (LOD) контуры всех регионов упрощаются
+вместе функцией shapely.coverage_simplify: общие границы соседних
+регионов упрощаются одинаково, поэтому между регионами не появляется
+щелей и наложений. Результат - russia_regions_lod.parquet с массивами
+x/y (внешние контуры, части мультиполигона разделены NaN - как в
+russia_regions.parquet). Из них же в памяти строится GeoJSON в
+EPSG:4326 для одно-трассового рендера карты (outlines_geojson).
+'''
+
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import shapely
+from pyproj import Transformer
+
+SOURCE_PATH = "russia_regions.parquet"
+LOD_PATH = "russia_regions_lod.parquet"
+
+# Система координат контуров (WGS 84 / UTM zone 46N)
+SOURCE_CRS = "EPSG:32646"
+
+# Допуск упрощения по уровням детализации, в метрах (координаты в UTM 46N);
+# None - исходные контуры
+LOD_TOLERANCES: Dict[str, Optional[float]] = {
+    "full": None,
+    "medium": 5000.0,
+    "low": 20000.0,
+}
+DEFAULT_LOD = "full"
+
+
+def outline_xy(geometry) -> Tuple[np.ndarray, np.ndarray]:
+    """Массивы x, y внешних контуров полигона или мультиполигона,
+    части разделены NaN
+    """
+    polygons = list(geometry.geoms) if geometry.geom_type == "MultiPolygon" else [geometry]
+    xs, ys = [], []
+    for index, polygon in enumerate(polygons):
+        if index:
+            xs.append([np.nan])
+            ys.append([np.nan])
+        coords = np.asarray(polygon.exterior.coords)
+        xs.append(coords[:, 0])
+        ys.append(coords[:, 1])
+    return np.concatenate(xs), np.concatenate(ys)
+
+
+def simplify_outlines(geometries: np.ndarray, tolerance: float) -> np.ndarray:
+    """Упрощение контуров всех регионов с сохранением общих границ"""
+    if hasattr(shapely, "coverage_simplify"):
+        return shapely.coverage_simplify(geometries, tolerance)
+    # shapely < 2.1: упрощение каждого региона отдельно (общие границы могут разойтись)
+    return shapely.simplify(geometries, tolerance, preserve_topology=True)
+
+
+def build_lod_table(regions: pd.DataFrame) -> pd.DataFrame:
+    """Таблица region, lod, x, y для всех уровней детализации
+
+    Args:
+        regions: таблица russia_regions.parquet (region, geometry в WKB, x, y)
+    """
+    geometries = shapely.from_wkb(regions["geometry"].to_numpy())
+    rows = []
+
+    for lod, tolerance in LOD_TOLERANCES.items():
+        if tolerance is None:
+            outlines = zip(regions["x"], regions["y"])
+        else:
+            outlines = (outline_xy(geometry) for geometry in simplify_outlines(geometries, tolerance))
+
+        for region, (x, y) in zip(regions["region"], outlines):
+            rows.append({"region": region, "lod": lod,
+                         "x": np.asarray(x, dtype=float), "y": np.asarray(y, dtype=float)})
+
+    return pd.DataFrame(rows)
+
+
+def load_lod_outlines(regions: pd.DataFrame, path: str = LOD_PATH) -> Dict[str, Tuple[List[np.ndarray], List[np.ndarray]]]:
+    """Контуры регионов по уровням детализации в порядке regions
+
+    Читает результат офлайн сборки; если файла нет или он собран для
+    другого набора регионов, контуры упрощаются в памяти.
+
+    Returns:
+        {lod: (список x по регионам, список y по регионам)}
+    """
+    table = None
+    if os.path.exists(path):
+        table = pd.read_parquet(path)
+        if set(table["region"]) != set(regions["region"]) or set(table["lod"]) != set(LOD_TOLERANCES):
+            print(f"{path} не соответствует {SOURCE_PATH}, контуры упрощаются в памяти")
+            table = None
+    if table is None:
+        table = build_lod_table(regions)
+
+    outlines = {}
+    for lod, group in table.groupby("lod", sort=False):
+        group = group.set_index("region").loc[regions["region"]]
+        outlines[lod] = (list(group["x"]), list(group["y"]))
+    return outlines
+
+
+def outlines_geojson(names: List[str], xs: List[np.ndarray], ys: List[np.ndarray],
+                     precision: int = 5) -> Dict[str, Any]:
+    """GeoJSON регионов в EPSG:4326 из массивов x/y контуров
+
+    Кольца ориентированы по часовой стрелке (так их ожидает d3 в plotly),
+    долготы восточнее 180° не переносятся в отрицательные, чтобы контуры
+    Чукотки не разрывались. id объекта - название региона.
+
+    Args:
+        names: названия регионов
+        xs, ys: контуры регионов в SOURCE_CRS, части разделены NaN
+        precision: число знаков после запятой в градусах (5 - около метра)
+    """
+    transformer = Transformer.from_crs(SOURCE_CRS, "EPSG:4326", always_xy=True)
+    features = []
+
+    for name, x, y in zip(names, xs, ys):
+        lon, lat = transformer.transform(x, y)
+        lon = np.where(lon < 0, lon + 360, lon)
+        breaks = np.flatnonzero(np.isnan(x))
+
+        polygons = []
+        for ring_lon, ring_lat in zip(np.split(lon, breaks), np.split(lat, breaks)):
+            ring = np.column_stack([ring_lon, ring_lat])
+            ring = np.round(ring[np.isfinite(ring).all(axis=1)], precision)
+            if len(ring) < 4:
+                continue
+            # Удвоенная ориентированная площадь > 0 - обход против часовой стрелки
+            area = np.dot(ring[:-1, 0], ring[1:, 1]) - np.dot(ring[1:, 0], ring[:-1, 1])
+            if area > 0:
+                ring = ring[::-1]
+            polygons.append([ring.tolist()])
+
+        features.append({"type": "Feature", "id": name, "properties": {"region": name},
+                         "geometry": {"type": "MultiPolygon", "coordinates": polygons}})
+
+    return {"type": "FeatureCollection", "features": features}
+
+
+if __name__ == "__main__":
+    source = pd.read_parquet(SOURCE_PATH)
+    lod_table = build_lod_table(source)
+    lod_table.to_parquet(LOD_PATH, index=False)
+
+    for lod, group in lod_table.groupby("lod", sort=False):
+        points = sum(len(x) for x in group["x"])
+        print(f"{lod}: допуск {LOD_TOLERANCES[lod]}, точек {points}")
+    print(f"Сохранено в {LOD_PATH} ({os.path.getsize(LOD_PATH) / 1024:.0f} КБ)")
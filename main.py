@@ -69,6 +69,40 @@ class SystemCoordinator:
             logger.error(f"❌ Ошибка подключения к Neo4j: {e}")
             return False
     
+    async def check_graph_schema(self) -> bool:
+        """Создание ограничений и индексов графа и проверка их состояния"""
+        try:
+            from neo4j import GraphDatabase
+            from ETL.graph_schema import bootstrap_schema, format_schema_report
+            
+            config = load_neo4j_config()
+            driver = GraphDatabase.driver(
+                config['NEO4J_URI'],
+                auth=(config['NEO4J_USERNAME'], config['NEO4J_PASSWORD'])
+            )
+            
+            try:
+                report = bootstrap_schema(driver, config['NEO4J_DATABASE'])
+            finally:
+                driver.close()
+            
+            for line in format_schema_report(report):
+                logger.info(line)
+            
+            if report['failed']:
+                logger.error("❌ Не все ограничения и индексы созданы")
+                return False
+            
+            if not report['all_online']:
+                logger.warning("⏳ Индексы еще заполняются")
+            
+            logger.info("✅ Схема графа актуальна")
+            return True
+            
+        except Exception as e:
+            logger.error(f"❌ Ошибка проверки схемы графа: {e}")
+            return False
+    
     def check_required_files(self) -> bool:
         """Проверка наличия всех необходимых файлов"""
         try:
@@ -138,7 +172,8 @@ class SystemCoordinator:
             ("Конфигурация системы", validate_system_config),
             ("Необходимые файлы", self.check_required_files),
             ("Переменные окружения", self.check_environment),
-            ("Neo4j подключение", self.check_neo4j_connection)
+            ("Neo4j подключение", self.check_neo4j_connection),
+            ("Схема графа", self.check_graph_schema)
         ]
         
         all_passed = True
@@ -1,12 +1,33 @@
 '''Класс для слоя подложки карты России'''
 
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
 import pandas as pd
 import geopandas as gpd
 import plotly.graph_objects as go
+import plotly.io as pio
 from shapely.geometry import Point
 
+from geometry_lod import DEFAULT_LOD, LOD_TOLERANCES, load_lod_outlines, outlines_geojson
+
 REGIONS = pd.read_parquet("russia_regions.parquet")
 
+# Названия регионов в порядке трасс карты
+REGION_NAMES: List[str] = REGIONS['region'].tolist()
+
+# Контуры регионов по уровням детализации (см. geometry_lod.py)
+REGION_OUTLINES = load_lod_outlines(REGIONS)
+
+# Способы рендера карты: traces - трасса Scatter на каждый регион (mapFigure),
+# choropleth - одна трасса Choropleth по GeoJSON регионов
+MAP_RENDERERS = ("traces", "choropleth")
+DEFAULT_MAP_RENDERER = "traces"
+
+# Базовая заливка и цвет границ регионов
+BASE_FILLCOLOR = 'lightblue'
+LINE_COLOR = 'grey'
+
 def convert_crs(x_arr, y_arr, to_crs='EPSG:32646', from_crs="EPSG:4326"):
     """Преобразование значений координат в массивах x_arr и y_arr
     из географической системы отсчёта from_crs в систему to_crs
@@ -18,28 +39,32 @@ def convert_crs(x_arr, y_arr, to_crs='EPSG:32646', from_crs="EPSG:4326"):
 
 class mapFigure(go.Figure):
     """ Шаблон фигуры для рисования поверх карты России
+
+    lod - уровень детализации контуров регионов (ключ LOD_TOLERANCES)
     """
     def __init__(self, # дефолтные параметры plotly
         data=None, layout=None, frames=None, skip_invalid=False, 
+        lod=DEFAULT_LOD, # уровень детализации контуров
         **kwargs # аргументы (см. документацию к plotly.graph_objects.Figure())
     ):
         # создаём plotlу фигуру с дефолтными параметрами
         super().__init__(data, layout, frames, skip_invalid, **kwargs)
 
         # прорисовка регионов
-        for i, r in REGIONS.iterrows():
-            self.add_trace(go.Scatter(x=r.x, y=r.y,
-                                      name=r.region,
-                                      text=r.region,
+        xs, ys = REGION_OUTLINES[lod]
+        for region, x, y in zip(REGION_NAMES, xs, ys):
+            self.add_trace(go.Scatter(x=x, y=y,
+                                      name=region,
+                                      text=region,
                                       hoverinfo="text",
-                                      line_color='grey',
+                                      line_color=LINE_COLOR,
                                       fill='toself',
                                       line_width=1,
-                                      fillcolor='lightblue',
+                                      fillcolor=BASE_FILLCOLOR,
                                       showlegend=False,
                                       mode='lines',
                                       # Делаем регионы кликабельными
-                                      customdata=[r.region]
+                                      customdata=[region]
             ))
         
         # не отображать оси, уравнять масштаб по осям
@@ -49,4 +74,92 @@ class mapFigure(go.Figure):
         # чтобы покрасивее вписывалась карта на поверхности фигуры
         self.update_layout(showlegend=False, dragmode='pan',
                            autosize=True,
-                           margin={'l': 10, 'b': 10, 't': 50, 'r': 10})
\ No newline at end of file
+                           margin={'l': 10, 'b': 10, 't': 50, 'r': 10})
+
+
+@lru_cache(maxsize=len(LOD_TOLERANCES))
+def base_figure_template(lod: str = DEFAULT_LOD) -> Dict[str, Any]:
+    """Шаблон карты: mapFigure, один раз на процесс и уровень детализации
+    сериализованный в словарь plotly (массивы координат регионов не копируются при рендере)
+    """
+    return mapFigure(lod=lod).to_plotly_json()
+
+
+@lru_cache(maxsize=len(LOD_TOLERANCES))
+def base_choropleth_template(lod: str = DEFAULT_LOD) -> Dict[str, Any]:
+    """Шаблон карты из одной трассы Choropleth по GeoJSON регионов.
+
+    Регион i имеет z=i, поэтому цвет каждого региона задается своей точкой
+    шкалы colorscale. Проекция - поперечная Меркатора, как у исходных
+    контуров (UTM); осевой меридиан plotly выбирает по середине регионов.
+    """
+    xs, ys = REGION_OUTLINES[lod]
+    last = len(REGION_NAMES) - 1
+    figure = go.Figure(go.Choropleth(
+        geojson=outlines_geojson(REGION_NAMES, xs, ys),
+        locations=REGION_NAMES,
+        z=list(range(len(REGION_NAMES))),
+        zmin=0, zmax=last,
+        colorscale=[[0, BASE_FILLCOLOR], [1, BASE_FILLCOLOR]],
+        showscale=False,
+        text=REGION_NAMES,
+        hoverinfo='text',
+        hoverlabel={'bgcolor': LINE_COLOR},
+        marker={'line': {'color': LINE_COLOR, 'width': 1}},
+        customdata=REGION_NAMES,
+    ))
+
+    # фон как у области построения mapFigure, без подложки мира
+    figure.update_geos(visible=False, fitbounds='locations',
+                       bgcolor=pio.templates[pio.templates.default].layout.plot_bgcolor,
+                       projection_type='transverse mercator')
+    figure.update_layout(showlegend=False, dragmode='pan',
+                         autosize=True,
+                         margin={'l': 10, 'b': 10, 't': 50, 'r': 10})
+    return figure.to_plotly_json()
+
+
+def patch_choropleth_figure(region_styles: Dict[int, Dict[str, Any]],
+                            layout: Optional[Dict[str, Any]] = None,
+                            lod: str = DEFAULT_LOD) -> Dict[str, Any]:
+    """Одно-трассовая фигура карты: цвета и подсказки регионов - массивы трассы"""
+    template = base_choropleth_template(lod)
+    colors = [BASE_FILLCOLOR] * len(REGION_NAMES)
+    text = list(REGION_NAMES)
+    for index, style in region_styles.items():
+        colors[index] = style.get('fillcolor', colors[index])
+        text[index] = style.get('text', text[index])
+
+    last = len(REGION_NAMES) - 1
+    trace = {**template['data'][0], 'text': text,
+             'colorscale': [[index / last, color] for index, color in enumerate(colors)]}
+
+    return {'data': [trace], 'layout': {**template['layout'], **(layout or {})}}
+
+
+def patch_map_figure(region_styles: Dict[int, Dict[str, Any]],
+                     layout: Optional[Dict[str, Any]] = None,
+                     lod: str = DEFAULT_LOD,
+                     renderer: str = DEFAULT_MAP_RENDERER) -> Dict[str, Any]:
+    """Фигура карты из шаблона с измененными свойствами трасс регионов.
+
+    Копируются только словари трасс, массивы координат общие с шаблоном.
+
+    Args:
+        region_styles: свойства трасс (fillcolor, text) по индексу региона в REGION_NAMES
+        layout: свойства layout, заменяющие свойства шаблона верхнего уровня
+        lod: уровень детализации контуров регионов (ключ LOD_TOLERANCES)
+        renderer: способ рендера (MAP_RENDERERS)
+
+    Returns:
+        словарь фигуры для plotly.io.to_html(..., validate=False)
+    """
+    if renderer == 'choropleth':
+        return patch_choropleth_figure(region_styles, layout, lod)
+
+    template = base_figure_template(lod)
+    data = list(template['data'])
+    for index, style in region_styles.items():
+        data[index] = {**data[index], **style}
+
+    return {'data': data, 'layout': {**template['layout'], **(layout or {})}}
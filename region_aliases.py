@@ -0,0 +1,194 @@
+'''Сохраняемый индекс названий регионов: Neo4j (Регион.name) -> регион карты
+
+Идентификатор региона - его название в russia_regions.parquet. Индекс
+хранится в region_aliases.json:
+
+    {
+        "regions": {"Москва": {"map_name": "Москва", "neo4j_names": ["г. Москва"]}, ...},
+        "unmatched": ["Российская Федерация", ...],
+        "overrides": {"г. Москва": "Москва", "Всего по России": null}
+    }
+
+overrides заполняются вручную и имеют приоритет над нечетким поиском
+(null - название не сопоставлять). Сопоставление известного названия -
+поиск в словаре; нечеткий поиск выполняется только для новых названий,
+результат сразу добавляется в индекс и сохраняется.
+
+Сборка индекса по всем регионам Neo4j:
+
+    python region_aliases.py --config neo4j_config.json
+'''
+
+import argparse
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
+from fuzzywuzzy import fuzz, process
+
+REGION_ALIASES_PATH = "region_aliases.json"
+
+# Порог схожести названий для нечеткого поиска, %
+MATCH_THRESHOLD = 70
+
+
+def normalize_name(name: str) -> str:
+    """Ключ индекса: регистр, ё, тире и пробелы не различаются"""
+    name = name.casefold().replace('ё', 'е')
+    name = re.sub(r'[‐-―−]', '-', name)
+    return re.sub(r'\s+', ' ', name).strip()
+
+
+class RegionAliasIndex:
+    """Индекс названий регионов из Neo4j для регионов карты"""
+
+    def __init__(self, map_regions: List[str], path: str = REGION_ALIASES_PATH,
+                 threshold: int = MATCH_THRESHOLD):
+        """
+        Args:
+            map_regions: названия регионов карты (идентификаторы регионов)
+            path: файл индекса; если его нет, индекс создается при первом сохранении
+            threshold: порог схожести нечеткого поиска, %
+        """
+        self.map_regions = list(map_regions)
+        self.path = path
+        self.threshold = threshold
+        self.regions: Dict[str, Dict[str, Any]] = {
+            region: {"map_name": region, "neo4j_names": []} for region in self.map_regions
+        }
+        self.unmatched: List[str] = []
+        self.overrides: Dict[str, Optional[str]] = {}
+        # нормализованное название -> регион карты (None - не сопоставляется)
+        self._lookup: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+
+        self.load()
+
+    def load(self) -> None:
+        """Загружает индекс из файла и строит словарь поиска"""
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for region, entry in data.get("regions", {}).items():
+                if region in self.regions:
+                    self.regions[region]["neo4j_names"] = list(entry.get("neo4j_names", []))
+                else:
+                    print(f"Регион индекса {region} отсутствует на карте, пропущен")
+            self.unmatched = list(data.get("unmatched", []))
+            self.overrides = dict(data.get("overrides", {}))
+
+        self._build_lookup()
+
+    def _build_lookup(self) -> None:
+        """Словарь поиска: названия карты, найденные ранее названия, ручные сопоставления"""
+        lookup = {normalize_name(region): region for region in self.map_regions}
+        for region, entry in self.regions.items():
+            for name in entry["neo4j_names"]:
+                lookup[normalize_name(name)] = region
+        for name in self.unmatched:
+            lookup.setdefault(normalize_name(name), None)
+        for name, region in self.overrides.items():
+            if region is not None and region not in self.regions:
+                print(f"Ручное сопоставление {name} -> {region}: региона нет на карте, пропущено")
+                continue
+            lookup[normalize_name(name)] = region
+        self._lookup = lookup
+
+    def save(self) -> None:
+        """Сохраняет индекс (через временный файл, чтобы не оставить его частично записанным)"""
+        data = {"regions": self.regions, "unmatched": self.unmatched, "overrides": self.overrides}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def _add(self, name: str) -> Optional[str]:
+        """Нечеткий поиск нового названия и добавление результата в индекс"""
+        best_match = process.extractOne(name, self.map_regions, scorer=fuzz.ratio)
+
+        if best_match and best_match[1] >= self.threshold:
+            region = best_match[0]
+            self.regions[region]["neo4j_names"].append(name)
+            print(f"Сопоставлен регион: {name} -> {region} (схожесть: {best_match[1]}%)")
+        else:
+            region = None
+            self.unmatched.append(name)
+            print(f"Не удалось сопоставить регион: {name}")
+
+        self._lookup[normalize_name(name)] = region
+        return region
+
+    def resolve_many(self, names: List[str]) -> Dict[str, str]:
+        """
+        Сопоставляет названия регионов с регионами карты.
+
+        Args:
+            names: названия регионов из Neo4j
+
+        Returns:
+            {название: регион карты} для сопоставленных названий
+        """
+        matches = {}
+        unseen = []
+
+        for name in names:
+            key = normalize_name(name)
+            if key in self._lookup:
+                if self._lookup[key] is not None:
+                    matches[name] = self._lookup[key]
+            else:
+                unseen.append(name)
+
+        if unseen:
+            with self._lock:
+                for name in unseen:
+                    key = normalize_name(name)
+                    # другой поток мог добавить название, пока ждали блокировку
+                    region = self._lookup[key] if key in self._lookup else self._add(name)
+                    if region is not None:
+                        matches[name] = region
+                try:
+                    self.save()
+                except OSError as e:
+                    # индекс в памяти уже обновлен, карта строится и без сохранения
+                    print(f"Не удалось сохранить индекс регионов {self.path}: {str(e)}")
+
+        return matches
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Регион карты для одного названия или None"""
+        return self.resolve_many([name]).get(name)
+
+
+if __name__ == "__main__":
+    import pandas as pd
+    from neo4j import GraphDatabase
+
+    parser = argparse.ArgumentParser(description="Сборка индекса названий регионов Neo4j -> карта")
+    parser.add_argument("--config", default="neo4j_config.json", help="Путь к конфигурации Neo4j")
+    parser.add_argument("--rebuild", action="store_true", help="Заново сопоставить все названия (ручные сопоставления сохраняются)")
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    index = RegionAliasIndex(pd.read_parquet("russia_regions.parquet")['region'].tolist())
+    if args.rebuild:
+        for entry in index.regions.values():
+            entry["neo4j_names"] = []
+        index.unmatched = []
+        index._build_lookup()
+
+    driver = GraphDatabase.driver(config["NEO4J_URI"], auth=(config["NEO4J_USERNAME"], config["NEO4J_PASSWORD"]))
+    try:
+        with driver.session(database=config["NEO4J_DATABASE"]) as session:
+            names = [record["name"] for record in session.run("MATCH (r:Регион) RETURN DISTINCT r.name AS name")]
+    finally:
+        driver.close()
+
+    matches = index.resolve_many(names)
+    index.save()
+    print(f"Названий регионов в Neo4j: {len(names)}, сопоставлено: {len(matches)}, "
+          f"не сопоставлено: {len(index.unmatched)}. Индекс сохранен в {index.path}")
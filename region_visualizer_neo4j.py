@@ -6,9 +6,14 @@ from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Any
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 from fuzzywuzzy import fuzz, process
-from map_figure import mapFigure
+from map_figure import BASE_FILLCOLOR, DEFAULT_MAP_RENDERER, REGION_NAMES, patch_map_figure
+from geometry_lod import DEFAULT_LOD
+from region_aliases import RegionAliasIndex
 from neo4j import GraphDatabase
+from ETL.regional_layout import unpack_regional_values
+from ETL.virtual_indicators import VirtualIndicatorResolver
 import warnings
 
 # Подавляем предупреждения pandas
@@ -32,6 +37,8 @@ class RegionVisualizerNeo4j:
         self.config = self._load_neo4j_config(config_path)
         self.driver = None
         self.years = ["2016", "2017", "2018", "2019", "2020", "2021", "2022", "2023", "2024"]
+        # Сохраненный индекс названий регионов Neo4j -> карта
+        self.region_index = RegionAliasIndex(REGION_NAMES)
         print(f"Инициализирован RegionVisualizerNeo4j с годами: {self.years}")
         
     def _load_neo4j_config(self, config_path: str) -> Dict[str, str]:
@@ -91,12 +98,26 @@ class RegionVisualizerNeo4j:
                 WHERE elementId(n) = $node_id 
                 RETURN n.name as name, n.полное_название as full_name, 
                        n.table_number as table_number, n.column as column, 
-                       n.row as row, n.years as years, n.federal_values as federal_values
+                       n.row as row, n.years as years, n.federal_values as federal_values,
+                       n.virtual as virtual
                 """
                 
                 result = session.run(query, {"node_id": node_id})
                 record = result.single()
                 
+                if record and record.get("virtual"):
+                    # Виртуальный расчетный узел: значения вычисляются по формуле
+                    node_data = self.get_virtual_node_data(node_id)
+                    return {
+                        "name": record["name"],
+                        "full_name": record["full_name"],
+                        "table_number": None,
+                        "column": None,
+                        "row": None,
+                        "years": node_data["years"],
+                        "federal_values": node_data["federal_values"]
+                    }
+                
                 if record:
                     return {
                         "name": record["name"],
@@ -115,6 +136,19 @@ class RegionVisualizerNeo4j:
             print(f"Ошибка при получении информации о узле {node_id}: {str(e)}")
             return {}
     
+    def get_virtual_node_data(self, node_id: str) -> Dict[str, Any]:
+        """
+        Вычисляет (или берет из кеша) значения виртуального расчетного узла
+        
+        Args:
+            node_id (str): ID узла в Neo4j
+            
+        Returns:
+            Dict[str, Any]: years, federal_values, regions, regional_values
+        """
+        resolver = VirtualIndicatorResolver(self.driver, self.config["NEO4J_DATABASE"], self.years)
+        return resolver.get_node_data(node_id)
+    
     def get_regional_data(self, node_id: str, year: str) -> Dict[str, float]:
         """
         Получение региональных данных для указанного узла и года
@@ -128,6 +162,38 @@ class RegionVisualizerNeo4j:
         """
         try:
             with self.driver.session(database=self.config["NEO4J_DATABASE"]) as session:
+                # Компактное хранение: регионы и значения в свойствах узла
+                layout_query = """
+                MATCH (n)
+                WHERE elementId(n) = $node_id
+                RETURN n.years as years, n.region_keys as region_keys, n.regional_values as regional_values,
+                       n.virtual as virtual
+                """
+                layout_record = session.run(layout_query, {"node_id": node_id}).single()
+                
+                if layout_record and layout_record.get("virtual"):
+                    node_data = self.get_virtual_node_data(node_id)
+                    year_index = node_data["years"].index(str(year)) if str(year) in node_data["years"] else None
+                    regional_data = {
+                        region_name: float(region_values[year_index])
+                        for region_name, region_values in zip(node_data["regions"], node_data["regional_values"])
+                        if year_index is not None and region_values[year_index] is not None
+                    }
+                    print(f"Получено данных по {len(regional_data)} регионам за {year} год (виртуальный узел)")
+                    return regional_data
+                
+                unpacked = unpack_regional_values(dict(layout_record), [year]) if layout_record else None
+                
+                if unpacked is not None:
+                    regions, values = unpacked
+                    regional_data = {
+                        region_name: float(region_values[0])
+                        for region_name, region_values in zip(regions, values)
+                        if region_values[0] is not None
+                    }
+                    print(f"Получено данных по {len(regional_data)} регионам за {year} год (массивы узла)")
+                    return regional_data
+                
                 query = f"""
                 MATCH (n)-[r:ПоРегион]->(region:Регион)
                 WHERE elementId(n) = $node_id
@@ -172,7 +238,10 @@ class RegionVisualizerNeo4j:
     
     def match_region_names(self, neo4j_regions: List[str], map_regions: List[str]) -> Dict[str, str]:
         """
-        Сопоставляет названия регионов из Neo4j с названиями регионов на карте используя нечеткий поиск.
+        Сопоставляет названия регионов из Neo4j с названиями регионов на карте.
+        
+        Для регионов карты REGION_NAMES используется сохраненный индекс названий
+        (region_aliases.py): нечеткий поиск выполняется только для новых названий.
         
         Args:
             neo4j_regions (List[str]): Список названий регионов из Neo4j
@@ -181,6 +250,10 @@ class RegionVisualizerNeo4j:
         Returns:
             Dict[str, str]: Словарь сопоставления {neo4j_region: map_region_name}
         """
+        if list(map_regions) == self.region_index.map_regions:
+            return self.region_index.resolve_many(neo4j_regions)
+        
+        # Другой набор регионов карты - нечеткий поиск для каждого названия
         matches = {}
         
         for neo4j_region in neo4j_regions:
@@ -220,6 +293,75 @@ class RegionVisualizerNeo4j:
         
         return f'rgb({red}, {green}, {blue})'
     
+    def get_map_title(self, node_info: Dict[str, Any], year: str) -> str:
+        """Заголовок карты узла за год"""
+        return f"{node_info.get('full_name', node_info.get('name', 'Узел'))} - {year} год"
+    
+    def get_region_styles(self, node_info: Dict[str, Any], year: str,
+                          map_data: Dict[str, float]) -> Dict[int, Dict[str, str]]:
+        """
+        Цвет заливки и текст подсказки регионов карты
+        
+        Args:
+            node_info (Dict[str, Any]): Информация об узле
+            year (str): Год данных
+            map_data (Dict[str, float]): Значения по названиям регионов карты
+            
+        Returns:
+            Dict[int, Dict[str, str]]: {индекс трассы региона: {'text', 'fillcolor'}};
+                у регионов без данных fillcolor нет (базовый цвет шаблона)
+        """
+        # Определяем диапазон значений для градиента
+        values = list(map_data.values())
+        min_value = min(values)
+        max_value = max(values)
+        
+        print(f"Диапазон значений: {min_value:.2f} - {max_value:.2f}")
+        
+        indicator_name = node_info.get("full_name", node_info.get("name", ""))
+        region_styles = {}
+        
+        for index, region_name in enumerate(REGION_NAMES):
+            if region_name in map_data:
+                value = map_data[region_name]
+                
+                # Форматируем текст для подсказки
+                value_text = f"Значение: <b>{value:,.2f}</b>".replace(',', ' ')
+                region_styles[index] = {
+                    'text': f'<b>{region_name}</b><br>{indicator_name}<br>Год: {year}<br>{value_text}',
+                    'fillcolor': self.get_color(value, min_value, max_value)
+                }
+            else:
+                # Регион без данных остается с базовым цветом
+                region_styles[index] = {'text': f'<b>{region_name}</b><br>Нет данных'}
+        
+        return region_styles
+    
+    def build_regional_map_figure(self, node_info: Dict[str, Any], year: str, map_data: Dict[str, float],
+                                  layout: Optional[Dict[str, Any]] = None, lod: str = DEFAULT_LOD,
+                                  renderer: str = DEFAULT_MAP_RENDERER) -> Dict[str, Any]:
+        """
+        Строит фигуру карты из шаблона map_figure: у трасс регионов меняются
+        только цвет заливки и текст подсказки
+        
+        Args:
+            node_info (Dict[str, Any]): Информация об узле
+            year (str): Год данных
+            map_data (Dict[str, float]): Значения по названиям регионов карты
+            layout (Optional[Dict[str, Any]]): Дополнительные свойства layout
+            lod (str): Уровень детализации контуров регионов (full, medium, low)
+            renderer (str): Способ рендера: traces - трасса на регион, choropleth - одна трасса
+            
+        Returns:
+            Dict[str, Any]: Словарь фигуры plotly
+        """
+        region_styles = self.get_region_styles(node_info, year, map_data)
+        
+        # Добавляем заголовок
+        title = self.get_map_title(node_info, year)
+        return patch_map_figure(region_styles, {'title': {'text': title}, **(layout or {})},
+                                lod=lod, renderer=renderer)
+    
     def create_regional_map(self, node_id: str, year: str) -> None:
         """
         Создает интерактивную карту России с региональными данными из Neo4j
@@ -247,17 +389,9 @@ class RegionVisualizerNeo4j:
             print("Не удалось получить региональные данные")
             return
         
-        # Загружаем данные карты для сопоставления названий
-        try:
-            regions_df = pd.read_parquet("russia_regions.parquet")
-            map_regions = regions_df['region'].tolist()
-        except Exception as e:
-            print(f"Ошибка при загрузке данных карты: {str(e)}")
-            return
-        
-        # Сопоставляем названия регионов
+        # Сопоставляем названия регионов с регионами карты
         neo4j_regions = list(regional_data.keys())
-        region_matches = self.match_region_names(neo4j_regions, map_regions)
+        region_matches = self.match_region_names(neo4j_regions, REGION_NAMES)
         
         # Создаем сопоставленные данные для карты
         map_data = {}
@@ -271,47 +405,9 @@ class RegionVisualizerNeo4j:
         
         print(f"Сопоставлено данных по {len(map_data)} регионам")
         
-        # Создаем базовую карту
-        russia_map = mapFigure()
-        
-        # Определяем диапазон значений для градиента
-        values = list(map_data.values())
-        min_value = min(values)
-        max_value = max(values)
-        
-        print(f"Диапазон значений: {min_value:.2f} - {max_value:.2f}")
-        
-        # Обновляем карту с данными
-        for i, r in regions_df.iterrows():
-            region_name = r.region
-            
-            if region_name in map_data:
-                value = map_data[region_name]
-                color = self.get_color(value, min_value, max_value)
-                
-                # Форматируем текст для подсказки
-                value_text = f"Значение: <b>{value:,.2f}</b>".replace(',', ' ')
-                text = f'<b>{region_name}</b><br>{node_info.get("full_name", node_info.get("name", ""))}<br>Год: {year}<br>{value_text}'
-                
-                russia_map.update_traces(
-                    selector=dict(name=region_name),
-                    text=text,
-                    fillcolor=color
-                )
-            else:
-                # Регион без данных остается с базовым цветом
-                text = f'<b>{region_name}</b><br>Нет данных'
-                russia_map.update_traces(
-                    selector=dict(name=region_name),
-                    text=text
-                )
-        
-        # Добавляем заголовок
-        title = f"{node_info.get('full_name', node_info.get('name', 'Узел'))} - {year} год"
-        russia_map.update_layout(title=title)
-        
-        # Отображаем карту
-        russia_map.show()
+        # Строим карту из шаблона и отображаем ее
+        russia_map = self.build_regional_map_figure(node_info, year, map_data)
+        pio.show(russia_map, validate=False)
     
     def create_federal_chart(self, node_id: str) -> None:
         """
@@ -382,7 +478,90 @@ class RegionVisualizerNeo4j:
         # Отображаем график
         fig.show()
     
-    def get_regional_map_html(self, node_id: str, year: str, include_plotlyjs: bool = False) -> str:
+    def get_map_data(self, node_id: str, year: str) -> Optional[Tuple[Dict[str, Any], Dict[str, float]]]:
+        """
+        Информация об узле и значения по регионам карты за год
+        
+        Args:
+            node_id (str): ID узла в Neo4j
+            year (str): Год данных
+            
+        Returns:
+            Optional[Tuple[Dict[str, Any], Dict[str, float]]]: (информация об узле,
+                {регион карты: значение}) или None, если данных нет
+        """
+        # Подключаемся к Neo4j
+        if not self.driver:
+            self.connect()
+        
+        # Получаем информацию о узле
+        node_info = self.get_node_info(node_id)
+        if not node_info:
+            print("Не удалось получить информацию о узле")
+            return None
+        
+        # Получаем региональные данные
+        regional_data = self.get_regional_data(node_id, year)
+        
+        if not regional_data:
+            print("Не удалось получить региональные данные")
+            return None
+        
+        # Сопоставляем названия регионов с регионами карты
+        neo4j_regions = list(regional_data.keys())
+        region_matches = self.match_region_names(neo4j_regions, REGION_NAMES)
+        
+        # Создаем сопоставленные данные для карты
+        map_data = {}
+        for neo4j_region, map_region in region_matches.items():
+            if neo4j_region in regional_data:
+                map_data[map_region] = regional_data[neo4j_region]
+        
+        if not map_data:
+            print("Не удалось сопоставить данные с регионами карты")
+            return None
+        
+        print(f"Сопоставлено данных по {len(map_data)} регионам")
+        
+        return node_info, map_data
+    
+    def get_regional_map_styles(self, node_id: str, year: str) -> Optional[Dict[str, Any]]:
+        """
+        Данные для перекраски уже загруженной карты без построения фигуры:
+        значения, цвета и подсказки всех регионов в порядке трасс карты
+        
+        Args:
+            node_id (str): ID узла в Neo4j
+            year (str): Год данных
+            
+        Returns:
+            Optional[Dict[str, Any]]: {'title', 'trace_indices', 'values', 'fillcolor', 'text'}
+                или None при ошибке
+        """
+        try:
+            prepared = self.get_map_data(node_id, year)
+            if not prepared:
+                return None
+            node_info, map_data = prepared
+            
+            region_styles = self.get_region_styles(node_info, year, map_data)
+            trace_indices = list(range(len(REGION_NAMES)))
+            
+            return {
+                'title': self.get_map_title(node_info, year),
+                'trace_indices': trace_indices,
+                'values': [map_data.get(region_name) for region_name in REGION_NAMES],
+                # Регионам без данных возвращаем базовый цвет: на карте может остаться цвет прошлого года
+                'fillcolor': [region_styles[index].get('fillcolor', BASE_FILLCOLOR) for index in trace_indices],
+                'text': [region_styles[index]['text'] for index in trace_indices]
+            }
+            
+        except Exception as e:
+            print(f"Ошибка при подготовке данных перекраски карты: {str(e)}")
+            return None
+    
+    def get_regional_map_html(self, node_id: str, year: str, include_plotlyjs: bool = False,
+                              lod: str = DEFAULT_LOD, renderer: str = DEFAULT_MAP_RENDERER) -> str:
         """
         Создает интерактивную карту России и возвращает HTML для веб-интеграции
         
@@ -390,106 +569,40 @@ class RegionVisualizerNeo4j:
             node_id (str): ID узла в Neo4j
             year (str): Год для отображения данных (2021, 2022, 2023, 2024)
             include_plotlyjs (bool): Включать ли Plotly библиотеку в HTML (для первого рендера)
+            lod (str): Уровень детализации контуров регионов: full - исходные,
+                medium и low - упрощенные для миниатюр и мобильных клиентов
+            renderer (str): Способ рендера: traces - трасса Scatter на регион,
+                choropleth - одна трасса Choropleth (меньше работы браузеру)
             
         Returns:
             str: HTML-код карты или пустая строка при ошибке
         """
         try:
-            print(f"Создание HTML карты для узла {node_id}, год {year}")
-            
-            # Подключаемся к Neo4j
-            if not self.driver:
-                self.connect()
-            
-            # Получаем информацию о узле
-            node_info = self.get_node_info(node_id)
-            if not node_info:
-                print("Не удалось получить информацию о узле")
-                return ""
-            
-            # Получаем региональные данные
-            regional_data = self.get_regional_data(node_id, year)
-            
-            if not regional_data:
-                print("Не удалось получить региональные данные")
-                return ""
+            print(f"Создание HTML карты для узла {node_id}, год {year}, детализация {lod}")
             
-            # Загружаем данные карты для сопоставления названий
-            try:
-                regions_df = pd.read_parquet("russia_regions.parquet")
-                map_regions = regions_df['region'].tolist()
-            except Exception as e:
-                print(f"Ошибка при загрузке данных карты: {str(e)}")
+            prepared = self.get_map_data(node_id, year)
+            if not prepared:
                 return ""
-            
-            # Сопоставляем названия регионов
-            neo4j_regions = list(regional_data.keys())
-            region_matches = self.match_region_names(neo4j_regions, map_regions)
-            
-            # Создаем сопоставленные данные для карты
-            map_data = {}
-            for neo4j_region, map_region in region_matches.items():
-                if neo4j_region in regional_data:
-                    map_data[map_region] = regional_data[neo4j_region]
-            
-            if not map_data:
-                print("Не удалось сопоставить данные с регионами карты")
-                return ""
-            
-            print(f"Сопоставлено данных по {len(map_data)} регионам")
-            
-            # Создаем базовую карту
-            russia_map = mapFigure()
-            
-            # Определяем диапазон значений для градиента
-            values = list(map_data.values())
-            min_value = min(values)
-            max_value = max(values)
-            
-            print(f"Диапазон значений: {min_value:.2f} - {max_value:.2f}")
-            
-            # Обновляем карту с данными
-            for i, r in regions_df.iterrows():
-                region_name = r.region
-                
-                if region_name in map_data:
-                    value = map_data[region_name]
-                    color = self.get_color(value, min_value, max_value)
-                    
-                    # Форматируем текст для подсказки
-                    value_text = f"Значение: <b>{value:,.2f}</b>".replace(',', ' ')
-                    text = f'<b>{region_name}</b><br>{node_info.get("full_name", node_info.get("name", ""))}<br>Год: {year}<br>{value_text}'
-                    
-                    russia_map.update_traces(
-                        selector=dict(name=region_name),
-                        text=text,
-                        fillcolor=color
-                    )
-                else:
-                    # Регион без данных остается с базовым цветом
-                    text = f'<b>{region_name}</b><br>Нет данных'
-                    russia_map.update_traces(
-                        selector=dict(name=region_name),
-                        text=text
-                    )
-            
-            # Добавляем заголовок и настраиваем размеры
-            title = f"{node_info.get('full_name', node_info.get('name', 'Узел'))} - {year} год"
-            russia_map.update_layout(
-                title=title,
-                autosize=False,
-                width=810,
-                height=600,
-                margin=dict(l=0, r=0, t=50, b=0),
-                showlegend=False,
-                dragmode='pan'
-            )
+            node_info, map_data = prepared
+            
+            # Строим карту из шаблона и настраиваем размеры
+            russia_map = self.build_regional_map_figure(node_info, year, map_data, layout={
+                'autosize': False,
+                'width': 810,
+                'height': 600,
+                'margin': dict(l=0, r=0, t=50, b=0),
+                'showlegend': False,
+                'dragmode': 'pan'
+            }, lod=lod, renderer=renderer)
             
             # Возвращаем HTML вместо показа
             # Для первого рендера включаем Plotly, для AJAX - используем уже загруженную
             plotly_js_setting = 'inline' if include_plotlyjs else False
             
-            html_content = russia_map.to_html(
+            # Фигура собрана из проверенного шаблона, повторная валидация не нужна
+            html_content = pio.to_html(
+                russia_map,
+                validate=False,
                 full_html=False,
                 include_plotlyjs=plotly_js_setting,
                 config={
@@ -111,6 +111,25 @@ class DashboardManager {
             this.showMapLoading();
             this.updateCurrentYearDisplay(year);
             
+            // Карта уже загружена - перекрашиваем регионы, геометрия не передается
+            const plotlyDiv = document.querySelector('#map-container .plotly-graph-div');
+            if (plotlyDiv && window.Plotly && plotlyDiv.data) {
+                const stylesResponse = await fetch(`/api/map/${this.currentNodeId}/${year}/styles`);
+                const styles = await stylesResponse.json();
+                
+                if (!stylesResponse.ok) {
+                    throw new Error(styles.error || 'Ошибка загрузки данных карты');
+                }
+                
+                await applyMapStyles(plotlyDiv, styles);
+                this.updateRegionsCount(year);
+                this.showNotification('Карта успешно обновлена', 'success');
+                
+                const newUrl = `/dashboard/${this.currentNodeId}?year=${year}`;
+                window.history.pushState({nodeId: this.currentNodeId, year: year}, '', newUrl);
+                return;
+            }
+            
             // Получаем новую карту через API
             const response = await fetch(`/api/map/${this.currentNodeId}/${year}`);
             const data = await response.json();
@@ -311,6 +330,27 @@ class DashboardManager {
     }
 }
 
+/**
+ * Перекрашивает загруженную карту данными /api/map/<node_id>/<year>/styles
+ * @param {HTMLElement} plotlyDiv - div карты Plotly
+ * @param {Object} styles - {title, trace_indices, fillcolor, text}
+ * @returns {Promise}
+ */
+function applyMapStyles(plotlyDiv, styles) {
+    const layoutUpdate = {'title.text': styles.title};
+    
+    // Одно-трассовая карта (renderer=choropleth): регион i окрашивает точка i шкалы
+    if (plotlyDiv.data.length === 1 && plotlyDiv.data[0].type === 'choropleth') {
+        const last = Math.max(styles.fillcolor.length - 1, 1);
+        const colorscale = styles.fillcolor.map((color, index) => [index / last, color]);
+        return window.Plotly.update(plotlyDiv, {colorscale: [colorscale], text: [styles.text]}, layoutUpdate, [0]);
+    }
+    
+    // Трасса на регион: значения массивов применяются к трассам trace_indices
+    return window.Plotly.update(plotlyDiv, {fillcolor: styles.fillcolor, text: styles.text},
+                                layoutUpdate, styles.trace_indices);
+}
+
 // Глобальные функции для использования в HTML
 function changeYear(year) {
     if (window.dashboardManager) {
@@ -423,6 +463,7 @@ if (typeof module !== 'undefined' && module.exports) {
     module.exports = {
         DashboardManager,
         URLManager,
-        initializeDashboard
+        initializeDashboard,
+        applyMapStyles
     };
 }
\ No newline at end of file
@@ -48,6 +48,31 @@ function updateMap(nodeId, year) {
     // Показываем индикатор загрузки
     mapContainer.classList.add('updating');
     
+    // Карта уже загружена - запрашиваем только цвета и подсказки регионов (applyMapStyles из dashboard.js)
+    const loadedPlotlyDiv = mapContainer.querySelector('.plotly-graph-div');
+    if (typeof applyMapStyles === 'function' && window.Plotly && loadedPlotlyDiv && loadedPlotlyDiv.data) {
+        fetch(`/api/map/${nodeId}/${year}/styles`)
+        .then(response => response.json().then(data => ({response: response, data: data})))
+        .then(({response, data}) => {
+            if (!response.ok) {
+                throw new Error(data.error || `HTTP error! status: ${response.status}`);
+            }
+            return applyMapStyles(loadedPlotlyDiv, data);
+        })
+        .then(() => {
+            console.log(`Карта перекрашена для ${year} года`);
+        })
+        .catch(error => {
+            console.error('Ошибка при обновлении карты:', error);
+            showError('Ошибка при обновлении карты: ' + error.message);
+        })
+        .finally(() => {
+            mapContainer.classList.remove('updating');
+            isUpdatingMap = false;
+        });
+        return;
+    }
+    
     // Отправляем AJAX-запрос
     fetch('/update_map', {
         method: 'POST',
@@ -251,7 +276,8 @@ function setupMapClickHandlers() {
                 plotlyDiv.on('plotly_click', function(data) {
                     if (data.points && data.points.length > 0) {
                         const point = data.points[0];
-                        const regionName = point.data.name;
+                        // В режиме choropleth все регионы - одна трасса, регион в point.location
+                        const regionName = point.location || point.data.name;
                         const hoverText = point.text;
                         
                         console.log('Клик по region:', regionName);
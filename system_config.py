@@ -155,7 +155,7 @@ CLI_CONFIG = {
         'start': 'Запустить все компоненты системы',
         'bot': 'Запустить только Telegram бота',
         'dashboard': 'Запустить только Dashboard сервер',
-        'check': 'Проверить готовность системы',
+        'check': 'Проверить готовность системы и создать индексы графа',
         'status': 'Показать статус компонентов'
     },
     'default_command': 'start'
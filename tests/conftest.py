@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Общие фикстуры тестов: драйвер Neo4j в памяти (fake_driver)
+
+Запрос сопоставляется с обработчиками по подстроке в порядке регистрации
+(fake_driver.on(маркер, обработчик)); обработчик получает текст запроса и
+параметры и возвращает список записей или бросает исключение. Все запросы
+сохраняются в fake_driver.queries.
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+sys.path.append(str(PROJECT_ROOT))
+
+
+class FakeResult:
+    """Результат запроса: итерация по записям, single() и consume()"""
+
+    def __init__(self, records):
+        self.records = list(records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def single(self):
+        return self.records[0] if self.records else None
+
+    def consume(self):
+        return None
+
+
+class FakeSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def run(self, query, parameters=None):
+        parameters = parameters or {}
+        # Запросы из нескольких потоков выполняются по одному, как транзакции
+        with self.driver.lock:
+            self.driver.queries.append((query, parameters))
+            for marker, handler in self.driver.handlers:
+                if marker in query:
+                    return FakeResult(handler(query, parameters))
+            return FakeResult([])
+
+
+class FakeDriver:
+    """Драйвер Neo4j в памяти"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.handlers = []
+        self.queries = []
+
+    def on(self, marker, handler):
+        """Регистрирует обработчик запросов, содержащих marker ("" - любой запрос)"""
+        self.handlers.append((marker, handler))
+        return self
+
+    def session(self, **kwargs):
+        return FakeSession(self)
+
+    def close(self):
+        return None
+
+    @property
+    def statements(self):
+        return [query for query, _ in self.queries]
+
+    def parameters(self, marker):
+        """Параметры всех запросов, содержащих marker"""
+        return [parameters for query, parameters in self.queries if marker in query]
+
+
+@pytest.fixture
+def fake_driver():
+    return FakeDriver()
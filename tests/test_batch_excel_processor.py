@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Тесты пакетного преобразования Excel файлов в CSV (ETL/batch_excel_processor.py)
+"""
+
+import sys
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+sys.path.append(str(PROJECT_ROOT))
+
+import ETL.batch_excel_processor as batch_excel_processor
+from ETL.batch_excel_processor import process_all_regions
+
+ROWS = [
+    ["Форма 1", None, None, None],
+    ["Наименование", "Код", "№ строки", "Всего"],
+    [None, None, "№ строки", "3"],
+    ["Организации", "01", "2", "15"],
+    ["Филиалы", "02", "3", "7"],
+]
+
+
+def make_regions(base_directory: Path) -> None:
+    for region, files in (("Алтайский край", 2), ("г. Москва", 3), ("Тверская область", 1)):
+        folder = base_directory / region
+        folder.mkdir(parents=True)
+        for index in range(files):
+            rows = [row[:3] + [f"{row[3]}{index}" if row[3] else None] for row in ROWS]
+            pd.DataFrame(rows).to_excel(folder / f"Раздел {index + 1}.xlsx", header=False, index=False)
+    (base_directory / "Пустая папка").mkdir()
+
+
+def converted_files(base_directory: Path) -> dict:
+    return {str(path.relative_to(base_directory)): path.read_bytes() for path in sorted(base_directory.rglob("*"))
+            if path.is_file()}
+
+
+def test_parallel_conversion_matches_serial(tmp_path):
+    make_regions(tmp_path / "serial")
+    make_regions(tmp_path / "parallel")
+
+    serial = process_all_regions(str(tmp_path / "serial"), max_workers=1)
+    parallel = process_all_regions(str(tmp_path / "parallel"), max_workers=3)
+
+    serial_files = converted_files(tmp_path / "serial")
+    assert len(serial_files) == 6
+    assert all(name.endswith(".csv") for name in serial_files)
+    assert converted_files(tmp_path / "parallel") == serial_files
+
+    for key in ("total_folders", "successful", "failed", "errors"):
+        assert parallel[key] == serial[key]
+    assert parallel["total_folders"] == 4 and parallel["successful"] == 4
+    assert set(parallel["folder_times"]) == set(serial["folder_times"])
+
+
+def test_parallel_conversion_reports_folder_errors(tmp_path, monkeypatch):
+    make_regions(tmp_path)
+
+    def list_excel_files(directory_path):
+        if directory_path.endswith("г. Москва"):
+            raise PermissionError("нет доступа")
+        return []
+
+    monkeypatch.setattr("ETL.batch_excel_processor.list_excel_files", list_excel_files)
+
+    result = process_all_regions(str(tmp_path), max_workers=2)
+
+    assert result["failed"] == 1 and result["successful"] == 3
+    assert result["errors"] == [{"folder": "г. Москва", "error": "нет доступа"}]
+    assert result["folder_times"]["г. Москва"] == 0.0
+
+
+class BreakingExecutor:
+    """Пул процессов, который ломается после двух обработанных файлов"""
+
+    def __init__(self, max_workers):
+        self.submitted = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def submit(self, function, file_path):
+        future = Future()
+        self.submitted += 1
+        if self.submitted <= 2:
+            future.set_result(function(file_path))
+        else:
+            future.set_exception(BrokenProcessPool("рабочий процесс завершился аварийно"))
+        return future
+
+
+def test_broken_pool_retries_only_unfinished_files(tmp_path, monkeypatch):
+    make_regions(tmp_path)
+    monkeypatch.setattr(batch_excel_processor, "ProcessPoolExecutor", BreakingExecutor)
+
+    converted = []
+    convert_workbook = batch_excel_processor.convert_workbook
+
+    def counting_convert_workbook(file_path):
+        converted.append(file_path)
+        return convert_workbook(file_path)
+
+    monkeypatch.setattr(batch_excel_processor, "convert_workbook", counting_convert_workbook)
+
+    result = process_all_regions(str(tmp_path), max_workers=3)
+
+    assert result["successful"] == 4 and result["failed"] == 0
+    # Каждый файл преобразован один раз: 2 в пуле и 4 последовательно
+    assert len(converted) == 6 and len(set(converted)) == 6
+    assert len([path for path in converted_files(tmp_path) if path.endswith(".csv")]) == 6
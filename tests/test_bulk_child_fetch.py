@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Тесты чтения данных дочерних узлов одним запросом (CalculatedNodeCreator.get_nodes_data_by_ids)
+"""
+
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+sys.path.append(str(PROJECT_ROOT))
+
+from ETL.calculated_node_creator import CalculatedNodeCreator
+from ETL.regional_layout import pack_regional_values
+
+YEARS = ["2022", "2023", "2024"]
+
+NODES = {
+    "id-1": {
+        "node_name": "Показатель 1", "federal_values": [1.0, 2.0, 3.0], "years": YEARS,
+        "region_keys": None, "regional_values": None,
+        "edges": [
+            {"region": "Алтайский край", "values": {"value_2022": 1.0, "value_2024": 3.0}},
+            {"region": "г. Москва", "values": {"value_2022": 10.0, "value_2023": 20.0, "value_2024": 30.0}},
+        ],
+    },
+    # Другой набор лет: значения выравниваются по годам калькулятора
+    "id-2": {
+        "node_name": "Показатель 2", "federal_values": [5.0, 6.0], "years": ["2023", "2024"],
+        "edges": [],
+        **pack_regional_values(["г. Москва"], [[7.0, 8.0]], ["2023", "2024"]),
+    },
+}
+
+
+def fetch_nodes(query, parameters):
+    return [{"node_id": node_id, **NODES[node_id]} for node_id in parameters["node_ids"] if node_id in NODES]
+
+
+def make_creator(fake_driver):
+    creator = CalculatedNodeCreator(str(PROJECT_ROOT / "neo4j_config.json"))
+    creator.driver = fake_driver.on("", fetch_nodes)
+    creator.years = YEARS
+    return creator
+
+
+def fetched_ids(fake_driver):
+    return [parameters["node_ids"] for parameters in fake_driver.parameters("")]
+
+
+def test_nodes_are_fetched_once_in_one_query(fake_driver):
+    """Повторяющиеся ID запрашиваются одним запросом, каждый - один раз"""
+    creator = make_creator(fake_driver)
+
+    data = creator.get_nodes_data_by_ids(["id-1", "id-2", "id-1", "missing"])
+
+    assert fetched_ids(fake_driver) == [["id-1", "id-2", "missing"]]
+    assert set(data) == {"id-1", "id-2"}
+
+
+def test_values_are_aligned_by_year(fake_driver):
+    """Федеральные и региональные значения - матрица регион x год по годам калькулятора"""
+    data = make_creator(fake_driver).get_nodes_data_by_ids(["id-1", "id-2"])
+
+    assert data["id-1"]["regions"] == ["Алтайский край", "г. Москва"]
+    assert data["id-1"]["regional_values"] == [[1.0, None, 3.0], [10.0, 20.0, 30.0]]
+    assert data["id-2"]["federal_values"] == [None, 5.0, 6.0]
+    assert data["id-2"]["regional_values"] == [[None, 7.0, 8.0]]
+
+
+def test_collect_child_nodes_data_uses_prefetched_data(fake_driver):
+    """Данные пакета читаются заранее; отсутствующий узел дает нулевые значения"""
+    creator = make_creator(fake_driver)
+    prefetched = creator.get_nodes_data_by_ids(["id-1", "id-2"])
+
+    children = creator.collect_child_nodes_data(["id-2", "missing", "id-1"], prefetched)
+
+    assert len(fake_driver.queries) == 1
+    assert [child["node_id"] for child in children] == ["id-2", "missing", "id-1"]
+    assert children[1]["federal_values"] == [0.0, 0.0, 0.0]
+
+
+def test_calculated_node_data_matches_fetched_format(fake_driver):
+    creator = make_creator(fake_driver)
+
+    data = creator.calculated_node_data("calc", {"name": "Расчет", "federal_values": [1.0, 2.0, 3.0]},
+                                        ["г. Москва", "Алтайский край"], [[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]])
+
+    assert data["regions"] == ["Алтайский край", "г. Москва"]
+    assert data["regional_values"] == [[4.0, 5.0, 6.0], [1.0, 2.0, 3.0]]
+    assert data["node_name"] == "Расчет"
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Тесты экспорта графа в CSV для офлайн-импорта (neo4j-admin)
+"""
+
+import csv
+import json
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+sys.path.append(str(PROJECT_ROOT))
+
+from ETL.calculated_node_creator import CalculatedNodeCreator
+from tests.test_extraction_plan import make_creator, NODES, REGIONS, YEARS
+
+
+def read_rows(path: Path):
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return list(csv.reader(f))
+
+
+def test_export_nodes_and_calculated_nodes(tmp_path, monkeypatch):
+    """Узлы Счетное и Расчетные экспортируются в один каталог со стабильными ID"""
+    creator = make_creator(tmp_path, monkeypatch)
+    output_dir = tmp_path / "import"
+
+    batch_path = tmp_path / "batch.json"
+    batch_path.write_text(json.dumps({"nodes": NODES}, ensure_ascii=False), encoding='utf-8')
+
+    result = creator.export_batch(str(batch_path), str(output_dir), chunk_size=2)
+
+    assert result["exported_nodes"] == 3
+    assert result["failed_nodes"] == 1
+    assert result["export_stats"]["regions"] == len(REGIONS)
+    assert result["export_stats"]["poregion"] == 3 * len(REGIONS)
+    assert "neo4j-admin database import full" in result["import_command"]
+
+    header = read_rows(output_dir / "poregion_header.csv")[0]
+    assert header[:2] == [":START_ID(Indicator)", ":END_ID(Region)"]
+    assert header[2:-1] == [f"value_{year}:double" for year in YEARS]
+
+    # Значения совпадают с посекционным сбором
+    periods_config = creator.extract_period_config(NODES[0])
+    federal = creator.collect_federal_data_by_periods(periods_config)
+    schetnoe = {row[0]: row for row in read_rows(output_dir / "schetnoe.csv")}
+    assert schetnoe["Узел1"][4] == ";".join(str(value) for value in federal)
+    assert schetnoe["Узел1"][-1] == "Счетное"
+
+    # Расчетный узел по ID дочерних узлов из существующей базы
+    calc_creator = CalculatedNodeCreator(str(PROJECT_ROOT / "neo4j_config.json"))
+    calc_creator.years = YEARS
+    calc_path = tmp_path / "calc.json"
+    calc_path.write_text(json.dumps({"calculated_nodes": [
+        {"node_name": "Отношение", "node_label": "Расчетные", "formula": "(node_id1 / node_id2)",
+         "child_nodes": ["4:db:1", "Узел2"]},
+        {"node_name": "Удвоенное", "node_label": "Расчетные", "formula": "(node_id1 * 2)",
+         "child_nodes": ["Отношение"]}
+    ]}, ensure_ascii=False), encoding='utf-8')
+
+    calc_result = calc_creator.export_calculated_nodes_batch(str(calc_path), str(output_dir), id_map={"4:db:1": "Узел1"})
+    assert calc_result["exported_nodes"] == 2
+
+    raschetnye = {row[0]: row for row in read_rows(output_dir / "raschetnye.csv")}
+    assert raschetnye["Отношение"][6] == "Узел1;Узел2"
+    ratio = [float(value) for value in raschetnye["Отношение"][4].split(";")]
+    doubled = [float(value) for value in raschetnye["Удвоенное"][4].split(";")]
+    assert doubled == [value * 2 for value in ratio]
+
+    links = read_rows(output_dir / "links.csv")
+    assert ["Отношение", "Узел1", "ОСНОВАН_НА"] in links
+    assert ["Узел2", "Отношение", "ИСПОЛЬЗУЕТСЯ_В"] in links
+    assert ["Удвоенное", "Отношение", "ОСНОВАН_НА"] in links
+
+    # Регионы не дублируются при дописывании
+    assert len(read_rows(output_dir / "regions.csv")) == len(REGIONS)
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Тесты графа зависимостей пакета расчетных узлов (ETL/calculation_graph.py)
+и обработки пакета по уровням в CalculatedNodeCreator
+"""
+
+import json
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+sys.path.append(str(PROJECT_ROOT))
+
+from ETL.calculation_graph import DependencyCycleError, build_dependency_levels, resolve_batch_dependency
+from ETL.calculated_node_creator import CalculatedNodeCreator
+
+YEARS = ["2023", "2024"]
+
+
+def calc(name, *children, formula="node_id1 + node_id2"):
+    return {"node_name": name, "node_label": "Расчетные", "formula": formula, "child_nodes": list(children)}
+
+
+def test_levels_follow_dependencies_not_file_order():
+    configs = [
+        calc("Итог", "Сумма", "id-3", formula="node_id1 * node_id2"),
+        calc("Сумма", "id-1", "id-2"),
+        calc("Разность", "id-1", "id-2", formula="node_id1 - node_id2"),
+    ]
+
+    assert build_dependency_levels(configs) == [[1, 2], [0]]
+
+
+def test_previous_node_ids_are_dependencies():
+    """Ссылка на ID ранее записанного узла пакета тоже задает порядок"""
+    configs = [calc("Итог", "elem-42", "id-3"), calc("Сумма", "id-1", "id-2")]
+
+    assert resolve_batch_dependency("elem-42", {"Итог", "Сумма"}, {"elem-42": "Сумма"}) == "Сумма"
+    assert build_dependency_levels(configs, {"elem-42": "Сумма"}) == [[1], [0]]
+
+
+def test_cycles_are_detected_up_front():
+    configs = [calc("A", "B", "id-1"), calc("B", "C", "id-1"), calc("C", "A", "id-1"), calc("D", "id-1", "id-2")]
+
+    with pytest.raises(DependencyCycleError) as error:
+        build_dependency_levels(configs)
+
+    assert error.value.node_names == ["A", "B", "C"]
+
+    with pytest.raises(DependencyCycleError):
+        build_dependency_levels([calc("A", "A", "id-1")])
+
+
+def test_duplicate_names_are_rejected():
+    with pytest.raises(ValueError):
+        build_dependency_levels([calc("A", "id-1", "id-2"), calc("A", "id-2", "id-1")])
+
+
+BASE_NODES = {
+    "id-1": {"node_name": "Показатель 1", "federal_values": [1.0, 2.0], "years": YEARS,
+             "region_keys": None, "regional_values": None,
+             "edges": [{"region": "г. Москва", "values": {"value_2023": 1.0, "value_2024": 2.0}}]},
+    "id-2": {"node_name": "Показатель 2", "federal_values": [10.0, 20.0], "years": YEARS,
+             "region_keys": None, "regional_values": None,
+             "edges": [{"region": "г. Москва", "values": {"value_2023": 10.0, "value_2024": 20.0}}]},
+}
+
+
+class FakeGraph:
+    """Граф в памяти: узлы-показатели, созданные расчетные узлы и запросы чтения"""
+
+    def __init__(self, driver):
+        self.created = {}
+        self.fetches = []
+        self.threads = set()
+        self.lineage_batches = []
+        self.driver = driver
+        driver.on("UNWIND $node_ids", self.fetch_nodes)
+        driver.on("UNWIND $names", self.find_created)
+        driver.on("CREATE (n:", self.create_node)
+        driver.on("ОСНОВАН_НА", self.write_lineage)
+        driver.on("UNWIND $rows", lambda query, parameters: [{"written": len(parameters["rows"])}])
+        driver.on("", lambda query, parameters: [{"ok": True}])
+
+    def fetch_nodes(self, query, parameters):
+        self.fetches.append(list(parameters["node_ids"]))
+        return [{"node_id": node_id, **BASE_NODES[node_id]}
+                for node_id in parameters["node_ids"] if node_id in BASE_NODES]
+
+    def find_created(self, query, parameters):
+        return [{"name": name, "node_id": node["node_id"]}
+                for name, node in self.created.items() if name in parameters["names"]]
+
+    def create_node(self, query, parameters):
+        node_id = f"calc-{len(self.created) + 1}"
+        self.created[parameters["name"]] = {"node_id": node_id, **parameters}
+        self.threads.add(threading.get_ident())
+        return [{"node_id": node_id}]
+
+    def write_lineage(self, query, parameters):
+        self.lineage_batches.append(list(parameters["rows"]))
+        return [{"written": 2 * len(parameters["rows"])}]
+
+
+def run_batch(tmp_path, graph, configs, workers=4):
+    config_path = tmp_path / "calculated.json"
+    config_path.write_text(json.dumps({"calculated_nodes": configs}, ensure_ascii=False), encoding="utf-8")
+
+    creator = CalculatedNodeCreator(str(PROJECT_ROOT / "neo4j_config.json"), calculation_workers=workers)
+    creator.years = YEARS
+    creator.connect = lambda: setattr(creator, "driver", graph.driver)
+    creator.disconnect = lambda: None
+
+    return creator.process_calculated_nodes_batch(str(config_path))
+
+
+def test_batch_reuses_computed_nodes_without_reading_them_back(tmp_path, fake_driver):
+    configs = [
+        calc("Итог", "Сумма", "Разность", formula="node_id1 * node_id2"),
+        calc("Сумма", "id-1", "id-2"),
+        calc("Разность", "id-2", "id-1", formula="node_id1 - node_id2"),
+    ]
+
+    graph = FakeGraph(fake_driver)
+    result = run_batch(tmp_path, graph, configs)
+
+    assert result["success"], result
+    assert result["levels"] == 2
+    assert result["created_nodes"] == 3
+    # Ограничения и индексы проверяются в начале пакета
+    assert any(line.startswith("Схема графа:") for line in result["processing_log"])
+    assert any("CREATE CONSTRAINT" in query for query in graph.driver.statements)
+    # Внешние дочерние узлы читаются один раз, расчетные узлы пакета - не читаются
+    assert graph.fetches == [["id-1", "id-2"]]
+    assert graph.created["Итог"]["federal_values"] == [11.0 * 9.0, 22.0 * 18.0]
+
+
+def test_cycle_fails_before_any_write(tmp_path, fake_driver):
+    graph = FakeGraph(fake_driver)
+    result = run_batch(tmp_path, graph, [calc("A", "B", "id-1"), calc("B", "A", "id-1")])
+
+    assert result["success"] is False
+    assert "Циклическая зависимость" in result["error"]
+    assert graph.created == {}
+
+
+def test_independent_nodes_are_written_in_parallel_pool(tmp_path, fake_driver):
+    configs = [calc(f"Узел {i}", "id-1", "id-2") for i in range(6)]
+
+    graph = FakeGraph(fake_driver)
+    result = run_batch(tmp_path, graph, configs, workers=3)
+
+    assert result["created_nodes"] == 6
+    assert threading.get_ident() not in graph.threads
+    assert all(f"Расчетный узел 'Узел {i}' создан успешно" in " ".join(result["processing_log"]) for i in range(6))
+
+
+def test_lineage_edges_are_written_in_one_round_trip(tmp_path, fake_driver):
+    """Связи ОСНОВАН_НА / ИСПОЛЬЗУЕТСЯ_В всего пакета записываются одним запросом UNWIND"""
+    configs = [calc(f"Узел {i}", "id-1", "id-2") for i in range(5)] + [calc("Итог", "Узел 0", "Узел 1")]
+
+    graph = FakeGraph(fake_driver)
+    result = run_batch(tmp_path, graph, configs)
+
+    assert len(graph.lineage_batches) == 1
+    rows = graph.lineage_batches[0]
+    assert len(rows) == 12
+    assert {"calc_id": graph.created["Итог"]["node_id"], "child_id": graph.created["Узел 0"]["node_id"]} in rows
+    assert result["lineage_relationships"] == 24
+
+
+def test_rerun_rewrites_existing_nodes_instead_of_creating(tmp_path, fake_driver):
+    """Повторный запуск без манифеста находит узлы по имени и не создает дубликаты"""
+    configs = [calc("Сумма", "id-1", "id-2")]
+    graph = FakeGraph(fake_driver)
+    run_batch(tmp_path, graph, configs)
+    (tmp_path / "calculated.manifest.json").unlink()
+
+    result = run_batch(tmp_path, graph, configs)
+
+    assert result["success"], result
+    assert result["created_nodes"] == 0
+    assert result["updated_nodes"] == 1
+    assert list(graph.created) == ["Сумма"]
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Тесты колоночного хранилища ETL/columnar_store.py
+"""
+
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+sys.path.append(str(PROJECT_ROOT))
+
+from ETL.columnar_store import compile_store, ColumnarStore, FEDERAL_REGION
+from ETL.table_cache import ParsedTableCache
+
+SAMPLE_BASE_DIR = PROJECT_ROOT / "БД"
+
+
+def write_table(path: Path, seed: int) -> None:
+    """Создает CSV раздела с предсказуемыми значениями"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lines = [";;;;", "1;2;3;4;5", "№ строки;Наименование;Всего;Графа 4;Графа 5"]
+    for row in range(1, 4):
+        lines.append(f"{row};Строка {row};{seed + row};;{seed + row},5")
+    path.write_text("\n".join(lines) + "\n", encoding='utf-8')
+
+
+def test_federal_values_match_csv(tmp_path):
+    """Значения из хранилища совпадают с чтением CSV через кеш таблиц"""
+    store_dir = tmp_path / "store"
+    compile_store(str(SAMPLE_BASE_DIR), str(store_dir), years=["2019", "2024"])
+    store = ColumnarStore(str(store_dir))
+    cache = ParsedTableCache()
+
+    for year in ["2019", "2024"]:
+        files = sorted((SAMPLE_BASE_DIR / year).glob("Раздел *.csv"))[:4]
+        for file_path in files:
+            table_number = file_path.stem[len("Раздел "):]
+            for row_number in range(1, 6):
+                for column_number in range(1, 8):
+                    expected = cache.get_value(str(file_path), column_number, row_number)
+                    actual = store.get_value(year, table_number, row_number, column_number)
+                    assert actual == expected, f"{year} {table_number} [{row_number}, {column_number}]"
+
+
+def test_regional_slice_and_labels(tmp_path):
+    """Одна ячейка по всем регионам года читается одним срезом"""
+    base_dir = tmp_path / "БД"
+    regions = ["Алтайский край", "Тверская область"]
+    write_table(base_dir / "2024" / "Раздел 2.1.1.csv", 100)
+    for index, region in enumerate(regions, 1):
+        write_table(base_dir / "2024" / "2024" / region / "Раздел 2.1.1.csv", 100 * (index + 1))
+
+    store_dir = tmp_path / "store"
+    stats = compile_store(str(base_dir), str(store_dir))
+    store = ColumnarStore(str(store_dir))
+
+    assert stats["files"] == 3
+    assert store.get_regions("2024") == regions
+    assert store.get_regional_values("2024", "2.1.1", 2, 3) == {
+        FEDERAL_REGION: 102.0,
+        "Алтайский край": 202.0,
+        "Тверская область": 302.0
+    }
+    assert store.get_value("2024", "2.1.1", 1, 5, region="Тверская область") == 301.5
+
+    # Пустые ячейки и неизвестные таблицы не возвращают значений
+    assert store.get_value("2024", "2.1.1", 1, 4) is None
+    assert store.get_value("2024", "9.9.9", 1, 3) is None
+    assert store.get_value("2016", "2.1.1", 1, 3) is None
+
+    schema = store.get_table_schema("2.1.1", "2024")
+    assert schema["columns"]["3"] == "Всего"
+    assert schema["rows"]["2"] == "Строка 2"
+
+
+def test_changed_csv_makes_year_stale(tmp_path, monkeypatch):
+    """Изменение, добавление или удаление CSV после компиляции выключает год в хранилище"""
+    import os
+    from ETL import columnar_store
+
+    monkeypatch.setattr(columnar_store, "FRESHNESS_CHECK_INTERVAL", 0)
+    base_dir = tmp_path / "БД"
+    write_table(base_dir / "2023" / "Раздел 2.1.1.csv", 100)
+    write_table(base_dir / "2024" / "Раздел 2.1.1.csv", 100)
+    write_table(base_dir / "2024" / "2024" / "Алтайский край" / "Раздел 2.1.1.csv", 200)
+
+    store_dir = tmp_path / "store"
+    compile_store(str(base_dir), str(store_dir))
+    store = ColumnarStore(str(store_dir))
+    assert store.has_year("2023") and store.has_year("2024")
+
+    region_file = base_dir / "2024" / "2024" / "Алтайский край" / "Раздел 2.1.1.csv"
+    stat = region_file.stat()
+    os.utime(region_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert not store.has_year("2024")
+    assert store.has_year("2023")
+
+    write_table(base_dir / "2023" / "Раздел 2.2.1.csv", 100)
+    assert not store.has_year("2023")
+
+    compile_store(str(base_dir), str(store_dir))
+    store = ColumnarStore(str(store_dir))
+    assert store.has_year("2023") and store.has_year("2024")
+
+    (base_dir / "2023" / "Раздел 2.2.1.csv").unlink()
+    assert not store.has_year("2023")
+
+
+def test_node_creator_uses_project_store(tmp_path, monkeypatch):
+    """Хранилище, собранное командой компиляции по умолчанию, находит и Neo4jNodeCreator"""
+    from ETL import columnar_store
+    from ETL.neo4j_node_creator import Neo4jNodeCreator
+
+    base_dir = tmp_path / "БД"
+    write_table(base_dir / "2024" / "Раздел 2.1.1.csv", 100)
+    write_table(base_dir / "2024" / "2024" / "Алтайский край" / "Раздел 2.1.1.csv", 200)
+    monkeypatch.delenv("COLUMNAR_STORE_DIR", raising=False)
+    monkeypatch.setattr(columnar_store, "PROJECT_BASE_DIR", str(base_dir))
+
+    # Как python ETL/columnar_store.py без --output-dir
+    compile_store(str(base_dir))
+
+    creator = Neo4jNodeCreator(str(PROJECT_ROOT / "neo4j_config.json"))
+    creator.years = ["2024"]
+
+    assert creator.columnar_store is not None
+    assert Path(creator.columnar_store.store_dir) == tmp_path / "БД_store"
+    federal_values, regions, regional_values = creator.collect_data_from_store(
+        {creator.get_period_key("2024"): {"table_number": "2.1.1", "column": 3, "row": 2}}
+    )
+    assert federal_values == [102.0]
+    assert regions == ["Алтайский край"]
+    assert regional_values == [[202.0]]
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Тесты манифеста инкрементальной загрузки ETL/etl_manifest.py
+"""
+
+import os
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+sys.path.append(str(PROJECT_ROOT))
+
+from ETL.etl_manifest import EtlManifest, config_hash, default_manifest_path
+
+
+def make_files(base_dir: Path):
+    """Создает два файла раздела в дереве БД"""
+    first = base_dir / "2024" / "Раздел 1.csv"
+    second = base_dir / "2024" / "2024" / "Тверская область" / "Раздел 1.csv"
+    for path, content in [(first, "№ строки;А\n1;10\n"), (second, "№ строки;А\n1;20\n")]:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding='utf-8')
+    return str(first), str(second)
+
+
+def test_only_changed_node_is_selected(tmp_path):
+    """После изменения файла пересчитывается только ссылающийся на него узел"""
+    base_dir = tmp_path / "БД"
+    first, second = make_files(base_dir)
+    manifest_path = str(tmp_path / "batch.manifest.json")
+
+    manifest = EtlManifest.load(manifest_path, str(base_dir))
+    assert manifest.node_changed("Узел1", "h1", [first])
+    manifest.record_node("Узел1", "id-1", "h1", [first])
+    manifest.record_node("Узел2", "id-2", "h2", [second])
+    manifest.save()
+
+    # Пути хранятся относительно корня БД
+    assert os.path.join("2024", "Раздел 1.csv") in manifest.files
+
+    reloaded = EtlManifest.load(manifest_path, str(base_dir))
+    assert not reloaded.node_changed("Узел1", "h1", [first])
+    assert not reloaded.node_changed("Узел2", "h2", [second])
+    # Хеши неизмененных файлов не пересчитываются
+    assert reloaded.hashed_files == 0
+
+    Path(second).write_text("№ строки;А\n1;25\n", encoding='utf-8')
+
+    changed = EtlManifest.load(manifest_path, str(base_dir))
+    assert not changed.node_changed("Узел1", "h1", [first])
+    assert changed.node_changed("Узел2", "h2", [second])
+    assert changed.get_node_id("Узел2") == "id-2"
+
+    # Изменение конфигурации узла также требует пересчета
+    assert changed.node_changed("Узел1", "h1-new", [first])
+
+
+def test_touch_without_content_change_is_not_a_change(tmp_path):
+    """Обновление mtime без изменения содержимого не считается изменением"""
+    base_dir = tmp_path / "БД"
+    first, _ = make_files(base_dir)
+    manifest_path = str(tmp_path / "batch.manifest.json")
+
+    manifest = EtlManifest.load(manifest_path, str(base_dir))
+    manifest.record_node("Узел1", "id-1", "h1", [first])
+    manifest.save()
+
+    stat = os.stat(first)
+    os.utime(first, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    reloaded = EtlManifest.load(manifest_path, str(base_dir))
+    assert not reloaded.node_changed("Узел1", "h1", [first])
+    assert reloaded.hashed_files == 1
+
+
+def test_missing_and_appearing_files(tmp_path):
+    """Появление ранее отсутствовавшего файла считается изменением"""
+    base_dir = tmp_path / "БД"
+    missing = str(base_dir / "2024" / "Раздел 2.csv")
+    manifest_path = str(tmp_path / "batch.manifest.json")
+
+    manifest = EtlManifest.load(manifest_path, str(base_dir))
+    manifest.record_node("Узел", "id", "h", [missing])
+    manifest.save()
+
+    assert not EtlManifest.load(manifest_path, str(base_dir)).node_changed("Узел", "h", [missing])
+
+    Path(missing).parent.mkdir(parents=True, exist_ok=True)
+    Path(missing).write_text("№ строки;А\n1;1\n", encoding='utf-8')
+
+    assert EtlManifest.load(manifest_path, str(base_dir)).node_changed("Узел", "h", [missing])
+
+
+def test_failed_node_sharing_a_file_is_recomputed(tmp_path):
+    """Узел, не записанный после изменения общего файла, пересчитывается, хотя соседний узел уже записан"""
+    base_dir = tmp_path / "БД"
+    shared, _ = make_files(base_dir)
+    manifest_path = str(tmp_path / "batch.manifest.json")
+
+    manifest = EtlManifest.load(manifest_path, str(base_dir))
+    manifest.record_node("Узел A", "id-a", "ha", [shared])
+    manifest.record_node("Узел B", "id-b", "hb", [shared])
+    manifest.save()
+
+    Path(shared).write_text("№ строки;А\n1;30\n", encoding='utf-8')
+
+    # Второй запуск: A записан, запись B завершилась ошибкой
+    second = EtlManifest.load(manifest_path, str(base_dir))
+    assert second.node_changed("Узел A", "ha", [shared]) and second.node_changed("Узел B", "hb", [shared])
+    second.record_node("Узел A", "id-a", "ha", [shared])
+    second.save()
+
+    third = EtlManifest.load(manifest_path, str(base_dir))
+    assert not third.node_changed("Узел A", "ha", [shared])
+    assert third.node_changed("Узел B", "hb", [shared])
+
+    # Узел, записанный не полностью, удаляется из манифеста
+    third.forget_node("Узел B")
+    assert third.get_node_id("Узел B") is None
+    assert third.node_changed("Узел B", "hb", [shared])
+
+
+def test_helpers(tmp_path):
+    assert config_hash({"a": 1, "b": [1, None]}) == config_hash({"b": [1, None], "a": 1})
+    assert config_hash({"a": 1}) != config_hash({"a": 2})
+    assert default_manifest_path("configs/batch.json") == "configs/batch.manifest.json"
+
+    # Поврежденный манифест заменяется пустым
+    broken = tmp_path / "broken.json"
+    broken.write_text("{", encoding='utf-8')
+    assert EtlManifest.load(str(broken)).nodes == {}
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Тесты планировщика извлечения ячеек для пакетной обработки узлов
+"""
+
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+sys.path.append(str(PROJECT_ROOT))
+
+import ETL.neo4j_node_creator as node_creator_module
+from ETL.neo4j_node_creator import Neo4jNodeCreator
+from ETL.table_cache import ParsedTableCache
+
+REGIONS = ["Алтайский край", "Тверская область", "г. Москва"]
+YEARS = ["2019", "2020", "2021"]
+
+
+def write_table(path: Path, seed: int) -> None:
+    """Создает CSV раздела с предсказуемыми значениями"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lines = [";;;;", "1;2;3;4;5", "№ строки;Наименование;Всего;Графа 4;Графа 5"]
+    for row in range(1, 6):
+        lines.append(f"{row};Строка {row};{seed + row * 10};{seed + row * 10 + 1};{seed + row * 10 + 2},5")
+    path.write_text("\n".join(lines) + "\n", encoding='utf-8')
+
+
+def make_tree(base_dir: Path) -> None:
+    """Создает минимальное дерево БД: федеральные и региональные таблицы"""
+    for year_index, year in enumerate(YEARS):
+        for table in ["2.1.1", "2.1.1.1"]:
+            write_table(base_dir / year / f"Раздел {table}.csv", 1000 * year_index)
+            for region_index, region in enumerate(REGIONS):
+                # Для одного региона таблица 2021 года отсутствует
+                if year == "2021" and region == "г. Москва":
+                    continue
+                write_table(base_dir / year / year / region / f"Раздел {table}.csv",
+                            1000 * year_index + 100 * (region_index + 1))
+
+
+def make_creator(tmp_path, monkeypatch) -> Neo4jNodeCreator:
+    base_dir = tmp_path / "БД"
+    make_tree(base_dir)
+    monkeypatch.setattr(node_creator_module, "BASE_DIR", str(base_dir))
+
+    creator = Neo4jNodeCreator(str(PROJECT_ROOT / "neo4j_config.json"))
+    creator.years = YEARS
+    creator.table_cache = ParsedTableCache()
+    # Данные читаются из CSV временного дерева, даже если хранилище проекта собрано
+    creator.columnar_store = None
+    monkeypatch.setattr(creator, "get_regions_list", lambda year="2024": list(REGIONS))
+    return creator
+
+
+NODES = [
+    {
+        "node_name": "Узел1",
+        "node_label": "Счетное",
+        "period_2016_2020": {"table_number": "2.1.1.1", "column": 3, "row": 1},
+        "period_2021_2024": {"table_number": "2.1.1", "column": 3, "row": 1}
+    },
+    {
+        "node_name": "Узел2",
+        "node_label": "Счетное",
+        "period_2016_2020": {"table_number": "2.1.1.1", "column": 5, "row": 2},
+        "period_2021_2024": {"table_number": "2.1.1", "column": 4, "row": 3}
+    },
+    {
+        # Старый формат: только период 2021-2024
+        "node_name": "Узел3",
+        "node_label": "Счетное",
+        "table_number": "2.1.1",
+        "column": 3,
+        "row": 4
+    },
+    {
+        "node_name": "БезПериодов",
+        "node_label": "Счетное"
+    }
+]
+
+
+def test_plan_matches_per_node_collection(tmp_path, monkeypatch):
+    """План пакета дает те же значения, что и посекционный сбор по каждому узлу"""
+    creator = make_creator(tmp_path, monkeypatch)
+    plan = creator.build_extraction_plan(NODES)
+    stats = plan.execute()
+
+    for index, node_config in enumerate(NODES):
+        periods_config = creator.extract_period_config(node_config)
+        if not periods_config:
+            assert plan.get_node_data(index) is None
+            continue
+
+        expected_federal = creator.collect_federal_data_by_periods(periods_config)
+        expected_regions, expected_regional = creator.collect_regional_data_by_periods(periods_config)
+
+        federal, regions, regional = plan.get_node_data(index)
+        assert federal == expected_federal
+        assert regions == expected_regions
+        assert regional == expected_regional
+
+    assert stats["nodes"] == 3
+    assert stats["missing_files"] == 1
+
+
+def test_each_file_is_parsed_once(tmp_path, monkeypatch):
+    """Каждый файл пакета разбирается ровно один раз"""
+    creator = make_creator(tmp_path, monkeypatch)
+    plan = creator.build_extraction_plan(NODES)
+    stats = plan.execute()
+
+    cache_stats = creator.table_cache.stats()
+    assert cache_stats["misses"] == stats["distinct_files"] - stats["missing_files"]
+    assert cache_stats["hits"] == 0
+    assert stats["cell_requests"] > stats["distinct_files"]
+    print(f"Запросов ячеек: {stats['cell_requests']}, файлов: {stats['distinct_files']}")
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Тесты векторного движка формул ETL/formula_engine.py
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+sys.path.append(str(PROJECT_ROOT))
+
+from ETL.formula_engine import FormulaError, compile_formula, evaluate_federal, evaluate_regional
+from ETL.calculated_node_creator import CalculatedNodeCreator
+
+
+def test_formula_is_parsed_once():
+    """Разобранная формула кешируется по тексту"""
+    assert compile_formula("(node_id1 / node_id2) * 100") is compile_formula("(node_id1 / node_id2) * 100")
+    assert compile_formula("node_id3 - node_id1 + 2").variables == [1, 3]
+
+
+@pytest.mark.parametrize("formula", ["__import__('os')", "node_id1.real", "abs(node_id1)", "x + 1", "node_id0", "node_id1 +"])
+def test_unsupported_formulas_are_rejected(formula):
+    with pytest.raises(FormulaError):
+        compile_formula(formula)
+
+
+def test_federal_missing_values_and_division_by_zero():
+    """None -> 0, пустая ячейка при всех пропусках, деление на ноль - только в своей ячейке"""
+    children = [
+        {"federal_values": [10.0, None, None, 6.0]},
+        {"federal_values": [4.0, 5.0, None, 0.0]},
+    ]
+
+    assert evaluate_federal("(node_id1 / node_id2) * 100", children, 4) == [250.0, 0.0, None, None]
+    assert evaluate_federal("node_id1 + node_id2", children, 4) == [14.0, 5.0, None, 6.0]
+    assert evaluate_federal("-node_id1 * 2", children, 4) == [-20.0, -0.0, None, -12.0]
+
+
+def test_division_by_zero_in_any_position():
+    """Нулевой делитель определяется по самому выражению, а не по node_id2"""
+    children = [{"federal_values": [1.0, 0.0]}, {"federal_values": [2.0, 3.0]}, {"federal_values": [4.0, 4.0]}]
+
+    assert evaluate_federal("node_id2 / node_id1 + node_id3", children, 2) == [6.0, None]
+    assert evaluate_federal("node_id1 / 100 + node_id2", children, 2) == [2.01, 3.0]
+
+
+def test_regions_are_joined_by_name():
+    """Регионы дочерних узлов сопоставляются по названию, а не по позиции"""
+    children = [
+        {"regions": ["Алтайский край", "г. Москва"], "regional_values": [[1.0, 2.0], [3.0, 4.0]]},
+        {"regions": ["г. Москва", "Алтайский край", "Тверская область"], "regional_values": [[30.0, 40.0], [10.0, 20.0], [5.0, None]]},
+    ]
+
+    regions, values = evaluate_regional("node_id1 + node_id2", children, 2)
+
+    assert regions == ["Алтайский край", "г. Москва", "Тверская область"]
+    assert values == [[11.0, 22.0], [33.0, 44.0], [5.0, None]]
+
+
+def test_evaluate_over_three_dimensional_arrays():
+    """Одна операция над массивом (дочерние узлы, регионы, годы)"""
+    values = np.arange(24, dtype=float).reshape(2, 3, 4)
+    present = np.ones_like(values, dtype=bool)
+
+    result, valid = compile_formula("node_id1 * node_id2").evaluate(values, present)
+
+    assert result.shape == (3, 4)
+    assert valid.all()
+    np.testing.assert_allclose(result, values[0] * values[1])
+
+
+def test_creator_matches_legacy_semantics():
+    """Методы CalculatedNodeCreator используют движок и сохраняют прежнее поведение"""
+    creator = CalculatedNodeCreator(str(PROJECT_ROOT / "neo4j_config.json"))
+    creator.years = ["2022", "2023"]
+
+    assert creator.evaluate_formula_for_values("(node_id1 / node_id2) * 100", [1.0, 4.0]) == 25.0
+    assert creator.evaluate_formula_for_values("(node_id1 / node_id2) * 100", [1.0, None]) is None
+    assert creator.evaluate_formula_for_values("node_id1 + node_id2", [None, None]) is None
+    assert creator.evaluate_formula_for_values("node_id1 +", [1.0, 2.0]) is None
+
+    children = [
+        {"federal_values": [1.0, 2.0], "regions": ["A"], "regional_values": [[1.0, None]]},
+        {"federal_values": [1.0], "regions": ["A"], "regional_values": [[1.0, None]]},
+    ]
+    assert creator.calculate_values_for_all_years("node_id1 - node_id2", children) == [0.0, 2.0]
+    assert creator.calculate_regional_values_for_all_years("node_id1 - node_id2", children) == (["A"], [[0.0, None]])
+    assert creator.calculate_values_for_all_years("node_id3", children) == [None, None]
+
+
+REGIONAL_CHILDREN = [
+    {"federal_values": [100.0, 120.0, 150.0],
+     "regions": ["Алтайский край", "г. Москва", "Тверская область"],
+     "regional_values": [[10.0, 20.0, 30.0], [60.0, 60.0, 90.0], [30.0, None, 30.0]]},
+]
+
+
+def test_region_share_of_federal_and_total():
+    """Доля региона в федеральном значении и в сумме по регионам"""
+    regions, share = evaluate_regional("node_id1 / federal(node_id1) * 100", REGIONAL_CHILDREN, 3)
+    _, of_total = evaluate_regional("node_id1 / sum_regions(node_id1)", REGIONAL_CHILDREN, 3)
+
+    assert regions == ["Алтайский край", "г. Москва", "Тверская область"]
+    assert share == [[10.0, 20.0 / 120.0 * 100, 20.0], [60.0, 50.0, 60.0], [30.0, None, 20.0]]
+    assert of_total == [[0.1, 0.25, 0.2], [0.6, 0.75, 0.6], [0.3, None, 0.2]]
+
+
+def test_deviation_from_regional_mean():
+    """Среднее учитывает только регионы с заполненными значениями"""
+    _, deviation = evaluate_regional("node_id1 - mean_regions(node_id1)", REGIONAL_CHILDREN, 3)
+
+    assert deviation[0] == pytest.approx([-23.0 - 1 / 3, -20.0, -20.0])
+    assert deviation[1] == pytest.approx([26.0 + 2 / 3, 20.0, 40.0])
+    assert deviation[2][1] is None and deviation[2][2] == pytest.approx(-20.0)
+
+
+def test_region_aggregates_in_federal_formula():
+    assert evaluate_federal("sum_regions(node_id1)", REGIONAL_CHILDREN, 3) == [100.0, 80.0, 150.0]
+    assert evaluate_federal("node_id1 - sum_regions(node_id1)", REGIONAL_CHILDREN, 3) == [0.0, 40.0, 0.0]
+    # Без региональных данных агрегат пуст
+    assert evaluate_federal("sum_regions(node_id1)", [{"federal_values": [1.0, 2.0]}], 2) == [None, None]
+
+
+def test_lag_and_yoy_shift_along_years():
+    children = [{"federal_values": [100.0, 110.0, 0.0, 50.0]}]
+
+    assert evaluate_federal("lag(node_id1)", children, 4) == [None, 100.0, 110.0, 0.0]
+    assert evaluate_federal("lag(node_id1, 2)", children, 4) == [None, None, 100.0, 110.0]
+    yoy = evaluate_federal("yoy(node_id1) * 100", children, 4)
+    assert yoy[0] is None and yoy[1] == pytest.approx(10.0) and yoy[2] == -100.0 and yoy[3] is None
+
+    _, regional_yoy = evaluate_regional("yoy(node_id1)", REGIONAL_CHILDREN, 3)
+    assert regional_yoy == [[None, 1.0, 0.5], [None, 0.0, 0.5], [None, None, None]]
+
+
+@pytest.mark.parametrize("formula", ["sum_regions()", "lag(node_id1, 0)", "lag(node_id1, node_id2)",
+                                     "yoy(node_id1, 1)", "federal(x=node_id1)", "node_id1.sum_regions()"])
+def test_invalid_function_calls_are_rejected(formula):
+    with pytest.raises(FormulaError):
+        compile_formula(formula)
+
+
+def test_functions_need_matching_data():
+    """federal() без федеральных значений - ошибка; CalculatedNodeCreator передает движку все данные"""
+    values = np.ones((1, 2, 3))
+
+    with pytest.raises(FormulaError):
+        compile_formula("node_id1 / federal(node_id1)").evaluate(values, values > 0)
+
+    creator = CalculatedNodeCreator(str(PROJECT_ROOT / "neo4j_config.json"))
+    creator.years = ["2023", "2024", "2025"]
+    yoy = creator.calculate_values_for_all_years("yoy(node_id1)", REGIONAL_CHILDREN)
+    assert yoy[0] is None and yoy[1:] == pytest.approx([0.2, 0.25])
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Тесты упрощенных контуров регионов (geometry_lod) и карты с уровнем детализации
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+sys.path.append(str(PROJECT_ROOT))
+
+from geometry_lod import LOD_PATH, LOD_TOLERANCES, build_lod_table, load_lod_outlines, outlines_geojson
+from map_figure import REGION_NAMES, REGIONS, base_figure_template
+from test_map_template import make_visualizer
+
+
+def point_count(xs) -> int:
+    return sum(int(np.isfinite(x).sum()) for x in xs)
+
+
+def test_lod_file_matches_source_regions():
+    table = pd.read_parquet(PROJECT_ROOT / LOD_PATH)
+
+    assert set(table["lod"]) == set(LOD_TOLERANCES)
+    for lod, group in table.groupby("lod"):
+        assert sorted(group["region"]) == sorted(REGION_NAMES), lod
+
+
+def test_full_lod_keeps_source_outlines():
+    xs, ys = load_lod_outlines(REGIONS, str(PROJECT_ROOT / LOD_PATH))["full"]
+
+    for x, y, (_, region) in zip(xs, ys, REGIONS.iterrows()):
+        np.testing.assert_array_equal(x, region.x)
+        np.testing.assert_array_equal(y, region.y)
+
+
+def test_coarser_lod_has_fewer_points():
+    outlines = load_lod_outlines(REGIONS, str(PROJECT_ROOT / LOD_PATH))
+    counts = [point_count(outlines[lod][0]) for lod in ("full", "medium", "low")]
+
+    assert counts[0] > counts[1] > counts[2]
+    # Ни один регион не исчезает при упрощении
+    for lod in LOD_TOLERANCES:
+        assert all(point_count([x]) >= 4 for x in outlines[lod][0]), lod
+
+
+def test_missing_lod_file_is_built_in_memory(tmp_path):
+    regions = REGIONS.head(5)
+    outlines = load_lod_outlines(regions, str(tmp_path / "missing.parquet"))
+
+    assert set(outlines) == set(LOD_TOLERANCES)
+    assert len(outlines["low"][0]) == 5
+    assert len(build_lod_table(regions)) == 5 * len(LOD_TOLERANCES)
+
+
+def test_map_html_is_smaller_for_low_lod():
+    visualizer = make_visualizer()
+
+    full_html = visualizer.get_regional_map_html("node", "2024")
+    low_html = visualizer.get_regional_map_html("node", "2024", lod="low")
+
+    assert "Plotly.newPlot" in low_html
+    assert len(low_html) < len(full_html) / 5
+    assert base_figure_template("low") is not base_figure_template("full")
+    assert [trace["name"] for trace in base_figure_template("low")["data"]] == REGION_NAMES
+
+
+def test_geojson_rings_are_clockwise_lonlat():
+    xs, ys = load_lod_outlines(REGIONS, str(PROJECT_ROOT / LOD_PATH))["low"]
+    geojson = outlines_geojson(REGION_NAMES, xs, ys)
+
+    assert [feature["id"] for feature in geojson["features"]] == REGION_NAMES
+    for feature in geojson["features"]:
+        assert feature["geometry"]["coordinates"], feature["id"]
+        for polygon in feature["geometry"]["coordinates"]:
+            ring = np.array(polygon[0])
+            assert 19 < ring[:, 0].min() and ring[:, 0].max() < 191
+            assert 41 < ring[:, 1].min() and ring[:, 1].max() < 82
+            area = np.dot(ring[:-1, 0], ring[1:, 1]) - np.dot(ring[1:, 0], ring[:-1, 1])
+            assert area < 0, feature["id"]
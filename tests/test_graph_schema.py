@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Тесты создания ограничений и индексов графа ETL/graph_schema.py
+"""
+
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+sys.path.append(str(PROJECT_ROOT))
+
+from ETL.graph_schema import (
+    SCHEMA_CONSTRAINTS, SCHEMA_INDEXES, bootstrap_schema, format_schema_report
+)
+
+
+def schema_driver(fake_driver, indexes, failing=()):
+    """Драйвер, отвечающий на SHOW INDEXES и падающий на операторах failing"""
+    def apply(query, parameters):
+        if query in failing:
+            raise Exception("Constraint violation")
+        return []
+
+    fake_driver.on("SHOW INDEXES", lambda query, parameters: indexes)
+    fake_driver.on("duplicate_names", lambda query, parameters: [{"duplicate_names": 2, "examples": ["Узел 1", "Узел 2"]}])
+    fake_driver.on("CREATE", apply)
+    return fake_driver
+
+
+def make_index(name, state="ONLINE", owning=None):
+    return {
+        "name": name, "type": "RANGE", "state": state, "populationPercent": 100.0 if state == "ONLINE" else 40.0,
+        "labelsOrTypes": ["Регион"], "properties": ["name"], "owningConstraint": owning
+    }
+
+
+def test_bootstrap_is_idempotent_and_reports_status(fake_driver):
+    """Все операторы идемпотентны, отчет содержит только индексы схемы"""
+    indexes = [
+        make_index("region_name_unique", owning="region_name_unique"),
+        make_index("schetnoe_full_name_text", state="POPULATING"),
+        make_index("unrelated_index")
+    ]
+    driver = schema_driver(fake_driver, indexes)
+
+    report = bootstrap_schema(driver, "neo4j")
+
+    for statement in driver.statements[:-1]:
+        assert "IF NOT EXISTS" in statement
+    assert len(report["applied"]) == len(SCHEMA_CONSTRAINTS) + len(SCHEMA_INDEXES)
+    assert [index["name"] for index in report["indexes"]] == ["region_name_unique", "schetnoe_full_name_text"]
+    assert report["all_online"] is False
+
+    lines = format_schema_report(report)
+    assert any("POPULATING" in line and "40%" in line for line in lines)
+
+
+def test_failed_constraint_is_reported(fake_driver):
+    """Ошибка создания ограничения (например, из-за дубликатов) попадает в отчет"""
+    failing_statement = SCHEMA_CONSTRAINTS[1][1]
+    driver = schema_driver(fake_driver, [make_index("region_name_unique")], failing=[failing_statement])
+
+    report = bootstrap_schema(driver, "neo4j")
+
+    assert [failure["name"] for failure in report["failed"]] == [SCHEMA_CONSTRAINTS[1][0]]
+    assert report["failed"][0]["duplicates"]["duplicate_names"] == 2
+    assert any("`Счетное`" in statement for statement in driver.statements)
+    assert any("Повторяющихся имен: 2" in line for line in format_schema_report(report))
+    assert report["all_online"] is True
+
+
+def test_range_indexes_cover_filtered_properties():
+    """Свойства, по которым ищутся узлы, покрыты RANGE индексами"""
+    statements = [statement for _, statement in SCHEMA_INDEXES]
+
+    assert any("RANGE INDEX" in statement and "(n.полное_название)" in statement and ":Счетное" in statement
+               for statement in statements)
+    assert any("RANGE INDEX" in statement and "(n.virtual)" in statement for statement in statements)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Тесты шаблона базовой карты (map_figure.base_figure_template) и
+рендера карты RegionVisualizerNeo4j без построения mapFigure на каждый запрос
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+sys.path.append(str(PROJECT_ROOT))
+
+from map_figure import REGION_NAMES, base_figure_template, mapFigure
+from region_visualizer_neo4j import RegionVisualizerNeo4j
+
+NODE_INFO = {"name": "Численность", "full_name": "Численность обучающихся"}
+
+
+def make_visualizer():
+    visualizer = RegionVisualizerNeo4j(str(PROJECT_ROOT / "neo4j_config.json"))
+    visualizer.driver = object()
+    visualizer.get_node_info = lambda node_id: NODE_INFO
+    visualizer.get_regional_data = lambda node_id, year: {
+        region: float(index * 10 + int(year) % 7) for index, region in enumerate(REGION_NAMES[::2])
+    }
+    visualizer.match_region_names = lambda neo4j_regions, map_regions: {region: region for region in neo4j_regions}
+    return visualizer
+
+
+def legacy_map_figure(visualizer, year, map_data):
+    """Прежний рендер: новая mapFigure и update_traces по имени для каждого региона"""
+    russia_map = mapFigure()
+    values = list(map_data.values())
+    for region_name in REGION_NAMES:
+        if region_name in map_data:
+            value = map_data[region_name]
+            value_text = f"Значение: <b>{value:,.2f}</b>".replace(',', ' ')
+            text = f'<b>{region_name}</b><br>{NODE_INFO["full_name"]}<br>Год: {year}<br>{value_text}'
+            russia_map.update_traces(selector=dict(name=region_name), text=text,
+                                     fillcolor=visualizer.get_color(value, min(values), max(values)))
+        else:
+            russia_map.update_traces(selector=dict(name=region_name), text=f'<b>{region_name}</b><br>Нет данных')
+    russia_map.update_layout(title=f"{NODE_INFO['full_name']} - {year} год")
+    return russia_map
+
+
+def test_template_figure_matches_legacy_figure():
+    visualizer = make_visualizer()
+    map_data = visualizer.get_regional_data("node", "2024")
+
+    figure = visualizer.build_regional_map_figure(NODE_INFO, "2024", map_data)
+    legacy = legacy_map_figure(visualizer, "2024", map_data).to_plotly_json()
+
+    assert len(figure["data"]) == len(legacy["data"]) == len(REGION_NAMES)
+    for trace, legacy_trace in zip(figure["data"], legacy["data"]):
+        assert set(trace) == set(legacy_trace)
+        for key, value in legacy_trace.items():
+            if isinstance(value, np.ndarray):
+                np.testing.assert_array_equal(trace[key], value)
+            else:
+                assert trace[key] == value, key
+    assert figure["layout"] == legacy["layout"]
+
+
+def test_render_does_not_modify_template():
+    visualizer = make_visualizer()
+    template_trace = dict(base_figure_template()["data"][0])
+
+    html = visualizer.get_regional_map_html("node", "2023")
+
+    assert "Plotly.newPlot" in html and "Численность обучающихся - 2023 год" in html
+    assert base_figure_template()["data"][0] == template_trace
+    assert "title" not in base_figure_template()["layout"]
+
+
+def test_render_benchmark():
+    """Время рендера карты по (узел, год): прежний путь и шаблон"""
+    visualizer = make_visualizer()
+    years = ["2021", "2022", "2023"]
+    visualizer.get_regional_map_html("node", "2020")
+
+    start = time.perf_counter()
+    for year in years:
+        legacy = legacy_map_figure(visualizer, year, visualizer.get_regional_data("node", year))
+        legacy.to_html(full_html=False, include_plotlyjs=False)
+    legacy_time = (time.perf_counter() - start) / len(years)
+
+    start = time.perf_counter()
+    for year in years:
+        visualizer.get_regional_map_html("node", year)
+    template_time = (time.perf_counter() - start) / len(years)
+
+    print(f"Рендер карты: прежний путь {legacy_time * 1000:.0f} мс, шаблон {template_time * 1000:.0f} мс "
+          f"({legacy_time / template_time:.1f}x)")
+    assert template_time < legacy_time
+
+
+def test_choropleth_renderer_matches_trace_colors():
+    visualizer = make_visualizer()
+    map_data = visualizer.get_regional_data("node", "2024")
+
+    traces = visualizer.build_regional_map_figure(NODE_INFO, "2024", map_data)
+    choropleth = visualizer.build_regional_map_figure(NODE_INFO, "2024", map_data, renderer="choropleth")
+
+    assert len(choropleth["data"]) == 1
+    trace = choropleth["data"][0]
+    colorscale = trace["colorscale"]
+    assert list(trace["locations"]) == REGION_NAMES
+    assert [point for point, _ in colorscale] == pytest.approx([z / trace["zmax"] for z in trace["z"]])
+    assert [color for _, color in colorscale] == [region["fillcolor"] for region in traces["data"]]
+    assert list(trace["text"]) == [region["text"] for region in traces["data"]]
+    assert choropleth["layout"]["title"] == traces["layout"]["title"]
+
+
+def test_choropleth_html_renders_single_trace():
+    visualizer = make_visualizer()
+
+    html = visualizer.get_regional_map_html("node", "2023", lod="low", renderer="choropleth")
+
+    assert "Plotly.newPlot" in html
+    assert html.count('"locations":') == 1 and '"toself"' not in html
+
+
+def test_map_styles_match_rendered_figure():
+    visualizer = make_visualizer()
+    map_data = visualizer.get_regional_data("node", "2022")
+
+    styles = visualizer.get_regional_map_styles("node", "2022")
+    figure = visualizer.build_regional_map_figure(NODE_INFO, "2022", map_data)
+
+    assert styles["trace_indices"] == list(range(len(REGION_NAMES)))
+    assert styles["fillcolor"] == [trace["fillcolor"] for trace in figure["data"]]
+    assert styles["text"] == [trace["text"] for trace in figure["data"]]
+    assert styles["title"] == figure["layout"]["title"]["text"]
+    assert styles["values"] == [map_data.get(region) for region in REGION_NAMES]
+
+
+def test_map_styles_endpoint_payload_is_small(monkeypatch):
+    import dashboard_server
+
+    visualizer = make_visualizer()
+    monkeypatch.setattr(dashboard_server, "visualizer", visualizer)
+    client = dashboard_server.app.test_client()
+
+    styles = client.get("/api/map/node/2023/styles")
+    full_map = client.get("/api/map/node/2023")
+
+    assert styles.status_code == 200 and full_map.status_code == 200
+    assert styles.get_json()["fillcolor"] == visualizer.get_regional_map_styles("node", "2023")["fillcolor"]
+    assert client.get("/api/map/node/1999/styles").status_code == 400
+    print(f"Смена года: HTML карты {len(full_map.data) / 1024:.0f} КБ, цвета регионов {len(styles.data) / 1024:.1f} КБ")
+    assert len(styles.data) < len(full_map.data) / 50
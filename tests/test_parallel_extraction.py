@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Тесты параллельного сбора региональных данных
+"""
+
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+sys.path.append(str(PROJECT_ROOT))
+
+from ETL import parallel_extraction
+from ETL.parallel_extraction import ExtractionPool, extract_cells, resolve_worker_count
+from ETL.table_cache import ParsedTableCache
+from tests.test_extraction_plan import make_creator, NODES
+
+
+def test_parallel_matches_serial(tmp_path, monkeypatch):
+    """Параллельный сбор дает те же значения и тот же порядок регионов"""
+    creator = make_creator(tmp_path, monkeypatch)
+
+    for node_config in NODES[:3]:
+        periods_config = creator.extract_period_config(node_config)
+
+        creator.max_workers = 1
+        serial = creator.collect_regional_data_by_periods(periods_config)
+
+        creator.max_workers = 2
+        parallel = creator.collect_regional_data_by_periods(periods_config)
+
+        assert parallel == serial
+
+
+def test_parallel_plan_matches_serial(tmp_path, monkeypatch):
+    """План пакета в пуле процессов совпадает с последовательным выполнением"""
+    creator = make_creator(tmp_path, monkeypatch)
+
+    creator.max_workers = 1
+    serial_plan = creator.build_extraction_plan(NODES)
+    serial_plan.execute()
+
+    creator.max_workers = 2
+    parallel_plan = creator.build_extraction_plan(NODES)
+    parallel_plan.execute()
+
+    for index in range(len(NODES)):
+        assert parallel_plan.get_node_data(index) == serial_plan.get_node_data(index)
+
+
+def test_pool_is_shared_between_nodes(tmp_path, monkeypatch):
+    """Узлы пакета используют один пул процессов, пул останавливается при disconnect"""
+    creator = make_creator(tmp_path, monkeypatch)
+    creator.max_workers = 2
+
+    started = []
+    executor_class = parallel_extraction.ProcessPoolExecutor
+
+    def counting_executor(*args, **kwargs):
+        started.append(kwargs.get("max_workers"))
+        return executor_class(*args, **kwargs)
+
+    monkeypatch.setattr(parallel_extraction, "ProcessPoolExecutor", counting_executor)
+
+    for node_config in NODES:
+        creator.collect_regional_data_by_periods(creator.extract_period_config(node_config))
+    creator.build_extraction_plan(NODES).execute()
+
+    assert started == [2]
+    creator.disconnect()
+    assert creator.extraction_pool._executor is None
+
+
+def test_extract_cells_order_and_missing_files(tmp_path):
+    """Результаты возвращаются в порядке задач, отсутствующие файлы дают None"""
+    path = tmp_path / "Раздел 1.csv"
+    path.write_text("№ строки;Наименование;Всего\n1;А;10\n2;Б;20,5\n", encoding='utf-8')
+
+    tasks = [
+        (str(path), [(2, 3), (1, 3)]),
+        (str(tmp_path / "нет.csv"), [(1, 3)]),
+        (str(path), [(1, 2), (5, 3)])
+    ]
+
+    expected = [[20.5, 10.0], [None], [None, None]]
+    assert extract_cells(tasks, 1, ParsedTableCache()) == expected
+    assert extract_cells(tasks, 2) == expected
+    with ExtractionPool() as pool:
+        assert extract_cells(tasks, 2, pool=pool) == expected
+        assert extract_cells(tasks, 2, pool=pool) == expected
+
+
+def test_resolve_worker_count():
+    assert resolve_worker_count(0) == 1
+    assert resolve_worker_count(3) == 3
+    assert resolve_worker_count() >= 1
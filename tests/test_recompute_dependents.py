@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Тесты пересчета расчетных узлов, зависящих от изменившихся узлов
+(CalculatedNodeCreator.recompute_dependents)
+"""
+
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+sys.path.append(str(PROJECT_ROOT))
+
+from ETL.calculated_node_creator import CalculatedNodeCreator
+
+YEARS = ["2023", "2024"]
+
+
+def indicator(name, federal, moscow):
+    return {"node_name": name, "federal_values": federal, "years": YEARS, "region_keys": None, "regional_values": None,
+            "edges": [{"region": "г. Москва", "values": dict(zip(["value_2023", "value_2024"], moscow))}]}
+
+
+class FakeGraph:
+    """
+    id-1 и id-2 - узлы Счетное; calc-sum = id-1 + id-2; calc-share = calc-sum / id-2;
+    calc-const = id-2 * 0 (значения не меняются при изменении id-2)
+    """
+
+    def __init__(self, driver):
+        self.nodes = {
+            # id-1 изменился: было 1.0/2.0
+            "id-1": indicator("Показатель 1", [5.0, 2.0], [5.0, 2.0]),
+            "id-2": indicator("Показатель 2", [10.0, 20.0], [10.0, 20.0]),
+            "calc-sum": indicator("Сумма", [11.0, 22.0], [11.0, 22.0]),
+            "calc-share": indicator("Доля", [1.1, 1.1], [1.1, 1.1]),
+            "calc-const": indicator("Ноль", [0.0, 0.0], [0.0, 0.0]),
+        }
+        self.formulas = {
+            "calc-sum": ("node_id1 + node_id2", ["id-1", "id-2"]),
+            # Дочерний расчетный узел указан первым, хотя пересчитывается раньше
+            "calc-share": ("node_id1 / node_id2", ["calc-sum", "id-2"]),
+            "calc-const": ("node_id1 * 0", ["id-1"]),
+        }
+        self.updated = []
+        self.driver = driver
+        driver.on("ИСПОЛЬЗУЕТСЯ_В*1..", self.dependents)
+        driver.on("UNWIND $node_ids", self.fetch_nodes)
+        driver.on("SET n += $properties", self.set_properties)
+        driver.on("UNWIND $rows", lambda query, parameters: [{"written": len(parameters["rows"])}])
+        driver.on("", lambda query, parameters: [{"deleted": 0}])
+
+    def dependents(self, query, parameters):
+        assert parameters["node_ids"] == ["id-1"]
+        return [
+            {"node_id": node_id, "node_name": self.nodes[node_id]["node_name"], "full_name": None,
+             "labels": ["Расчетные"], "formula": formula, "child_nodes": children}
+            for node_id, (formula, children) in self.formulas.items()
+        ]
+
+    def fetch_nodes(self, query, parameters):
+        return [{"node_id": node_id, **self.nodes[node_id]}
+                for node_id in parameters["node_ids"] if node_id in self.nodes]
+
+    def set_properties(self, query, parameters):
+        self.updated.append((parameters["node_id"], parameters["properties"]))
+        return [{"node_id": parameters["node_id"]}]
+
+
+def test_dependents_are_recomputed_in_dependency_order(fake_driver):
+    graph = FakeGraph(fake_driver)
+    creator = CalculatedNodeCreator(str(PROJECT_ROOT / "neo4j_config.json"))
+    creator.years = YEARS
+    creator.connect = lambda: setattr(creator, "driver", fake_driver)
+    creator.disconnect = lambda: None
+
+    result = creator.recompute_dependents(["id-1", "id-1"])
+
+    assert result["success"], result
+    assert result["dependent_nodes"] == 3
+    assert result["touched_nodes"] == 2
+    assert result["skipped_nodes"] == 1
+
+    # Сумма пересчитана раньше доли, доля использует новую сумму без повторного чтения
+    assert [node_id for node_id, _ in graph.updated] == ["calc-sum", "calc-share"]
+    assert graph.updated[0][1]["federal_values"] == [15.0, 22.0]
+    assert graph.updated[1][1]["federal_values"] == [1.5, 1.1]
+    assert graph.updated[1][1]["child_nodes"] == ["calc-sum", "id-2"]
+    assert result["touched_node_ids"] == ["calc-sum", "calc-share"]
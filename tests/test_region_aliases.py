@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Тесты сохраняемого индекса названий регионов (region_aliases)
+"""
+
+import json
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+sys.path.append(str(PROJECT_ROOT))
+
+import region_aliases
+from region_aliases import RegionAliasIndex, normalize_name
+
+MAP_REGIONS = ["Москва", "Кемеровская область", "Ханты-Мансийский автономный округ — Югра", "Республика Тыва"]
+
+
+def count_fuzzy_calls(monkeypatch):
+    calls = []
+    extract_one = region_aliases.process.extractOne
+
+    def counting_extract_one(*args, **kwargs):
+        calls.append(args[0])
+        return extract_one(*args, **kwargs)
+
+    monkeypatch.setattr(region_aliases.process, "extractOne", counting_extract_one)
+    return calls
+
+
+def test_new_names_are_matched_once_and_persisted(tmp_path, monkeypatch):
+    path = str(tmp_path / "aliases.json")
+    calls = count_fuzzy_calls(monkeypatch)
+    names = ["г. Москва", "Кемеровская область – Кузбасс", "Российская Федерация", "Республика Тыва"]
+
+    matches = RegionAliasIndex(MAP_REGIONS, path).resolve_many(names)
+
+    assert matches == {"г. Москва": "Москва", "Кемеровская область – Кузбасс": "Кемеровская область",
+                       "Республика Тыва": "Республика Тыва"}
+    # Точное название карты находится без нечеткого поиска
+    assert sorted(calls) == sorted(["г. Москва", "Кемеровская область – Кузбасс", "Российская Федерация"])
+
+    saved = json.loads(Path(path).read_text(encoding="utf-8"))
+    assert saved["regions"]["Москва"]["neo4j_names"] == ["г. Москва"]
+    assert saved["unmatched"] == ["Российская Федерация"]
+
+    calls.clear()
+    reloaded = RegionAliasIndex(MAP_REGIONS, path)
+    assert reloaded.resolve_many(names) == matches
+    assert calls == []
+
+
+def test_overrides_take_priority(tmp_path):
+    path = tmp_path / "aliases.json"
+    path.write_text(json.dumps({"overrides": {"ХМАО": "Ханты-Мансийский автономный округ — Югра",
+                                              "г. Москва": None}}, ensure_ascii=False), encoding="utf-8")
+
+    index = RegionAliasIndex(MAP_REGIONS, str(path))
+
+    assert index.resolve("хмао") == "Ханты-Мансийский автономный округ — Югра"
+    assert index.resolve("г. Москва") is None
+
+
+def test_normalize_name_ignores_case_dashes_and_spaces():
+    assert normalize_name("Ханты-Мансийский  автономный округ – Югра") == \
+        normalize_name("ханты-мансийский автономный округ — югра")
+    assert normalize_name("Орёл") == normalize_name("Орел")
+
+
+def test_visualizer_uses_index_for_map_regions(tmp_path, monkeypatch):
+    from map_figure import REGION_NAMES
+    from region_visualizer_neo4j import RegionVisualizerNeo4j
+
+    visualizer = RegionVisualizerNeo4j(str(PROJECT_ROOT / "neo4j_config.json"))
+    visualizer.region_index = RegionAliasIndex(REGION_NAMES, str(tmp_path / "aliases.json"))
+    calls = count_fuzzy_calls(monkeypatch)
+
+    first = visualizer.match_region_names(["г. Москва", "Алтайский край"], REGION_NAMES)
+    second = visualizer.match_region_names(["г. Москва", "Алтайский край"], REGION_NAMES)
+
+    assert first == second == {"г. Москва": "Москва", "Алтайский край": "Алтайский край"}
+    assert calls == ["г. Москва"]
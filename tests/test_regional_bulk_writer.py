@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Тесты массовой записи связей ПоРегион (UNWIND)
+"""
+
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+sys.path.append(str(PROJECT_ROOT))
+
+from ETL.neo4j_node_creator import Neo4jNodeCreator
+
+
+def write_rows(query, parameters):
+    return [{"written": len(parameters["rows"])}]
+
+
+def make_creator(fake_driver, batch_size: int) -> Neo4jNodeCreator:
+    creator = Neo4jNodeCreator(str(PROJECT_ROOT / "neo4j_config.json"), write_batch_size=batch_size)
+    creator.years = ["2023", "2024"]
+    creator.driver = fake_driver.on("UNWIND $rows", write_rows)
+    return creator
+
+
+def test_rows_are_written_in_batches(fake_driver):
+    """Связи узла пишутся пакетами UNWIND, а не по одной"""
+    creator = make_creator(fake_driver, batch_size=2)
+    regions = ["Алтайский край", "Тверская область", "г. Москва"]
+    values = [[1.0, 2.0], [3.0], [None, 6.0]]
+
+    written = creator.create_regional_relationships("node-1", regions, values)
+
+    calls = fake_driver.queries
+    assert written == 3
+    assert len(calls) == 2
+    assert "UNWIND $rows AS row" in calls[0][0]
+    assert "MERGE (reg:Регион" in calls[0][0]
+    assert "CREATE (n)-[r:ПоРегион]->(reg)" in calls[0][0]
+    assert calls[0][1]["rows"][1] == {
+        "node_id": "node-1",
+        "region": "Тверская область",
+        "values": {"value_2023": 3.0, "value_2024": None}
+    }
+    assert creator.regional_write_stats["batches"] == 2
+
+
+def test_buffer_combines_nodes(fake_driver):
+    """В режиме буфера связи нескольких узлов уходят одной транзакцией"""
+    creator = make_creator(fake_driver, batch_size=100)
+    creator.begin_regional_buffer()
+
+    for node_index in range(5):
+        written = creator.create_regional_relationships(f"node-{node_index}", ["Регион А", "Регион Б"], [[1, 2], [3, 4]])
+        assert written == 0
+
+    assert fake_driver.queries == []
+    assert creator.flush_regional_buffer() == 10
+    assert len(fake_driver.queries) == 1
+    assert {row["node_id"] for row in fake_driver.queries[0][1]["rows"]} == {f"node-{i}" for i in range(5)}
+
+
+def test_merge_mode(fake_driver):
+    creator = make_creator(fake_driver, batch_size=10)
+    creator.write_regional_rows(creator.build_regional_rows("node", ["Регион"], [[1, 2]]), merge=True)
+    assert "MERGE (n)-[r:ПоРегион]->(reg)" in fake_driver.queries[0][0]
+
+
+def test_failed_batch_reports_its_nodes(fake_driver):
+    """Узлы из пакета, завершившегося ошибкой, не считаются записанными"""
+    def failing_write(query, parameters):
+        if any(row["node_id"] == "node-2" for row in parameters["rows"]):
+            raise RuntimeError("transaction failed")
+        return write_rows(query, parameters)
+
+    fake_driver.on("UNWIND $rows", failing_write)
+    creator = make_creator(fake_driver, batch_size=2)
+    rows = []
+    for node_index in range(3):
+        rows.extend(creator.build_regional_rows(f"node-{node_index}", ["Регион А", "Регион Б"], [[1, 2], [3, 4]]))
+    written = creator.write_regional_rows(rows)
+
+    assert written == 4
+    assert creator.failed_regional_node_ids == {"node-2"}
+    assert creator.regional_write_stats["rows"] == 4
+
+
+def test_stats_are_consistent_across_threads(fake_driver):
+    """Счетчики записи не теряют обновления при записи из нескольких потоков"""
+    creator = make_creator(fake_driver, batch_size=1)
+    rows = creator.build_regional_rows("node", [f"Регион {i}" for i in range(50)], [[1, 2]] * 50)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        written = sum(executor.map(lambda row: creator.write_regional_rows([row]), rows * 8))
+
+    assert written == 400
+    assert creator.regional_write_stats["rows"] == 400
+    assert creator.regional_write_stats["batches"] == 400
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Тесты компактного хранения региональных значений ETL/regional_layout.py
+"""
+
+import math
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+sys.path.append(str(PROJECT_ROOT))
+
+from ETL.regional_layout import pack_regional_values, unpack_regional_values, values_equal
+from ETL.calculated_node_creator import CalculatedNodeCreator
+
+YEARS = ["2022", "2023", "2024"]
+
+
+def test_pack_unpack_round_trip():
+    """Массив хранится по регионам, внутри - по годам; NULL хранится как NaN"""
+    regions = ["Алтайский край", "г. Москва"]
+    values = [[1.0, None, 3.0], [4.0, 5.0]]
+
+    packed = pack_regional_values(regions, values, YEARS)
+    assert packed["region_keys"] == regions
+    assert packed["regional_values"][:3] == [1.0, packed["regional_values"][1], 3.0]
+    assert math.isnan(packed["regional_values"][1])
+    assert math.isnan(packed["regional_values"][5])
+
+    unpacked_regions, unpacked_values = unpack_regional_values({**packed, "years": YEARS}, YEARS)
+    assert unpacked_regions == regions
+    assert unpacked_values == [[1.0, None, 3.0], [4.0, 5.0, None]]
+
+
+def test_unpack_selects_years_by_node_years():
+    """Выбор лет идет по свойству years узла: новый год не требует новых свойств"""
+    packed = pack_regional_values(["Регион"], [[10.0, 20.0, 30.0]], YEARS)
+    properties = {**packed, "years": YEARS}
+
+    assert unpack_regional_values(properties, ["2024"]) == (["Регион"], [[30.0]])
+    assert unpack_regional_values(properties, ["2025", "2022"]) == (["Регион"], [[None, 10.0]])
+    assert unpack_regional_values({"years": YEARS}, YEARS) is None
+
+
+def test_values_equal_treats_nan_as_equal():
+    assert values_equal([1.0, float("nan")], [1.0, float("nan")])
+    assert not values_equal([1.0, float("nan")], [1.0, 2.0])
+    assert values_equal(None, None)
+
+
+def test_calculator_reads_array_layout_in_one_query(fake_driver):
+    """Калькулятор читает массивы узла без обхода связей ПоРегион"""
+    creator = CalculatedNodeCreator(str(PROJECT_ROOT / "neo4j_config.json"), storage_layout="array")
+    # Узел с компактным хранением возвращается на любой запрос
+    creator.driver = fake_driver.on("", lambda query, parameters: [{
+        "federal_values": [1.0, 2.0, 3.0], "years": YEARS, "node_name": "Узел", "node_id": "id-1",
+        "edges": [],
+        **pack_regional_values(["Тверская область", "Алтайский край"], [[1, 2, 3], [4, None, 6]], YEARS)
+    }])
+    creator.years = YEARS
+
+    data = creator.get_node_data_by_id("id-1")
+
+    assert len(fake_driver.queries) == 1
+    assert data["regions"] == ["Алтайский край", "Тверская область"]
+    assert data["regional_values"] == [[4.0, None, 6.0], [1.0, 2.0, 3.0]]
+    assert creator.uses_regional_relationships() is False
+    assert creator.layout_properties(["Регион"], [[1, 2, 3]])["region_keys"] == ["Регион"]
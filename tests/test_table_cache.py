@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Тесты кеша разобранных таблиц ETL/table_cache.py
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+sys.path.append(str(PROJECT_ROOT))
+
+from ETL.table_cache import ParsedTableCache, parse_numeric_table
+
+SAMPLE_DIR = PROJECT_ROOT / "БД" / "2019"
+
+
+def legacy_cell_value(file_path: str, column_number: int, row_number: int):
+    """Исходный алгоритм чтения ячейки (read_csv + iterrows) для сравнения"""
+    df = pd.read_csv(file_path, header=None, encoding='utf-8', sep=';')
+    header_row_index = None
+    for idx, row in df.iterrows():
+        if isinstance(row[0], str) and "№ строки" in str(row[0]):
+            header_row_index = idx
+            break
+    if header_row_index is None:
+        return None
+    actual_row_index = header_row_index + row_number
+    if actual_row_index >= len(df) or column_number - 1 >= len(df.columns):
+        return None
+    cell_value = df.iloc[actual_row_index, column_number - 1]
+    if pd.isna(cell_value):
+        return None
+    try:
+        return float(str(cell_value).strip().replace(',', '.'))
+    except ValueError:
+        return None
+
+
+def test_values_match_legacy_reader():
+    """Значения из кеша совпадают с исходным построчным чтением"""
+    files = sorted(SAMPLE_DIR.glob("Раздел *.csv"))[:5]
+    assert files, "Нет тестовых CSV файлов"
+
+    cache = ParsedTableCache()
+    for file_path in files:
+        table = parse_numeric_table(str(file_path))
+        rows, columns = table.values.shape
+        for row_number in range(1, min(rows, 6) + 1):
+            for column_number in range(1, min(columns, 8) + 1):
+                expected = legacy_cell_value(str(file_path), column_number, row_number)
+                actual = cache.get_value(str(file_path), column_number, row_number)
+                assert actual == expected, f"{file_path.name} [{row_number}, {column_number}]: {actual} != {expected}"
+
+        # Выход за границы таблицы
+        assert cache.get_value(str(file_path), columns + 5, 1) is None
+        assert cache.get_value(str(file_path), 1, rows + 5) is None
+
+    print(f"Статистика кеша: {cache.stats()}")
+
+
+def test_counters_and_eviction(tmp_path):
+    """Счетчики попаданий, промахов и вытеснений"""
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"Раздел {i}.csv"
+        path.write_text(f";;\n№ строки;Наименование;3\n1;Строка;{i},5\n", encoding='utf-8')
+        paths.append(str(path))
+
+    cache = ParsedTableCache(max_entries=2)
+    assert cache.get_value(paths[0], 3, 1) == 0.5
+    assert cache.get_value(paths[0], 3, 1) == 0.5
+    assert cache.get_value(paths[1], 3, 1) == 1.5
+    assert cache.get_value(paths[2], 3, 1) == 2.5
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 3
+    assert stats["evictions"] == 1
+    assert stats["entries"] == 2
+
+
+def test_file_change_invalidates_entry(tmp_path):
+    """Изменение mtime файла приводит к повторному разбору"""
+    path = tmp_path / "Раздел 1.csv"
+    path.write_text("№ строки;Наименование;3\n1;Строка;10\n", encoding='utf-8')
+
+    cache = ParsedTableCache()
+    assert cache.get_value(str(path), 3, 1) == 10.0
+
+    path.write_text("№ строки;Наименование;3\n1;Строка;20\n", encoding='utf-8')
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert cache.get_value(str(path), 3, 1) == 20.0
+    assert cache.stats()["entries"] == 1
+
+
+def test_missing_header_returns_none(tmp_path):
+    """Файл без строки '№ строки' не содержит данных"""
+    path = tmp_path / "Раздел 2.csv"
+    path.write_text(";;\n1;2;3\n", encoding='utf-8')
+
+    cache = ParsedTableCache()
+    assert cache.get_table(str(path)).header_row_index is None
+    assert cache.get_value(str(path), 1, 1) is None
+
+
+def test_bot_gets_raw_cell_text(tmp_path):
+    """Бот получает текст ячейки как в файле, ячейка вне таблицы - пустая строка"""
+    from tg_bot.excel_reader import get_cell_value
+
+    path = tmp_path / "Раздел 3.csv"
+    path.write_text("№ строки;Наименование;3;4\n1;Строка;12,5;нет данных\n", encoding='utf-8')
+
+    assert get_cell_value(str(path), 2, 1) == "Строка"
+    assert get_cell_value(str(path), 3, 1) == "12,5"
+    assert get_cell_value(str(path), 4, 1) == "нет данных"
+    assert get_cell_value(str(path), 5, 1) == ""
+    assert get_cell_value(str(path), 3, 2) == ""
+
+
+def test_repeated_lookups_are_faster():
+    """Повторное обращение к той же таблице не перечитывает файл"""
+    file_path = str(sorted(SAMPLE_DIR.glob("Раздел *.csv"))[0])
+    cache = ParsedTableCache()
+
+    start = time.perf_counter()
+    cache.get_value(file_path, 3, 1)
+    first = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(100):
+        cache.get_value(file_path, 3, 1)
+    repeated = (time.perf_counter() - start) / 100
+
+    print(f"Первый разбор: {first * 1000:.2f} мс, из кеша: {repeated * 1000:.3f} мс")
+    assert repeated < first
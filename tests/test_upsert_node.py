@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Тесты режима upsert с вычислением изменений (Neo4jNodeCreator.upsert_node)
+"""
+
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+sys.path.append(str(PROJECT_ROOT))
+
+from tests.test_extraction_plan import make_creator, NODES, REGIONS
+
+
+READ_NODE = "WITH n LIMIT 1"
+
+
+class FakeGraph:
+    """Минимальная модель графа: узлы по имени и связи ПоРегион"""
+
+    def __init__(self, driver):
+        self.nodes = {}
+        self.edges = {}
+        self.driver = driver
+        driver.on(READ_NODE, self.read_node)
+        driver.on("SET n += $properties", self.set_properties)
+        driver.on("DELETE r", self.delete_edges)
+        driver.on("UNWIND $rows", self.write_edges)
+        driver.on("CREATE (n:", self.create_node)
+
+    @property
+    def writes(self):
+        """Запросы записи (все, кроме чтения узла)"""
+        return [query for query in self.driver.statements if READ_NODE not in query]
+
+    def read_node(self, query, parameters):
+        node = self.nodes.get(parameters["name"])
+        if node is None:
+            return []
+        edges = [{"region": region, "values": values}
+                 for (node_id, region), values in self.edges.items() if node_id == node["id"]]
+        return [{"node_id": node["id"], "properties": node["properties"], "edges": edges}]
+
+    def create_node(self, query, parameters):
+        node_id = f"id-{parameters['name']}"
+        # Как в Neo4j: свойства со значением null не сохраняются
+        properties = {key: value for key, value in parameters.items() if value is not None}
+        self.nodes[parameters["name"]] = {"id": node_id, "properties": properties}
+        return [{"node_id": node_id}]
+
+    def set_properties(self, query, parameters):
+        for node in self.nodes.values():
+            if node["id"] == parameters["node_id"]:
+                for key, value in parameters["properties"].items():
+                    if value is None:
+                        node["properties"].pop(key, None)
+                    else:
+                        node["properties"][key] = value
+        return [{"node_id": parameters["node_id"]}]
+
+    def delete_edges(self, query, parameters):
+        stale = [key for key in self.edges if key[0] == parameters["node_id"] and key[1] in parameters["regions"]]
+        for key in stale:
+            del self.edges[key]
+        return [{"deleted": len(stale)}]
+
+    def write_edges(self, query, parameters):
+        for row in parameters["rows"]:
+            edge = self.edges.setdefault((row["node_id"], row["region"]), {})
+            edge.update({key: value for key, value in row["values"].items() if value is not None})
+        return [{"written": len(parameters["rows"])}]
+
+
+def test_upsert_inserts_then_reports_unchanged(tmp_path, monkeypatch, fake_driver):
+    """Повторный upsert тех же данных ничего не записывает, изменение одной ячейки - одну связь"""
+    creator = make_creator(tmp_path, monkeypatch)
+    graph = FakeGraph(fake_driver)
+    creator.driver = fake_driver
+    node_config = NODES[0]
+
+    first = creator.upsert_node(node_config)
+    assert first["status"] == "inserted"
+
+    fake_driver.queries.clear()
+    second = creator.upsert_node(node_config)
+    assert second["status"] == "unchanged"
+    assert second["edges"] == {"inserted": 0, "updated": 0, "unchanged": 3, "removed": 0}
+    assert graph.writes == []
+
+    # Меняем значение одного региона
+    region_file = tmp_path / "БД" / "2019" / "2019" / "Тверская область" / "Раздел 2.1.1.1.csv"
+    region_file.write_text(region_file.read_text(encoding='utf-8').replace(";210;", ";999;"), encoding='utf-8')
+    creator.table_cache.clear()
+
+    third = creator.upsert_node(node_config)
+    assert third["status"] == "updated"
+    assert third["edges"] == {"inserted": 0, "updated": 1, "unchanged": 2, "removed": 0}
+    assert len(graph.writes) == 1
+    assert "MERGE (n)-[r:ПоРегион]->(reg)" in graph.writes[0]
+    assert graph.edges[(first["node_id"], "Тверская область")]["value_2019"] == 999.0
+
+
+def test_relationships_layout_removes_stale_arrays(tmp_path, monkeypatch, fake_driver):
+    """Переход на хранение в связях удаляет массивы узла, записанные раньше"""
+    creator = make_creator(tmp_path, monkeypatch)
+    graph = FakeGraph(fake_driver)
+    creator.driver = fake_driver
+    node_config = NODES[0]
+
+    creator.storage_layout = "both"
+    node_id = creator.upsert_node(node_config)["node_id"]
+    assert "region_keys" in graph.nodes[node_config["node_name"]]["properties"]
+
+    creator.storage_layout = "relationships"
+    outcome = creator.upsert_node(node_config)
+
+    assert outcome["status"] == "updated"
+    properties = graph.nodes[node_config["node_name"]]["properties"]
+    assert "region_keys" not in properties and "regional_values" not in properties
+
+    fake_driver.queries.clear()
+    assert creator.upsert_node(node_config)["status"] == "unchanged"
+    assert graph.writes == []
+    assert creator.rewrite_node(node_id, node_config) == node_id
+
+
+def test_upsert_removes_edges_of_regions_no_longer_extracted(tmp_path, monkeypatch, fake_driver):
+    """Связь ПоРегион региона, которого больше нет в данных, удаляется и учитывается в счетчике removed"""
+    creator = make_creator(tmp_path, monkeypatch)
+    graph = FakeGraph(fake_driver)
+    creator.driver = fake_driver
+    node_config = NODES[0]
+
+    node_id = creator.upsert_node(node_config)["node_id"]
+    assert {region for _, region in graph.edges} == set(REGIONS)
+
+    monkeypatch.setattr(creator, "get_regions_list", lambda year="2024": list(REGIONS[:-1]))
+    outcome = creator.upsert_node(node_config)
+
+    assert outcome["status"] == "updated"
+    assert outcome["edges"]["removed"] == 1
+    assert {region for _, region in graph.edges} == set(REGIONS[:-1])
+
+    fake_driver.queries.clear()
+    assert creator.upsert_node(node_config)["edges"]["removed"] == 0
+    assert not any("DELETE r" in query for query in graph.writes)
+    assert all(key[0] == node_id for key in graph.edges)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Тесты виртуальных расчетных узлов и кеша их результатов (ETL/virtual_indicators.py)
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+sys.path.append(str(PROJECT_ROOT))
+
+from ETL.virtual_indicators import VirtualIndicatorResolver, VirtualResultCache
+from ETL.calculated_node_creator import CalculatedNodeCreator
+
+YEARS = ["2023", "2024"]
+
+
+def stored(name, federal, moscow):
+    return {"node_name": name, "federal_values": federal, "years": YEARS,
+            "edges": [{"region": "г. Москва", "values": dict(zip(["value_2023", "value_2024"], moscow))}]}
+
+
+def virtual(name, formula, children):
+    return {"node_name": name, "years": YEARS, "federal_values": None, "virtual": True, "formula": formula,
+            "child_nodes": children, "edges": []}
+
+
+def graph_driver(fake_driver, nodes):
+    """Драйвер, возвращающий узлы nodes по node_ids запроса"""
+    return fake_driver.on("", lambda query, parameters: [
+        {"node_id": node_id, **nodes[node_id]} for node_id in parameters["node_ids"] if node_id in nodes
+    ])
+
+
+def make_nodes():
+    return {
+        "id-1": stored("Показатель 1", [1.0, 2.0], [1.0, 2.0]),
+        "id-2": stored("Показатель 2", [4.0, 0.0], [4.0, 8.0]),
+        "v-share": virtual("Доля", "node_id1 / node_id2", ["id-1", "id-2"]),
+        "v-pct": virtual("Процент", "node_id1 * 100", ["v-share"]),
+    }
+
+
+def test_virtual_node_is_computed_on_read(fake_driver):
+    resolver = VirtualIndicatorResolver(graph_driver(fake_driver, make_nodes()), "neo4j", YEARS, VirtualResultCache())
+
+    data = resolver.get_node_data("v-share")
+
+    assert data["federal_values"] == [0.25, 0.0]
+    assert data["regions"] == ["г. Москва"]
+    assert data["regional_values"] == [[0.25, 0.25]]
+
+
+def test_nested_virtual_nodes_and_cache_hits(fake_driver):
+    cache = VirtualResultCache()
+    resolver = VirtualIndicatorResolver(graph_driver(fake_driver, make_nodes()), "neo4j", YEARS, cache)
+
+    first = resolver.get_node_data("v-pct")
+    assert first["federal_values"] == [25.0, 0.0]
+    assert cache.stats()["misses"] == 2
+
+    second = resolver.get_node_data("v-pct")
+    assert second["regional_values"] == first["regional_values"]
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["entries"] == 2
+
+
+def test_child_data_change_invalidates_result(fake_driver):
+    nodes = make_nodes()
+    cache = VirtualResultCache()
+    resolver = VirtualIndicatorResolver(graph_driver(fake_driver, nodes), "neo4j", YEARS, cache)
+
+    before = resolver.get_node_data("v-pct")
+    nodes["id-1"] = stored("Показатель 1", [2.0, 2.0], [2.0, 2.0])
+    after = resolver.get_node_data("v-pct")
+
+    assert after["federal_values"] == [50.0, 0.0]
+    assert after["data_version"] != before["data_version"]
+
+
+def test_cache_is_bounded():
+    cache = VirtualResultCache(max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.put(key, {"federal_values": []})
+
+    assert cache.get("a") is None
+    assert cache.stats()["evictions"] == 1
+    assert cache.clear() == 2
+
+
+def test_virtual_cycle_is_reported(fake_driver):
+    nodes = {"v-a": virtual("A", "node_id1", ["v-b"]), "v-b": virtual("B", "node_id1", ["v-a"])}
+    resolver = VirtualIndicatorResolver(graph_driver(fake_driver, nodes), "neo4j", YEARS, VirtualResultCache())
+
+    with pytest.raises(ValueError):
+        resolver.get_node_data("v-a")
+
+
+def test_creator_stores_only_definition_of_virtual_node():
+    creator = CalculatedNodeCreator(str(PROJECT_ROOT / "neo4j_config.json"))
+    creator.years = YEARS
+    config = {"node_name": "Доля", "node_label": "Расчетные", "formula": "node_id1 / node_id2",
+              "child_nodes": ["id-1", "id-2"], "virtual": True}
+    children = [{"node_id": "id-1", "federal_values": [1.0, 2.0]}, {"node_id": "id-2", "federal_values": [4.0, 4.0]}]
+
+    properties, _, _ = creator.compute_calculated_node(config, children)
+    stored_properties = creator.stored_properties(config, properties)
+
+    assert properties["federal_values"] == [0.25, 0.5]
+    assert stored_properties == {"name": "Доля", "полное_название": "Доля", "years": YEARS,
+                                 "formula": "node_id1 / node_id2", "child_nodes": ["id-1", "id-2"], "virtual": True}
+    assert creator.stored_properties({**config, "virtual": False}, properties) is properties
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Тесты потокового разбиения регионального Excel файла на CSV разделов (ETL/workbook_splitter.py)
+"""
+
+import sys
+from pathlib import Path
+
+import openpyxl
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+sys.path.append(str(PROJECT_ROOT))
+
+from ETL.excel_processor import process_directory
+from ETL.regional_excel_processor import save_sheets_to_region_folder
+from ETL.workbook_splitter import StreamingNotSupportedError, split_workbook_to_csv, streaming_supported
+
+
+def make_workbook(path: Path) -> None:
+    """Книга в формате статистической формы: титул, объединенные заголовки, разделы"""
+    workbook = openpyxl.Workbook()
+    workbook.active.title = "Титул"
+    workbook.active["A1"] = "Сведения об организации"
+
+    for section, offset in (("Раздел 1.1", 0), ("Раздел 2", 100)):
+        ws = workbook.create_sheet(section)
+        ws["A1"] = f"{section}. Общие\nсведения"
+        ws.merge_cells("A1:F1")
+        ws["A3"] = "Наименование показателей"
+        ws.merge_cells("A3:B4")
+        ws["C3"] = "№ строки"
+        ws.merge_cells("C3:C4")
+        ws["D3"] = "Численность"
+        ws.merge_cells("D3:E3")
+        ws["D4"] = "всего"
+        ws["E4"] = "в том числе\r\nженщин"
+        ws["F3"] = "Доля, %"
+        ws.merge_cells("F3:F4")
+        ws.append([1, None, 2, 3, 4, 5])
+        ws.append(["Организации  ", None, "01", 10 + offset, 4.0, 0.25])
+        ws.append(["Филиалы", None, "02", None, "#DIV/0!", 1.5])
+        ws.append([])
+        ws.append(["Всего", None, "03", 12 + offset, 7, None])
+
+    workbook.create_sheet("Справка")["A1"] = "Не раздел"
+    workbook.save(path)
+
+
+def csv_files(directory: Path) -> dict:
+    return {path.name: path.read_bytes() for path in sorted(directory.iterdir())}
+
+
+def test_streaming_output_matches_two_stage_pipeline(tmp_path):
+    source = tmp_path / "Алтайский край (ГОУ) (город+село).xlsx"
+    make_workbook(source)
+
+    legacy_files = save_sheets_to_region_folder(str(source), "Алтайский край", str(tmp_path / "legacy"), streaming=False)
+    assert [Path(path).name for path in legacy_files] == ["Раздел 1.1.xlsx", "Раздел 2.xlsx"]
+    process_directory(str(tmp_path / "legacy" / "Алтайский край"))
+
+    created = save_sheets_to_region_folder(str(source), "Алтайский край", str(tmp_path / "streaming"))
+
+    streaming = csv_files(tmp_path / "streaming" / "Алтайский край")
+    assert [Path(path).name for path in created] == ["Раздел 1.1.csv", "Раздел 2.csv"]
+    assert list(streaming) == ["Раздел 1.1.csv", "Раздел 2.csv"]
+    assert streaming == csv_files(tmp_path / "legacy" / "Алтайский край")
+    assert "Численность всего" in streaming["Раздел 2.csv"].decode("utf-8-sig")
+
+
+def test_merged_range_below_last_data_row(tmp_path):
+    """Объединенный диапазон заполняется и в строках ниже последней строки с данными"""
+    source = tmp_path / "Регион.xlsx"
+    workbook = openpyxl.Workbook()
+    ws = workbook.active
+    ws.title = "Раздел 1"
+    ws.append(["Форма"])
+    ws.append(["Наименование", "№ строки", "Всего"])
+    ws.append(["Строка", "01", 5])
+    ws["A4"] = "Итого"
+    ws.merge_cells("A4:A6")
+    workbook.save(source)
+
+    created = split_workbook_to_csv(str(source), str(tmp_path / "out"))
+    save_sheets_to_region_folder(str(source), "Регион", str(tmp_path / "legacy"), streaming=False)
+    process_directory(str(tmp_path / "legacy" / "Регион"))
+
+    content = Path(created[0]).read_text(encoding="utf-8-sig")
+    assert content.count("Итого") == 3
+    assert csv_files(tmp_path / "out") == csv_files(tmp_path / "legacy" / "Регион")
+
+
+def test_workbook_without_sections_is_rejected(tmp_path):
+    source = tmp_path / "Регион.xlsx"
+    openpyxl.Workbook().save(source)
+
+    with pytest.raises(ValueError):
+        split_workbook_to_csv(str(source), str(tmp_path / "out"))
+
+
+def test_missing_openpyxl_internals_fall_back_to_legacy_path(tmp_path, monkeypatch):
+    """Без закрытых атрибутов openpyxl книга разбивается прежним путем"""
+    source = tmp_path / "Алтайский край.xlsx"
+    make_workbook(source)
+    save_sheets_to_region_folder(str(source), "Алтайский край", str(tmp_path / "streaming"))
+
+    workbook = openpyxl.load_workbook(source, read_only=True)
+    assert streaming_supported(workbook, ["Раздел 2"])
+    workbook.close()
+    assert not streaming_supported(openpyxl.Workbook(), ["Sheet"])
+
+    monkeypatch.setattr("ETL.workbook_splitter.streaming_supported", lambda workbook, sheets: False)
+
+    with pytest.raises(StreamingNotSupportedError):
+        split_workbook_to_csv(str(source), str(tmp_path / "out"))
+    assert not (tmp_path / "out").exists()
+
+    created = save_sheets_to_region_folder(str(source), "Алтайский край", str(tmp_path / "fallback"))
+    assert all(path.endswith(".xlsx") for path in created)
+    process_directory(str(tmp_path / "fallback" / "Алтайский край"))
+
+    assert csv_files(tmp_path / "fallback" / "Алтайский край") == csv_files(tmp_path / "streaming" / "Алтайский край")
@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 import os
+import sys
 from pathlib import Path
 from typing import Dict, List, Optional, Any
 
@@ -8,6 +9,12 @@ from typing import Dict, List, Optional, Any
 PROJECT_ROOT = Path(__file__).parent.parent.absolute()
 BASE_DIR = os.path.join(PROJECT_ROOT, "БД")
 
+# Добавляем корневую директорию в путь для импорта ETL
+sys.path.append(str(PROJECT_ROOT))
+
+from ETL.table_cache import get_table_cache, format_cell_value
+from ETL.columnar_store import open_store_if_available, project_store_dir
+
 def get_file_path(year: str, table_number: str) -> str:
     """
     Формирует путь к файлу для конкретного года и номера таблицы.
@@ -31,37 +38,16 @@ def get_cell_value(file_path: str, column_number: int, row_number: int) -> str:
         row_number (int): Номер строки (начиная с 1)
     
     Returns:
-        str: Значение ячейки
+        str: Исходный текст ячейки ("" для пустой ячейки и ячейки вне таблицы)
     """
-    # Читаем CSV файл
-    df = pd.read_csv(file_path, header=None, encoding='utf-8', sep=';')
-    
-    # Находим строку с заголовком (содержит "№ строки")
-    header_row_index = None
-    for idx, row in df.iterrows():
-        if isinstance(row[0], str) and "№ строки" in str(row[0]):
-            header_row_index = idx
-            break
+    # Берем разобранную таблицу из общего кеша процесса
+    table = get_table_cache().get_table(file_path)
     
-    if header_row_index is None:
+    if table.header_row_index is None:
         raise ValueError("Не удалось найти строку заголовка с '№ строки'")
     
-    # Данные начинаются со следующей строки после заголовка
-    data_start_index = header_row_index + 1
-    
-    # Получаем реальный индекс строки с учетом смещения
-    actual_row_index = data_start_index + row_number - 1
-    
-    # Получаем значение ячейки (column_number - 1, так как в pandas индексация с 0)
-    cell_value = df.iloc[actual_row_index, column_number - 1]
-
-    #Удалить последний символ
-    
-    
-    # Проверяем на NaN и конвертируем в строку
-    if pd.isna(cell_value):
-        return ""
-    return str(cell_value)
+    # Текст ячейки как в файле: нечисловые значения и десятичная запятая сохраняются
+    return table.get_text(column_number, row_number)
 
 
 
@@ -84,12 +70,18 @@ def get_cell_value_by_table(table_number: str, column_number: int, row_number: i
     # Генерируем список годов в указанном диапазоне
     years = [str(year) for year in range(int(start_year), int(end_year) + 1)]
     
+    # Скомпилированное колоночное хранилище (если оно собрано)
+    store = open_store_if_available(project_store_dir())
+    
     for year in years:
         file_path = get_file_path(year, table_number)
         try:
             if os.path.exists(file_path):
+                # CSV файл отдает исходный текст ячейки
                 value = get_cell_value(file_path, column_number, row_number)
                 result[year] = value
+            elif store is not None and store.has_year(year):
+                result[year] = format_cell_value(store.get_value(year, table_number, row_number, column_number))
             else:
                 result[year] = ""
         except Exception as e:
@@ -1,7 +1,15 @@
 import os
 import csv
+import sys
+from pathlib import Path
 from typing import Dict, Optional, Tuple
 
+# Добавляем корневую директорию в путь для импорта ETL
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+sys.path.append(str(PROJECT_ROOT))
+
+from ETL.columnar_store import open_store_if_available, project_store_dir
+
 class TableSchemaError(Exception):
     """Пользовательское исключение для ошибок при работе со схемой таблицы"""
     pass
@@ -23,6 +31,13 @@ def get_table_schema(table_number: str, year: str) -> Dict[str, Dict[str, str]]:
         TableSchemaError: Если файл не найден или возникла ошибка при чтении
     """
     try:
+        # Сначала ищем подписи в колоночном хранилище (если оно собрано)
+        store = open_store_if_available(project_store_dir())
+        if store is not None and store.has_year(year):
+            schema = store.get_table_schema(table_number, year)
+            if schema is not None:
+                return schema
+        
         # Формируем путь к файлу (БД находится в корне проекта)
         project_root = os.path.dirname(os.path.dirname(__file__))
         base_dir = os.path.join(project_root, 'БД', year)